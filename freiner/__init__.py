@@ -7,21 +7,65 @@ from .limits import (
     RateLimitItemPerSecond,
     RateLimitItemPerYear,
 )
-from .storage import FixedWindowStorage, MovingWindow, MovingWindowStorage
+from .storage import (
+    ConcurrencyStorage,
+    FixedWindow,
+    FixedWindowBatchStorage,
+    FixedWindowBulkStorage,
+    FixedWindowStatsStorage,
+    FixedWindowStorage,
+    GCRABatchStorage,
+    GCRABulkStorage,
+    GCRAState,
+    GCRAStorage,
+    MovingWindow,
+    MovingWindowBatchStorage,
+    MovingWindowBulkStorage,
+    MovingWindowRetryStorage,
+    MovingWindowStorage,
+    SlidingWindow,
+    SlidingWindowCounterBatchStorage,
+    SlidingWindowCounterBulkStorage,
+    SlidingWindowCounterStorage,
+)
 from .storage.memory import MemoryStorage
 from .strategies import RateLimiter, WindowStats
+from .strategies.adaptive import AdaptiveRateLimiter
+from .strategies.composite import CompositeRateLimiter
+from .strategies.concurrency import ConcurrencyLimiter, Lease
 from .strategies.fixed_window import FixedWindowRateLimiter
 from .strategies.fixed_window_elastic import FixedWindowElasticExpiryRateLimiter
+from .strategies.gcra import GCRARateLimiter
+from .strategies.leasing import LeasingRateLimiter
 from .strategies.moving_window import MovingWindowRateLimiter
+from .strategies.negative_cache import NegativeCacheRateLimiter
+from .strategies.sliding_window_counter import SlidingWindowCounterRateLimiter
+from .strategies.waiting import WaitingRateLimiter
 from .util import parse, parse_many
 
 
 __version__ = "3.1.0"
 
 __all__ = [
+    "ConcurrencyStorage",
+    "FixedWindow",
+    "FixedWindowBatchStorage",
+    "FixedWindowBulkStorage",
+    "FixedWindowStatsStorage",
     "FixedWindowStorage",
+    "GCRABatchStorage",
+    "GCRABulkStorage",
+    "GCRAState",
+    "GCRAStorage",
     "MovingWindow",
+    "MovingWindowBatchStorage",
+    "MovingWindowBulkStorage",
+    "MovingWindowRetryStorage",
     "MovingWindowStorage",
+    "SlidingWindow",
+    "SlidingWindowCounterBatchStorage",
+    "SlidingWindowCounterBulkStorage",
+    "SlidingWindowCounterStorage",
     "MemoryStorage",
     "RateLimitItem",
     "RateLimitItemPerYear",
@@ -32,9 +76,18 @@ __all__ = [
     "RateLimitItemPerSecond",
     "RateLimiter",
     "WindowStats",
+    "AdaptiveRateLimiter",
+    "CompositeRateLimiter",
+    "ConcurrencyLimiter",
+    "Lease",
     "FixedWindowRateLimiter",
     "FixedWindowElasticExpiryRateLimiter",
+    "GCRARateLimiter",
+    "LeasingRateLimiter",
     "MovingWindowRateLimiter",
+    "NegativeCacheRateLimiter",
+    "SlidingWindowCounterRateLimiter",
+    "WaitingRateLimiter",
     "parse",
     "parse_many",
 ]
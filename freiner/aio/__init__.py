@@ -0,0 +1,24 @@
+from .storage import (
+    AsyncFixedWindowStorage,
+    AsyncMovingWindowRetryStorage,
+    AsyncMovingWindowStorage,
+)
+from .storage.memory import AsyncMemoryStorage
+from .strategies import AsyncRateLimiter
+from .strategies.fixed_window import AsyncFixedWindowRateLimiter
+from .strategies.fixed_window_elastic import AsyncFixedWindowElasticExpiryRateLimiter
+from .strategies.moving_window import AsyncMovingWindowRateLimiter
+from .strategies.waiting import AsyncWaitingRateLimiter
+
+
+__all__ = [
+    "AsyncFixedWindowStorage",
+    "AsyncMovingWindowRetryStorage",
+    "AsyncMovingWindowStorage",
+    "AsyncMemoryStorage",
+    "AsyncRateLimiter",
+    "AsyncFixedWindowRateLimiter",
+    "AsyncFixedWindowElasticExpiryRateLimiter",
+    "AsyncMovingWindowRateLimiter",
+    "AsyncWaitingRateLimiter",
+]
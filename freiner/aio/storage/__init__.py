@@ -0,0 +1,106 @@
+from typing import Protocol, runtime_checkable
+
+from freiner.storage import MovingWindow
+
+
+@runtime_checkable
+class AsyncFixedWindowStorage(Protocol):
+    async def incr(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> int:
+        """
+        Increments the counter for the given rate limit key.
+
+        # noqa: DAR202
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The number of hits currently on the rate limit for the given key.
+        """
+
+    async def get(self, key: str) -> int:
+        """
+        Retrieve the current request count for the given rate limit key.
+
+        :param key: The key to get the counter value for.
+        """
+
+    async def get_expiry(self, key: str) -> float:
+        """
+        Retrieve the expected expiry time for the given rate limit key.
+
+        # noqa: DAR202
+
+        :param key: The key to get the expiry time for.
+        :return: The time at which the current rate limit for the given key ends.
+        """
+
+    async def clear(self, key: str) -> None:
+        """
+        Resets the rate limit for the given key.
+
+        :param key: The key to clear rate limits for.
+        """
+
+
+@runtime_checkable
+class AsyncMovingWindowStorage(Protocol):
+    async def acquire_entry(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> bool:
+        """
+        :param key: The rate limit key to acquire an entry in.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entry to expire in.
+        :param no_add: If False, an entry is not actually acquired but instead serves as a 'check'.
+        :param amount: The number of entries to acquire at once.
+        """
+
+    async def get_moving_window(self, key: str, limit: int, expiry: int) -> MovingWindow:
+        """
+        Retrieves the starting point and the number of entries in the moving window.
+
+        # noqa: DAR202
+
+        :param key: The rate limit key to retrieve statistics about.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entry to expire in.
+        :return: (start of window, number of acquired entries)
+        """
+
+    async def clear(self, key: str) -> None:
+        """
+        Resets the rate limit for the given key.
+
+        :param key: The key to clear rate limits for.
+        """
+
+
+@runtime_checkable
+class AsyncMovingWindowRetryStorage(Protocol):
+    async def get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then. At most ``limit - amount`` entries may
+        remain in the window, so this is when the newest entry beyond those expires.
+
+        # noqa: DAR202
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        """
+
+
+__all__ = [
+    "AsyncFixedWindowStorage",
+    "AsyncMovingWindowRetryStorage",
+    "AsyncMovingWindowStorage",
+]
@@ -0,0 +1,169 @@
+from typing import Any, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiomcache
+
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.errors import FreinerConfigurationError
+from freiner.keys import HashedKeyEncoder
+
+
+class AsyncMemcachedStorage:
+    """
+    Rate limit storage with memcached as backend, for use with asyncio.
+
+    Depends on the `aiomcache` library, as `pymemcache` doesn't support asyncio.
+
+    :param client: The asyncio memcached client to use.
+    :param clock: The clock to read the current time from. Defaults to the system clock. As
+                  expiry times are stored in memcached, this should not be a
+                  :class:`freiner.clock.MonotonicClock`.
+    :param key_encoder: Encodes each rate limit key before it is sent to memcached, such as a
+                        :class:`freiner.keys.HashedKeyEncoder` to store long keys as short
+                        digests. Defaults to storing the keys as they are.
+    :raises FreinerConfigurationError: If the key encoder's keys aren't text, as memcached
+                                       doesn't accept whitespace or control characters in keys.
+    """
+
+    MAX_CAS_RETRIES = 10
+
+    #: The default size of the connection pool created by :meth:`from_uri`.
+    DEFAULT_POOL_SIZE = 100
+
+    def __init__(
+        self,
+        client: aiomcache.Client,
+        clock: Optional[Clock] = None,
+        key_encoder: Optional[HashedKeyEncoder] = None,
+    ) -> None:
+        if key_encoder is not None and not key_encoder.text:
+            raise FreinerConfigurationError("Memcached requires a key encoder with text=True")
+
+        self._client: aiomcache.Client = client
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self._key_encoder = key_encoder
+
+    def _key(self, key: str) -> bytes:
+        # The key as it is stored in memcached.
+        if self._key_encoder is None:
+            return key.encode()
+        return self._key_encoder(key)
+
+    @classmethod
+    def from_uri(cls, uri: str, **options: Any) -> "AsyncMemcachedStorage":
+        """
+        :param uri: URI of the form `memcached://host:port`.
+        :param options: All remaining keyword arguments are passed directly to the constructor
+                        of :class:`aiomcache.Client`. ``pool_size``, which limits the number of
+                        concurrent connections, defaults to :attr:`DEFAULT_POOL_SIZE`.
+        :raises FreinerConfigurationError: When a single host couldn't be parsed from the
+                                           supplied URI, as `aiomcache` doesn't support
+                                           distributing keys across several hosts.
+        """
+
+        parsed_uri = urlparse(uri)
+        locs = [loc for loc in parsed_uri.netloc.strip().split(",") if loc]
+        if len(locs) != 1:
+            raise FreinerConfigurationError(f"Exactly one Memcached host is required: {uri}")
+
+        host, port = locs[0].split(":")
+        options.setdefault("pool_size", cls.DEFAULT_POOL_SIZE)
+        return cls(aiomcache.Client(host, int(port), **options))
+
+    async def get(self, key: str) -> int:
+        """
+        Retrieve the current request count for the given rate limit key.
+
+        :param key: The key to get the counter value for.
+        """
+
+        return int(await self._client.get(self._key(key)) or 0)
+
+    async def clear(self, key: str) -> None:
+        """
+        Resets the rate limit for the given key.
+
+        :param key: The key to clear rate limits for.
+        """
+
+        await self._client.delete(self._key(key))
+
+    async def incr(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> int:
+        """
+        Increments the counter for the given rate limit key.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The number of hits currently on the rate limit for the given key.
+        """
+
+        counter, _ = await self._incr(key, expiry, elastic_expiry, amount)
+        return counter
+
+    async def _incr(
+        self, key: str, expiry: int, elastic_expiry: bool, amount: int
+    ) -> Tuple[int, Optional[float]]:
+        # Returns the new count, and the counter's expiry time if it was set by this call.
+        encoded_key = self._key(key)
+        if await self._client.add(encoded_key, str(amount).encode(), expiry):
+            return amount, await self._set_expiry(key, expiry)
+
+        if not elastic_expiry:
+            try:
+                return await self._client.incr(encoded_key, amount) or amount, None
+            except aiomcache.ClientException:
+                # The counter expired after it couldn't be added, so it's counted from scratch.
+                await self._client.set(encoded_key, str(amount).encode(), expiry)
+                return amount, await self._set_expiry(key, expiry)
+
+        retry = 0
+        while True:
+            value, cas = await self._client.gets(encoded_key)
+            counter = int(value or 0) + amount
+            if cas is None:
+                # The counter expired after it couldn't be added, so it's counted from scratch.
+                await self._client.set(encoded_key, str(counter).encode(), expiry)
+                break
+            if (
+                await self._client.cas(encoded_key, str(counter).encode(), cas, expiry)
+                or retry >= self.MAX_CAS_RETRIES
+            ):
+                break
+            retry += 1
+
+        return counter, await self._set_expiry(key, expiry)
+
+    async def _set_expiry(self, key: str, expiry: int) -> float:
+        expiry_time = expiry + self._clock.now()
+        await self._client.set(self._key(key + "/expires"), str(expiry_time).encode(), expiry)
+        return expiry_time
+
+    async def get_expiry(self, key: str) -> float:
+        """
+        Retrieve the expected expiry time for the given rate limit key.
+
+        :param key: The key to get the expiry time for.
+        :return: The time at which the current rate limit for the given key ends.
+        """
+
+        return float(await self._client.get(self._key(key + "/expires")) or self._clock.now())
+
+    async def check(self) -> bool:
+        """
+        Check if the connection to the storage backend is healthy.
+        """
+
+        try:
+            await self._client.version()
+            return True
+        except:  # noqa
+            return False
+
+
+__all__ = [
+    "AsyncMemcachedStorage",
+]
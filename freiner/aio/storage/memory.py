@@ -0,0 +1,257 @@
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple
+
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.storage import MovingWindow
+from freiner.storage.memory import _MovingWindowEvents
+
+
+class _Counter:
+    """
+    The count and expiry time of a single fixed window, updated in place.
+    """
+
+    __slots__ = ("value", "expires_at")
+
+    def __init__(self, value: int, expires_at: float) -> None:
+        self.value = value
+        self.expires_at = expires_at
+
+
+class AsyncMemoryStorage:
+    """
+    Rate limit storage in process memory, for use with asyncio.
+
+    Every operation runs to completion without awaiting anything, so it can't be interleaved
+    with other tasks on the event loop. This makes each operation atomic without any locks, as
+    long as the storage is only used from a single event loop.
+
+    Each fixed window is a single object holding its count and expiry time, and each moving
+    window is a ring buffer of timestamps, as in :class:`freiner.storage.memory.MemoryStorage`.
+
+    Instead of a background thread or timers, expired keys are removed lazily. Reads ignore
+    expired data, and every write first removes the keys whose deadlines have passed, found
+    through a heap of deadlines. The memory of expired keys is therefore only reclaimed once
+    the storage is written to again.
+
+    As data never leaves the process, any :class:`freiner.clock.Clock` can be used, including
+    a :class:`freiner.clock.MonotonicClock` to stay correct when the system clock is adjusted.
+
+    :param clock: The clock to read the current time from. Defaults to the system clock.
+    """
+
+    def __init__(self, clock: Optional[Clock] = None) -> None:
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self._counters: Dict[str, _Counter] = {}
+        self._events: Dict[str, _MovingWindowEvents] = {}
+
+        self._expiry_heap: List[Tuple[float, str]] = []
+        # The deadline of each key's live entry in the expiry heap. Heap entries which don't
+        # match are stale, and are skipped when they reach the top of the heap.
+        self._scheduled: Dict[str, float] = {}
+
+    def _schedule(self, key: str, deadline: float) -> None:
+        # Entries are not moved when a key's deadline moves later. Instead, the key is pushed
+        # back with its current deadline when its entry reaches the top of the heap.
+        if key not in self._scheduled:
+            self._scheduled[key] = deadline
+            heapq.heappush(self._expiry_heap, (deadline, key))
+
+    def _sweep(self, timestamp: float) -> None:
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= timestamp:
+            scheduled_deadline, key = heapq.heappop(heap)
+            if self._scheduled.get(key) != scheduled_deadline:
+                continue
+
+            deadline: Optional[float] = None
+            counter = self._counters.get(key)
+            if counter is not None:
+                if counter.expires_at <= timestamp:
+                    del self._counters[key]
+                else:
+                    deadline = counter.expires_at
+            events = self._events.get(key)
+            if events is not None:
+                events.expire(timestamp - events.expiry)
+                if not events:
+                    del self._events[key]
+                else:
+                    events_deadline = events[len(events) - 1] + events.expiry
+                    if deadline is None or events_deadline > deadline:
+                        deadline = events_deadline
+
+            if deadline is None:
+                del self._scheduled[key]
+            else:
+                self._scheduled[key] = deadline
+                heapq.heappush(heap, (deadline, key))
+
+    async def incr(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> int:
+        """
+        Increments the counter for the given rate limit key.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The number of hits currently on the rate limit for the given key.
+        """
+
+        timestamp = self._clock.now()
+        if self._expiry_heap and self._expiry_heap[0][0] <= timestamp:
+            self._sweep(timestamp)
+
+        counter = self._counters.get(key)
+        if counter is None or counter.expires_at <= timestamp:
+            counter = self._counters[key] = _Counter(amount, timestamp + expiry)
+            self._schedule(key, counter.expires_at)
+        else:
+            counter.value += amount
+            if elastic_expiry:
+                counter.expires_at = timestamp + expiry
+        return counter.value
+
+    async def get(self, key: str) -> int:
+        """
+        Retrieve the current request count for the given rate limit key.
+
+        :param key: The key to get the counter value for.
+        """
+
+        counter = self._counters.get(key)
+        if counter is None or counter.expires_at <= self._clock.now():
+            return 0
+        return counter.value
+
+    async def get_expiry(self, key: str) -> float:
+        """
+        Retrieve the expected expiry time for the given rate limit key.
+
+        :param key: The key to get the expiry time for.
+        :return: The time at which the current rate limit for the given key ends.
+        """
+
+        counter = self._counters.get(key)
+        if counter is None or counter.expires_at <= self._clock.now():
+            return -1
+        return counter.expires_at
+
+    async def clear(self, key: str) -> None:
+        """
+        Resets the rate limit for the given key.
+
+        :param key: The key to clear rate limits for.
+        """
+
+        self._counters.pop(key, None)
+        self._events.pop(key, None)
+
+    async def acquire_entry(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> bool:
+        """
+        :param key: The rate limit key to acquire an entry in.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entry to expire in.
+        :param no_add: If False, an entry is not actually acquired but instead serves as a 'check'.
+        :param amount: The number of entries to acquire at once.
+        """
+
+        if limit < 1 or amount > limit:
+            return False
+
+        timestamp = self._clock.now()
+        if self._expiry_heap and self._expiry_heap[0][0] <= timestamp:
+            self._sweep(timestamp)
+
+        events = self._events.get(key)
+        if events is not None:
+            if events.capacity != limit:
+                events = self._events[key] = events.resize(limit)
+            # At most limit - amount entries may remain in the window, so the newest entry
+            # beyond those must have expired.
+            index = len(events) - 1 - (limit - amount)
+            if index >= 0 and events[index] > timestamp - expiry:
+                return False
+        if no_add:
+            return True
+
+        if events is None:
+            events = self._events[key] = _MovingWindowEvents(limit, expiry)
+        events.expiry = expiry
+        if amount == 1:
+            events.append(timestamp)
+        else:
+            events.extend(timestamp, amount)
+        self._schedule(key, timestamp + expiry)
+        return True
+
+    async def get_moving_window(self, key: str, limit: int, expiry: int) -> MovingWindow:
+        """
+        Retrieves the starting point and the number of entries in the moving window.
+
+        :param key: The rate limit key to retrieve statistics about.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entry to expire in.
+        :return: (start of window, number of acquired entries)
+        """
+
+        timestamp = self._clock.now()
+        events = self._events.get(key)
+        if events:
+            acquired = len(events) - events.index_after(timestamp - expiry)
+            if acquired:
+                return MovingWindow(events[len(events) - 1], acquired)
+        return MovingWindow(timestamp, 0)
+
+    async def get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then.
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        """
+
+        if limit < 1 or amount > limit:
+            return math.inf
+
+        timestamp = self._clock.now()
+        events = self._events.get(key)
+        if events is not None:
+            index = len(events) - 1 - (limit - amount)
+            if index >= 0 and events[index] > timestamp - expiry:
+                return events[index] + expiry
+        return timestamp
+
+    async def check(self) -> bool:
+        """
+        Check if the connection to the storage backend is healthy.
+        """
+
+        return True
+
+    async def reset(self) -> None:
+        """
+        Removes the data for every key.
+        """
+
+        self._counters.clear()
+        self._events.clear()
+        self._expiry_heap.clear()
+        self._scheduled.clear()
+
+
+__all__ = [
+    "AsyncMemoryStorage",
+]
@@ -0,0 +1,116 @@
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from redis.asyncio import Redis
+from redis.asyncio.sentinel import Sentinel
+
+from freiner.clock import Clock
+from freiner.errors import FreinerConfigurationError
+from freiner.keys import HashedKeyEncoder
+
+from .redis import AsyncRedisStorage
+
+
+class AsyncRedisSentinelStorage(AsyncRedisStorage):
+    """
+    Rate limit storage with redis sentinel as backend, for use with asyncio.
+
+    Depends on the `redis` library, which provides :mod:`redis.asyncio`.
+    """
+
+    def __init__(
+        self,
+        sentinel: Sentinel,
+        service_name: str,
+        clock: Optional[Clock] = None,
+        key_encoder: Optional[HashedKeyEncoder] = None,
+    ) -> None:
+        self._sentinel: Sentinel = sentinel
+        self._service_name: str = service_name
+
+        self._sentinel_master: Redis = self._sentinel.master_for(self._service_name)
+        self._sentinel_slave: Redis = self._sentinel.slave_for(self._service_name)
+
+        super().__init__(self._sentinel_master, clock, key_encoder)
+
+    @classmethod
+    def from_uri(
+        cls, uri: str, service_name: Optional[str] = None, **options: Any
+    ) -> "AsyncRedisSentinelStorage":
+        """
+        :param uri: URI of the form `redis+sentinel://host:port,host:port/service_name`
+        :param service_name: Sentinel service name (if not provided in `uri`).
+        :param options: All remaining keyword arguments are passed directly to the constructor
+                        of :class:`redis.asyncio.sentinel.Sentinel`.
+        :raises FreinerConfigurationError: When no service name is provided.
+        """
+
+        parsed_uri = urlparse(uri)
+        sentinel_configuration = []
+
+        password = None
+        if parsed_uri.password:
+            password = parsed_uri.password
+
+        for loc in parsed_uri.netloc[parsed_uri.netloc.find("@") + 1 :].split(","):
+            host, port = loc.split(":")
+            sentinel_configuration.append((host, int(port)))
+
+        service_name = parsed_uri.path.replace("/", "") if parsed_uri.path else service_name
+        if service_name is None:
+            raise FreinerConfigurationError("'service_name' not provided")
+
+        options.setdefault("socket_timeout", 0.2)
+
+        sentinel = Sentinel(sentinel_configuration, password=password, **options)
+        return cls(sentinel, service_name)
+
+    async def get(self, key: str) -> int:
+        """
+        Retrieve the current request count for the given rate limit key.
+
+        :param key: The key to get the counter value for.
+        """
+
+        return await self._get(key, self._sentinel_slave)
+
+    async def get_expiry(self, key: str) -> float:
+        """
+        Retrieve the expected expiry time for the given rate limit key.
+
+        :param key: The key to get the expiry time for.
+        :return: The time at which the current rate limit for the given key ends.
+        """
+
+        return await self._get_expiry(key, self._sentinel_slave)
+
+    async def get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then.
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        """
+
+        return await self._get_moving_window_retry_time(
+            key, limit, expiry, self._sentinel_slave, amount
+        )
+
+    async def check(self) -> bool:
+        """
+        Check if the connection to the storage backend is healthy.
+        """
+
+        return await self._check(self._sentinel_slave)
+
+
+__all__ = [
+    "AsyncRedisSentinelStorage",
+]
@@ -0,0 +1,56 @@
+from typing import Any, Protocol, runtime_checkable
+
+from freiner.limits import RateLimitItem
+from freiner.strategies import WindowStats
+
+
+@runtime_checkable
+class AsyncRateLimiter(Protocol):
+    async def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit and returns ``True`` if successful.
+
+        # noqa: DAR202
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+    async def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
+
+        # noqa: DAR202
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+    async def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Retrieve statistics about the number of requests remaining within the given limit.
+
+        # noqa: DAR202
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+    async def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+
+__all__ = [
+    "AsyncRateLimiter",
+]
@@ -0,0 +1,85 @@
+import inspect
+from typing import Any
+
+from freiner.aio.storage import AsyncFixedWindowStorage
+from freiner.limits import RateLimitItem
+from freiner.strategies import WindowStats, _amount_argument
+
+
+class AsyncFixedWindowRateLimiter:
+    """
+    Reference: :ref:`fixed-window`
+
+    The asyncio counterpart of :class:`freiner.strategies.fixed_window.FixedWindowRateLimiter`.
+    """
+
+    _elastic_expiry = False
+
+    def __init__(self, storage: AsyncFixedWindowStorage) -> None:
+        if not isinstance(storage, AsyncFixedWindowStorage) or not inspect.iscoroutinefunction(
+            storage.incr
+        ):
+            msg = f"Async Fixed Window rate limiting is not implemented for storage of type {storage.__class__.__name__}"
+            raise TypeError(msg)
+
+        self.storage: AsyncFixedWindowStorage = storage
+
+    async def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit and returns ``True`` if successful.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+        counter = await self.storage.incr(
+            item.key_for(*identifiers),
+            item.get_expiry(),
+            elastic_expiry=self._elastic_expiry,
+            **_amount_argument(cost),
+        )
+        return counter <= item.amount
+
+    async def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+        return await self.storage.get(item.key_for(*identifiers)) + cost <= item.amount
+
+    async def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Returns the number of requests remaining within this limit.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+        key = item.key_for(*identifiers)
+        remaining = max(0, item.amount - await self.storage.get(key))
+        reset = await self.storage.get_expiry(key)
+        return WindowStats(reset, remaining)
+
+    async def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        await self.storage.clear(item.key_for(*identifiers))
+
+
+__all__ = [
+    "AsyncFixedWindowRateLimiter",
+]
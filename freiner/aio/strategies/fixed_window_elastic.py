@@ -0,0 +1,17 @@
+from .fixed_window import AsyncFixedWindowRateLimiter
+
+
+class AsyncFixedWindowElasticExpiryRateLimiter(AsyncFixedWindowRateLimiter):
+    """
+    Reference: :ref:`fixed-window-elastic`
+
+    The asyncio counterpart of
+    :class:`freiner.strategies.fixed_window_elastic.FixedWindowElasticExpiryRateLimiter`.
+    """
+
+    _elastic_expiry = True
+
+
+__all__ = [
+    "AsyncFixedWindowElasticExpiryRateLimiter",
+]
@@ -0,0 +1,116 @@
+import inspect
+import math
+from typing import Any
+
+from freiner.aio.storage import AsyncMovingWindowRetryStorage, AsyncMovingWindowStorage
+from freiner.limits import RateLimitItem
+from freiner.strategies import WindowStats, _amount_argument
+
+
+class AsyncMovingWindowRateLimiter:
+    """
+    Reference: :ref:`moving-window`
+
+    The asyncio counterpart of :class:`freiner.strategies.moving_window.MovingWindowRateLimiter`.
+    """
+
+    def __init__(self, storage: AsyncMovingWindowStorage) -> None:
+        if not isinstance(storage, AsyncMovingWindowStorage) or not inspect.iscoroutinefunction(
+            storage.acquire_entry
+        ):
+            msg = f"Async Moving Window rate limiting is not implemented for storage of type {storage.__class__.__name__}"
+            raise TypeError(msg)
+
+        self.storage: AsyncMovingWindowStorage = storage
+
+    async def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit and returns ``True`` if successful.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+        return await self.storage.acquire_entry(
+            item.key_for(*identifiers), item.amount, item.get_expiry(), **_amount_argument(cost)
+        )
+
+    async def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+        _, acquired_count = await self.storage.get_moving_window(
+            item.key_for(*identifiers), item.amount, item.get_expiry()
+        )
+
+        return acquired_count + cost <= item.amount
+
+    async def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Returns the number of requests remaining within this limit.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+        expiry = item.get_expiry()
+        window_start, window_items = await self.storage.get_moving_window(
+            item.key_for(*identifiers), item.amount, expiry
+        )
+        reset = window_start + expiry
+        return WindowStats(reset, item.amount - window_items)
+
+    async def get_retry_time(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> float:
+        """
+        Returns the time at which a hit of the given cost will next be allowed, if no further
+        hits are made. If the storage implements
+        :class:`freiner.aio.storage.AsyncMovingWindowRetryStorage`, this is when enough of the
+        window's entries will have expired. Otherwise, it is the limit's reset time, when all of
+        them will have.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: The time at which the hit will be allowed. This is no later than the current
+                 time if it would be allowed straight away, and infinity if the cost exceeds the
+                 limit.
+        """
+
+        key = item.key_for(*identifiers)
+        expiry = item.get_expiry()
+        if isinstance(self.storage, AsyncMovingWindowRetryStorage):
+            return await self.storage.get_moving_window_retry_time(
+                key, item.amount, expiry, **_amount_argument(cost)
+            )
+
+        if cost > item.amount:
+            return math.inf
+        window = await self.storage.get_moving_window(key, item.amount, expiry)
+        if window.acquired_count + cost <= item.amount:
+            return window.start_time
+        return window.start_time + expiry
+
+    async def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        await self.storage.clear(item.key_for(*identifiers))
+
+
+__all__ = [
+    "AsyncMovingWindowRateLimiter",
+]
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from freiner.aio.strategies import AsyncRateLimiter
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.limits import RateLimitItem
+from freiner.strategies import WindowStats
+from freiner.strategies.waiting import _wait_time
+
+
+class AsyncWaitingRateLimiter:
+    """
+    The asyncio counterpart of :class:`freiner.strategies.waiting.WaitingRateLimiter`.
+
+    Rate limiters which provide ``get_retry_time``, such as the moving window strategy, are
+    asked for the time at which a rejected hit will be allowed, just as the synchronous
+    counterpart does. Tasks waiting on the same limit in this event loop are served in the order
+    they arrived, and only the first of them reaches the storage at a time.
+
+    :param limiter: The rate limiter to wrap.
+    :param clock: The clock to compare reset times against. This should be the same clock as
+                  the wrapped rate limiter's storage uses. Defaults to the system clock.
+    """
+
+    #: The shortest time to sleep before trying again, in seconds.
+    MIN_WAIT = 0.001
+
+    def __init__(self, limiter: AsyncRateLimiter, clock: Optional[Clock] = None) -> None:
+        self.limiter: AsyncRateLimiter = limiter
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        # Each key's waiters, in the order they arrived. Only the first of them is ever set.
+        self._waiters: Dict[str, Deque[asyncio.Event]] = {}
+
+    async def _try_hit(
+        self, item: RateLimitItem, identifiers: Tuple[Any, ...], cost: int
+    ) -> Optional[float]:
+        # Returns None if the hit was allowed, or otherwise the time at which it would be.
+        if await self.limiter.hit(item, *identifiers, cost=cost):
+            return None
+
+        get_retry_time = getattr(self.limiter, "get_retry_time", None)
+        if get_retry_time is not None:
+            retry_time: float = await get_retry_time(item, *identifiers, cost=cost)
+            return retry_time
+        window_stats = await self.limiter.get_window_stats(item, *identifiers)
+        return window_stats.reset_time
+
+    async def acquire(
+        self, item: RateLimitItem, *identifiers: Any, cost: int = 1, timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Creates a hit on the rate limit, waiting until it is allowed if necessary.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :param timeout: The longest time to wait, in seconds. Defaults to waiting indefinitely.
+        :return: ``True`` once the hit was allowed, or ``False`` if it can't be allowed within
+                 the timeout. In that case, no time is spent waiting for a hit that would
+                 still be rejected.
+        """
+
+        if item.amount < 1 or cost > item.amount:
+            return False
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        key = item.key_for(*identifiers)
+        event = asyncio.Event()
+        waiters = self._waiters.setdefault(key, deque())
+        waiters.append(event)
+        if len(waiters) == 1:
+            event.set()
+
+        try:
+            if not event.is_set():
+                try:
+                    await asyncio.wait_for(
+                        event.wait(),
+                        None if deadline is None else max(deadline - time.monotonic(), 0),
+                    )
+                except asyncio.TimeoutError:
+                    return False
+
+            while True:
+                retry_time = await self._try_hit(item, identifiers, cost)
+                if retry_time is None:
+                    return True
+
+                wait = _wait_time(retry_time, self._clock.now(), self.MIN_WAIT)
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    return False
+                await asyncio.sleep(wait)
+        finally:
+            waiters.remove(event)
+            if waiters:
+                waiters[0].set()
+            else:
+                del self._waiters[key]
+
+    async def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit and returns ``True`` if successful, without waiting.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+        return await self.limiter.hit(item, *identifiers, cost=cost)
+
+    async def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+        return await self.limiter.test(item, *identifiers, cost=cost)
+
+    async def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Returns the number of requests remaining within this limit, from the wrapped rate
+        limiter.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+        return await self.limiter.get_window_stats(item, *identifiers)
+
+    async def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        await self.limiter.clear(item, *identifiers)
+
+
+__all__ = [
+    "AsyncWaitingRateLimiter",
+]
@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+import weakref
+from typing import Optional, Protocol, runtime_checkable
+
+
+@runtime_checkable
+class Clock(Protocol):
+    def now(self) -> float:
+        """
+        # noqa: DAR202
+
+        :return: The current time, in seconds since the epoch.
+        """
+
+
+class SystemClock:
+    """
+    Reads the system's wall clock on every call. This is the default clock for all storages.
+    """
+
+    def now(self) -> float:
+        """
+        :return: The current time, in seconds since the epoch.
+        """
+
+        return time.time()
+
+
+class MonotonicClock:
+    """
+    A clock that never goes backwards, even when the system's wall clock is adjusted.
+
+    Readings are taken from :func:`time.monotonic`, offset so that they match the wall clock at
+    the moment this clock was created. Different processes anchor their clocks at different
+    moments, so this clock is only suitable for storages whose data never leaves the process,
+    such as :class:`freiner.storage.memory.MemoryStorage`.
+    """
+
+    def __init__(self) -> None:
+        self._offset = time.time() - time.monotonic()
+
+    def now(self) -> float:
+        """
+        :return: The current time, in seconds since the epoch.
+        """
+
+        return time.monotonic() + self._offset
+
+
+def _tick(clock_ref: "weakref.ReferenceType[CoarseClock]", stop: threading.Event) -> None:
+    while True:
+        clock = clock_ref()
+        if clock is None:
+            return
+        clock._now = clock._source.now()
+        resolution = clock.resolution
+        del clock
+
+        if stop.wait(resolution):
+            return
+
+
+_coarse_clocks: "weakref.WeakSet[CoarseClock]" = weakref.WeakSet()
+
+
+def _restart_coarse_clocks() -> None:
+    # Threads don't survive a fork, so without this the child would read a frozen time forever.
+    for clock in list(_coarse_clocks):
+        clock._ticker = None
+        clock._start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_coarse_clocks)
+
+
+class CoarseClock:
+    """
+    A clock that caches the time, which a background thread refreshes every ``resolution``
+    seconds. Reading it is just an attribute lookup, at the cost of readings being up to
+    ``resolution`` seconds stale.
+
+    This is worthwhile when rate limiting a very large number of requests, where a window is
+    usually many orders of magnitude longer than the clock's resolution.
+
+    :param resolution: The time between refreshes, in seconds.
+    :param source: The clock to read the time from. Defaults to a :class:`SystemClock`.
+    :raises ValueError: If the resolution is not positive.
+    """
+
+    def __init__(self, resolution: float = 0.01, source: Optional[Clock] = None) -> None:
+        if resolution <= 0:
+            raise ValueError("CoarseClock requires a positive resolution.")
+
+        self.resolution = resolution
+        self._source: Clock = source if source is not None else SystemClock()
+        self._now = self._source.now()
+        self._ticker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self._start()
+        _coarse_clocks.add(self)
+
+    def _start(self) -> None:
+        if self._ticker is not None:
+            return
+
+        self._stop = threading.Event()
+        self._now = self._source.now()
+        self._ticker = threading.Thread(
+            target=_tick,
+            args=(weakref.ref(self), self._stop),
+            name="freiner-coarse-clock",
+            daemon=True,
+        )
+        self._ticker.start()
+
+    def stop(self) -> None:
+        """
+        Stops refreshing the time. Subsequent readings return the last cached time.
+        """
+
+        self._stop.set()
+        ticker, self._ticker = self._ticker, None
+        if ticker is not None and ticker is not threading.current_thread():
+            ticker.join()
+        _coarse_clocks.discard(self)
+
+    def now(self) -> float:
+        """
+        :return: The time as of the most recent refresh, in seconds since the epoch.
+        """
+
+        return self._now
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+__all__ = [
+    "Clock",
+    "CoarseClock",
+    "MonotonicClock",
+    "SYSTEM_CLOCK",
+    "SystemClock",
+]
@@ -2,3 +2,10 @@ class FreinerConfigurationError(Exception):
     """
     Raised when a configuration problem is encountered.
     """
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """
+    Raised by :meth:`freiner.strategies.concurrency.ConcurrencyLimiter.hold` when the limit on
+    requests in flight has already been reached.
+    """
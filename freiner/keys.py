@@ -0,0 +1,83 @@
+from base64 import urlsafe_b64encode
+from hashlib import blake2b
+from typing import Optional, Union
+
+
+#: A rate limit key, as sent to a storage.
+Key = Union[str, bytes]
+
+
+def hash_tag(data: bytes) -> Optional[bytes]:
+    """
+    Finds the hash tag of a key, which is the first non-empty section wrapped in ``{`` and ``}``.
+    Redis Cluster only hashes the hash tag of a key to choose its hash slot, if it has one.
+
+    :param data: The key to find the hash tag of.
+    :return: The hash tag, without its braces, or ``None`` if the key doesn't have one.
+    """
+
+    start = data.find(b"{")
+    if start != -1:
+        end = data.find(b"}", start + 1)
+        if end > start + 1:
+            return data[start + 1 : end]
+    return None
+
+
+class HashedKeyEncoder:
+    """
+    Encodes rate limit keys as a fixed-length BLAKE2b digest, preceded by a namespace. Keys made
+    up of long identifiers are then sent to the storage, and kept in it, at a fraction of their
+    size.
+
+    If a key contains a hash tag, the hash tag is kept in front of the digest, so that keys
+    which were given the same hash tag still belong to the same Redis Cluster hash slot.
+
+    :param namespace: The prefix of the encoded keys. Storages only reset keys which start with
+                      ``LIMITER``, so the namespace should start with it too.
+    :param digest_size: The length of the digest in bytes, between 1 and 64.
+    :param text: Whether to encode the digest with URL-safe base64, for storages which don't
+                 accept arbitrary bytes in keys. This makes it a third longer.
+    :raises ValueError: If ``digest_size`` is out of range.
+    """
+
+    __slots__ = ("_prefix", "_digest_size", "_text")
+
+    def __init__(self, namespace: str = "LIMITER", digest_size: int = 16, text: bool = False):
+        if not 1 <= digest_size <= 64:
+            raise ValueError("HashedKeyEncoder requires a digest_size between 1 and 64.")
+
+        self._prefix = namespace.encode("utf-8") + b"/"
+        self._digest_size = digest_size
+        self._text = text
+
+    @property
+    def text(self) -> bool:
+        """
+        Whether the encoded keys only contain URL-safe ASCII characters.
+        """
+
+        return self._text
+
+    def __call__(self, key: str) -> bytes:
+        """
+        :param key: The rate limit key to encode.
+        :return: The encoded key.
+        """
+
+        data = key.encode("utf-8")
+        digest = blake2b(data, digest_size=self._digest_size).digest()
+        if self._text:
+            digest = urlsafe_b64encode(digest).rstrip(b"=")
+
+        tag = hash_tag(data)
+        if tag is None:
+            return self._prefix + digest
+        return b"".join((self._prefix, b"{", tag, b"}/", digest))
+
+
+__all__ = [
+    "HashedKeyEncoder",
+    "Key",
+    "hash_tag",
+]
@@ -1,5 +1,5 @@
 from functools import total_ordering
-from typing import Any, Dict, Type, cast
+from typing import Any, Dict, Tuple, Type, cast
 
 
 def safe_string(value: Any) -> str:
@@ -9,11 +9,22 @@ def safe_string(value: Any) -> str:
     :param value: The value to stringify.
     """
 
+    if value.__class__ is str:
+        return value
     if isinstance(value, bytes):
         return value.decode()
     return str(value)
 
 
+def _join_identifiers(identifiers: Tuple[Any, ...]) -> str:
+    # Most identifiers are plain strings, which can be joined without converting them. Subclasses
+    # of str are still converted, as they may define their own __str__.
+    for identifier in identifiers:
+        if identifier.__class__ is not str:
+            return "/".join(map(safe_string, identifiers))
+    return "/".join(identifiers)
+
+
 TIME_TYPES = {
     "year": (60 * 60 * 24 * 30 * 12, "year"),
     "month": (60 * 60 * 24 * 30, "month"),
@@ -36,23 +47,74 @@ class RateLimitItemMeta(type):
         return granularity
 
 
+class KeyBuilder:
+    """
+    Builds the keys of a rate limit item for identifiers that all start with the same prefix,
+    such as when hitting a separate limit for each of many identifiers. Everything but the
+    remaining identifiers is only converted to a string once, when the key builder is created
+    with :meth:`RateLimitItem.key_builder`.
+
+    Calling the key builder with the remaining identifiers returns the same key as calling
+    :meth:`RateLimitItem.key_for` with the prefix followed by those identifiers.
+
+    :param prefix_key: The key of the rate limit item for the prefix alone.
+    :param suffix: The end of every key of the rate limit item.
+    """
+
+    __slots__ = ("_prefix_key", "_prefix", "_suffix")
+
+    def __init__(self, prefix_key: str, suffix: str) -> None:
+        self._prefix_key = prefix_key
+        self._prefix = prefix_key[: len(prefix_key) - len(suffix)]
+        self._suffix = suffix
+
+    def __call__(self, *identifiers: Any) -> str:
+        if not identifiers:
+            return self._prefix_key
+        return f"{self._prefix}/{_join_identifiers(identifiers)}{self._suffix}"
+
+
 @total_ordering
 class RateLimitItem(metaclass=RateLimitItemMeta):
     """
     defines a Rate limited resource which contains the characteristic
     namespace, amount and granularity multiples of the rate limiting window.
 
+    Rate limit items are immutable and hashable, so they can be shared freely and used as
+    dictionary keys. Two items are equal if they have the same amount, multiples, granularity
+    and namespace.
+
     :param amount: The amount of hits that can be sustained within the given period (e.g. X in 'x per y seconds').
     :param multiples: Multiple of the 'per' granularity (e.g. Y in 'x per y seconds').
     :param namespace: An arbitrary namespace for this rate limit.
     """
 
+    __slots__ = ("namespace", "amount", "multiples", "_key_suffix")
+
     granularity = (0, "")
 
+    namespace: str
+    amount: int
+    multiples: int
+    _key_suffix: str
+
     def __init__(self, amount: int, multiples: int = 1, namespace: str = "LIMITER") -> None:
-        self.namespace = namespace
-        self.amount = int(amount)
-        self.multiples = int(multiples or 1)
+        object.__setattr__(self, "namespace", namespace)
+        object.__setattr__(self, "amount", int(amount))
+        object.__setattr__(self, "multiples", int(multiples or 1))
+        # The end of every key is the same, so it's only built once.
+        object.__setattr__(
+            self, "_key_suffix", f"/{self.amount}/{self.multiples}/{self.granularity[1]}"
+        )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return self.__class__, (self.amount, self.multiples, self.namespace)
 
     @classmethod
     def check_granularity_string(cls, granularity_string: str) -> bool:
@@ -78,19 +140,31 @@ class RateLimitItem(metaclass=RateLimitItemMeta):
         :return: A string key identifying this resource with each identifier appended with a '/' delimiter.
         """
 
-        identifier_strings = [safe_string(k) for k in identifiers]
-        limit_strings = [safe_string(self.amount), safe_string(self.multiples), self.granularity[1]]
+        if not identifiers:
+            return self.namespace + self._key_suffix
+        return f"{self.namespace}/{_join_identifiers(identifiers)}{self._key_suffix}"
 
-        remainder = "/".join(identifier_strings + limit_strings)
-        return "{}/{}".format(self.namespace, remainder)
+    def key_builder(self, *prefix: Any) -> "KeyBuilder":
+        """
+        :param prefix: A list of arbitrary strings which every key starts with.
+        :return: A :class:`KeyBuilder` which builds the keys of this resource for identifiers
+                 starting with the given prefix.
+        """
+
+        return KeyBuilder(self.key_for(*prefix), self._key_suffix)
 
     def __eq__(self, other) -> bool:
         return (
             isinstance(other, RateLimitItem)
             and self.amount == other.amount
+            and self.multiples == other.multiples
             and self.granularity == other.granularity
+            and self.namespace == other.namespace
         )
 
+    def __hash__(self) -> int:
+        return hash((self.amount, self.multiples, self.granularity, self.namespace))
+
     def __str__(self) -> str:
         return "{} per {} {}".format(self.amount, self.multiples, self.granularity[1])
 
@@ -98,7 +172,19 @@ class RateLimitItem(metaclass=RateLimitItemMeta):
         return "{}<{}>".format(self.__class__.__name__, str(self))
 
     def __lt__(self, other) -> bool:
-        return isinstance(other, RateLimitItem) and self.granularity[0] < other.granularity[0]
+        # Ordered by the length of the window first, and then by every field that equality
+        # compares, so that items are only neither less nor greater than each other when equal.
+        return isinstance(other, RateLimitItem) and (
+            self.get_expiry(),
+            self.amount,
+            self.granularity,
+            self.namespace,
+        ) < (
+            other.get_expiry(),
+            other.amount,
+            other.granularity,
+            other.namespace,
+        )
 
 
 class RateLimitItemPerYear(RateLimitItem):
@@ -106,6 +192,8 @@ class RateLimitItemPerYear(RateLimitItem):
     Per year rate limited resource.
     """
 
+    __slots__ = ()
+
     granularity = TIME_TYPES["year"]
 
 
@@ -114,6 +202,8 @@ class RateLimitItemPerMonth(RateLimitItem):
     Per month rate limited resource.
     """
 
+    __slots__ = ()
+
     granularity = TIME_TYPES["month"]
 
 
@@ -122,6 +212,8 @@ class RateLimitItemPerDay(RateLimitItem):
     Per day rate limited resource.
     """
 
+    __slots__ = ()
+
     granularity = TIME_TYPES["day"]
 
 
@@ -130,6 +222,8 @@ class RateLimitItemPerHour(RateLimitItem):
     Per hour rate limited resource.
     """
 
+    __slots__ = ()
+
     granularity = TIME_TYPES["hour"]
 
 
@@ -138,6 +232,8 @@ class RateLimitItemPerMinute(RateLimitItem):
     Per minute rate limited resource.
     """
 
+    __slots__ = ()
+
     granularity = TIME_TYPES["minute"]
 
 
@@ -146,4 +242,6 @@ class RateLimitItemPerSecond(RateLimitItem):
     Per second rate limited resource.
     """
 
+    __slots__ = ()
+
     granularity = TIME_TYPES["second"]
@@ -1,9 +1,9 @@
-from typing import NamedTuple, Protocol, runtime_checkable
+from typing import List, NamedTuple, Protocol, Sequence, Tuple, runtime_checkable
 
 
 @runtime_checkable
 class FixedWindowStorage(Protocol):
-    def incr(self, key: str, expiry: int, elastic_expiry: bool = False) -> int:
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
         """
         Increments the counter for the given rate limit key.
 
@@ -12,6 +12,7 @@ class FixedWindowStorage(Protocol):
         :param key: The key to increment.
         :param expiry: Amount in seconds for the key to expire in.
         :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
         :return: The number of hits currently on the rate limit for the given key.
         """
 
@@ -40,6 +41,82 @@ class FixedWindowStorage(Protocol):
         """
 
 
+class FixedWindow(NamedTuple):
+    counter: int
+    expiry_time: float
+
+
+@runtime_checkable
+class FixedWindowBatchStorage(Protocol):
+    def incr_many(
+        self,
+        entries: Sequence[Tuple[str, int, int]],
+        elastic_expiry: bool = False,
+        amount: int = 1,
+    ) -> Tuple[bool, List[FixedWindow]]:
+        """
+        Increments the counters for all of the given rate limit keys, but only if none of them
+        would then exceed their limit. This must happen atomically. A key given more than once is
+        incremented once for each time it is given, and its limit must allow for all of them.
+
+        # noqa: DAR202
+
+        :param entries: The key, limit and expiry in seconds of each counter.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: Whether the counters were incremented, and the count and expiry time of each
+                 counter afterwards.
+        """
+
+    def get_many(self, keys: Sequence[str]) -> List[FixedWindow]:
+        """
+        Retrieves the count and expiry time of each of the given rate limit keys.
+
+        # noqa: DAR202
+
+        :param keys: The keys to get the counters for.
+        :return: The count and expiry time of each counter.
+        """
+
+
+@runtime_checkable
+class FixedWindowStatsStorage(Protocol):
+    def incr_with_expiry(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> FixedWindow:
+        """
+        Increments the counter for the given rate limit key, and retrieves its expiry time in the
+        same operation.
+
+        # noqa: DAR202
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The count and expiry time of the counter afterwards.
+        """
+
+
+@runtime_checkable
+class FixedWindowBulkStorage(Protocol):
+    def incr_bulk(
+        self, keys: Sequence[str], expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> List[int]:
+        """
+        Increments the counters for each of the given rate limit keys independently, with as few
+        operations as the backend allows.
+
+        # noqa: DAR202
+
+        :param keys: The keys to increment.
+        :param expiry: Amount in seconds for the keys to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: The number of hits currently on the rate limit for each of the keys.
+        """
+
+
 class MovingWindow(NamedTuple):
     start_time: float
     acquired_count: int
@@ -47,12 +124,15 @@ class MovingWindow(NamedTuple):
 
 @runtime_checkable
 class MovingWindowStorage(Protocol):
-    def acquire_entry(self, key: str, limit: int, expiry: int, no_add: bool = False) -> bool:
+    def acquire_entry(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> bool:
         """
         :param key: The rate limit key to acquire an entry in.
         :param limit: The total amount of entries allowed before hitting the rate limit.
         :param expiry: Amount in seconds for the acquired entry to expire in.
         :param no_add: If False, an entry is not actually acquired but instead serves as a 'check'.
+        :param amount: The number of entries to acquire at once.
         """
 
     def get_moving_window(self, key: str, limit: int, expiry: int) -> MovingWindow:
@@ -75,8 +155,327 @@ class MovingWindowStorage(Protocol):
         """
 
 
+@runtime_checkable
+class MovingWindowBatchStorage(Protocol):
+    def acquire_entries(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[MovingWindow]]:
+        """
+        Acquires ``amount`` entries in every one of the given moving windows, but only if they
+        can be acquired in all of them. This must happen atomically. A key given more than once
+        acquires ``amount`` entries for each time it is given, and its limit must allow for all of
+        them.
+
+        # noqa: DAR202
+
+        :param entries: The key, limit and expiry in seconds of each moving window.
+        :param amount: The number of entries to acquire in each moving window.
+        :return: Whether the entries were acquired, and the start and number of acquired entries
+                 of each moving window afterwards.
+        """
+
+    def get_moving_windows(self, entries: Sequence[Tuple[str, int, int]]) -> List[MovingWindow]:
+        """
+        Retrieves the starting point and the number of entries in each of the moving windows.
+
+        # noqa: DAR202
+
+        :param entries: The key, limit and expiry in seconds of each moving window.
+        :return: The start and number of acquired entries of each moving window.
+        """
+
+
+@runtime_checkable
+class MovingWindowBulkStorage(Protocol):
+    def acquire_entry_bulk(
+        self, keys: Sequence[str], limit: int, expiry: int, amount: int = 1
+    ) -> List[bool]:
+        """
+        Acquires ``amount`` entries in the moving window of each of the given keys
+        independently, with as few operations as the backend allows.
+
+        # noqa: DAR202
+
+        :param keys: The rate limit keys to acquire entries in.
+        :param limit: The total amount of hits allowed within the period, for each key.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param amount: The number of hits to count against each key.
+        :return: Whether the hits were allowed, for each of the keys.
+        """
+
+
+@runtime_checkable
+class MovingWindowRetryStorage(Protocol):
+    def get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then. At most ``limit - amount`` entries may
+        remain in the window, so this is when the newest entry beyond those expires.
+
+        # noqa: DAR202
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        """
+
+
+class GCRAState(NamedTuple):
+    now: float
+    tat: float
+
+
+@runtime_checkable
+class GCRAStorage(Protocol):
+    def acquire_tat(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> Tuple[bool, GCRAState]:
+        """
+        Advances the theoretical arrival time of the given key by ``amount`` emission intervals
+        (``expiry / limit`` seconds each), unless doing so would take it more than ``expiry``
+        seconds past the current time.
+
+        # noqa: DAR202
+
+        :param key: The rate limit key to advance the theoretical arrival time of.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param no_add: If True, the theoretical arrival time is not actually advanced, and this
+                       instead serves as a 'check'.
+        :param amount: The number of hits to count.
+        :return: Whether the hits were allowed, and the theoretical arrival time afterwards.
+        """
+
+    def get_tat(self, key: str) -> GCRAState:
+        """
+        Retrieves the theoretical arrival time of the given key.
+
+        # noqa: DAR202
+
+        :param key: The rate limit key to retrieve the theoretical arrival time of.
+        :return: (current time, theoretical arrival time) where the theoretical arrival time is
+                 never earlier than the current time.
+        """
+
+    def clear(self, key: str) -> None:
+        """
+        Resets the rate limit for the given key.
+
+        :param key: The key to clear rate limits for.
+        """
+
+
+@runtime_checkable
+class GCRABatchStorage(Protocol):
+    def acquire_tats(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[GCRAState]]:
+        """
+        Advances the theoretical arrival time of every one of the given keys by ``amount``
+        emission intervals, but only if none of them would then be more than their limit's
+        period past the current time. This must happen atomically. A key given more than once is
+        advanced once for each time it is given, and its limit must allow for all of them.
+
+        # noqa: DAR202
+
+        :param entries: The key, limit and period in seconds of each theoretical arrival time.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were allowed, and the theoretical arrival time of each key
+                 afterwards.
+        """
+
+    def get_tats(self, keys: Sequence[str]) -> List[GCRAState]:
+        """
+        Retrieves the theoretical arrival time of each of the given keys.
+
+        # noqa: DAR202
+
+        :param keys: The rate limit keys to retrieve the theoretical arrival times of.
+        :return: (current time, theoretical arrival time) of each key.
+        """
+
+
+@runtime_checkable
+class GCRABulkStorage(Protocol):
+    def acquire_tat_bulk(
+        self, keys: Sequence[str], limit: int, expiry: int, amount: int = 1
+    ) -> List[bool]:
+        """
+        Advances the theoretical arrival time of each of the given keys by ``amount`` emission
+        intervals independently, with as few operations as the backend allows.
+
+        # noqa: DAR202
+
+        :param keys: The rate limit keys to advance the theoretical arrival times of.
+        :param limit: The total amount of hits allowed within the period, for each key.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param amount: The number of hits to count against each key.
+        :return: Whether the hits were allowed, for each of the keys.
+        """
+
+
+class SlidingWindow(NamedTuple):
+    now: float
+    previous_count: int
+    current_count: int
+
+
+@runtime_checkable
+class SlidingWindowCounterStorage(Protocol):
+    def acquire_sliding_window_entry(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> Tuple[bool, SlidingWindow]:
+        """
+        Counts ``amount`` hits in the current window, unless the weighted count of hits would then
+        exceed the limit. Windows are aligned to multiples of ``expiry`` seconds since the epoch,
+        and the previous window's count is weighted by the fraction of the current window
+        remaining.
+
+        # noqa: DAR202
+
+        :param key: The rate limit key to count hits against.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param amount: The number of hits to count.
+        :return: Whether the hits were counted, and the counts of hits in the current and
+                 previous windows afterwards.
+        """
+
+    def get_sliding_window(self, key: str, expiry: int) -> SlidingWindow:
+        """
+        Retrieves the counts of hits in the current and previous windows.
+
+        # noqa: DAR202
+
+        :param key: The rate limit key to retrieve statistics about.
+        :param expiry: The period that the limit applies to, in seconds.
+        :return: (current time, hits in the previous window, hits in the current window)
+        """
+
+    def clear(self, key: str) -> None:
+        """
+        Resets the rate limit for the given key.
+
+        :param key: The key to clear rate limits for.
+        """
+
+
+@runtime_checkable
+class SlidingWindowCounterBatchStorage(Protocol):
+    def acquire_sliding_window_entries(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[SlidingWindow]]:
+        """
+        Counts ``amount`` hits in the current window of every one of the given keys, but only if
+        none of their weighted counts of hits would then exceed their limit. This must happen
+        atomically. A key given more than once is counted once for each time it is given, and
+        its limit must allow for all of them.
+
+        # noqa: DAR202
+
+        :param entries: The key, limit and period in seconds of each sliding window.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were counted, and the counts of hits in the current and
+                 previous windows of each key afterwards.
+        """
+
+    def get_sliding_windows(self, entries: Sequence[Tuple[str, int]]) -> List[SlidingWindow]:
+        """
+        Retrieves the counts of hits in the current and previous windows of each of the given
+        keys.
+
+        # noqa: DAR202
+
+        :param entries: The key and period in seconds of each sliding window.
+        :return: (current time, hits in the previous window, hits in the current window) of
+                 each key.
+        """
+
+
+@runtime_checkable
+class SlidingWindowCounterBulkStorage(Protocol):
+    def acquire_sliding_window_entry_bulk(
+        self, keys: Sequence[str], limit: int, expiry: int, amount: int = 1
+    ) -> List[bool]:
+        """
+        Counts ``amount`` hits in the current window of each of the given keys independently,
+        with as few operations as the backend allows.
+
+        # noqa: DAR202
+
+        :param keys: The rate limit keys to count hits against.
+        :param limit: The total amount of hits allowed within the period, for each key.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param amount: The number of hits to count against each key.
+        :return: Whether the hits were allowed, for each of the keys.
+        """
+
+
+@runtime_checkable
+class ConcurrencyStorage(Protocol):
+    def acquire_lease(self, key: str, limit: int, lease_id: str, timeout: float) -> bool:
+        """
+        Adds a lease with the given ID to the given key, unless the key already holds ``limit``
+        unexpired leases. This must happen atomically.
+
+        # noqa: DAR202
+
+        :param key: The rate limit key to acquire a lease in.
+        :param limit: The maximum number of unexpired leases the key may hold.
+        :param lease_id: A unique ID for the new lease.
+        :param timeout: Amount in seconds for the lease to expire in, if it isn't released.
+        :return: Whether the lease was acquired.
+        """
+
+    def release_lease(self, key: str, lease_id: str) -> None:
+        """
+        Removes the lease with the given ID from the given key, if it still holds it.
+
+        :param key: The rate limit key to release the lease from.
+        :param lease_id: The ID of the lease to release.
+        """
+
+    def get_lease_count(self, key: str) -> int:
+        """
+        Retrieves the number of unexpired leases held by the given key.
+
+        # noqa: DAR202
+
+        :param key: The rate limit key to count the leases of.
+        :return: The number of unexpired leases.
+        """
+
+    def clear(self, key: str) -> None:
+        """
+        Releases every lease held by the given key.
+
+        :param key: The key to clear leases for.
+        """
+
+
 __all__ = [
+    "ConcurrencyStorage",
+    "FixedWindow",
+    "FixedWindowBatchStorage",
+    "FixedWindowBulkStorage",
+    "FixedWindowStatsStorage",
     "FixedWindowStorage",
+    "GCRABatchStorage",
+    "GCRABulkStorage",
+    "GCRAState",
+    "GCRAStorage",
     "MovingWindow",
+    "MovingWindowBatchStorage",
+    "MovingWindowBulkStorage",
+    "MovingWindowRetryStorage",
     "MovingWindowStorage",
+    "SlidingWindow",
+    "SlidingWindowCounterBatchStorage",
+    "SlidingWindowCounterBulkStorage",
+    "SlidingWindowCounterStorage",
 ]
@@ -1,12 +1,17 @@
-import time
-from typing import Any, List, Union
+import json
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 from urllib.parse import urlparse
 
 import pymemcache
 
+from freiner.clock import SYSTEM_CLOCK, Clock
 from freiner.errors import FreinerConfigurationError
+from freiner.keys import HashedKeyEncoder, Key
 from freiner.types import Host
 
+from . import FixedWindow, GCRAState
+
 
 MemcachedClient = Union[pymemcache.Client, pymemcache.PooledClient, pymemcache.HashClient]
 
@@ -16,12 +21,38 @@ class MemcachedStorage:
     Rate limit storage with memcached as backend.
 
     Depends on the `pymemcache` library.
+
+    :param client: The memcached client to use.
+    :param clock: The clock to read the current time from. Defaults to the system clock. As
+                  expiry times are stored in memcached, this should not be a
+                  :class:`freiner.clock.MonotonicClock`.
+    :param key_encoder: Encodes each rate limit key before it is sent to memcached, such as a
+                        :class:`freiner.keys.HashedKeyEncoder` to store long keys as short
+                        digests. Defaults to storing the keys as they are.
+    :raises FreinerConfigurationError: If the key encoder's keys aren't text, as memcached
+                                       doesn't accept whitespace or control characters in keys.
     """
 
     MAX_CAS_RETRIES = 10
 
-    def __init__(self, client: MemcachedClient) -> None:
+    def __init__(
+        self,
+        client: MemcachedClient,
+        clock: Optional[Clock] = None,
+        key_encoder: Optional[HashedKeyEncoder] = None,
+    ) -> None:
+        if key_encoder is not None and not key_encoder.text:
+            raise FreinerConfigurationError("Memcached requires a key encoder with text=True")
+
         self._client: MemcachedClient = client
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self._key_encoder = key_encoder
+
+    def _key(self, key: str) -> Key:
+        # The key as it is stored in memcached.
+        if self._key_encoder is None:
+            return key
+        return self._key_encoder(key)
 
     @classmethod
     def from_uri(cls, uri: str, **options: Any) -> "MemcachedStorage":
@@ -61,7 +92,7 @@ class MemcachedStorage:
         :param key: The key to get the counter value for.
         """
 
-        return int(self._client.get(key) or 0)
+        return int(self._client.get(self._key(key)) or 0)
 
     def clear(self, key: str) -> None:
         """
@@ -69,24 +100,95 @@ class MemcachedStorage:
 
         :param key: The key to clear rate limits for.
         """
-        self._client.delete(key)
+        self._client.delete(self._key(key))
 
-    def incr(self, key: str, expiry: int, elastic_expiry: bool = False) -> int:
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
         """
         Increments the counter for the given rate limit key.
 
         :param key: The key to increment.
         :param expiry: Amount in seconds for the key to expire in.
         :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
         :return: The number of hits currently on the rate limit for the given key.
         """
 
-        if self._client.add(key, 1, expiry, noreply=False):
-            self._set_expiry(key, expiry)
-            return 1
+        counter, _ = self._incr(key, expiry, elastic_expiry, amount)
+        return counter
+
+    def incr_with_expiry(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> FixedWindow:
+        """
+        Increments the counter for the given rate limit key, and retrieves its expiry time.
+
+        When this call sets the expiry time, no further request is needed to retrieve it.
+        Otherwise the expiry time is fetched with one extra request, as the memcached client
+        doesn't support the meta commands that could return it along with the increment.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The count and expiry time of the counter afterwards.
+        """
+
+        counter, expiry_time = self._incr(key, expiry, elastic_expiry, amount)
+        if expiry_time is None:
+            expiry_time = self.get_expiry(key)
+        return FixedWindow(counter, expiry_time)
+
+    def incr_bulk(
+        self, keys: Sequence[str], expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> List[int]:
+        """
+        Increments the counters for each of the given rate limit keys independently.
+
+        The existing counters are incremented without waiting for replies, and then read back
+        with a single request. Counters which didn't exist yet are then created one at a time.
+        As the counters are read after being incremented, they may include concurrent hits
+        made in between, which can only cause more hits to be rejected, never fewer. Elastic
+        expiry requires a compare-and-set per key, so in that case the keys are incremented one
+        at a time.
+
+        :param keys: The keys to increment.
+        :param expiry: Amount in seconds for the keys to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: The number of hits currently on the rate limit for each of the keys.
+        """
+
+        if elastic_expiry:
+            return [self.incr(key, expiry, elastic_expiry, amount) for key in keys]
+
+        encoded_keys = [self._key(key) for key in keys]
+        for encoded_key in encoded_keys:
+            self._client.incr(encoded_key, amount, noreply=True)
+        values = self._client.get_many(encoded_keys)
+
+        counters = []
+        for key, encoded_key in zip(keys, encoded_keys):
+            value = values.get(encoded_key)
+            if value is None:
+                # Incrementing a missing key has no effect, so it's created here instead.
+                counters.append(self.incr(key, expiry, amount=amount))
+            else:
+                counters.append(int(value))
+        return counters
+
+    def _incr(
+        self, key: str, expiry: int, elastic_expiry: bool, amount: int
+    ) -> Tuple[int, Optional[float]]:
+        # Returns the new count, and the counter's expiry time if it was set by this call.
+        # memcached counters are unsigned, so negative amounts decrement them down to zero.
+        encoded_key = self._key(key)
+        if self._client.add(encoded_key, max(amount, 0), expiry, noreply=False):
+            return max(amount, 0), self._set_expiry(key, expiry)
 
         if not elastic_expiry:
-            return self._client.incr(key, 1) or 1
+            if amount < 0:
+                return self._client.decr(encoded_key, -amount) or 0, None
+            return self._client.incr(encoded_key, amount) or amount, None
 
         # TODO: There is a timing issue here.
         # This code makes the assumption that because client.add() failed, the key must exist.
@@ -98,21 +200,22 @@ class MemcachedStorage:
         # I believe the solution will be to "restart" the logic flow if 'cas is None'. However,
         # that will require rewriting the method so that that can be achieved without recursion,
         # and without the code looking like a nightmare.
-        value, cas = self._client.gets(key)
+        value, cas = self._client.gets(encoded_key)
         retry = 0
 
         while (
-            not self._client.cas(key, int(value or 0) + 1, cas, expiry)
+            not self._client.cas(encoded_key, max(int(value or 0) + amount, 0), cas, expiry)
             and retry < self.MAX_CAS_RETRIES
         ):
-            value, cas = self._client.gets(key)
+            value, cas = self._client.gets(encoded_key)
             retry += 1
 
-        self._set_expiry(key, expiry)
-        return int(value or 0) + 1
+        return max(int(value or 0) + amount, 0), self._set_expiry(key, expiry)
 
-    def _set_expiry(self, key: str, expiry: int):
-        self._client.set(key + "/expires", expiry + time.time(), expire=expiry, noreply=False)
+    def _set_expiry(self, key: str, expiry: int) -> float:
+        expiry_time = expiry + self._clock.now()
+        self._client.set(self._key(key + "/expires"), expiry_time, expire=expiry, noreply=False)
+        return expiry_time
 
     def get_expiry(self, key: str) -> float:
         """
@@ -122,7 +225,283 @@ class MemcachedStorage:
         :return: The time at which the current rate limit for the given key ends.
         """
 
-        return float(self._client.get(key + "/expires") or time.time())
+        return float(self._client.get(self._key(key + "/expires")) or self._clock.now())
+
+    def incr_many(
+        self,
+        entries: Sequence[Tuple[str, int, int]],
+        elastic_expiry: bool = False,
+        amount: int = 1,
+    ) -> Tuple[bool, List[FixedWindow]]:
+        """
+        Increments the counters for all of the given rate limit keys, but only if none of them
+        would then exceed their limit.
+
+        The counters are checked with a single request first. Memcached has no way to update
+        several keys at once, so they are then incremented one at a time, and if any of them
+        turns out to have exceeded its limit, the increments already made are undone. Concurrent
+        hits may then be rejected while the increments are briefly counted, but a hit is never
+        allowed past any of the limits, and a rejected hit doesn't use up any of them.
+
+        :param entries: The key, limit and expiry in seconds of each counter.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: Whether the counters were incremented, and the count and expiry time of each
+                 counter afterwards.
+        """
+
+        windows = self.get_many([key for key, _, _ in entries])
+        pending: Dict[str, int] = {}
+        for window, (key, limit, _) in zip(windows, entries):
+            pending[key] = pending.get(key, 0) + amount
+            if window.counter + pending[key] > limit:
+                return False, windows
+
+        incremented: List[str] = []
+        allowed = True
+        for key, limit, expiry in entries:
+            incremented.append(key)
+            if self.incr(key, expiry, elastic_expiry, amount) > limit:
+                allowed = False
+                break
+
+        if not allowed:
+            for key in incremented:
+                self._client.decr(self._key(key), amount, noreply=False)
+        return allowed, self.get_many([key for key, _, _ in entries])
+
+    def get_many(self, keys: Sequence[str]) -> List[FixedWindow]:
+        """
+        Retrieves the count and expiry time of each of the given rate limit keys, with a single
+        request.
+
+        :param keys: The keys to get the counters for.
+        :return: The count and expiry time of each counter.
+        """
+
+        counter_keys = [self._key(key) for key in keys]
+        expires_keys = [self._key(key + "/expires") for key in keys]
+        values = self._client.get_many([*counter_keys, *expires_keys])
+        timestamp = self._clock.now()
+        return [
+            FixedWindow(int(values.get(key) or 0), float(values.get(expires_key) or timestamp))
+            for key, expires_key in zip(counter_keys, expires_keys)
+        ]
+
+    def acquire_tat(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> Tuple[bool, GCRAState]:
+        """
+        Advances the theoretical arrival time of the given key by ``amount`` emission intervals
+        (``expiry / limit`` seconds each), unless doing so would take it more than ``expiry``
+        seconds past the current time.
+
+        The theoretical arrival time is stored in whole microseconds, and updated with
+        compare-and-swap. If the update keeps losing races with other clients, the hit is
+        rejected.
+
+        :param key: The rate limit key to advance the theoretical arrival time of.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param no_add: If True, the theoretical arrival time is not actually advanced, and this
+                       instead serves as a 'check'.
+        :param amount: The number of hits to count.
+        :return: Whether the hits were allowed, and the theoretical arrival time afterwards.
+        """
+
+        if limit < 1:
+            return False, self.get_tat(key)
+
+        increment = expiry * 1_000_000 // limit * amount
+        encoded_key = self._key(key)
+        for _ in range(self.MAX_CAS_RETRIES + 1):
+            value, cas = self._client.gets(encoded_key)
+            now = int(self._clock.now() * 1_000_000)
+            tat = max(int(value or 0), now)
+            state = GCRAState(now / 1_000_000, tat / 1_000_000)
+            new_tat = tat + increment
+            if new_tat - now > expiry * 1_000_000:
+                return False, state
+            if no_add:
+                return True, state
+
+            new_state = GCRAState(now / 1_000_000, new_tat / 1_000_000)
+            ttl = max(math.ceil((new_tat - now) / 1_000_000), 1)
+            if cas is None:
+                # The key doesn't exist (or has just expired), so there's nothing to swap with.
+                if self._client.add(encoded_key, new_tat, ttl, noreply=False):
+                    return True, new_state
+            elif self._client.cas(encoded_key, new_tat, cas, ttl):
+                return True, new_state
+
+        return False, state
+
+    def get_tat(self, key: str) -> GCRAState:
+        """
+        Retrieves the theoretical arrival time of the given key.
+
+        :param key: The rate limit key to retrieve the theoretical arrival time of.
+        :return: (current time, theoretical arrival time) where the theoretical arrival time is
+                 never earlier than the current time.
+        """
+
+        now = int(self._clock.now() * 1_000_000)
+        tat = max(int(self._client.get(self._key(key)) or 0), now)
+        return GCRAState(now / 1_000_000, tat / 1_000_000)
+
+    def acquire_tats(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[GCRAState]]:
+        """
+        Advances the theoretical arrival time of every one of the given keys by ``amount``
+        emission intervals, but only if none of them would then be more than their limit's
+        period past the current time.
+
+        The theoretical arrival times are checked with a single request first. Memcached has no
+        way to update several keys at once, so they are then advanced one at a time with
+        compare-and-swap, and if any of them turns out to have gone too far, the advances already
+        made are undone. Concurrent hits may then be rejected while the advances are briefly
+        counted, but a hit is never allowed past any of the limits.
+
+        :param entries: The key, limit and period in seconds of each theoretical arrival time.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were allowed, and the theoretical arrival time of each key
+                 afterwards.
+        """
+
+        keys = [key for key, _, _ in entries]
+        states = self.get_tats(keys)
+        # A key given more than once is advanced once for each time it is given.
+        pending: Dict[str, int] = {}
+        for state, (key, limit, expiry) in zip(states, entries):
+            if limit < 1:
+                return False, states
+            pending[key] = pending.get(key, 0) + amount
+            increment = expiry * 1_000_000 // limit * pending[key]
+            if int(state.tat * 1_000_000) + increment - int(state.now * 1_000_000) > (
+                expiry * 1_000_000
+            ):
+                return False, states
+
+        advanced: List[Tuple[str, int]] = []
+        allowed = True
+        for key, limit, expiry in entries:
+            if key not in pending:
+                continue
+            hits = pending.pop(key)
+            if not self.acquire_tat(key, limit, expiry, amount=hits)[0]:
+                allowed = False
+                break
+            advanced.append((key, expiry * 1_000_000 // limit * hits))
+
+        if not allowed:
+            for key, increment in advanced:
+                self._rewind_tat(key, increment)
+        return allowed, self.get_tats(keys)
+
+    def get_tats(self, keys: Sequence[str]) -> List[GCRAState]:
+        """
+        Retrieves the theoretical arrival time of each of the given keys, with a single request.
+
+        :param keys: The rate limit keys to retrieve the theoretical arrival times of.
+        :return: (current time, theoretical arrival time) of each key.
+        """
+
+        encoded_keys = [self._key(key) for key in keys]
+        values = self._client.get_many(encoded_keys)
+        now = int(self._clock.now() * 1_000_000)
+        return [
+            GCRAState(now / 1_000_000, max(int(values.get(key) or 0), now) / 1_000_000)
+            for key in encoded_keys
+        ]
+
+    def _rewind_tat(self, key: str, increment: int) -> None:
+        # Undoes an advance of the theoretical arrival time, unless the key has expired since.
+        encoded_key = self._key(key)
+        for _ in range(self.MAX_CAS_RETRIES + 1):
+            value, cas = self._client.gets(encoded_key)
+            if cas is None:
+                return
+            now = int(self._clock.now() * 1_000_000)
+            tat = max(int(value) - increment, now)
+            ttl = max(math.ceil((tat - now) / 1_000_000), 1)
+            if self._client.cas(encoded_key, tat, cas, ttl):
+                return
+
+    def acquire_lease(self, key: str, limit: int, lease_id: str, timeout: float) -> bool:
+        """
+        Adds a lease with the given ID to the given key, unless the key already holds ``limit``
+        unexpired leases.
+
+        The leases of each key are stored together in a single value, and updated with
+        compare-and-swap. If the update keeps losing races with other clients, the lease is not
+        acquired.
+
+        :param key: The rate limit key to acquire a lease in.
+        :param limit: The maximum number of unexpired leases the key may hold.
+        :param lease_id: A unique ID for the new lease.
+        :param timeout: Amount in seconds for the lease to expire in, if it isn't released.
+        :return: Whether the lease was acquired.
+        """
+
+        for _ in range(self.MAX_CAS_RETRIES + 1):
+            value, cas = self._client.gets(self._key(key))
+            timestamp = self._clock.now()
+            leases = self._load_leases(value, timestamp)
+            if len(leases) >= limit:
+                return False
+
+            leases[lease_id] = timestamp + timeout
+            if self._store_leases(key, leases, cas, timestamp):
+                return True
+
+        return False
+
+    def release_lease(self, key: str, lease_id: str) -> None:
+        """
+        Removes the lease with the given ID from the given key, if it still holds it.
+
+        :param key: The rate limit key to release the lease from.
+        :param lease_id: The ID of the lease to release.
+        """
+
+        for _ in range(self.MAX_CAS_RETRIES + 1):
+            value, cas = self._client.gets(self._key(key))
+            timestamp = self._clock.now()
+            leases = self._load_leases(value, timestamp)
+            if cas is None or leases.pop(lease_id, None) is None:
+                return
+
+            if self._store_leases(key, leases, cas, timestamp):
+                return
+
+    def get_lease_count(self, key: str) -> int:
+        """
+        Retrieves the number of unexpired leases held by the given key.
+
+        :param key: The rate limit key to count the leases of.
+        :return: The number of unexpired leases.
+        """
+
+        return len(self._load_leases(self._client.get(self._key(key)), self._clock.now()))
+
+    @staticmethod
+    def _load_leases(value: Optional[bytes], timestamp: float) -> Dict[str, float]:
+        if not value:
+            return {}
+        leases: Dict[str, float] = json.loads(value)
+        return {lease_id: until for lease_id, until in leases.items() if until > timestamp}
+
+    def _store_leases(
+        self, key: str, leases: Dict[str, float], cas: Optional[bytes], timestamp: float
+    ) -> bool:
+        # The value lives as long as its longest lease.
+        ttl = max(math.ceil(max(leases.values(), default=timestamp) - timestamp), 1)
+        value = json.dumps(leases, separators=(",", ":"))
+        if cas is None:
+            # The key doesn't exist (or has just expired), so there's nothing to swap with.
+            return bool(self._client.add(self._key(key), value, ttl, noreply=False))
+        return bool(self._client.cas(self._key(key), value, cas, ttl))
 
     def check(self) -> bool:
         """
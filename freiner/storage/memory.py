@@ -1,85 +1,694 @@
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
 import threading
 import time
-from collections import Counter
-from typing import Counter as CounterType
-from typing import Dict, List, Optional
+import weakref
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import accumulate, chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, cast
 
-from . import MovingWindow
+from freiner.clock import SYSTEM_CLOCK, Clock
 
+from . import FixedWindow, GCRAState, MovingWindow
 
-class _LockableEntry:
-    __slots__ = ("atime", "expiry", "_lock")
 
-    def __init__(self, expiry: float):
-        self.atime: float = time.time()
-        self.expiry: float = self.atime + expiry
+# Snapshots are a header followed by a stream of blocks, each holding either the fixed window
+# counters or the moving windows of a single shard. A block stores its keys as an array of
+# lengths followed by the concatenated UTF-8 keys, and then one array per field, so that loading
+# doesn't have to unpack every key's values individually. All values are little-endian.
+# The header also holds the storage's clock reading and the wall clock time when the snapshot
+# was taken, so that restored times can be rebased onto a clock with a different origin.
+_SNAPSHOT_MAGIC = b"FREINERS"
+_SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<8sIdd")
+_SNAPSHOT_BLOCK = struct.Struct("<BII")
+_BLOCK_COUNTERS = 1
+_BLOCK_WINDOWS = 2
+_BLOCK_TATS = 3
 
-        self._lock = threading.RLock()
 
-    def acquire(self) -> None:
-        self._lock.acquire()
+def _pack_array(typecode: str, values: Iterable[Any]) -> bytes:
+    packed = array(typecode, values)
+    if sys.byteorder != "little":  # pragma: no cover
+        packed.byteswap()
+    return packed.tobytes()
 
-    def release(self) -> None:
-        self._lock.release()
 
-    def __enter__(self):
-        self.acquire()
+def _unpack_array(typecode: str, data: mmap.mmap, offset: int, count: int) -> Tuple[array, int]:
+    unpacked = array(typecode)
+    end = offset + unpacked.itemsize * count
+    if end > len(data):
+        raise struct.error("truncated snapshot")
+    unpacked.frombytes(data[offset:end])
+    if sys.byteorder != "little":  # pragma: no cover
+        unpacked.byteswap()
+    return unpacked, end
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.release()
+
+def _pack_block(kind: int, keys: Sequence[str], *columns: bytes) -> bytes:
+    encoded_keys = [key.encode() for key in keys]
+    blob = b"".join(encoded_keys)
+    header = _SNAPSHOT_BLOCK.pack(kind, len(encoded_keys), len(blob))
+    return b"".join((header, _pack_array("I", map(len, encoded_keys)), blob, *columns))
+
+
+def _unpack_keys(blob: bytes, lengths: Sequence[int]) -> List[str]:
+    ends = list(accumulate(lengths))
+    if (ends[-1] if ends else 0) != len(blob):
+        raise struct.error("key lengths do not match key data")
+    starts = [0] + ends[:-1]
+    if blob.isascii():
+        text = blob.decode("ascii")
+        return [text[start:end] for start, end in zip(starts, ends)]
+    return [blob[start:end].decode() for start, end in zip(starts, ends)]
+
+
+class _MovingWindowEvents:
+    """
+    A fixed-capacity ring buffer of acquisition timestamps for a single moving window,
+    ordered from oldest to newest. Only the most recent ``capacity`` entries are retained,
+    which is all that's needed to decide whether a new entry can be acquired.
+    """
+
+    __slots__ = ("expiry", "_timestamps", "_start", "_size")
+
+    def __init__(self, capacity: int, expiry: int) -> None:
+        self.expiry: int = expiry
+
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._start = 0
+        self._size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._timestamps)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> float:
+        if not 0 <= index < self._size:
+            raise IndexError("moving window index out of range")
+        return self._timestamps[(self._start + index) % len(self._timestamps)]
+
+    def append(self, timestamp: float) -> None:
+        capacity = len(self._timestamps)
+        if self._size == capacity:
+            # Overwrite the oldest entry.
+            self._timestamps[self._start] = timestamp
+            self._start = (self._start + 1) % capacity
+        else:
+            self._timestamps[(self._start + self._size) % capacity] = timestamp
+            self._size += 1
+
+    def extend(self, timestamp: float, count: int) -> None:
+        """
+        Appends ``count`` entries with the same timestamp, overwriting the oldest entries if the
+        buffer is full.
+
+        :param timestamp: The timestamp of the new entries.
+        :param count: The number of entries to append.
+        """
+
+        timestamps = self._timestamps
+        capacity = len(timestamps)
+        count = min(count, capacity)
+        if count < 1:
+            return
+
+        end = (self._start + self._size) % capacity
+        head = min(count, capacity - end)
+        timestamps[end : end + head] = array("d", (timestamp,)) * head
+        timestamps[: count - head] = array("d", (timestamp,)) * (count - head)
+
+        overwritten = max(self._size + count - capacity, 0)
+        self._start = (self._start + overwritten) % capacity
+        self._size = min(self._size + count, capacity)
+
+    def index_after(self, timestamp: float) -> int:
+        """
+        :param timestamp: The point in time to search from.
+        :return: The index of the oldest entry acquired strictly after the given timestamp.
+        """
+
+        timestamps = self._timestamps
+        capacity = len(timestamps)
+        start = self._start
+        low, high = 0, self._size
+        while low < high:
+            mid = (low + high) // 2
+            if timestamps[(start + mid) % capacity] > timestamp:
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    def expire(self, timestamp: float) -> None:
+        """
+        Discards all entries acquired at or before the given timestamp.
+
+        :param timestamp: The point in time to discard entries up to.
+        """
+
+        expired = self.index_after(timestamp)
+        if expired:
+            self._start = (self._start + expired) % len(self._timestamps)
+            self._size -= expired
+
+    def ordered(self) -> array:
+        """
+        :return: A copy of the entries, oldest first.
+        """
+
+        timestamps = self._timestamps
+        end = self._start + self._size
+        if end <= len(timestamps):
+            return timestamps[self._start : end]
+        return timestamps[self._start :] + timestamps[: end - len(timestamps)]
+
+    @classmethod
+    def from_timestamps(
+        cls, capacity: int, expiry: int, timestamps: array
+    ) -> "_MovingWindowEvents":
+        """
+        :param capacity: The capacity of the new buffer.
+        :param expiry: Amount in seconds for the entries to expire in.
+        :param timestamps: Entries, oldest first.
+        :return: A new buffer holding the most recent of the given entries.
+        """
+
+        events = cls(capacity, expiry)
+        retained = timestamps[max(len(timestamps) - capacity, 0) :]
+        events._timestamps[: len(retained)] = retained
+        events._size = len(retained)
+        return events
+
+    def resize(self, capacity: int) -> "_MovingWindowEvents":
+        """
+        :param capacity: The capacity of the new buffer.
+        :return: A new buffer with the given capacity holding the most recent entries of this one.
+        """
+
+        resized = _MovingWindowEvents(capacity, self.expiry)
+        for index in range(max(0, self._size - capacity), self._size):
+            resized.append(self[index])
+        return resized
 
     def __repr__(self) -> str:
-        return f"MemoryLockableEntry<atime={self.atime}, expiry={self.expiry}>"  # pragma: no cover
+        return f"MemoryMovingWindowEvents<size={self._size}, capacity={self.capacity}>"  # pragma: no cover
 
 
-class MemoryStorage:
+class _MemoryShard:
     """
-    rate limit storage using :py:class:`collections.Counter`
-    as an in memory storage for fixed and elastic window strategies,
-    and a simple list to implement moving window strategy.
+    One stripe of a :class:`MemoryStorage`. Every key is assigned to exactly one shard, and all
+    reads and writes of that key's data happen while holding the shard's lock.
+
+    When the shard has a key limit, keys are tracked in least-recently-written order so that the
+    oldest key can be evicted to make room for a new one.
     """
 
-    def __init__(self) -> None:
-        self.storage: CounterType[str] = Counter()
+    __slots__ = (
+        "lock",
+        "counters",
+        "expirations",
+        "events",
+        "tats",
+        "leases",
+        "expiry_heap",
+        "scheduled",
+        "max_keys",
+        "recency",
+        "evictions",
+    )
+
+    def __init__(self, max_keys: Optional[int] = None) -> None:
+        self.lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
         self.expirations: Dict[str, float] = {}
-        self.events: Dict[str, List[_LockableEntry]] = {}
+        self.events: Dict[str, _MovingWindowEvents] = {}
+        # Theoretical arrival times for the GCRA strategy, in microseconds.
+        self.tats: Dict[str, int] = {}
+        # The expiry time of each lease held by each key, for the concurrency limiter.
+        self.leases: Dict[str, Dict[str, float]] = {}
+
+        self.expiry_heap: List[Tuple[float, str]] = []
+        # The deadline of each key's live entry in the expiry heap. Heap entries which don't
+        # match are stale, and are skipped when they reach the top of the heap.
+        self.scheduled: Dict[str, float] = {}
+
+        self.max_keys = max_keys
+        self.recency: Optional["OrderedDict[str, None]"] = None
+        if max_keys is not None:
+            self.recency = OrderedDict()
+        self.evictions = 0
+
+    def get_counter(self, key: str, timestamp: float) -> int:
+        if self.expirations.get(key, 0) <= timestamp:
+            self.counters.pop(key, None)
+            self.expirations.pop(key, None)
+            if key not in self.events and key not in self.tats and key not in self.leases:
+                self.forget(key)
+        return self.counters.get(key, 0)
+
+    def get_leases(self, key: str, timestamp: float) -> Dict[str, float]:
+        leases = self.leases.get(key)
+        if leases is None:
+            return {}
+        for lease_id in [lease_id for lease_id, until in leases.items() if until <= timestamp]:
+            del leases[lease_id]
+        if not leases:
+            del self.leases[key]
+        return leases
+
+    def deadline_for(self, key: str) -> Optional[float]:
+        deadline = self.expirations.get(key)
+        events = self.events.get(key)
+        if events:
+            events_deadline = events[len(events) - 1] + events.expiry
+            if deadline is None or events_deadline > deadline:
+                deadline = events_deadline
+        tat = self.tats.get(key)
+        if tat is not None and (deadline is None or tat / 1_000_000 > deadline):
+            deadline = tat / 1_000_000
+        leases = self.leases.get(key)
+        if leases:
+            leases_deadline = max(leases.values())
+            if deadline is None or leases_deadline > deadline:
+                deadline = leases_deadline
+        return deadline
+
+    def schedule(self, key: str, deadline: float) -> bool:
+        """
+        :param key: The key to schedule expiry for.
+        :param deadline: The time at which the key's data will have expired.
+        :return: Whether a new entry was added to the expiry heap.
+        """
+
+        if key in self.scheduled:
+            return False
+        self.scheduled[key] = deadline
+        heapq.heappush(self.expiry_heap, (deadline, key))
+        return True
+
+    def touch(self, key: str) -> None:
+        """
+        Marks the given key as the most recently written, evicting the least recently written key
+        if the shard is over its key limit.
+
+        :param key: The key that was just written.
+        """
+
+        recency = self.recency
+        if recency is None:
+            return
 
-        self.timer = threading.Timer(0.01, self.__expire_events)
-        self.timer.start()
+        if key in recency:
+            recency.move_to_end(key)
+            return
 
-    def __expire_events(self) -> None:
-        for key in list(self.events.keys()):
-            for event in list(self.events[key]):
-                with event:
-                    if event.expiry <= time.time() and event in self.events[key]:
-                        self.events[key].remove(event)
+        recency[key] = None
+        if len(recency) > cast(int, self.max_keys):
+            evicted_key, _ = recency.popitem(last=False)
+            self.remove(evicted_key)
+            self.evictions += 1
 
-        for key in list(self.expirations.keys()):
-            if self.expirations[key] <= time.time():
-                self.storage.pop(key, None)
+    def forget(self, key: str) -> None:
+        if self.recency is not None:
+            self.recency.pop(key, None)
+
+    def remove(self, key: str) -> None:
+        self.counters.pop(key, None)
+        self.expirations.pop(key, None)
+        self.events.pop(key, None)
+        self.tats.pop(key, None)
+        self.leases.pop(key, None)
+        self.forget(key)
+
+        if self.scheduled.pop(key, None) is not None:
+            # Removing entries from the middle of a heap is expensive, so stale entries are left
+            # behind and only cleaned out once they make up the majority of the heap.
+            if len(self.expiry_heap) > 2 * len(self.scheduled) + 64:
+                self.expiry_heap = [(deadline, key) for key, deadline in self.scheduled.items()]
+                heapq.heapify(self.expiry_heap)
+
+    def expire(self, timestamp: float) -> None:
+        """
+        Removes the data for every key in this shard whose deadline has passed.
+
+        Each key has at most one live entry in the expiry heap. Entries are not updated when a
+        key's deadline moves later; instead, when an entry reaches the top of the heap it is
+        pushed back with the key's current deadline. This keeps each pass proportional to the
+        number of keys that are actually due.
+
+        :param timestamp: The current time.
+        """
+
+        heap = self.expiry_heap
+        while heap and heap[0][0] <= timestamp:
+            scheduled_deadline, key = heapq.heappop(heap)
+            if self.scheduled.get(key) != scheduled_deadline:
+                continue
+
+            expiration = self.expirations.get(key)
+            if expiration is not None and expiration <= timestamp:
+                self.counters.pop(key, None)
                 self.expirations.pop(key, None)
+            events = self.events.get(key)
+            if events is not None:
+                events.expire(timestamp - events.expiry)
+                if not events:
+                    self.events.pop(key, None)
+            tat = self.tats.get(key)
+            if tat is not None and tat <= timestamp * 1_000_000:
+                del self.tats[key]
+            self.get_leases(key, timestamp)
+
+            deadline = self.deadline_for(key)
+            if deadline is None:
+                del self.scheduled[key]
+                self.forget(key)
+            else:
+                self.scheduled[key] = deadline
+                heapq.heappush(heap, (deadline, key))
+
+    def dump(
+        self, timestamp: float
+    ) -> Tuple[
+        List[Tuple[str, int, float]], List[Tuple[str, int, int, array]], List[Tuple[str, int]]
+    ]:
+        """
+        :param timestamp: The current time.
+        :return: The key, value and expiration time of each unexpired counter, the key, expiry,
+                 capacity and entries of each non-empty moving window, and the key and
+                 theoretical arrival time of each GCRA limit that hasn't yet fully recovered.
+        """
+
+        counters = [
+            (key, value, self.expirations[key])
+            for key, value in self.counters.items()
+            if self.expirations.get(key, 0) > timestamp
+        ]
+        windows = [
+            (key, events.expiry, events.capacity, events.ordered())
+            for key, events in self.events.items()
+            if events
+        ]
+        tats = [(key, tat) for key, tat in self.tats.items() if tat > timestamp * 1_000_000]
+        return counters, windows, tats
+
+    def clear(self) -> None:
+        self.counters.clear()
+        self.expirations.clear()
+        self.events.clear()
+        self.tats.clear()
+        self.leases.clear()
+        self.expiry_heap.clear()
+        self.scheduled.clear()
+        if self.recency is not None:
+            self.recency.clear()
+
+
+def _reap(storage_ref: "weakref.ReferenceType[MemoryStorage]", wakeup: threading.Event) -> None:
+    # Only a weak reference to the storage is held between passes, so that an unused storage can
+    # still be garbage collected while its reaper is waiting on a distant deadline.
+    while True:
+        wakeup.clear()
+        storage = storage_ref()
+        if storage is None:
+            return  # pragma: no cover
+        delay = storage._expire_events()
+        del storage
+        if delay is None:
+            return
+        wakeup.wait(min(delay, MemoryStorage.MAX_REAPER_INTERVAL))
+
+
+def _snapshot_periodically(
+    storage_ref: "weakref.ReferenceType[MemoryStorage]",
+    path: str,
+    interval: float,
+    stop: threading.Event,
+) -> None:
+    while not stop.wait(interval):
+        storage = storage_ref()
+        if storage is None:
+            return  # pragma: no cover
+        storage.snapshot(path)
+        del storage
+
+
+class MemoryStorage:
+    """
+    rate limit storage using a set of in memory shards, each holding plain dictionaries of
+    counters for fixed and elastic window strategies, and a ring buffer of timestamps
+    per key to implement moving window strategy.
+
+    Keys are spread across the shards by hash, and each shard has its own lock. Every operation
+    on a single key is atomic, while operations on keys in different shards can proceed in
+    parallel.
+
+    Expired keys are removed by a single background thread, which sleeps until the earliest
+    deadline in the shards' heaps of key expiry times. The thread is only running while there
+    are keys waiting to expire.
+
+    By default the number of keys is unbounded. When ``max_keys`` is set, each shard holds
+    at most its share of that many keys, and writing a new key to a full shard evicts the key
+    in that shard that was least recently written to. This bounds the memory used when faced
+    with a very large number of distinct identifiers, at the cost of forgetting the state of
+    evicted keys. It should therefore be set comfortably above the number of keys expected to
+    be active within your longest rate limit window.
+
+    The state of every key can be saved to a file with :meth:`snapshot` and loaded again with
+    :meth:`restore`, so that limits carry over when a process is restarted. Snapshots can also
+    be taken periodically in the background with :meth:`start_snapshots`.
 
-    def __schedule_expiry(self) -> None:
-        if not self.timer.is_alive():
-            self.timer = threading.Timer(0.01, self.__expire_events)
-            self.timer.start()
+    As data never leaves the process, any :class:`freiner.clock.Clock` can be used, including
+    a :class:`freiner.clock.MonotonicClock` to stay correct when the system clock is adjusted.
+    Snapshots record when they were taken by both the storage's clock and the wall clock, and
+    restored times are rebased onto the restoring storage's clock.
 
-    def incr(self, key: str, expiry: int, elastic_expiry: bool = False) -> int:
+    :param shards: The number of independently locked shards to spread keys across.
+    :param max_keys: The approximate maximum number of keys to hold at once.
+    :param clock: The clock to read the current time from. Defaults to the system clock.
+    :raises ValueError: If fewer than one shard, or a maximum of fewer than one key, is requested.
+    """
+
+    #: The longest the reaper will sleep before re-checking the clock, in seconds.
+    MAX_REAPER_INTERVAL = 1.0
+
+    def __init__(
+        self, shards: int = 16, max_keys: Optional[int] = None, clock: Optional[Clock] = None
+    ) -> None:
+        if shards < 1:
+            raise ValueError("MemoryStorage requires at least one shard.")
+
+        max_keys_per_shard: Optional[int] = None
+        if max_keys is not None:
+            if max_keys < 1:
+                raise ValueError("MemoryStorage requires a maximum of at least one key.")
+            max_keys_per_shard = -(-max_keys // shards)
+
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self._shards: Tuple[_MemoryShard, ...] = tuple(
+            _MemoryShard(max_keys_per_shard) for _ in range(shards)
+        )
+
+        self._reaper_lock = threading.Lock()
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_wakeup = threading.Event()
+
+        self._snapshotter: Optional[Tuple[threading.Thread, threading.Event]] = None
+
+    def _shard_for(self, key: str) -> _MemoryShard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    @contextmanager
+    def _locked_shards(self, keys: Iterable[str]) -> Iterator[List[_MemoryShard]]:
+        shard_count = len(self._shards)
+        indexes = [hash(key) % shard_count for key in keys]
+        # Locks are always taken in shard order, so that concurrent batches can't deadlock.
+        locked: List[_MemoryShard] = []
+        try:
+            for index in sorted(set(indexes)):
+                shard = self._shards[index]
+                shard.lock.acquire()
+                locked.append(shard)
+            yield [self._shards[index] for index in indexes]
+        finally:
+            for shard in reversed(locked):
+                shard.lock.release()
+
+    @property
+    def evictions(self) -> int:
+        """
+        The number of keys that have been evicted to stay within ``max_keys``.
+        """
+
+        return sum(shard.evictions for shard in self._shards)
+
+    def _expire_events(self) -> Optional[float]:
+        """
+        Removes the data for every key whose deadline has passed.
+
+        :return: The number of seconds until the next deadline, or ``None`` if no keys remain.
+        """
+
+        next_deadline: Optional[float] = None
+        for shard in self._shards:
+            with shard.lock:
+                shard.expire(self._clock.now())
+                if shard.expiry_heap and (
+                    next_deadline is None or shard.expiry_heap[0][0] < next_deadline
+                ):
+                    next_deadline = shard.expiry_heap[0][0]
+
+        if next_deadline is not None:
+            return max(0.0, next_deadline - self._clock.now())
+
+        with self._reaper_lock:
+            # Writers push onto a shard's heap before checking whether the reaper is running,
+            # so if every heap is still empty here, any later writer will start a new reaper.
+            if any(shard.expiry_heap for shard in self._shards):
+                return 0.0
+            self._reaper = None
+            return None
+
+    def _schedule_expiry(
+        self, shard: _MemoryShard, key: str, deadline: float, timestamp: float
+    ) -> None:
+        # Must be called while holding the shard's lock.
+        shard.schedule(key, deadline)
+        heap = shard.expiry_heap
+        if self._reaper is not None and heap[0][1] != key and heap[0][0] > timestamp:
+            return
+        # Either the reaper isn't running, this key is now the earliest deadline in its shard,
+        # or the clock has moved past the earliest deadline while the reaper was sleeping.
+        self._wake_reaper()
+
+    def _wake_reaper(self) -> None:
+        with self._reaper_lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(
+                    target=_reap,
+                    args=(weakref.ref(self), self._reaper_wakeup),
+                    name="freiner-memory-reaper",
+                    daemon=True,
+                )
+                self._reaper.start()
+            else:
+                self._reaper_wakeup.set()
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
         """
         Increments the counter for the given rate limit key.
 
         :param key: The key to increment.
         :param expiry: Amount in seconds for the key to expire in.
         :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
         :return: The number of hits currently on the rate limit for the given key.
         """
 
-        self.get(key)
-        self.__schedule_expiry()
-        self.storage[key] += 1
-        if elastic_expiry or self.storage[key] == 1:
-            self.expirations[key] = time.time() + expiry
-        return self.storage.get(key, 0)
+        shard = self._shard_for(key)
+        with shard.lock:
+            timestamp = self._clock.now()
+            return self._incr(shard, key, expiry, elastic_expiry, amount, timestamp)
+
+    def incr_with_expiry(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> FixedWindow:
+        """
+        Increments the counter for the given rate limit key, and retrieves its expiry time in the
+        same operation.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The count and expiry time of the counter afterwards.
+        """
+
+        shard = self._shard_for(key)
+        with shard.lock:
+            timestamp = self._clock.now()
+            counter = self._incr(shard, key, expiry, elastic_expiry, amount, timestamp)
+            return FixedWindow(counter, shard.expirations[key])
+
+    def _incr(
+        self,
+        shard: _MemoryShard,
+        key: str,
+        expiry: int,
+        elastic_expiry: bool,
+        amount: int,
+        timestamp: float,
+    ) -> int:
+        # Must be called while holding the shard's lock.
+        previous = shard.get_counter(key, timestamp)
+        value = previous + amount
+        shard.counters[key] = value
+        shard.touch(key)
+        if elastic_expiry or not previous:
+            shard.expirations[key] = timestamp + expiry
+            self._schedule_expiry(shard, key, timestamp + expiry, timestamp)
+        return value
+
+    def incr_many(
+        self,
+        entries: Sequence[Tuple[str, int, int]],
+        elastic_expiry: bool = False,
+        amount: int = 1,
+    ) -> Tuple[bool, List[FixedWindow]]:
+        """
+        Increments the counters for all of the given rate limit keys, but only if none of them
+        would then exceed their limit.
+
+        :param entries: The key, limit and expiry in seconds of each counter.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: Whether the counters were incremented, and the count and expiry time of each
+                 counter afterwards.
+        """
+
+        with self._locked_shards(key for key, _, _ in entries) as shards:
+            timestamp = self._clock.now()
+            # A key given more than once is incremented once for each time it is given.
+            pending: Dict[str, int] = {}
+            allowed = True
+            for shard, (key, limit, _) in zip(shards, entries):
+                pending[key] = pending.get(key, 0) + amount
+                if shard.get_counter(key, timestamp) + pending[key] > limit:
+                    allowed = False
+            if allowed:
+                for shard, (key, _, expiry) in zip(shards, entries):
+                    self._incr(shard, key, expiry, elastic_expiry, amount, timestamp)
+
+            return allowed, [
+                FixedWindow(shard.counters.get(key, 0), shard.expirations.get(key, -1))
+                for shard, (key, _, _) in zip(shards, entries)
+            ]
+
+    def get_many(self, keys: Sequence[str]) -> List[FixedWindow]:
+        """
+        Retrieves the count and expiry time of each of the given rate limit keys.
+
+        :param keys: The keys to get the counters for.
+        :return: The count and expiry time of each counter.
+        """
+
+        with self._locked_shards(keys) as shards:
+            timestamp = self._clock.now()
+            return [
+                FixedWindow(shard.get_counter(key, timestamp), shard.expirations.get(key, -1))
+                for shard, key in zip(shards, keys)
+            ]
 
     def get(self, key: str) -> int:
         """
@@ -88,10 +697,9 @@ class MemoryStorage:
         :param key: The key to get the counter value for.
         """
 
-        if self.expirations.get(key, 0) <= time.time():
-            self.storage.pop(key, None)
-            self.expirations.pop(key, None)
-        return self.storage.get(key, 0)
+        shard = self._shard_for(key)
+        with shard.lock:
+            return shard.get_counter(key, self._clock.now())
 
     def clear(self, key: str) -> None:
         """
@@ -99,33 +707,120 @@ class MemoryStorage:
 
         :param key: The key to clear rate limits for.
         """
-        self.storage.pop(key, None)
-        self.expirations.pop(key, None)
-        self.events.pop(key, None)
 
-    def acquire_entry(self, key: str, limit: int, expiry: int, no_add: bool = False) -> bool:
+        shard = self._shard_for(key)
+        with shard.lock:
+            shard.remove(key)
+
+    def acquire_entry(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> bool:
         """
         :param key: The rate limit key to acquire an entry in.
         :param limit: The total amount of entries allowed before hitting the rate limit.
         :param expiry: Amount in seconds for the acquired entry to expire in.
         :param no_add: If False, an entry is not actually acquired but instead serves as a 'check'.
+        :param amount: The number of entries to acquire at once.
         """
 
-        self.events.setdefault(key, [])
-        self.__schedule_expiry()
-        timestamp = time.time()
-        entry: Optional[_LockableEntry]
-        try:
-            entry = self.events[key][limit - 1]
-        except IndexError:
-            entry = None
+        shard = self._shard_for(key)
+        with shard.lock:
+            timestamp = self._clock.now()
+            if not self._can_acquire(shard, key, limit, expiry, amount, timestamp):
+                return False
+            if not no_add:
+                self._acquire(shard, key, limit, expiry, amount, timestamp)
+            return True
 
-        if entry and entry.atime > timestamp - expiry:
+    def _can_acquire(
+        self,
+        shard: _MemoryShard,
+        key: str,
+        limit: int,
+        expiry: int,
+        amount: int,
+        timestamp: float,
+    ) -> bool:
+        # Must be called while holding the shard's lock.
+        if limit < 1 or amount > limit:
             return False
+        events = shard.events.get(key)
+        if events is not None:
+            if events.capacity != limit:
+                events = shard.events[key] = events.resize(limit)
+            # At most limit - amount entries may remain in the window, so the newest entry
+            # beyond those must have expired.
+            index = len(events) - 1 - (limit - amount)
+            if index >= 0 and events[index] > timestamp - expiry:
+                return False
+        return True
+
+    def _acquire(
+        self,
+        shard: _MemoryShard,
+        key: str,
+        limit: int,
+        expiry: int,
+        amount: int,
+        timestamp: float,
+    ) -> None:
+        # Must be called while holding the shard's lock, after checking _can_acquire.
+        events = shard.events.get(key)
+        if events is None:
+            events = shard.events[key] = _MovingWindowEvents(limit, expiry)
+        events.expiry = expiry
+        if amount == 1:
+            events.append(timestamp)
         else:
-            if not no_add:
-                self.events[key].insert(0, _LockableEntry(expiry))
-            return True
+            events.extend(timestamp, amount)
+        shard.touch(key)
+        self._schedule_expiry(shard, key, timestamp + expiry, timestamp)
+
+    def acquire_entries(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[MovingWindow]]:
+        """
+        Acquires ``amount`` entries in every one of the given moving windows, but only if they
+        can be acquired in all of them.
+
+        :param entries: The key, limit and expiry in seconds of each moving window.
+        :param amount: The number of entries to acquire in each moving window.
+        :return: Whether the entries were acquired, and the start and number of acquired entries
+                 of each moving window afterwards.
+        """
+
+        with self._locked_shards(key for key, _, _ in entries) as shards:
+            timestamp = self._clock.now()
+            # A key given more than once acquires entries once for each time it is given.
+            pending: Dict[str, int] = {}
+            allowed = True
+            for shard, (key, limit, expiry) in zip(shards, entries):
+                pending[key] = pending.get(key, 0) + amount
+                if not self._can_acquire(shard, key, limit, expiry, pending[key], timestamp):
+                    allowed = False
+            if allowed:
+                for shard, (key, limit, expiry) in zip(shards, entries):
+                    self._acquire(shard, key, limit, expiry, amount, timestamp)
+
+            return allowed, [
+                self._get_moving_window(shard, key, expiry, timestamp)
+                for shard, (key, _, expiry) in zip(shards, entries)
+            ]
+
+    def get_moving_windows(self, entries: Sequence[Tuple[str, int, int]]) -> List[MovingWindow]:
+        """
+        Retrieves the starting point and the number of entries in each of the moving windows.
+
+        :param entries: The key, limit and expiry in seconds of each moving window.
+        :return: The start and number of acquired entries of each moving window.
+        """
+
+        with self._locked_shards(key for key, _, _ in entries) as shards:
+            timestamp = self._clock.now()
+            return [
+                self._get_moving_window(shard, key, expiry, timestamp)
+                for shard, (key, _, expiry) in zip(shards, entries)
+            ]
 
     def get_expiry(self, key: str) -> float:
         """
@@ -135,7 +830,10 @@ class MemoryStorage:
         :return: The time at which the current rate limit for the given key ends.
         """
 
-        return self.expirations.get(key, -1)
+        shard = self._shard_for(key)
+        with shard.lock:
+            expires_at = shard.expirations.get(key, -1)
+        return expires_at if expires_at > self._clock.now() else -1
 
     def get_num_acquired(self, key: str, expiry: int) -> int:
         """
@@ -145,11 +843,13 @@ class MemoryStorage:
         :param expiry: expiry of the entry
         """
 
-        timestamp = time.time()
-        if self.events.get(key):
-            return len([k for k in self.events[key] if k.atime > timestamp - expiry])
-        else:
-            return 0
+        shard = self._shard_for(key)
+        with shard.lock:
+            events = shard.events.get(key)
+            if not events:
+                return 0
+
+            return len(events) - events.index_after(self._clock.now() - expiry)
 
     def get_moving_window(self, key: str, limit: int, expiry: int) -> MovingWindow:
         """
@@ -161,12 +861,206 @@ class MemoryStorage:
         :return: (start of window, number of acquired entries)
         """
 
-        timestamp = time.time()
-        acquired = self.get_num_acquired(key, expiry)
-        for item in self.events.get(key, []):
-            if item.atime > timestamp - expiry:
-                return MovingWindow(item.atime, acquired)
-        return MovingWindow(timestamp, acquired)
+        shard = self._shard_for(key)
+        with shard.lock:
+            return self._get_moving_window(shard, key, expiry, self._clock.now())
+
+    def get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then.
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        """
+
+        if limit < 1 or amount > limit:
+            return math.inf
+
+        shard = self._shard_for(key)
+        with shard.lock:
+            timestamp = self._clock.now()
+            events = shard.events.get(key)
+            if events is not None:
+                index = len(events) - 1 - (limit - amount)
+                if index >= 0 and events[index] > timestamp - expiry:
+                    return events[index] + expiry
+            return timestamp
+
+    def _get_moving_window(
+        self, shard: _MemoryShard, key: str, expiry: int, timestamp: float
+    ) -> MovingWindow:
+        # Must be called while holding the shard's lock.
+        events = shard.events.get(key)
+        if events:
+            acquired = len(events) - events.index_after(timestamp - expiry)
+            if acquired:
+                return MovingWindow(events[len(events) - 1], acquired)
+        return MovingWindow(timestamp, 0)
+
+    def acquire_tat(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> Tuple[bool, GCRAState]:
+        """
+        Advances the theoretical arrival time of the given key by ``amount`` emission intervals
+        (``expiry / limit`` seconds each), unless doing so would take it more than ``expiry``
+        seconds past the current time.
+
+        :param key: The rate limit key to advance the theoretical arrival time of.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param no_add: If True, the theoretical arrival time is not actually advanced, and this
+                       instead serves as a 'check'.
+        :param amount: The number of hits to count.
+        :return: Whether the hits were allowed, and the theoretical arrival time afterwards.
+        """
+
+        shard = self._shard_for(key)
+        with shard.lock:
+            timestamp = self._clock.now()
+            now = int(timestamp * 1_000_000)
+            tat = max(shard.tats.get(key, now), now)
+            if limit < 1:
+                return False, GCRAState(now / 1_000_000, tat / 1_000_000)
+
+            new_tat = tat + expiry * 1_000_000 // limit * amount
+            if new_tat - now > expiry * 1_000_000:
+                return False, GCRAState(now / 1_000_000, tat / 1_000_000)
+
+            if not no_add:
+                tat = shard.tats[key] = new_tat
+                shard.touch(key)
+                self._schedule_expiry(shard, key, tat / 1_000_000, timestamp)
+            return True, GCRAState(now / 1_000_000, tat / 1_000_000)
+
+    def get_tat(self, key: str) -> GCRAState:
+        """
+        Retrieves the theoretical arrival time of the given key.
+
+        :param key: The rate limit key to retrieve the theoretical arrival time of.
+        :return: (current time, theoretical arrival time) where the theoretical arrival time is
+                 never earlier than the current time.
+        """
+
+        shard = self._shard_for(key)
+        with shard.lock:
+            now = int(self._clock.now() * 1_000_000)
+            tat = max(shard.tats.get(key, now), now)
+            return GCRAState(now / 1_000_000, tat / 1_000_000)
+
+    def acquire_tats(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[GCRAState]]:
+        """
+        Advances the theoretical arrival time of every one of the given keys by ``amount``
+        emission intervals, but only if none of them would then be more than their limit's
+        period past the current time.
+
+        :param entries: The key, limit and period in seconds of each theoretical arrival time.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were allowed, and the theoretical arrival time of each key
+                 afterwards.
+        """
+
+        with self._locked_shards(key for key, _, _ in entries) as shards:
+            timestamp = self._clock.now()
+            now = int(timestamp * 1_000_000)
+            # A key given more than once is advanced once for each time it is given.
+            pending: Dict[str, int] = {}
+            allowed = True
+            for shard, (key, limit, expiry) in zip(shards, entries):
+                if limit < 1:
+                    allowed = False
+                    continue
+                pending[key] = pending.get(key, 0) + expiry * 1_000_000 // limit * amount
+                tat = max(shard.tats.get(key, now), now)
+                if tat + pending[key] - now > expiry * 1_000_000:
+                    allowed = False
+
+            if allowed:
+                for shard, (key, _, _) in zip(shards, entries):
+                    increment = pending.pop(key, None)
+                    if increment is not None:
+                        tat = shard.tats[key] = max(shard.tats.get(key, now), now) + increment
+                        shard.touch(key)
+                        self._schedule_expiry(shard, key, tat / 1_000_000, timestamp)
+
+            return allowed, [
+                GCRAState(now / 1_000_000, max(shard.tats.get(key, now), now) / 1_000_000)
+                for shard, (key, _, _) in zip(shards, entries)
+            ]
+
+    def get_tats(self, keys: Sequence[str]) -> List[GCRAState]:
+        """
+        Retrieves the theoretical arrival time of each of the given keys.
+
+        :param keys: The rate limit keys to retrieve the theoretical arrival times of.
+        :return: (current time, theoretical arrival time) of each key.
+        """
+
+        with self._locked_shards(keys) as shards:
+            now = int(self._clock.now() * 1_000_000)
+            return [
+                GCRAState(now / 1_000_000, max(shard.tats.get(key, now), now) / 1_000_000)
+                for shard, key in zip(shards, keys)
+            ]
+
+    def acquire_lease(self, key: str, limit: int, lease_id: str, timeout: float) -> bool:
+        """
+        Adds a lease with the given ID to the given key, unless the key already holds ``limit``
+        unexpired leases.
+
+        :param key: The rate limit key to acquire a lease in.
+        :param limit: The maximum number of unexpired leases the key may hold.
+        :param lease_id: A unique ID for the new lease.
+        :param timeout: Amount in seconds for the lease to expire in, if it isn't released.
+        :return: Whether the lease was acquired.
+        """
+
+        shard = self._shard_for(key)
+        with shard.lock:
+            timestamp = self._clock.now()
+            if len(shard.get_leases(key, timestamp)) >= limit:
+                return False
+
+            shard.leases.setdefault(key, {})[lease_id] = timestamp + timeout
+            shard.touch(key)
+            self._schedule_expiry(shard, key, timestamp + timeout, timestamp)
+            return True
+
+    def release_lease(self, key: str, lease_id: str) -> None:
+        """
+        Removes the lease with the given ID from the given key, if it still holds it.
+
+        :param key: The rate limit key to release the lease from.
+        :param lease_id: The ID of the lease to release.
+        """
+
+        shard = self._shard_for(key)
+        with shard.lock:
+            leases = shard.leases.get(key)
+            if leases is not None:
+                leases.pop(lease_id, None)
+                if not leases:
+                    del shard.leases[key]
+
+    def get_lease_count(self, key: str) -> int:
+        """
+        Retrieves the number of unexpired leases held by the given key.
+
+        :param key: The rate limit key to count the leases of.
+        :return: The number of unexpired leases.
+        """
+
+        shard = self._shard_for(key)
+        with shard.lock:
+            return len(shard.get_leases(key, self._clock.now()))
 
     def check(self) -> bool:
         """
@@ -175,10 +1069,231 @@ class MemoryStorage:
 
         return True
 
+    def snapshot(self, path: str) -> None:
+        """
+        Writes the state of every key that hasn't yet expired to the given file. Concurrency
+        leases aren't included, as they belong to requests that won't survive a restart.
+
+        Shards are written one at a time, so only one shard is locked at any moment. The file is
+        written to a temporary location and then moved into place, so an existing snapshot is
+        never left partially overwritten.
+
+        :param path: The location to write the snapshot to.
+        """
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temporary_path = tempfile.mkstemp(dir=directory, prefix=".freiner-snapshot-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(
+                    _SNAPSHOT_HEADER.pack(
+                        _SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, self._clock.now(), time.time()
+                    )
+                )
+                for shard in self._shards:
+                    with shard.lock:
+                        counters, windows, tats = shard.dump(self._clock.now())
+
+                    if counters:
+                        keys, values, expirations = zip(*counters)
+                        f.write(
+                            _pack_block(
+                                _BLOCK_COUNTERS,
+                                keys,
+                                _pack_array("q", values),
+                                _pack_array("d", expirations),
+                            )
+                        )
+                    if windows:
+                        keys, expiries, capacities, timestamps = zip(*windows)
+                        f.write(
+                            _pack_block(
+                                _BLOCK_WINDOWS,
+                                keys,
+                                _pack_array("d", expiries),
+                                _pack_array("I", capacities),
+                                _pack_array("I", map(len, timestamps)),
+                                *(_pack_array("d", entries) for entries in timestamps),
+                            )
+                        )
+                    if tats:
+                        keys, arrival_times = zip(*tats)
+                        f.write(_pack_block(_BLOCK_TATS, keys, _pack_array("q", arrival_times)))
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def restore(self, path: str) -> int:
+        """
+        Loads the keys saved in a snapshot file, replacing any existing state for those keys.
+        Keys that have expired since the snapshot was taken are skipped.
+
+        The saved times are shifted by the difference between how far this storage's clock and
+        the wall clock have each moved on since the snapshot was taken. Snapshots taken with a
+        clock whose readings differ between processes, such as
+        :class:`freiner.clock.MonotonicClock`, therefore keep their remaining expiry times.
+
+        :param path: The location of the snapshot to load.
+        :raises ValueError: If the file is not a valid snapshot.
+        :return: The number of keys restored.
+        """
+
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _SNAPSHOT_HEADER.size:
+                raise ValueError(f"Not a MemoryStorage snapshot: {path}")
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                magic, version, taken_at, taken_at_wall = _SNAPSHOT_HEADER.unpack_from(data, 0)
+                if magic != _SNAPSHOT_MAGIC or version != _SNAPSHOT_VERSION:
+                    raise ValueError(f"Not a MemoryStorage snapshot: {path}")
+
+                timestamp = self._clock.now()
+                shift = timestamp - taken_at - (time.time() - taken_at_wall)
+                try:
+                    return self._restore_blocks(data, _SNAPSHOT_HEADER.size, size, timestamp, shift)
+                except (struct.error, UnicodeDecodeError) as exc:
+                    raise ValueError(f"Corrupt MemoryStorage snapshot: {path}") from exc
+
+    def _restore_blocks(
+        self, data: mmap.mmap, offset: int, size: int, timestamp: float, shift: float
+    ) -> int:
+        # Every saved time is moved onto this storage's clock by adding shift.
+        shards = self._shards
+        counters: List[Tuple[List[str], List[int], List[float]]] = [([], [], []) for _ in shards]
+        windows: List[List[Tuple[str, _MovingWindowEvents]]] = [[] for _ in shards]
+        tats: List[List[Tuple[str, int]]] = [[] for _ in shards]
+
+        while offset < size:
+            kind, count, blob_size = _SNAPSHOT_BLOCK.unpack_from(data, offset)
+            offset += _SNAPSHOT_BLOCK.size
+            lengths, offset = _unpack_array("I", data, offset, count)
+            if offset + blob_size > size:
+                raise struct.error("truncated snapshot")
+            keys = _unpack_keys(data[offset : offset + blob_size], lengths)
+            offset += blob_size
+
+            if kind == _BLOCK_COUNTERS:
+                values, offset = _unpack_array("q", data, offset, count)
+                expirations, offset = _unpack_array("d", data, offset, count)
+                if shift:
+                    expirations = array("d", [expiration + shift for expiration in expirations])
+                # Blocks are written per shard, but hashes differ between processes, so the keys
+                # of a block have to be redistributed.
+                groups = [
+                    (group_keys.append, group_values.append, group_expirations.append)
+                    for group_keys, group_values, group_expirations in counters
+                ]
+                for key, value, expiration in zip(keys, values, expirations):
+                    if expiration > timestamp:
+                        add_key, add_value, add_expiration = groups[hash(key) % len(groups)]
+                        add_key(key)
+                        add_value(value)
+                        add_expiration(expiration)
+            elif kind == _BLOCK_WINDOWS:
+                expiries, offset = _unpack_array("d", data, offset, count)
+                capacities, offset = _unpack_array("I", data, offset, count)
+                sizes, offset = _unpack_array("I", data, offset, count)
+                entries, offset = _unpack_array("d", data, offset, sum(sizes))
+                if shift:
+                    entries = array("d", [entry + shift for entry in entries])
+
+                position = 0
+                for key, expiry, capacity, entry_count in zip(keys, expiries, capacities, sizes):
+                    events = _MovingWindowEvents.from_timestamps(
+                        capacity, int(expiry), entries[position : position + entry_count]
+                    )
+                    position += entry_count
+                    events.expire(timestamp - expiry)
+                    if events:
+                        windows[hash(key) % len(windows)].append((key, events))
+            elif kind == _BLOCK_TATS:
+                arrival_times, offset = _unpack_array("q", data, offset, count)
+                if shift:
+                    arrival_times = array(
+                        "q", [tat + int(shift * 1_000_000) for tat in arrival_times]
+                    )
+                for key, tat in zip(keys, arrival_times):
+                    if tat > timestamp * 1_000_000:
+                        tats[hash(key) % len(tats)].append((key, tat))
+            else:
+                raise struct.error(f"unknown block type {kind}")
+
+        restored = 0
+        for shard, shard_counters, shard_windows, shard_tats in zip(
+            shards, counters, windows, tats
+        ):
+            counter_keys, counter_values, counter_expirations = shard_counters
+            if not counter_keys and not shard_windows and not shard_tats:
+                continue
+
+            window_keys = [key for key, _ in shard_windows]
+            tat_keys = [key for key, _ in shard_tats]
+            deadlines = dict(zip(counter_keys, counter_expirations))
+            deadlines.update(
+                (key, events[len(events) - 1] + events.expiry) for key, events in shard_windows
+            )
+            deadlines.update((key, tat / 1_000_000) for key, tat in shard_tats)
+            with shard.lock:
+                shard.counters.update(zip(counter_keys, counter_values))
+                shard.expirations.update(zip(counter_keys, counter_expirations))
+                shard.events.update(shard_windows)
+                shard.tats.update(shard_tats)
+                # Keys that are already scheduled keep their deadline, as the reaper checks it
+                # against the key's current state anyway.
+                deadlines.update(shard.scheduled)
+                shard.scheduled.update(deadlines)
+                if shard.recency is not None:
+                    for key in chain(counter_keys, window_keys, tat_keys):
+                        shard.touch(key)
+
+                # Rebuilding the heap in one go is much faster than pushing each key onto it.
+                shard.expiry_heap = list(zip(shard.scheduled.values(), shard.scheduled.keys()))
+                heapq.heapify(shard.expiry_heap)
+            restored += len(counter_keys) + len(window_keys) + len(tat_keys)
+
+        if restored:
+            self._wake_reaper()
+        return restored
+
+    def start_snapshots(self, path: str, interval: float) -> None:
+        """
+        Starts writing a snapshot to the given file every ``interval`` seconds, in a background
+        thread. Any previously started periodic snapshots are stopped first.
+
+        :param path: The location to write snapshots to.
+        :param interval: The time between snapshots, in seconds.
+        """
+
+        self.stop_snapshots()
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=_snapshot_periodically,
+            args=(weakref.ref(self), path, interval, stop),
+            name="freiner-memory-snapshots",
+            daemon=True,
+        )
+        self._snapshotter = (thread, stop)
+        thread.start()
+
+    def stop_snapshots(self) -> None:
+        """
+        Stops any periodic snapshots started with :meth:`start_snapshots`.
+        """
+
+        if self._snapshotter is None:
+            return
+
+        thread, stop = self._snapshotter
+        self._snapshotter = None
+        stop.set()
+        thread.join()
+
     def reset(self) -> None:
-        self.storage.clear()
-        self.expirations.clear()
-        self.events.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.clear()
 
 
 __all__ = [
@@ -1,9 +1,12 @@
-import time
-from typing import Any, Callable, Tuple, cast
+import math
+from typing import Any, Callable, List, Optional, Sequence, Tuple, Union, cast
 
 import redis
 
-from . import MovingWindow
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.keys import HashedKeyEncoder, Key
+
+from . import FixedWindow, GCRAState, MovingWindow, SlidingWindow
 
 
 class RedisInteractor:
@@ -25,23 +28,247 @@ class RedisInteractor:
         return {oldest, a}
         """
 
+    # Entries are pushed in batches, since unpack() can only spread a limited number of values.
     SCRIPT_ACQUIRE_MOVING_WINDOW = """
-        local entry = redis.call('lindex', KEYS[1], tonumber(ARGV[2]) - 1)
         local timestamp = tonumber(ARGV[1])
+        local limit = tonumber(ARGV[2])
         local expiry = tonumber(ARGV[3])
+        local amount = tonumber(ARGV[5])
+        if amount > limit then
+            return false
+        end
+        local entry = redis.call('lindex', KEYS[1], limit - amount)
         if entry and tonumber(entry) > timestamp - expiry then
             return false
         end
-        local limit = tonumber(ARGV[2])
         local no_add = tonumber(ARGV[4])
-        if no_add == 0 then
-            redis.call('lpush', KEYS[1], timestamp)
+        if no_add == 0 and amount > 0 then
+            local entries = {}
+            for i = 1, math.min(amount, 5000) do
+                entries[i] = ARGV[1]
+            end
+            for i = 1, amount, 5000 do
+                redis.call('lpush', KEYS[1], unpack(entries, 1, math.min(amount - i + 1, 5000)))
+            end
             redis.call('ltrim', KEYS[1], 0, limit - 1)
             redis.call('expire', KEYS[1], expiry)
         end
         return true
         """
 
+    SCRIPT_INCR_MANY = """
+        local elastic_expiry = tonumber(ARGV[1]) == 1
+        local amount = tonumber(ARGV[2])
+        local counters = {}
+        local pending = {}
+        local allowed = 1
+        for i = 1, #KEYS do
+            pending[KEYS[i]] = (pending[KEYS[i]] or 0) + amount
+            counters[i] = tonumber(redis.call('get', KEYS[i]) or 0)
+            if counters[i] + pending[KEYS[i]] > tonumber(ARGV[i * 2 + 1]) then
+                allowed = 0
+            end
+        end
+        local result = {allowed}
+        for i = 1, #KEYS do
+            if allowed == 1 then
+                local previous = counters[i]
+                counters[i] = redis.call('incrby', KEYS[i], amount)
+                if elastic_expiry or previous == 0 then
+                    redis.call('expire', KEYS[i], ARGV[i * 2 + 2])
+                end
+            end
+            table.insert(result, counters[i])
+            table.insert(result, redis.call('ttl', KEYS[i]))
+        end
+        return result
+        """
+
+    # Timestamps are returned as the strings they were stored as, since Lua numbers are
+    # truncated to integers when returned to the client.
+    SCRIPT_ACQUIRE_MOVING_WINDOWS = """
+        local timestamp = tonumber(ARGV[1])
+        local allowed = tonumber(ARGV[2]) == 0
+        local amount = tonumber(ARGV[3])
+        local pending = {}
+        for i = 1, #KEYS do
+            local limit = tonumber(ARGV[i * 2 + 2])
+            local expiry = tonumber(ARGV[i * 2 + 3])
+            local needed = (pending[KEYS[i]] or 0) + amount
+            pending[KEYS[i]] = needed
+            if limit < 1 or needed > limit then
+                allowed = false
+            else
+                local entry = redis.call('lindex', KEYS[i], limit - needed)
+                if entry and tonumber(entry) > timestamp - expiry then
+                    allowed = false
+                end
+            end
+        end
+        local entries = {}
+        if allowed then
+            for i = 1, math.min(amount, 5000) do
+                entries[i] = ARGV[1]
+            end
+        end
+        local result = {allowed and 1 or 0}
+        for i = 1, #KEYS do
+            local limit = tonumber(ARGV[i * 2 + 2])
+            local expiry = tonumber(ARGV[i * 2 + 3])
+            if allowed and amount > 0 then
+                for j = 1, amount, 5000 do
+                    redis.call('lpush', KEYS[i], unpack(entries, 1, math.min(amount - j + 1, 5000)))
+                end
+                redis.call('ltrim', KEYS[i], 0, limit - 1)
+                redis.call('expire', KEYS[i], expiry)
+            end
+            local items = redis.call('lrange', KEYS[i], 0, limit - 1)
+            local acquired = 0
+            for idx = 1, #items do
+                if tonumber(items[idx]) > timestamp - expiry then
+                    acquired = acquired + 1
+                else
+                    break
+                end
+            end
+            table.insert(result, acquired > 0 and items[1] or ARGV[1])
+            table.insert(result, acquired)
+        end
+        return result
+        """
+
+    # Theoretical arrival times are stored as whole microseconds, which Lua's numbers represent
+    # exactly, so that a burst of exactly the limit is never rejected due to rounding.
+    SCRIPT_ACQUIRE_TAT = """
+        local now = tonumber(ARGV[1])
+        local increment = tonumber(ARGV[2])
+        local expiry = tonumber(ARGV[3])
+        local tat = tonumber(redis.call('get', KEYS[1]) or 0)
+        if tat < now then
+            tat = now
+        end
+        local new_tat = tat + increment
+        if new_tat - now > expiry then
+            return {0, tat}
+        end
+        if tonumber(ARGV[4]) == 0 then
+            local ttl = math.max(math.ceil((new_tat - now) / 1000), 1)
+            redis.call('set', KEYS[1], string.format('%d', new_tat), 'PX', ttl)
+            tat = new_tat
+        end
+        return {1, tat}
+        """
+
+    SCRIPT_ACQUIRE_TATS = """
+        local now = tonumber(ARGV[1])
+        local tats = {}
+        local pending = {}
+        local allowed = 1
+        for i = 1, #KEYS do
+            local tat = tonumber(redis.call('get', KEYS[i]) or 0)
+            if tat < now then
+                tat = now
+            end
+            tats[i] = tat
+            pending[KEYS[i]] = (pending[KEYS[i]] or 0) + tonumber(ARGV[i * 2])
+            if tat + pending[KEYS[i]] - now > tonumber(ARGV[i * 2 + 1]) then
+                allowed = 0
+            end
+        end
+        local result = {allowed}
+        for i = 1, #KEYS do
+            if allowed == 1 and pending[KEYS[i]] then
+                local new_tat = tats[i] + pending[KEYS[i]]
+                local ttl = math.max(math.ceil((new_tat - now) / 1000), 1)
+                redis.call('set', KEYS[i], string.format('%d', new_tat), 'PX', ttl)
+                pending[KEYS[i]] = nil
+            end
+            table.insert(result, math.max(tonumber(redis.call('get', KEYS[i]) or 0), now))
+        end
+        return result
+        """
+
+    # Both windows' counters are kept in a single hash, keyed by window number, so that they
+    # always live on the same cluster node.
+    SCRIPT_ACQUIRE_SLIDING_WINDOW = """
+        local index = tonumber(ARGV[1])
+        local weight = tonumber(ARGV[2])
+        local limit = tonumber(ARGV[3])
+        local expiry = tonumber(ARGV[4])
+        local amount = tonumber(ARGV[5])
+        local counts = redis.call('hmget', KEYS[1], index - 1, index)
+        local previous = tonumber(counts[1] or 0)
+        local current = tonumber(counts[2] or 0)
+        if previous * weight + current + amount > limit then
+            return {0, previous, current}
+        end
+        current = redis.call('hincrby', KEYS[1], index, amount)
+        if redis.call('hlen', KEYS[1]) > 2 then
+            for _, field in ipairs(redis.call('hkeys', KEYS[1])) do
+                if tonumber(field) < index - 1 then
+                    redis.call('hdel', KEYS[1], field)
+                end
+            end
+        end
+        redis.call('expire', KEYS[1], expiry * 2)
+        return {1, previous, current}
+        """
+
+    SCRIPT_ACQUIRE_SLIDING_WINDOWS = """
+        local amount = tonumber(ARGV[1])
+        local previous = {}
+        local current = {}
+        local pending = {}
+        local allowed = 1
+        for i = 1, #KEYS do
+            local index = tonumber(ARGV[i * 4 - 2])
+            local counts = redis.call('hmget', KEYS[i], index - 1, index)
+            previous[i] = tonumber(counts[1] or 0)
+            current[i] = tonumber(counts[2] or 0)
+            pending[KEYS[i]] = (pending[KEYS[i]] or 0) + amount
+            local weight = tonumber(ARGV[i * 4 - 1])
+            if previous[i] * weight + current[i] + pending[KEYS[i]] > tonumber(ARGV[i * 4]) then
+                allowed = 0
+            end
+        end
+        local result = {allowed}
+        for i = 1, #KEYS do
+            local index = tonumber(ARGV[i * 4 - 2])
+            if allowed == 1 then
+                current[i] = redis.call('hincrby', KEYS[i], index, amount)
+                if redis.call('hlen', KEYS[i]) > 2 then
+                    for _, field in ipairs(redis.call('hkeys', KEYS[i])) do
+                        if tonumber(field) < index - 1 then
+                            redis.call('hdel', KEYS[i], field)
+                        end
+                    end
+                end
+                redis.call('expire', KEYS[i], tonumber(ARGV[i * 4 + 1]) * 2)
+            end
+            table.insert(result, previous[i])
+            table.insert(result, current[i])
+        end
+        return result
+        """
+
+    # Leases are members of a sorted set, scored by their expiry time, so that expired leases
+    # can be dropped with a single range removal.
+    SCRIPT_ACQUIRE_LEASE = """
+        local now = tonumber(ARGV[1])
+        local limit = tonumber(ARGV[2])
+        local expires_at = tonumber(ARGV[4])
+        redis.call('zremrangebyscore', KEYS[1], '-inf', now)
+        if redis.call('zcard', KEYS[1]) >= limit then
+            return 0
+        end
+        redis.call('zadd', KEYS[1], expires_at, ARGV[3])
+        local ttl = math.max(math.ceil(expires_at - now), 1)
+        if redis.call('ttl', KEYS[1]) < ttl then
+            redis.call('expire', KEYS[1], ttl)
+        end
+        return 1
+        """
+
     SCRIPT_CLEAR_KEYS = """
         local keys = redis.call('keys', KEYS[1])
         local res = 0
@@ -53,27 +280,97 @@ class RedisInteractor:
         return res
         """
 
+    SCRIPT_INCR_WITH_EXPIRY = """
+        local current = redis.call("incrby", KEYS[1], ARGV[2])
+        if tonumber(ARGV[3]) == 1 or tonumber(current) == tonumber(ARGV[2]) then
+            redis.call("expire", KEYS[1], ARGV[1])
+        end
+        return {current, redis.call("pttl", KEYS[1])}
+        """
+
     SCRIPT_INCR_EXPIRE = """
         local current
-        current = redis.call("incr", KEYS[1])
-        if tonumber(current) == 1 then
+        current = redis.call("incrby", KEYS[1], ARGV[2])
+        if tonumber(current) == tonumber(ARGV[2]) then
             redis.call("expire", KEYS[1], ARGV[1])
         end
         return current
     """
 
-    def initialize_storage(self, connection: redis.Redis):
+    def initialize_storage(
+        self,
+        connection: redis.Redis,
+        clock: Optional[Clock] = None,
+        key_encoder: Optional[HashedKeyEncoder] = None,
+    ):
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self._key_encoder = key_encoder
+
         moving_window_script = connection.register_script(self.SCRIPT_MOVING_WINDOW)
         self.lua_moving_window = cast(
-            Callable[[Tuple[str], Tuple[float, int]], Tuple[float, int]],
+            Callable[[Tuple[Key], Tuple[float, int]], Tuple[float, int]],
             moving_window_script,
         )
 
         acquire_window_script = connection.register_script(self.SCRIPT_ACQUIRE_MOVING_WINDOW)
         self.lua_acquire_window = cast(
-            Callable[[Tuple[str], Tuple[float, int, int, int]], bool],
+            Callable[[Tuple[Key], Tuple[float, int, int, int, int]], bool],
             acquire_window_script,
         )
+        # Also kept uncast, so that it can be queued on a pipeline.
+        self.acquire_window_script = acquire_window_script
+
+        incr_many_script = connection.register_script(self.SCRIPT_INCR_MANY)
+        self.lua_incr_many = cast(
+            Callable[[Sequence[Key], Sequence[int]], List[int]],
+            incr_many_script,
+        )
+
+        acquire_moving_windows_script = connection.register_script(
+            self.SCRIPT_ACQUIRE_MOVING_WINDOWS
+        )
+        self.lua_acquire_moving_windows = cast(
+            Callable[[Sequence[Key], Sequence[float]], List[Union[bytes, int]]],
+            acquire_moving_windows_script,
+        )
+
+        acquire_tat_script = connection.register_script(self.SCRIPT_ACQUIRE_TAT)
+        self.lua_acquire_tat = cast(
+            Callable[[Tuple[Key], Tuple[int, int, int, int]], Tuple[int, int]],
+            acquire_tat_script,
+        )
+        # Also kept uncast, so that it can be queued on a pipeline.
+        self.acquire_tat_script = acquire_tat_script
+
+        acquire_sliding_window_script = connection.register_script(
+            self.SCRIPT_ACQUIRE_SLIDING_WINDOW
+        )
+        self.lua_acquire_sliding_window = cast(
+            Callable[[Tuple[Key], Tuple[int, float, int, int, int]], Tuple[int, int, int]],
+            acquire_sliding_window_script,
+        )
+        # Also kept uncast, so that it can be queued on a pipeline.
+        self.acquire_sliding_window_script = acquire_sliding_window_script
+
+        acquire_tats_script = connection.register_script(self.SCRIPT_ACQUIRE_TATS)
+        self.lua_acquire_tats = cast(
+            Callable[[Sequence[Key], Sequence[int]], List[int]],
+            acquire_tats_script,
+        )
+
+        acquire_sliding_windows_script = connection.register_script(
+            self.SCRIPT_ACQUIRE_SLIDING_WINDOWS
+        )
+        self.lua_acquire_sliding_windows = cast(
+            Callable[[Sequence[Key], Sequence[float]], List[int]],
+            acquire_sliding_windows_script,
+        )
+
+        acquire_lease_script = connection.register_script(self.SCRIPT_ACQUIRE_LEASE)
+        self.lua_acquire_lease = cast(
+            Callable[[Tuple[Key], Tuple[float, int, str, float]], int],
+            acquire_lease_script,
+        )
 
         clear_keys_script = connection.register_script(self.SCRIPT_CLEAR_KEYS)
         self.lua_clear_keys = cast(
@@ -81,12 +378,26 @@ class RedisInteractor:
             clear_keys_script,
         )
 
+        incr_with_expiry_script = connection.register_script(self.SCRIPT_INCR_WITH_EXPIRY)
+        self.lua_incr_with_expiry = cast(
+            Callable[[Tuple[Key], Tuple[int, int, int]], Tuple[int, int]],
+            incr_with_expiry_script,
+        )
+        # Also kept uncast, so that it can be queued on a pipeline.
+        self.incr_with_expiry_script = incr_with_expiry_script
+
         incr_expire_script = connection.register_script(RedisStorage.SCRIPT_INCR_EXPIRE)
         self.lua_incr_expire = cast(
-            Callable[[Tuple[str], Tuple[int]], int],
+            Callable[[Tuple[Key], Tuple[int, int]], int],
             incr_expire_script,
         )
 
+    def _key(self, key: str) -> Key:
+        # The key as it is stored in Redis.
+        if self._key_encoder is None:
+            return key
+        return self._key_encoder(key)
+
     def get_moving_window(self, key: str, limit: int, expiry: int) -> MovingWindow:
         """
         Retrieves the starting point and the number of entries in the moving window.
@@ -97,11 +408,18 @@ class RedisInteractor:
         :return: (start of window, number of acquired entries)
         """
 
-        timestamp = time.time()
-        window = self.lua_moving_window((key,), (timestamp - expiry, limit))
+        timestamp = self._clock.now()
+        window = self.lua_moving_window((self._key(key),), (timestamp - expiry, limit))
         return MovingWindow(window[0], window[1])
 
-    def _incr(self, key: str, expiry: int, connection: redis.Redis, elastic_expiry: bool = False):
+    def _incr(
+        self,
+        key: str,
+        expiry: int,
+        connection: redis.Redis,
+        elastic_expiry: bool = False,
+        amount: int = 1,
+    ):
         """
         Increments the counter for the given rate limit key.
 
@@ -109,14 +427,68 @@ class RedisInteractor:
         :param expiry: Amount in seconds for the key to expire in.
         :param connection: Redis connection.
         :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
         :return: The number of hits currently on the rate limit for the given key.
         """
 
-        value = connection.incr(key)
-        if elastic_expiry or value == 1:
-            connection.expire(key, expiry)
+        encoded_key = self._key(key)
+        value = connection.incrby(encoded_key, amount)
+        if elastic_expiry or value == amount:
+            connection.expire(encoded_key, expiry)
         return value
 
+    def _incr_with_expiry(
+        self,
+        key: str,
+        expiry: int,
+        connection: redis.Redis,
+        elastic_expiry: bool = False,
+        amount: int = 1,
+    ) -> FixedWindow:
+        """
+        Increments the counter for the given rate limit key, and retrieves its expiry time in the
+        same round trip.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param connection: Redis connection.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The count and expiry time of the counter afterwards.
+        """
+
+        counter, pttl = self.lua_incr_with_expiry(
+            (self._key(key),), (expiry, amount, int(elastic_expiry))
+        )
+        return FixedWindow(int(counter), max(pttl, 0) / 1000 + self._clock.now())
+
+    def _incr_bulk(
+        self,
+        keys: Sequence[str],
+        expiry: int,
+        connection: redis.Redis,
+        elastic_expiry: bool = False,
+        amount: int = 1,
+    ) -> List[int]:
+        """
+        Increments the counters for each of the given rate limit keys independently, in a single
+        pipelined round trip. Each key is still incremented atomically.
+
+        :param keys: The keys to increment.
+        :param expiry: Amount in seconds for the keys to expire in.
+        :param connection: Redis connection.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: The number of hits currently on the rate limit for each of the keys.
+        """
+
+        pipeline = connection.pipeline(transaction=False)
+        for key in keys:
+            self.incr_with_expiry_script(
+                keys=(self._key(key),), args=(expiry, amount, int(elastic_expiry)), client=pipeline
+            )
+        return [int(counter) for counter, _ in pipeline.execute()]
+
     def _get(self, key: str, connection: redis.Redis) -> int:
         """
         Retrieve the current request count for the given rate limit key.
@@ -125,7 +497,7 @@ class RedisInteractor:
         :param connection: Redis connection.
         """
 
-        return int(connection.get(key) or 0)
+        return int(connection.get(self._key(key)) or 0)
 
     def _clear(self, key: str, connection: redis.Redis) -> None:
         """
@@ -135,13 +507,19 @@ class RedisInteractor:
         :param connection: Redis connection.
         """
 
-        connection.delete(key)
+        connection.delete(self._key(key))
 
     def _reset(self) -> int:
         return self.lua_clear_keys(("LIMITER*",))
 
     def _acquire_entry(
-        self, key: str, limit: int, expiry: int, connection: redis.Redis, no_add: bool = False
+        self,
+        key: str,
+        limit: int,
+        expiry: int,
+        connection: redis.Redis,
+        no_add: bool = False,
+        amount: int = 1,
     ) -> bool:
         """
         :param key: The rate limit key to acquire an entry in.
@@ -149,15 +527,417 @@ class RedisInteractor:
         :param expiry: Amount in seconds for the acquired entry to expire in.
         :param connection: Redis connection.
         :param no_add: If False, an entry is not actually acquired but instead serves as a 'check'.
+        :param amount: The number of entries to acquire at once.
         """
 
-        timestamp = time.time()
+        timestamp = self._clock.now()
         acquired = self.lua_acquire_window(
-            (key,),
-            (timestamp, limit, expiry, int(no_add)),
+            (self._key(key),),
+            (timestamp, limit, expiry, int(no_add), amount),
         )
         return bool(acquired)
 
+    def _acquire_entry_bulk(
+        self,
+        keys: Sequence[str],
+        limit: int,
+        expiry: int,
+        connection: redis.Redis,
+        amount: int = 1,
+    ) -> List[bool]:
+        """
+        Acquires ``amount`` entries in the moving window of each of the given keys
+        independently, in a single pipelined round trip. Each key is still updated atomically.
+
+        :param keys: The rate limit keys to acquire entries in.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param connection: Redis connection.
+        :param amount: The number of entries to acquire in each window.
+        :return: Whether the entries were acquired, for each of the keys.
+        """
+
+        timestamp = self._clock.now()
+        pipeline = connection.pipeline(transaction=False)
+        for key in keys:
+            self.acquire_window_script(
+                keys=(self._key(key),), args=(timestamp, limit, expiry, 0, amount), client=pipeline
+            )
+        return [bool(acquired) for acquired in pipeline.execute()]
+
+    def _get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, connection: redis.Redis, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then.
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param connection: Redis connection.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        """
+
+        if limit < 1 or amount > limit:
+            return math.inf
+
+        # Entries are pushed onto the head of the list, so they are ordered newest first.
+        entry = connection.lindex(self._key(key), limit - amount)
+        timestamp = self._clock.now()
+        if entry is not None and float(entry) > timestamp - expiry:
+            return float(entry) + expiry
+        return timestamp
+
+    def _incr_many(
+        self,
+        entries: Sequence[Tuple[str, int, int]],
+        connection: redis.Redis,
+        elastic_expiry: bool = False,
+        amount: int = 1,
+    ) -> Tuple[bool, List[FixedWindow]]:
+        """
+        Increments the counters for all of the given rate limit keys, but only if none of them
+        would then exceed their limit.
+
+        :param entries: The key, limit and expiry in seconds of each counter.
+        :param connection: Redis connection.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: Whether the counters were incremented, and the count and expiry time of each
+                 counter afterwards.
+        """
+
+        args = [int(elastic_expiry), amount]
+        for _, limit, expiry in entries:
+            args.extend((limit, expiry))
+        result = self.lua_incr_many([self._key(key) for key, _, _ in entries], args)
+
+        timestamp = self._clock.now()
+        windows = [
+            FixedWindow(int(counter), max(ttl, 0) + timestamp)
+            for counter, ttl in zip(result[1::2], result[2::2])
+        ]
+        return bool(result[0]), windows
+
+    def _get_many(self, keys: Sequence[str], connection: redis.Redis) -> List[FixedWindow]:
+        """
+        Retrieves the count and expiry time of each of the given rate limit keys.
+
+        :param keys: The keys to get the counters for.
+        :param connection: Redis connection.
+        :return: The count and expiry time of each counter.
+        """
+
+        pipeline = connection.pipeline(transaction=False)
+        for key in keys:
+            encoded_key = self._key(key)
+            pipeline.get(encoded_key)
+            pipeline.ttl(encoded_key)
+        result = pipeline.execute()
+
+        timestamp = self._clock.now()
+        return [
+            FixedWindow(int(counter or 0), max(ttl, 0) + timestamp)
+            for counter, ttl in zip(result[0::2], result[1::2])
+        ]
+
+    def _acquire_entries(
+        self,
+        entries: Sequence[Tuple[str, int, int]],
+        connection: redis.Redis,
+        no_add: bool = False,
+        amount: int = 1,
+    ) -> Tuple[bool, List[MovingWindow]]:
+        """
+        Acquires ``amount`` entries in every one of the given moving windows, but only if they
+        can be acquired in all of them.
+
+        :param entries: The key, limit and expiry in seconds of each moving window.
+        :param connection: Redis connection.
+        :param no_add: If True, no entries are actually acquired, and this only retrieves the
+                       state of the moving windows.
+        :param amount: The number of entries to acquire in each moving window.
+        :return: Whether the entries were acquired, and the start and number of acquired entries
+                 of each moving window afterwards.
+        """
+
+        args: List[float] = [self._clock.now(), int(no_add), amount]
+        for _, limit, expiry in entries:
+            args.extend((limit, expiry))
+        result = self.lua_acquire_moving_windows([self._key(key) for key, _, _ in entries], args)
+
+        windows = [
+            MovingWindow(float(start_time), int(acquired))
+            for start_time, acquired in zip(result[1::2], result[2::2])
+        ]
+        return bool(result[0]), windows
+
+    def _acquire_tat(
+        self,
+        key: str,
+        limit: int,
+        expiry: int,
+        connection: redis.Redis,
+        no_add: bool = False,
+        amount: int = 1,
+    ) -> Tuple[bool, GCRAState]:
+        """
+        :param key: The rate limit key to advance the theoretical arrival time of.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param connection: Redis connection.
+        :param no_add: If True, the theoretical arrival time is not actually advanced, and this
+                       instead serves as a 'check'.
+        :param amount: The number of hits to count.
+        :return: Whether the hits were allowed, and the theoretical arrival time afterwards.
+        """
+
+        if limit < 1:
+            return False, self._get_tat(key, connection)
+
+        now = int(self._clock.now() * 1_000_000)
+        increment = expiry * 1_000_000 // limit * amount
+        acquired, tat = self.lua_acquire_tat(
+            (self._key(key),),
+            (now, increment, expiry * 1_000_000, int(no_add)),
+        )
+        return bool(acquired), GCRAState(now / 1_000_000, tat / 1_000_000)
+
+    def _acquire_tat_bulk(
+        self,
+        keys: Sequence[str],
+        limit: int,
+        expiry: int,
+        connection: redis.Redis,
+        amount: int = 1,
+    ) -> List[bool]:
+        """
+        Advances the theoretical arrival time of each of the given keys independently, in a
+        single pipelined round trip. Each key is still updated atomically.
+
+        :param keys: The rate limit keys to advance the theoretical arrival times of.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param connection: Redis connection.
+        :param amount: The number of hits to count against each key.
+        :return: Whether the hits were allowed, for each of the keys.
+        """
+
+        if limit < 1:
+            return [False for _ in keys]
+
+        now = int(self._clock.now() * 1_000_000)
+        increment = expiry * 1_000_000 // limit * amount
+        pipeline = connection.pipeline(transaction=False)
+        for key in keys:
+            self.acquire_tat_script(
+                keys=(self._key(key),),
+                args=(now, increment, expiry * 1_000_000, 0),
+                client=pipeline,
+            )
+        return [bool(acquired) for acquired, _ in pipeline.execute()]
+
+    def _get_tat(self, key: str, connection: redis.Redis) -> GCRAState:
+        """
+        Retrieves the theoretical arrival time of the given key.
+
+        :param key: The rate limit key to retrieve the theoretical arrival time of.
+        :param connection: Redis connection.
+        :return: (current time, theoretical arrival time) where the theoretical arrival time is
+                 never earlier than the current time.
+        """
+
+        now = int(self._clock.now() * 1_000_000)
+        tat = max(int(connection.get(self._key(key)) or 0), now)
+        return GCRAState(now / 1_000_000, tat / 1_000_000)
+
+    def _acquire_tats(
+        self, entries: Sequence[Tuple[str, int, int]], connection: redis.Redis, amount: int = 1
+    ) -> Tuple[bool, List[GCRAState]]:
+        """
+        :param entries: The key, limit and period in seconds of each theoretical arrival time.
+        :param connection: Redis connection.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were allowed, and the theoretical arrival time of each key
+                 afterwards.
+        """
+
+        if any(limit < 1 for _, limit, _ in entries):
+            return False, self._get_tats([key for key, _, _ in entries], connection)
+
+        now = int(self._clock.now() * 1_000_000)
+        args: List[int] = [now]
+        for _, limit, expiry in entries:
+            args.extend((expiry * 1_000_000 // limit * amount, expiry * 1_000_000))
+        result = self.lua_acquire_tats([self._key(key) for key, _, _ in entries], args)
+        return bool(result[0]), [GCRAState(now / 1_000_000, tat / 1_000_000) for tat in result[1:]]
+
+    def _get_tats(self, keys: Sequence[str], connection: redis.Redis) -> List[GCRAState]:
+        """
+        Retrieves the theoretical arrival time of each of the given keys.
+
+        :param keys: The rate limit keys to retrieve the theoretical arrival times of.
+        :param connection: Redis connection.
+        :return: (current time, theoretical arrival time) of each key.
+        """
+
+        values = connection.mget([self._key(key) for key in keys]) if keys else []
+        now = int(self._clock.now() * 1_000_000)
+        return [
+            GCRAState(now / 1_000_000, max(int(value or 0), now) / 1_000_000) for value in values
+        ]
+
+    def _acquire_lease(
+        self, key: str, limit: int, lease_id: str, timeout: float, connection: redis.Redis
+    ) -> bool:
+        """
+        :param key: The rate limit key to acquire a lease in.
+        :param limit: The maximum number of unexpired leases the key may hold.
+        :param lease_id: A unique ID for the new lease.
+        :param timeout: Amount in seconds for the lease to expire in, if it isn't released.
+        :param connection: Redis connection.
+        :return: Whether the lease was acquired.
+        """
+
+        timestamp = self._clock.now()
+        acquired = self.lua_acquire_lease(
+            (self._key(key),), (timestamp, limit, lease_id, timestamp + timeout)
+        )
+        return bool(acquired)
+
+    def _release_lease(self, key: str, lease_id: str, connection: redis.Redis) -> None:
+        """
+        :param key: The rate limit key to release the lease from.
+        :param lease_id: The ID of the lease to release.
+        :param connection: Redis connection.
+        """
+
+        connection.zrem(self._key(key), lease_id)
+
+    def _get_lease_count(self, key: str, connection: redis.Redis) -> int:
+        """
+        :param key: The rate limit key to count the leases of.
+        :param connection: Redis connection.
+        :return: The number of unexpired leases.
+        """
+
+        return connection.zcount(self._key(key), f"({self._clock.now()!r}", "+inf")
+
+    def _acquire_sliding_window_entry(
+        self, key: str, limit: int, expiry: int, connection: redis.Redis, amount: int = 1
+    ) -> Tuple[bool, SlidingWindow]:
+        """
+        :param key: The rate limit key to count hits against.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param connection: Redis connection.
+        :param amount: The number of hits to count.
+        :return: Whether the hits were counted, and the counts of hits in the current and
+                 previous windows afterwards.
+        """
+
+        timestamp = self._clock.now()
+        index, elapsed = divmod(timestamp, expiry)
+        acquired, previous, current = self.lua_acquire_sliding_window(
+            (self._key(key),),
+            (int(index), 1 - elapsed / expiry, limit, expiry, amount),
+        )
+        return bool(acquired), SlidingWindow(timestamp, int(previous), int(current))
+
+    def _acquire_sliding_window_entry_bulk(
+        self,
+        keys: Sequence[str],
+        limit: int,
+        expiry: int,
+        connection: redis.Redis,
+        amount: int = 1,
+    ) -> List[bool]:
+        """
+        Counts ``amount`` hits in the current window of each of the given keys independently, in
+        a single pipelined round trip. Each key is still updated atomically.
+
+        :param keys: The rate limit keys to count hits against.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param connection: Redis connection.
+        :param amount: The number of hits to count against each key.
+        :return: Whether the hits were counted, for each of the keys.
+        """
+
+        index, elapsed = divmod(self._clock.now(), expiry)
+        pipeline = connection.pipeline(transaction=False)
+        for key in keys:
+            self.acquire_sliding_window_script(
+                keys=(self._key(key),),
+                args=(int(index), 1 - elapsed / expiry, limit, expiry, amount),
+                client=pipeline,
+            )
+        return [bool(acquired) for acquired, _, _ in pipeline.execute()]
+
+    def _get_sliding_window(self, key: str, expiry: int, connection: redis.Redis) -> SlidingWindow:
+        """
+        Retrieves the counts of hits in the current and previous windows.
+
+        :param key: The rate limit key to retrieve statistics about.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param connection: Redis connection.
+        :return: (current time, hits in the previous window, hits in the current window)
+        """
+
+        timestamp = self._clock.now()
+        index = int(timestamp // expiry)
+        previous, current = connection.hmget(self._key(key), [str(index - 1), str(index)])
+        return SlidingWindow(timestamp, int(previous or 0), int(current or 0))
+
+    def _acquire_sliding_window_entries(
+        self, entries: Sequence[Tuple[str, int, int]], connection: redis.Redis, amount: int = 1
+    ) -> Tuple[bool, List[SlidingWindow]]:
+        """
+        :param entries: The key, limit and period in seconds of each sliding window.
+        :param connection: Redis connection.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were counted, and the counts of hits in the current and
+                 previous windows of each key afterwards.
+        """
+
+        timestamp = self._clock.now()
+        args: List[float] = [amount]
+        for _, limit, expiry in entries:
+            index, elapsed = divmod(timestamp, expiry)
+            args.extend((int(index), 1 - elapsed / expiry, limit, expiry))
+        result = self.lua_acquire_sliding_windows([self._key(key) for key, _, _ in entries], args)
+        windows = [
+            SlidingWindow(timestamp, int(previous), int(current))
+            for previous, current in zip(result[1::2], result[2::2])
+        ]
+        return bool(result[0]), windows
+
+    def _get_sliding_windows(
+        self, entries: Sequence[Tuple[str, int]], connection: redis.Redis
+    ) -> List[SlidingWindow]:
+        """
+        Retrieves the counts of hits in the current and previous windows of each of the given
+        keys, in a single pipelined round trip.
+
+        :param entries: The key and period in seconds of each sliding window.
+        :param connection: Redis connection.
+        :return: (current time, hits in the previous window, hits in the current window) of
+                 each key.
+        """
+
+        timestamp = self._clock.now()
+        pipeline = connection.pipeline(transaction=False)
+        for key, expiry in entries:
+            index = int(timestamp // expiry)
+            pipeline.hmget(self._key(key), [str(index - 1), str(index)])
+        return [
+            SlidingWindow(timestamp, int(previous or 0), int(current or 0))
+            for previous, current in pipeline.execute()
+        ]
+
     def _get_expiry(self, key: str, connection: redis.Redis) -> float:
         """
         Retrieve the expected expiry time for the given rate limit key.
@@ -167,7 +947,7 @@ class RedisInteractor:
         :return: The time at which the current rate limit for the given key ends.
         """
 
-        return max(connection.ttl(key), 0) + time.time()
+        return max(connection.ttl(self._key(key)), 0) + self._clock.now()
 
     def _check(self, connection: redis.Redis) -> bool:
         """
@@ -187,11 +967,24 @@ class RedisStorage(RedisInteractor):
     Rate limit storage with redis as backend.
 
     Depends on the `redis` library.
+
+    :param client: The Redis client to use.
+    :param clock: The clock to read the current time from. Defaults to the system clock. As
+                  moving window entries are stored in Redis, this should not be a
+                  :class:`freiner.clock.MonotonicClock`.
+    :param key_encoder: Encodes each rate limit key before it is sent to Redis, such as a
+                        :class:`freiner.keys.HashedKeyEncoder` to store long keys as short
+                        digests. Defaults to storing the keys as they are.
     """
 
-    def __init__(self, client: redis.Redis) -> None:
+    def __init__(
+        self,
+        client: redis.Redis,
+        clock: Optional[Clock] = None,
+        key_encoder: Optional[HashedKeyEncoder] = None,
+    ) -> None:
         self._client = client
-        self.initialize_storage(self._client)
+        self.initialize_storage(self._client, clock, key_encoder)
 
     @classmethod
     def from_uri(cls, uri: str, **options: Any) -> "RedisStorage":
@@ -206,20 +999,53 @@ class RedisStorage(RedisInteractor):
         client: redis.Redis = redis.from_url(uri, **options)
         return cls(client)
 
-    def incr(self, key: str, expiry: int, elastic_expiry: bool = False) -> int:
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
         """
         Increments the counter for the given rate limit key.
 
         :param key: The key to increment.
         :param expiry: Amount in seconds for the key to expire in.
         :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
         :return: The number of hits currently on the rate limit for the given key.
         """
 
         if elastic_expiry:
-            return self._incr(key, expiry, self._client, elastic_expiry)
+            return self._incr(key, expiry, self._client, elastic_expiry, amount)
         else:
-            return self.lua_incr_expire((key,), (expiry,))
+            return self.lua_incr_expire((self._key(key),), (expiry, amount))
+
+    def incr_with_expiry(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> FixedWindow:
+        """
+        Increments the counter for the given rate limit key, and retrieves its expiry time in the
+        same round trip.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The count and expiry time of the counter afterwards.
+        """
+
+        return self._incr_with_expiry(key, expiry, self._client, elastic_expiry, amount)
+
+    def incr_bulk(
+        self, keys: Sequence[str], expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> List[int]:
+        """
+        Increments the counters for each of the given rate limit keys independently, in a single
+        pipelined round trip.
+
+        :param keys: The keys to increment.
+        :param expiry: Amount in seconds for the keys to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: The number of hits currently on the rate limit for each of the keys.
+        """
+
+        return self._incr_bulk(keys, expiry, self._client, elastic_expiry, amount)
 
     def get(self, key: str) -> int:
         """
@@ -239,15 +1065,51 @@ class RedisStorage(RedisInteractor):
 
         self._clear(key, self._client)
 
-    def acquire_entry(self, key: str, limit: int, expiry: int, no_add: bool = False) -> bool:
+    def acquire_entry(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> bool:
         """
         :param key: The rate limit key to acquire an entry in.
         :param limit: The total amount of entries allowed before hitting the rate limit.
         :param expiry: Amount in seconds for the acquired entry to expire in.
         :param no_add: If False, an entry is not actually acquired but instead serves as a 'check'.
+        :param amount: The number of entries to acquire at once.
         """
 
-        return self._acquire_entry(key, limit, expiry, self._client, no_add=no_add)
+        return self._acquire_entry(key, limit, expiry, self._client, no_add=no_add, amount=amount)
+
+    def get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then.
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        """
+
+        return self._get_moving_window_retry_time(key, limit, expiry, self._client, amount)
+
+    def acquire_entry_bulk(
+        self, keys: Sequence[str], limit: int, expiry: int, amount: int = 1
+    ) -> List[bool]:
+        """
+        Acquires ``amount`` entries in the moving window of each of the given keys
+        independently, in a single pipelined round trip.
+
+        :param keys: The rate limit keys to acquire entries in.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire in each window.
+        :return: Whether the entries were acquired, for each of the keys.
+        """
+
+        return self._acquire_entry_bulk(keys, limit, expiry, self._client, amount)
 
     def get_expiry(self, key: str) -> float:
         """
@@ -259,6 +1121,239 @@ class RedisStorage(RedisInteractor):
 
         return self._get_expiry(key, self._client)
 
+    def incr_many(
+        self,
+        entries: Sequence[Tuple[str, int, int]],
+        elastic_expiry: bool = False,
+        amount: int = 1,
+    ) -> Tuple[bool, List[FixedWindow]]:
+        """
+        Increments the counters for all of the given rate limit keys, but only if none of them
+        would then exceed their limit.
+
+        :param entries: The key, limit and expiry in seconds of each counter.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: Whether the counters were incremented, and the count and expiry time of each
+                 counter afterwards.
+        """
+
+        return self._incr_many(entries, self._client, elastic_expiry, amount)
+
+    def get_many(self, keys: Sequence[str]) -> List[FixedWindow]:
+        """
+        Retrieves the count and expiry time of each of the given rate limit keys.
+
+        :param keys: The keys to get the counters for.
+        :return: The count and expiry time of each counter.
+        """
+
+        return self._get_many(keys, self._client)
+
+    def acquire_entries(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[MovingWindow]]:
+        """
+        Acquires ``amount`` entries in every one of the given moving windows, but only if they
+        can be acquired in all of them.
+
+        :param entries: The key, limit and expiry in seconds of each moving window.
+        :param amount: The number of entries to acquire in each moving window.
+        :return: Whether the entries were acquired, and the start and number of acquired entries
+                 of each moving window afterwards.
+        """
+
+        return self._acquire_entries(entries, self._client, amount=amount)
+
+    def get_moving_windows(self, entries: Sequence[Tuple[str, int, int]]) -> List[MovingWindow]:
+        """
+        Retrieves the starting point and the number of entries in each of the moving windows.
+
+        :param entries: The key, limit and expiry in seconds of each moving window.
+        :return: The start and number of acquired entries of each moving window.
+        """
+
+        _, windows = self._acquire_entries(entries, self._client, no_add=True)
+        return windows
+
+    def acquire_tat(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> Tuple[bool, GCRAState]:
+        """
+        Advances the theoretical arrival time of the given key by ``amount`` emission intervals
+        (``expiry / limit`` seconds each), unless doing so would take it more than ``expiry``
+        seconds past the current time.
+
+        :param key: The rate limit key to advance the theoretical arrival time of.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param no_add: If True, the theoretical arrival time is not actually advanced, and this
+                       instead serves as a 'check'.
+        :param amount: The number of hits to count.
+        :return: Whether the hits were allowed, and the theoretical arrival time afterwards.
+        """
+
+        return self._acquire_tat(key, limit, expiry, self._client, no_add=no_add, amount=amount)
+
+    def acquire_tat_bulk(
+        self, keys: Sequence[str], limit: int, expiry: int, amount: int = 1
+    ) -> List[bool]:
+        """
+        Advances the theoretical arrival time of each of the given keys by ``amount`` emission
+        intervals independently, in a single pipelined round trip.
+
+        :param keys: The rate limit keys to advance the theoretical arrival times of.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param amount: The number of hits to count against each key.
+        :return: Whether the hits were allowed, for each of the keys.
+        """
+
+        return self._acquire_tat_bulk(keys, limit, expiry, self._client, amount)
+
+    def get_tat(self, key: str) -> GCRAState:
+        """
+        Retrieves the theoretical arrival time of the given key.
+
+        :param key: The rate limit key to retrieve the theoretical arrival time of.
+        :return: (current time, theoretical arrival time) where the theoretical arrival time is
+                 never earlier than the current time.
+        """
+
+        return self._get_tat(key, self._client)
+
+    def acquire_tats(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[GCRAState]]:
+        """
+        Advances the theoretical arrival time of every one of the given keys by ``amount``
+        emission intervals, but only if none of them would then be more than their limit's
+        period past the current time. This is done atomically in a single round trip.
+
+        :param entries: The key, limit and period in seconds of each theoretical arrival time.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were allowed, and the theoretical arrival time of each key
+                 afterwards.
+        """
+
+        return self._acquire_tats(entries, self._client, amount)
+
+    def get_tats(self, keys: Sequence[str]) -> List[GCRAState]:
+        """
+        Retrieves the theoretical arrival time of each of the given keys.
+
+        :param keys: The rate limit keys to retrieve the theoretical arrival times of.
+        :return: (current time, theoretical arrival time) of each key.
+        """
+
+        return self._get_tats(keys, self._client)
+
+    def acquire_lease(self, key: str, limit: int, lease_id: str, timeout: float) -> bool:
+        """
+        Adds a lease with the given ID to the given key, unless the key already holds ``limit``
+        unexpired leases.
+
+        :param key: The rate limit key to acquire a lease in.
+        :param limit: The maximum number of unexpired leases the key may hold.
+        :param lease_id: A unique ID for the new lease.
+        :param timeout: Amount in seconds for the lease to expire in, if it isn't released.
+        :return: Whether the lease was acquired.
+        """
+
+        return self._acquire_lease(key, limit, lease_id, timeout, self._client)
+
+    def release_lease(self, key: str, lease_id: str) -> None:
+        """
+        Removes the lease with the given ID from the given key, if it still holds it.
+
+        :param key: The rate limit key to release the lease from.
+        :param lease_id: The ID of the lease to release.
+        """
+
+        self._release_lease(key, lease_id, self._client)
+
+    def get_lease_count(self, key: str) -> int:
+        """
+        Retrieves the number of unexpired leases held by the given key.
+
+        :param key: The rate limit key to count the leases of.
+        :return: The number of unexpired leases.
+        """
+
+        return self._get_lease_count(key, self._client)
+
+    def acquire_sliding_window_entry(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> Tuple[bool, SlidingWindow]:
+        """
+        Counts ``amount`` hits in the current window, unless the weighted count of hits would then
+        exceed the limit.
+
+        :param key: The rate limit key to count hits against.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param amount: The number of hits to count.
+        :return: Whether the hits were counted, and the counts of hits in the current and
+                 previous windows afterwards.
+        """
+
+        return self._acquire_sliding_window_entry(key, limit, expiry, self._client, amount)
+
+    def acquire_sliding_window_entry_bulk(
+        self, keys: Sequence[str], limit: int, expiry: int, amount: int = 1
+    ) -> List[bool]:
+        """
+        Counts ``amount`` hits in the current window of each of the given keys independently, in
+        a single pipelined round trip.
+
+        :param keys: The rate limit keys to count hits against.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param amount: The number of hits to count against each key.
+        :return: Whether the hits were counted, for each of the keys.
+        """
+
+        return self._acquire_sliding_window_entry_bulk(keys, limit, expiry, self._client, amount)
+
+    def get_sliding_window(self, key: str, expiry: int) -> SlidingWindow:
+        """
+        Retrieves the counts of hits in the current and previous windows.
+
+        :param key: The rate limit key to retrieve statistics about.
+        :param expiry: The period that the limit applies to, in seconds.
+        :return: (current time, hits in the previous window, hits in the current window)
+        """
+
+        return self._get_sliding_window(key, expiry, self._client)
+
+    def acquire_sliding_window_entries(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[SlidingWindow]]:
+        """
+        Counts ``amount`` hits in the current window of every one of the given keys, but only if
+        none of their weighted counts of hits would then exceed their limit. This is done
+        atomically in a single round trip.
+
+        :param entries: The key, limit and period in seconds of each sliding window.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were counted, and the counts of hits in the current and
+                 previous windows of each key afterwards.
+        """
+
+        return self._acquire_sliding_window_entries(entries, self._client, amount)
+
+    def get_sliding_windows(self, entries: Sequence[Tuple[str, int]]) -> List[SlidingWindow]:
+        """
+        Retrieves the counts of hits in the current and previous windows of each of the given
+        keys.
+
+        :param entries: The key and period in seconds of each sliding window.
+        :return: (current time, hits in the previous window, hits in the current window) of
+                 each key.
+        """
+
+        return self._get_sliding_windows(entries, self._client)
+
     def check(self) -> bool:
         """
         Check if the connection to the storage backend is healthy.
@@ -1,11 +1,43 @@
-from typing import Any
+import binascii
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union, cast
 from urllib.parse import urlparse
 
+import redis
 from rediscluster import RedisCluster
 
+from freiner.clock import Clock
+from freiner.keys import HashedKeyEncoder, Key, hash_tag
+
+from . import FixedWindow, GCRAState, MovingWindow, SlidingWindow
 from .redis import RedisStorage
 
 
+#: The number of hash slots that Redis Cluster divides keys between.
+HASH_SLOTS = 16384
+
+
+def key_slot(key: Union[str, bytes]) -> int:
+    """
+    Works out which Redis Cluster hash slot a key belongs to. If the key contains a hash tag,
+    which is a non-empty section wrapped in ``{`` and ``}``, only the hash tag is hashed.
+
+    :param key: The key to find the hash slot of.
+    :return: The key's hash slot.
+    """
+
+    data = key.encode("utf-8") if isinstance(key, str) else key
+    tag = hash_tag(data)
+    return binascii.crc_hqx(data if tag is None else tag, 0) % HASH_SLOTS
+
+
+def _slot_groups(keys: Sequence[Key]) -> List[List[int]]:
+    # Groups the indexes of the keys by hash slot, in order of hash slot.
+    groups: Dict[int, List[int]] = {}
+    for index, key in enumerate(keys):
+        groups.setdefault(key_slot(key), []).append(index)
+    return [groups[slot] for slot in sorted(groups)]
+
+
 class RedisClusterStorage(RedisStorage):
     """
     Rate limit storage with redis cluster as backend.
@@ -33,6 +65,372 @@ class RedisClusterStorage(RedisStorage):
         client = RedisCluster(**options)
         return cls(client)
 
+    SCRIPT_DECR_EXISTING = """
+        if redis.call('exists', KEYS[1]) == 1 then
+            redis.call('decrby', KEYS[1], ARGV[1])
+        end
+        """
+
+    SCRIPT_HDECR_EXISTING = """
+        if redis.call('hexists', KEYS[1], ARGV[1]) == 1 then
+            redis.call('hincrby', KEYS[1], ARGV[1], -tonumber(ARGV[2]))
+        end
+        """
+
+    def initialize_storage(
+        self,
+        connection: redis.Redis,
+        clock: Optional[Clock] = None,
+        key_encoder: Optional[HashedKeyEncoder] = None,
+    ):
+        super().initialize_storage(connection, clock, key_encoder)
+
+        # The SHA1 digests of the scripts that have been loaded on every primary.
+        self._loaded_scripts: Set[str] = set()
+
+        decr_existing_script = connection.register_script(self.SCRIPT_DECR_EXISTING)
+        self.lua_decr_existing = cast(
+            Callable[[Tuple[Key], Tuple[int]], None],
+            decr_existing_script,
+        )
+
+        hdecr_existing_script = connection.register_script(self.SCRIPT_HDECR_EXISTING)
+        self.lua_hdecr_existing = cast(
+            Callable[[Tuple[Key], Tuple[int, int]], None],
+            hdecr_existing_script,
+        )
+
+    def _evalsha_bulk(self, script: Any, keys: Sequence[str], args: Tuple[Any, ...]) -> List[Any]:
+        # Runs the script against each of the keys independently. The cluster pipeline can't
+        # load scripts on demand, so the script is loaded on every primary the first time it's
+        # used, and again for any keys whose node has since lost it, such as after a failover.
+        pending = list(range(len(keys)))
+        results: List[Any] = [None] * len(keys)
+        while True:
+            if script.sha not in self._loaded_scripts:
+                self._client.script_load(script.script)
+                self._loaded_scripts.add(script.sha)
+
+            pipeline = self._client.pipeline()
+            for index in pending:
+                pipeline.evalsha(script.sha, 1, self._key(keys[index]), *args)
+            missing = []
+            for index, result in zip(pending, pipeline.execute(raise_on_error=False)):
+                if isinstance(result, redis.exceptions.NoScriptError):
+                    missing.append(index)
+                elif isinstance(result, Exception):
+                    raise result
+                else:
+                    results[index] = result
+
+            if not missing:
+                return results
+            self._loaded_scripts.discard(script.sha)
+            pending = missing
+
+    # A single Lua script can only access keys which belong to the same hash slot. The batch
+    # operations are atomic when all of their keys do, which can be ensured by giving the keys
+    # the same hash tag. Otherwise, one script is run per hash slot, in order of hash slot, and
+    # the hits made by earlier scripts are undone if a later one rejects the hit.
+
+    def incr_many(
+        self,
+        entries: Sequence[Tuple[str, int, int]],
+        elastic_expiry: bool = False,
+        amount: int = 1,
+    ) -> Tuple[bool, List[FixedWindow]]:
+        """
+        Increments the counters for all of the given rate limit keys, but only if none of them
+        would then exceed their limit.
+
+        .. warning::
+         Unless all of the keys belong to the same hash slot, this is neither atomic nor
+         performed in a single round trip. The counters of each hash slot are checked and
+         incremented atomically in turn, and if any of them would exceed their limit, the
+         increments already made are undone. Concurrent hits may then be rejected while those
+         increments are briefly counted, but a hit is never allowed past any of the limits.
+
+        :param entries: The key, limit and expiry in seconds of each counter.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: Whether the counters were incremented, and the count and expiry time of each
+                 counter afterwards.
+        """
+
+        keys = [key for key, _, _ in entries]
+        groups = _slot_groups([self._key(key) for key in keys])
+        if len(groups) <= 1:
+            return super().incr_many(entries, elastic_expiry, amount)
+
+        windows: Dict[int, FixedWindow] = {}
+        for position, group in enumerate(groups):
+            allowed, group_windows = super().incr_many(
+                [entries[index] for index in group], elastic_expiry, amount
+            )
+            if not allowed:
+                for index in (index for done in groups[:position] for index in done):
+                    self.lua_decr_existing((self._key(keys[index]),), (amount,))
+                return False, self.get_many(keys)
+            windows.update(zip(group, group_windows))
+
+        return True, [windows[index] for index in range(len(entries))]
+
+    def incr_bulk(
+        self, keys: Sequence[str], expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> List[int]:
+        """
+        Increments the counters for each of the given rate limit keys independently. The cluster
+        pipeline sends each node the scripts for the hash slots it serves, so this takes a single
+        round trip per node. Each key is still incremented atomically.
+
+        :param keys: The keys to increment.
+        :param expiry: Amount in seconds for the keys to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: The number of hits currently on the rate limit for each of the keys.
+        """
+
+        results = self._evalsha_bulk(
+            self.incr_with_expiry_script, keys, (expiry, amount, int(elastic_expiry))
+        )
+        return [int(counter) for counter, _ in results]
+
+    def get_many(self, keys: Sequence[str]) -> List[FixedWindow]:
+        """
+        Retrieves the count and expiry time of each of the given rate limit keys.
+
+        :param keys: The keys to get the counters for.
+        :return: The count and expiry time of each counter.
+        """
+
+        return [FixedWindow(self.get(key), self.get_expiry(key)) for key in keys]
+
+    def acquire_entries(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[MovingWindow]]:
+        """
+        Acquires ``amount`` entries in every one of the given moving windows, but only if they
+        can be acquired in all of them.
+
+        .. warning::
+         Unless all of the keys belong to the same hash slot, this is neither atomic nor
+         performed in a single round trip. The moving windows of each hash slot are checked and
+         acquired atomically in turn, and if any of them would exceed their limit, the entries
+         already acquired are removed again. Concurrent hits may then be rejected while those
+         entries are briefly counted, but a hit is never allowed past any of the limits.
+
+        :param entries: The key, limit and expiry in seconds of each moving window.
+        :param amount: The number of entries to acquire in each moving window.
+        :return: Whether the entries were acquired, and the start and number of acquired entries
+                 of each moving window afterwards.
+        """
+
+        groups = _slot_groups([self._key(key) for key, _, _ in entries])
+        if len(groups) <= 1:
+            return super().acquire_entries(entries, amount)
+
+        windows: Dict[int, MovingWindow] = {}
+        for position, group in enumerate(groups):
+            allowed, group_windows = super().acquire_entries(
+                [entries[index] for index in group], amount
+            )
+            if not allowed:
+                # The start of each moving window that was acquired in is the newest entry,
+                # which is one of the entries that were just acquired.
+                for index in (index for done in groups[:position] for index in done):
+                    self._client.lrem(
+                        self._key(entries[index][0]), amount, repr(windows[index].start_time)
+                    )
+                return False, self.get_moving_windows(entries)
+            windows.update(zip(group, group_windows))
+
+        return True, [windows[index] for index in range(len(entries))]
+
+    def get_moving_windows(self, entries: Sequence[Tuple[str, int, int]]) -> List[MovingWindow]:
+        """
+        Retrieves the starting point and the number of entries in each of the moving windows.
+
+        :param entries: The key, limit and expiry in seconds of each moving window.
+        :return: The start and number of acquired entries of each moving window.
+        """
+
+        return [self.get_moving_window(key, limit, expiry) for key, limit, expiry in entries]
+
+    def acquire_entry_bulk(
+        self, keys: Sequence[str], limit: int, expiry: int, amount: int = 1
+    ) -> List[bool]:
+        """
+        Acquires ``amount`` entries in the moving window of each of the given keys
+        independently. The cluster pipeline sends each node the scripts for the hash slots it
+        serves, so this takes a single round trip per node. Each key is still updated
+        atomically.
+
+        :param keys: The rate limit keys to acquire entries in.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire in each window.
+        :return: Whether the entries were acquired, for each of the keys.
+        """
+
+        timestamp = self._clock.now()
+        results = self._evalsha_bulk(
+            self.acquire_window_script, keys, (timestamp, limit, expiry, 0, amount)
+        )
+        return [bool(acquired) for acquired in results]
+
+    def acquire_tats(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[GCRAState]]:
+        """
+        Advances the theoretical arrival time of every one of the given keys by ``amount``
+        emission intervals, but only if none of them would then be more than their limit's
+        period past the current time.
+
+        .. warning::
+         Unless all of the keys belong to the same hash slot, this is neither atomic nor
+         performed in a single round trip. The theoretical arrival times of each hash slot are
+         checked and advanced atomically in turn, and if any of them would go too far, the
+         advances already made are undone. Concurrent hits may then be rejected while those
+         advances are briefly counted, but a hit is never allowed past any of the limits.
+
+        :param entries: The key, limit and period in seconds of each theoretical arrival time.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were allowed, and the theoretical arrival time of each key
+                 afterwards.
+        """
+
+        groups = _slot_groups([self._key(key) for key, _, _ in entries])
+        if len(groups) <= 1 or any(limit < 1 for _, limit, _ in entries):
+            return super().acquire_tats(entries, amount)
+
+        states: Dict[int, GCRAState] = {}
+        for position, group in enumerate(groups):
+            allowed, group_states = super().acquire_tats(
+                [entries[index] for index in group], amount
+            )
+            if not allowed:
+                for index in (index for done in groups[:position] for index in done):
+                    key, limit, expiry = entries[index]
+                    increment = expiry * 1_000_000 // limit * amount
+                    self.lua_decr_existing((self._key(key),), (increment,))
+                return False, self.get_tats([key for key, _, _ in entries])
+            states.update(zip(group, group_states))
+
+        return True, [states[index] for index in range(len(entries))]
+
+    def get_tats(self, keys: Sequence[str]) -> List[GCRAState]:
+        """
+        Retrieves the theoretical arrival time of each of the given keys.
+
+        :param keys: The rate limit keys to retrieve the theoretical arrival times of.
+        :return: (current time, theoretical arrival time) of each key.
+        """
+
+        return [self.get_tat(key) for key in keys]
+
+    def acquire_tat_bulk(
+        self, keys: Sequence[str], limit: int, expiry: int, amount: int = 1
+    ) -> List[bool]:
+        """
+        Advances the theoretical arrival time of each of the given keys by ``amount`` emission
+        intervals independently. The cluster pipeline sends each node the scripts for the hash
+        slots it serves, so this takes a single round trip per node. Each key is still updated
+        atomically.
+
+        :param keys: The rate limit keys to advance the theoretical arrival times of.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param amount: The number of hits to count against each key.
+        :return: Whether the hits were allowed, for each of the keys.
+        """
+
+        if limit < 1:
+            return [False for _ in keys]
+
+        now = int(self._clock.now() * 1_000_000)
+        increment = expiry * 1_000_000 // limit * amount
+        results = self._evalsha_bulk(
+            self.acquire_tat_script, keys, (now, increment, expiry * 1_000_000, 0)
+        )
+        return [bool(acquired) for acquired, _ in results]
+
+    def acquire_sliding_window_entries(
+        self, entries: Sequence[Tuple[str, int, int]], amount: int = 1
+    ) -> Tuple[bool, List[SlidingWindow]]:
+        """
+        Counts ``amount`` hits in the current window of every one of the given keys, but only if
+        none of their weighted counts of hits would then exceed their limit.
+
+        .. warning::
+         Unless all of the keys belong to the same hash slot, this is neither atomic nor
+         performed in a single round trip. The sliding windows of each hash slot are checked and
+         counted atomically in turn, and if any of them would exceed their limit, the hits
+         already counted are undone. Concurrent hits may then be rejected while those hits are
+         briefly counted, but a hit is never allowed past any of the limits.
+
+        :param entries: The key, limit and period in seconds of each sliding window.
+        :param amount: The number of hits to count against each limit.
+        :return: Whether the hits were counted, and the counts of hits in the current and
+                 previous windows of each key afterwards.
+        """
+
+        groups = _slot_groups([self._key(key) for key, _, _ in entries])
+        if len(groups) <= 1:
+            return super().acquire_sliding_window_entries(entries, amount)
+
+        windows: Dict[int, SlidingWindow] = {}
+        for position, group in enumerate(groups):
+            allowed, group_windows = super().acquire_sliding_window_entries(
+                [entries[index] for index in group], amount
+            )
+            if not allowed:
+                # Each hit was counted in the window that was current when it was made.
+                for index in (index for done in groups[:position] for index in done):
+                    key, _, expiry = entries[index]
+                    window_index = int(windows[index].now // expiry)
+                    self.lua_hdecr_existing((self._key(key),), (window_index, amount))
+                return False, self.get_sliding_windows(
+                    [(key, expiry) for key, _, expiry in entries]
+                )
+            windows.update(zip(group, group_windows))
+
+        return True, [windows[index] for index in range(len(entries))]
+
+    def get_sliding_windows(self, entries: Sequence[Tuple[str, int]]) -> List[SlidingWindow]:
+        """
+        Retrieves the counts of hits in the current and previous windows of each of the given
+        keys.
+
+        :param entries: The key and period in seconds of each sliding window.
+        :return: (current time, hits in the previous window, hits in the current window) of
+                 each key.
+        """
+
+        return [self.get_sliding_window(key, expiry) for key, expiry in entries]
+
+    def acquire_sliding_window_entry_bulk(
+        self, keys: Sequence[str], limit: int, expiry: int, amount: int = 1
+    ) -> List[bool]:
+        """
+        Counts ``amount`` hits in the current window of each of the given keys independently.
+        The cluster pipeline sends each node the scripts for the hash slots it serves, so this
+        takes a single round trip per node. Each key is still updated atomically.
+
+        :param keys: The rate limit keys to count hits against.
+        :param limit: The total amount of hits allowed within the period.
+        :param expiry: The period that the limit applies to, in seconds.
+        :param amount: The number of hits to count against each key.
+        :return: Whether the hits were counted, for each of the keys.
+        """
+
+        index, elapsed = divmod(self._clock.now(), expiry)
+        results = self._evalsha_bulk(
+            self.acquire_sliding_window_script,
+            keys,
+            (int(index), 1 - elapsed / expiry, limit, expiry, amount),
+        )
+        return [bool(acquired) for acquired, _, _ in results]
+
     def reset(self) -> None:
         """
         Redis Clusters are sharded and deleting across shards
@@ -48,9 +446,11 @@ class RedisClusterStorage(RedisStorage):
 
         keys = self._client.keys("LIMITER*")
         for key in keys:
-            self._client.delete(key.decode("utf-8"))
+            self._client.delete(key)
 
 
 __all__ = [
+    "HASH_SLOTS",
     "RedisClusterStorage",
+    "key_slot",
 ]
@@ -1,11 +1,14 @@
-from typing import Any, Optional
+from typing import Any, List, Optional, Sequence, Tuple
 from urllib.parse import urlparse
 
 from redis import Redis
 from redis.sentinel import Sentinel
 
+from freiner.clock import Clock
 from freiner.errors import FreinerConfigurationError
+from freiner.keys import HashedKeyEncoder
 
+from . import FixedWindow, GCRAState, SlidingWindow
 from .redis import RedisStorage
 
 
@@ -16,14 +19,20 @@ class RedisSentinelStorage(RedisStorage):
     Depends on `redis` library.
     """
 
-    def __init__(self, sentinel: Sentinel, service_name: str) -> None:
+    def __init__(
+        self,
+        sentinel: Sentinel,
+        service_name: str,
+        clock: Optional[Clock] = None,
+        key_encoder: Optional[HashedKeyEncoder] = None,
+    ) -> None:
         self._sentinel: Sentinel = sentinel
         self._service_name: str = service_name
 
         self._sentinel_master: Redis = self._sentinel.master_for(self._service_name)
         self._sentinel_slave: Redis = self._sentinel.slave_for(self._service_name)
 
-        super().__init__(self._sentinel_master)
+        super().__init__(self._sentinel_master, clock, key_encoder)
 
     @classmethod
     def from_uri(
@@ -76,6 +85,87 @@ class RedisSentinelStorage(RedisStorage):
 
         return self._get_expiry(key, self._sentinel_slave)
 
+    def get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then.
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        """
+
+        return self._get_moving_window_retry_time(key, limit, expiry, self._sentinel_slave, amount)
+
+    def get_tat(self, key: str) -> GCRAState:
+        """
+        Retrieves the theoretical arrival time of the given key.
+
+        :param key: The rate limit key to retrieve the theoretical arrival time of.
+        :return: (current time, theoretical arrival time) where the theoretical arrival time is
+                 never earlier than the current time.
+        """
+
+        return self._get_tat(key, self._sentinel_slave)
+
+    def get_tats(self, keys: Sequence[str]) -> List[GCRAState]:
+        """
+        Retrieves the theoretical arrival time of each of the given keys.
+
+        :param keys: The rate limit keys to retrieve the theoretical arrival times of.
+        :return: (current time, theoretical arrival time) of each key.
+        """
+
+        return self._get_tats(keys, self._sentinel_slave)
+
+    def get_many(self, keys: Sequence[str]) -> List[FixedWindow]:
+        """
+        Retrieves the count and expiry time of each of the given rate limit keys.
+
+        :param keys: The keys to get the counters for.
+        :return: The count and expiry time of each counter.
+        """
+
+        return self._get_many(keys, self._sentinel_slave)
+
+    def get_sliding_window(self, key: str, expiry: int) -> SlidingWindow:
+        """
+        Retrieves the counts of hits in the current and previous windows.
+
+        :param key: The rate limit key to retrieve statistics about.
+        :param expiry: The period that the limit applies to, in seconds.
+        :return: (current time, hits in the previous window, hits in the current window)
+        """
+
+        return self._get_sliding_window(key, expiry, self._sentinel_slave)
+
+    def get_sliding_windows(self, entries: Sequence[Tuple[str, int]]) -> List[SlidingWindow]:
+        """
+        Retrieves the counts of hits in the current and previous windows of each of the given
+        keys.
+
+        :param entries: The key and period in seconds of each sliding window.
+        :return: (current time, hits in the previous window, hits in the current window) of
+                 each key.
+        """
+
+        return self._get_sliding_windows(entries, self._sentinel_slave)
+
+    def get_lease_count(self, key: str) -> int:
+        """
+        Retrieves the number of unexpired leases held by the given key.
+
+        :param key: The rate limit key to count the leases of.
+        :return: The number of unexpired leases.
+        """
+
+        return self._get_lease_count(key, self._sentinel_slave)
+
     def check(self) -> bool:
         """
         Check if the connection to the storage backend is healthy.
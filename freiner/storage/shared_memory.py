@@ -0,0 +1,462 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import weakref
+from array import array
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple, cast
+
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.errors import FreinerConfigurationError
+
+from . import FixedWindow, MovingWindow
+
+
+_MAGIC = b"FREINER\x00"
+_VERSION = 1
+_HEADER = struct.Struct("<8sIIII")
+_HEADER_SIZE = 64
+
+_EMPTY_DIGEST = bytes(16)
+
+# Every slot is a sequence of 8-byte words, so that the whole table can be accessed through
+# aligned memoryviews of doubles and signed integers.
+_DIGEST = 0  # two words
+_COUNTER = 2
+_EXPIRATION = 3
+_WINDOW_EXPIRY = 4
+_EVENTS_START = 5
+_EVENTS_SIZE = 6
+_EVENTS = 7
+_SLOT_HEADER_WORDS = 7
+
+_instances: "weakref.WeakSet[SharedMemoryStorage]" = weakref.WeakSet()
+
+
+def _reinit_locks_after_fork() -> None:  # pragma: no cover
+    # Thread locks may have been held by other threads at the time of the fork.
+    for instance in list(_instances):
+        instance._locks = [threading.Lock() for _ in instance._locks]
+
+
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    os.register_at_fork(after_in_child=_reinit_locks_after_fork)
+
+
+class SharedMemoryStorage:
+    """
+    Rate limit storage kept in a memory-mapped file, so that every process on a host that opens
+    the same file shares the same limits. This is intended for pre-fork servers such as gunicorn
+    and uwsgi, where each worker would otherwise have its own in-memory limits.
+
+    The file holds a fixed-size open-addressing hash table. Each slot stores a counter and
+    expiry time for fixed window strategies, plus a ring buffer of up to ``window_capacity``
+    timestamps for the moving window strategy. Slots are grouped into stripes, and each stripe
+    is guarded by a thread lock and an ``fcntl`` byte-range lock on the file, making every
+    operation on a single key atomic across threads and processes.
+
+    Slots belonging to expired keys are reused. If every slot a key may occupy holds a live key,
+    the slot with the earliest deadline is evicted to make room.
+
+    The file is created and initialised by the first process to open it. Subsequent processes
+    use the geometry recorded in the file, and must request the same geometry. For best
+    performance, place the file on a memory-backed filesystem such as ``/dev/shm``.
+
+    Only available on POSIX platforms. Because ``fcntl`` locks are held per process, each
+    process should only open a given file once.
+
+    :param path: The location of the file backing the shared table.
+    :param slots: The total number of keys the table can hold.
+    :param window_capacity: The largest limit the moving window strategy can be used with.
+    :param stripes: The number of independently locked groups of slots.
+    :param clock: The clock to read the current time from. Defaults to the system clock. As
+                  every process sharing the file must agree on the time, this should not be a
+                  :class:`freiner.clock.MonotonicClock`.
+    :raises FreinerConfigurationError: If the geometry is invalid, or does not match that of an
+                                       existing file.
+    """
+
+    #: The maximum number of slots to examine when looking up a key.
+    MAX_PROBES = 16
+
+    def __init__(
+        self,
+        path: str,
+        slots: int = 16384,
+        window_capacity: int = 64,
+        stripes: int = 64,
+        clock: Optional[Clock] = None,
+    ) -> None:
+        if stripes < 1 or slots < stripes or window_capacity < 0:
+            msg = f"Invalid shared memory geometry: {slots} slots, {stripes} stripes, window capacity {window_capacity}"
+            raise FreinerConfigurationError(msg)
+
+        self._path = path
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            geometry = self._initialise(slots // stripes, window_capacity, stripes)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+        self._slots_per_stripe, self._window_capacity, self._stripes = geometry
+        self._slot_words = _SLOT_HEADER_WORDS + self._window_capacity
+        self._probes = min(self.MAX_PROBES, self._slots_per_stripe)
+
+        size = os.fstat(self._fd).st_size
+        self._mmap = mmap.mmap(self._fd, size)
+        view = memoryview(self._mmap)[_HEADER_SIZE:]
+        self._bytes = view
+        self._floats = view.cast("d")
+        self._ints = view.cast("q")
+
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(self._stripes)]
+        _instances.add(self)
+
+    def _initialise(
+        self, slots_per_stripe: int, window_capacity: int, stripes: int
+    ) -> Tuple[int, int, int]:
+        # Byte 0 of the file is locked while creating or inspecting the header, and byte N + 1
+        # is locked while operating on stripe N.
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+        try:
+            header = os.pread(self._fd, _HEADER.size, 0)
+            if len(header) < _HEADER.size:
+                slot_size = 8 * (_SLOT_HEADER_WORDS + window_capacity)
+                os.ftruncate(self._fd, _HEADER_SIZE + slot_size * slots_per_stripe * stripes)
+                header = _HEADER.pack(_MAGIC, _VERSION, slots_per_stripe, window_capacity, stripes)
+                os.pwrite(self._fd, header, 0)
+                return slots_per_stripe, window_capacity, stripes
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+
+        magic, version, *geometry = _HEADER.unpack(header)
+        if magic != _MAGIC or version != _VERSION:
+            raise FreinerConfigurationError(f"Not a Freiner shared memory file: {self._path}")
+        if tuple(geometry) != (slots_per_stripe, window_capacity, stripes):
+            msg = f"Shared memory file {self._path} was created with a different geometry"
+            raise FreinerConfigurationError(msg)
+        return slots_per_stripe, window_capacity, stripes
+
+    def close(self) -> None:
+        """
+        Unmaps the shared table and closes the underlying file. The file itself is left in place
+        for other processes to continue using.
+        """
+
+        if self._mmap.closed:
+            return
+
+        _instances.discard(self)
+        self._ints.release()
+        self._floats.release()
+        self._bytes.release()
+        self._mmap.close()
+        os.close(self._fd)
+
+    @contextmanager
+    def _locked(self, stripe: int) -> Iterator[None]:
+        with self._locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, stripe + 1)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, stripe + 1)
+
+    def _locate(self, key: str) -> Tuple[bytes, int, int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        home = int.from_bytes(digest[:8], "little")
+        return digest, home % self._stripes, home // self._stripes
+
+    def _deadline(self, base: int) -> float:
+        floats = self._floats
+        deadline = floats[base + _EXPIRATION]
+        size = self._ints[base + _EVENTS_SIZE]
+        if size:
+            newest = (self._ints[base + _EVENTS_START] + size - 1) % self._window_capacity
+            events_deadline = floats[base + _EVENTS + newest] + floats[base + _WINDOW_EXPIRY]
+            deadline = max(deadline, events_deadline)
+        return deadline
+
+    def _find(
+        self, digest: bytes, stripe: int, home: int, timestamp: float, create: bool
+    ) -> Optional[int]:
+        # Must be called while holding the stripe's lock. Returns the word offset of the slot.
+        data = self._bytes
+        free: Optional[int] = None
+        victim = -1
+        victim_deadline = 0.0
+        first_slot = stripe * self._slots_per_stripe
+        for probe in range(self._probes):
+            slot = first_slot + (home + probe) % self._slots_per_stripe
+            base = slot * self._slot_words
+            slot_digest = data[base * 8 : base * 8 + 16]
+            if slot_digest == digest:
+                return base
+            if slot_digest == _EMPTY_DIGEST:
+                if free is None:
+                    free = base
+                # Slots are never emptied once used, so the key can't be any further along.
+                break
+            if free is None:
+                deadline = self._deadline(base)
+                if deadline <= timestamp:
+                    free = base
+                elif victim < 0 or deadline < victim_deadline:
+                    victim, victim_deadline = base, deadline
+
+        if not create:
+            return None
+
+        base = free if free is not None else victim
+        data[base * 8 : base * 8 + 16] = digest
+        self._reset_slot(base)
+        return base
+
+    def _reset_slot(self, base: int) -> None:
+        ints = self._ints
+        ints[base + _COUNTER] = 0
+        self._floats[base + _EXPIRATION] = 0.0
+        self._floats[base + _WINDOW_EXPIRY] = 0.0
+        ints[base + _EVENTS_START] = 0
+        ints[base + _EVENTS_SIZE] = 0
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        """
+        Increments the counter for the given rate limit key.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The number of hits currently on the rate limit for the given key.
+        """
+
+        return self.incr_with_expiry(key, expiry, elastic_expiry, amount).counter
+
+    def incr_with_expiry(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> FixedWindow:
+        """
+        Increments the counter for the given rate limit key, and retrieves its expiry time in the
+        same operation.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The count and expiry time of the counter afterwards.
+        """
+
+        digest, stripe, home = self._locate(key)
+        with self._locked(stripe):
+            timestamp = self._clock.now()
+            base = cast(int, self._find(digest, stripe, home, timestamp, create=True))
+
+            ints = self._ints
+            floats = self._floats
+            if floats[base + _EXPIRATION] <= timestamp:
+                ints[base + _COUNTER] = 0
+            previous = ints[base + _COUNTER]
+            value = previous + amount
+            ints[base + _COUNTER] = value
+            if elastic_expiry or not previous:
+                floats[base + _EXPIRATION] = timestamp + expiry
+            return FixedWindow(value, floats[base + _EXPIRATION])
+
+    def get(self, key: str) -> int:
+        """
+        Retrieve the current request count for the given rate limit key.
+
+        :param key: The key to get the counter value for.
+        """
+
+        digest, stripe, home = self._locate(key)
+        with self._locked(stripe):
+            timestamp = self._clock.now()
+            base = self._find(digest, stripe, home, timestamp, create=False)
+            if base is None or self._floats[base + _EXPIRATION] <= timestamp:
+                return 0
+            return self._ints[base + _COUNTER]
+
+    def get_expiry(self, key: str) -> float:
+        """
+        Retrieve the expected expiry time for the given rate limit key.
+
+        :param key: The key to get the expiry time for.
+        :return: The time at which the current rate limit for the given key ends.
+        """
+
+        digest, stripe, home = self._locate(key)
+        with self._locked(stripe):
+            timestamp = self._clock.now()
+            base = self._find(digest, stripe, home, timestamp, create=False)
+            if base is None or self._floats[base + _EXPIRATION] <= timestamp:
+                return -1
+            return self._floats[base + _EXPIRATION]
+
+    def clear(self, key: str) -> None:
+        """
+        Resets the rate limit for the given key.
+
+        :param key: The key to clear rate limits for.
+        """
+
+        digest, stripe, home = self._locate(key)
+        with self._locked(stripe):
+            base = self._find(digest, stripe, home, self._clock.now(), create=False)
+            if base is not None:
+                # The digest is left in place so that other keys' probe sequences stay intact.
+                self._reset_slot(base)
+
+    def acquire_entry(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> bool:
+        """
+        :param key: The rate limit key to acquire an entry in.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entry to expire in.
+        :param no_add: If False, an entry is not actually acquired but instead serves as a 'check'.
+        :param amount: The number of entries to acquire at once.
+        :raises ValueError: If the limit is larger than this storage's moving window capacity.
+        """
+
+        if limit > self._window_capacity:
+            msg = f"Limit of {limit} exceeds the shared memory window capacity of {self._window_capacity}"
+            raise ValueError(msg)
+        if limit < 1 or amount > limit:
+            return False
+
+        digest, stripe, home = self._locate(key)
+        with self._locked(stripe):
+            timestamp = self._clock.now()
+            base = self._find(digest, stripe, home, timestamp, create=not no_add)
+            if base is None:
+                return True
+
+            ints = self._ints
+            floats = self._floats
+            capacity = self._window_capacity
+            start = ints[base + _EVENTS_START]
+            size = ints[base + _EVENTS_SIZE]
+            # At most limit - amount entries may remain in the window.
+            if size > limit - amount:
+                entry = floats[base + _EVENTS + (start + size - 1 - limit + amount) % capacity]
+                if entry > timestamp - expiry:
+                    return False
+
+            if not no_add:
+                events = base + _EVENTS
+                end = (start + size) % capacity
+                head = min(amount, capacity - end)
+                floats[events + end : events + end + head] = array("d", (timestamp,)) * head
+                floats[events : events + amount - head] = array("d", (timestamp,)) * (amount - head)
+
+                overwritten = max(size + amount - capacity, 0)
+                ints[base + _EVENTS_START] = (start + overwritten) % capacity
+                ints[base + _EVENTS_SIZE] = min(size + amount, capacity)
+                floats[base + _WINDOW_EXPIRY] = expiry
+            return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> MovingWindow:
+        """
+        Retrieves the starting point and the number of entries in the moving window.
+
+        :param key: The rate limit key to retrieve statistics about.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entry to expire in.
+        :return: (start of window, number of acquired entries)
+        """
+
+        digest, stripe, home = self._locate(key)
+        with self._locked(stripe):
+            timestamp = self._clock.now()
+            base = self._find(digest, stripe, home, timestamp, create=False)
+            if base is None:
+                return MovingWindow(timestamp, 0)
+
+            floats = self._floats
+            capacity = self._window_capacity
+            start = self._ints[base + _EVENTS_START]
+            size = self._ints[base + _EVENTS_SIZE]
+            threshold = timestamp - expiry
+            low, high = 0, size
+            while low < high:
+                mid = (low + high) // 2
+                if floats[base + _EVENTS + (start + mid) % capacity] > threshold:
+                    high = mid
+                else:
+                    low = mid + 1
+
+            acquired = size - low
+            if not acquired:
+                return MovingWindow(timestamp, 0)
+            newest = floats[base + _EVENTS + (start + size - 1) % capacity]
+            return MovingWindow(newest, acquired)
+
+    def get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then.
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        :raises ValueError: If the limit is larger than this storage's moving window capacity.
+        """
+
+        if limit > self._window_capacity:
+            msg = f"Limit of {limit} exceeds the shared memory window capacity of {self._window_capacity}"
+            raise ValueError(msg)
+        if limit < 1 or amount > limit:
+            return math.inf
+
+        digest, stripe, home = self._locate(key)
+        with self._locked(stripe):
+            timestamp = self._clock.now()
+            base = self._find(digest, stripe, home, timestamp, create=False)
+            if base is None:
+                return timestamp
+
+            start = self._ints[base + _EVENTS_START]
+            size = self._ints[base + _EVENTS_SIZE]
+            # At most limit - amount entries may remain in the window.
+            if size > limit - amount:
+                index = (start + size - 1 - limit + amount) % self._window_capacity
+                entry = self._floats[base + _EVENTS + index]
+                if entry > timestamp - expiry:
+                    return entry + expiry
+            return timestamp
+
+    def check(self) -> bool:
+        """
+        Check if the connection to the storage backend is healthy.
+        """
+
+        return not self._mmap.closed
+
+    def reset(self) -> None:
+        """
+        Removes every key from the shared table, for all processes using it.
+        """
+
+        for stripe in range(self._stripes):
+            with self._locked(stripe):
+                first = stripe * self._slots_per_stripe * self._slot_words * 8
+                last = first + self._slots_per_stripe * self._slot_words * 8
+                self._bytes[first:last] = bytes(last - first)
+
+
+__all__ = [
+    "SharedMemoryStorage",
+]
@@ -0,0 +1,386 @@
+import math
+import os
+import sqlite3
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.errors import FreinerConfigurationError
+
+from . import FixedWindow, MovingWindow
+
+
+class SQLiteStorage:
+    """
+    Rate limit storage using an SQLite database file, so that limits survive restarts and are
+    shared between all processes on a host that use the same file. This is particularly useful
+    for long windows (days, months or years) where losing state on restart matters, but running
+    a separate server is undesirable.
+
+    The database is opened in WAL mode, so readers never block writers. Each thread gets its own
+    connection, and every operation on a key runs in a single ``BEGIN IMMEDIATE`` transaction,
+    which makes it atomic across threads and processes. Counters are incremented with a single
+    UPSERT statement.
+
+    Expired rows are deleted lazily in small batches, at most once every ``cleanup_interval``
+    seconds per process, so that no single request pays for a large cleanup.
+
+    Depends only on the :py:mod:`sqlite3` module from the standard library.
+
+    :param path: The location of the database file.
+    :param timeout: How long to wait for another connection's lock before giving up, in seconds.
+    :param synchronous: The value of SQLite's ``synchronous`` pragma. The default of ``NORMAL``
+                        avoids an fsync on every commit, at the risk of losing the most recent
+                        hits if the host (not just the process) crashes.
+    :param cleanup_interval: The minimum time between expired row cleanups, in seconds.
+    :param cleanup_batch_size: The maximum number of expired rows to delete per table per cleanup.
+    :param clock: The clock to read the current time from. Defaults to the system clock. As
+                  expiry times are stored in the database, this should not be a
+                  :class:`freiner.clock.MonotonicClock`.
+    :raises FreinerConfigurationError: If an unknown ``synchronous`` mode is requested.
+    """
+
+    SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS freiner_counters (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS freiner_counters_expires_at ON freiner_counters (expires_at);
+        CREATE TABLE IF NOT EXISTS freiner_events (
+            key TEXT NOT NULL,
+            acquired_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS freiner_events_key ON freiner_events (key, acquired_at);
+        CREATE INDEX IF NOT EXISTS freiner_events_expires_at ON freiner_events (expires_at);
+        """
+
+    SQL_INCR = """
+        INSERT INTO freiner_counters (key, value, expires_at) VALUES (:key, :amount, :expires_at)
+        ON CONFLICT (key) DO UPDATE SET
+            value = CASE WHEN expires_at <= :now THEN :amount ELSE value + :amount END,
+            expires_at = CASE
+                WHEN expires_at <= :now OR :elastic_expiry THEN excluded.expires_at
+                ELSE expires_at
+            END
+        """
+    SQL_GET = "SELECT value, expires_at FROM freiner_counters WHERE key = ? AND expires_at > ?"
+    SQL_GET_EXPIRY = "SELECT expires_at FROM freiner_counters WHERE key = ? AND expires_at > ?"
+    SQL_CLEAR_COUNTER = "DELETE FROM freiner_counters WHERE key = ?"
+
+    SQL_ENTRY_AT_LIMIT = """
+        SELECT acquired_at FROM freiner_events WHERE key = ?
+        ORDER BY acquired_at DESC LIMIT 1 OFFSET ?
+        """
+    SQL_ADD_ENTRY = "INSERT INTO freiner_events (key, acquired_at, expires_at) VALUES (?, ?, ?)"
+    SQL_TRIM_ENTRIES = "DELETE FROM freiner_events WHERE key = ? AND acquired_at <= ?"
+    SQL_MOVING_WINDOW = """
+        SELECT COUNT(*), MAX(acquired_at) FROM freiner_events WHERE key = ? AND acquired_at > ?
+        """
+    SQL_CLEAR_EVENTS = "DELETE FROM freiner_events WHERE key = ?"
+
+    SQL_CLEANUP_COUNTERS = """
+        DELETE FROM freiner_counters WHERE key IN (
+            SELECT key FROM freiner_counters WHERE expires_at <= ? LIMIT ?
+        )
+        """
+    SQL_CLEANUP_EVENTS = """
+        DELETE FROM freiner_events WHERE rowid IN (
+            SELECT rowid FROM freiner_events WHERE expires_at <= ? LIMIT ?
+        )
+        """
+
+    def __init__(
+        self,
+        path: str,
+        timeout: float = 5.0,
+        synchronous: str = "NORMAL",
+        cleanup_interval: float = 60.0,
+        cleanup_batch_size: int = 1000,
+        clock: Optional[Clock] = None,
+    ) -> None:
+        synchronous = synchronous.upper()
+        if synchronous not in self.SYNCHRONOUS_MODES:
+            raise FreinerConfigurationError(f"Unknown SQLite synchronous mode: {synchronous}")
+
+        self._path = path
+        self._timeout = timeout
+        self._synchronous = synchronous
+        self._cleanup_interval = cleanup_interval
+        self._cleanup_batch_size = cleanup_batch_size
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._next_cleanup = 0.0
+
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must not be shared with forked children, so they're tied to a process ID.
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) == pid:
+            return self._local.connection
+
+        connection = sqlite3.connect(
+            self._path, timeout=self._timeout, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute(f"PRAGMA synchronous = {self._synchronous}")
+
+        self._local.pid = pid
+        self._local.connection = connection
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._connect())
+
+    def _maybe_cleanup(self, timestamp: float) -> None:
+        if timestamp < self._next_cleanup:
+            return
+        self._next_cleanup = timestamp + self._cleanup_interval
+
+        with self._transaction() as connection:
+            batch_size = self._cleanup_batch_size
+            connection.execute(self.SQL_CLEANUP_COUNTERS, (timestamp, batch_size))
+            connection.execute(self.SQL_CLEANUP_EVENTS, (timestamp, batch_size))
+
+    def close(self) -> None:
+        """
+        Closes every connection this storage has opened.
+        """
+
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        """
+        Increments the counter for the given rate limit key.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The number of hits currently on the rate limit for the given key.
+        """
+
+        return self.incr_with_expiry(key, expiry, elastic_expiry, amount).counter
+
+    def incr_with_expiry(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> FixedWindow:
+        """
+        Increments the counter for the given rate limit key, and retrieves its expiry time in the
+        same transaction.
+
+        :param key: The key to increment.
+        :param expiry: Amount in seconds for the key to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to the counter.
+        :return: The count and expiry time of the counter afterwards.
+        """
+
+        timestamp = self._clock.now()
+        with self._transaction() as connection:
+            params = {
+                "key": key,
+                "expires_at": timestamp + expiry,
+                "now": timestamp,
+                "elastic_expiry": elastic_expiry,
+                "amount": amount,
+            }
+            connection.execute(self.SQL_INCR, params)
+            value, expires_at = connection.execute(self.SQL_GET, (key, timestamp)).fetchone()
+
+        self._maybe_cleanup(timestamp)
+        return FixedWindow(value, expires_at)
+
+    def incr_bulk(
+        self, keys: Sequence[str], expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> List[int]:
+        """
+        Increments the counters for each of the given rate limit keys independently, in a single
+        transaction.
+
+        :param keys: The keys to increment.
+        :param expiry: Amount in seconds for the keys to expire in.
+        :param elastic_expiry: Whether to keep extending the rate limit window every hit.
+        :param amount: The number of hits to add to each counter.
+        :return: The number of hits currently on the rate limit for each of the keys.
+        """
+
+        timestamp = self._clock.now()
+        counters = []
+        with self._transaction() as connection:
+            params = {
+                "expires_at": timestamp + expiry,
+                "now": timestamp,
+                "elastic_expiry": elastic_expiry,
+                "amount": amount,
+            }
+            for key in keys:
+                connection.execute(self.SQL_INCR, {**params, "key": key})
+                counters.append(connection.execute(self.SQL_GET, (key, timestamp)).fetchone()[0])
+
+        self._maybe_cleanup(timestamp)
+        return counters
+
+    def get(self, key: str) -> int:
+        """
+        Retrieve the current request count for the given rate limit key.
+
+        :param key: The key to get the counter value for.
+        """
+
+        row = self._connect().execute(self.SQL_GET, (key, self._clock.now())).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        """
+        Retrieve the expected expiry time for the given rate limit key.
+
+        :param key: The key to get the expiry time for.
+        :return: The time at which the current rate limit for the given key ends.
+        """
+
+        row = self._connect().execute(self.SQL_GET_EXPIRY, (key, self._clock.now())).fetchone()
+        return row[0] if row else -1
+
+    def clear(self, key: str) -> None:
+        """
+        Resets the rate limit for the given key.
+
+        :param key: The key to clear rate limits for.
+        """
+
+        with self._transaction() as connection:
+            connection.execute(self.SQL_CLEAR_COUNTER, (key,))
+            connection.execute(self.SQL_CLEAR_EVENTS, (key,))
+
+    def acquire_entry(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> bool:
+        """
+        :param key: The rate limit key to acquire an entry in.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entry to expire in.
+        :param no_add: If False, an entry is not actually acquired but instead serves as a 'check'.
+        :param amount: The number of entries to acquire at once.
+        """
+
+        if limit < 1 or amount > limit:
+            return False
+
+        timestamp = self._clock.now()
+        with self._transaction() as connection:
+            row = connection.execute(self.SQL_ENTRY_AT_LIMIT, (key, limit - amount)).fetchone()
+            if row and row[0] > timestamp - expiry:
+                return False
+
+            if not no_add:
+                connection.execute(self.SQL_TRIM_ENTRIES, (key, timestamp - expiry))
+                entry = (key, timestamp, timestamp + expiry)
+                connection.executemany(self.SQL_ADD_ENTRY, [entry] * amount)
+
+        if not no_add:
+            self._maybe_cleanup(timestamp)
+        return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> MovingWindow:
+        """
+        Retrieves the starting point and the number of entries in the moving window.
+
+        :param key: The rate limit key to retrieve statistics about.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entry to expire in.
+        :return: (start of window, number of acquired entries)
+        """
+
+        timestamp = self._clock.now()
+        row: Tuple[int, float] = (
+            self._connect().execute(self.SQL_MOVING_WINDOW, (key, timestamp - expiry)).fetchone()
+        )
+        acquired, newest = row
+        if not acquired:
+            return MovingWindow(timestamp, 0)
+        return MovingWindow(newest, acquired)
+
+    def get_moving_window_retry_time(
+        self, key: str, limit: int, expiry: int, amount: int = 1
+    ) -> float:
+        """
+        Retrieves the time at which ``amount`` entries can next be acquired in the moving window,
+        if no further entries are acquired before then.
+
+        :param key: The rate limit key to retrieve the retry time of.
+        :param limit: The total amount of entries allowed before hitting the rate limit.
+        :param expiry: Amount in seconds for the acquired entries to expire in.
+        :param amount: The number of entries to acquire at once.
+        :return: The time at which the entries can be acquired, which is the current time if
+                 they can be acquired straight away, or infinity if ``amount`` exceeds the limit.
+        """
+
+        if limit < 1 or amount > limit:
+            return math.inf
+
+        timestamp = self._clock.now()
+        row = self._connect().execute(self.SQL_ENTRY_AT_LIMIT, (key, limit - amount)).fetchone()
+        if row and row[0] > timestamp - expiry:
+            return float(row[0]) + expiry
+        return timestamp
+
+    def check(self) -> bool:
+        """
+        Check if the connection to the storage backend is healthy.
+        """
+
+        try:
+            self._connect().execute("SELECT 1").fetchone()
+            return True
+        except:  # noqa
+            return False
+
+    def reset(self) -> None:
+        """
+        Deletes all rate limit data from the database.
+        """
+
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM freiner_counters")
+            connection.execute("DELETE FROM freiner_events")
+
+
+class _Transaction:
+    """
+    Runs the enclosed statements in a ``BEGIN IMMEDIATE`` transaction, which takes the database's
+    write lock up front so that reads and writes within it are atomic.
+    """
+
+    __slots__ = ("_connection",)
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self._connection = connection
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._connection.execute("BEGIN IMMEDIATE")
+        return self._connection
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self._connection.execute("COMMIT")
+        else:
+            self._connection.execute("ROLLBACK")
+
+
+__all__ = [
+    "SQLiteStorage",
+]
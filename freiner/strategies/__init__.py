@@ -1,4 +1,4 @@
-from typing import Any, NamedTuple, Protocol, runtime_checkable
+from typing import Any, NamedTuple, Protocol, TypedDict, runtime_checkable
 
 from freiner.limits import RateLimitItem
 
@@ -8,9 +8,19 @@ class WindowStats(NamedTuple):
     remaining_count: int
 
 
+class _AmountArgument(TypedDict, total=False):
+    amount: int
+
+
+def _amount_argument(cost: int) -> _AmountArgument:
+    # Storages written before hits had a cost don't accept an ``amount`` argument, so it's only
+    # passed to them when it differs from a single hit.
+    return {} if cost == 1 else {"amount": cost}
+
+
 @runtime_checkable
 class RateLimiter(Protocol):
-    def hit(self, item: RateLimitItem, *identifiers: Any) -> bool:
+    def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
         """
         Creates a hit on the rate limit and returns ``True`` if successful.
 
@@ -18,18 +28,21 @@ class RateLimiter(Protocol):
 
         :param item: A :class:`freiner.limits.RateLimitItem` instance.
         :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
         :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
         """
 
-    def test(self, item: RateLimitItem, *identifiers: Any) -> bool:
+    def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
         """
-        Checks the rate limit and returns ``True`` if it is not currently exceeded.
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
 
         # noqa: DAR202
 
         :param item: A :class:`freiner.limits.RateLimitItem` instance.
         :param identifiers: A variable list of stringable objects to uniquely identify the limit.
-        :return: ``True`` if the rate limit has not yet been exceeded, or ``False`` if it has.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
         """
 
     def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
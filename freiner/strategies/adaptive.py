@@ -0,0 +1,326 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Tuple
+
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.limits import KeyBuilder, RateLimitItem
+from freiner.storage import FixedWindowStorage
+
+from . import RateLimiter, WindowStats
+
+
+class _AdjustedItem(RateLimitItem):
+    """
+    A copy of a rate limit item with a different amount, which keeps the original item's keys so
+    that the wrapped strategy's counts carry over when the amount changes.
+    """
+
+    __slots__ = ("granularity", "_item")
+
+    _item: RateLimitItem
+
+    def __init__(self, item: RateLimitItem, amount: int) -> None:
+        # Rate limit items are immutable once constructed, so this bypasses that check.
+        object.__setattr__(self, "granularity", item.granularity)
+        object.__setattr__(self, "_item", item)
+        super().__init__(amount, item.multiples, item.namespace)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return self.__class__, (self._item, self.amount)
+
+    def key_for(self, *identifiers: Any) -> str:
+        return self._item.key_for(*identifiers)
+
+    def key_builder(self, *prefix: Any) -> KeyBuilder:
+        return self._item.key_builder(*prefix)
+
+
+class _Observations:
+    """
+    The outcomes recorded by this process for a single limit since its last adjustment.
+    """
+
+    __slots__ = ("started", "count", "errors", "latency_count", "latency_total")
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self.count = 0
+        self.errors = 0
+        self.latency_count = 0
+        self.latency_total = 0.0
+
+
+class AdaptiveRateLimiter:
+    """
+    Reference: :ref:`adaptive`
+
+    Wraps another rate limiter, and adjusts the amount of each limit at runtime based on the
+    outcomes of the requests it admits, which are reported with :meth:`record` or
+    :meth:`measure`. The adjustment follows additive increase, multiplicative decrease (AIMD):
+    every ``interval`` seconds, each process compares the outcomes it recorded for a limit
+    against ``max_error_rate`` and ``latency_threshold``. While they are healthy, the amount is
+    raised by ``increase_step``, up to the item's own amount. Otherwise it is multiplied by
+    ``decrease_factor``, down to ``min_amount``.
+
+    The adjusted amount of each limit is kept in ``storage``, so that every process applies
+    and adjusts the same value. It is read at most once per ``interval`` by each process. An
+    adjusted amount expires ``state_ttl`` seconds after it was last changed, after which the
+    item's own amount applies again. Each adjustment increments the stored value by the change
+    in amount, so adjustments made concurrently by several processes add up rather than
+    overwrite each other. Concurrent increases are capped at the item's own amount.
+
+    :param limiter: The rate limiter to wrap.
+    :param storage: The storage to keep adjusted amounts in. This is usually the same storage
+                    as the wrapped rate limiter uses.
+    :param min_amount: The lowest amount a limit can be reduced to.
+    :param increase_step: How much to raise the amount by after a healthy interval.
+    :param decrease_factor: What to multiply the amount by after an unhealthy interval.
+    :param latency_threshold: The highest mean latency in seconds which is still considered
+                              healthy. Defaults to not considering latency.
+    :param max_error_rate: The highest share of failed requests which is still considered
+                           healthy.
+    :param interval: How often to adjust each limit, in seconds.
+    :param state_ttl: How long an adjusted amount is kept after it was last changed, in seconds.
+    :param max_keys: The maximum number of limits to keep observations for. Once reached, the
+                     least recently observed limits are forgotten first.
+    :param clock: The clock to measure intervals with. Defaults to the system clock.
+    :raises TypeError: If the storage doesn't support the fixed window strategy.
+    :raises ValueError: If ``min_amount`` or ``max_keys`` is not positive, or
+                        ``decrease_factor`` is not between 0 and 1.
+    """
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        storage: FixedWindowStorage,
+        min_amount: int = 1,
+        increase_step: int = 1,
+        decrease_factor: float = 0.5,
+        latency_threshold: Optional[float] = None,
+        max_error_rate: float = 0.05,
+        interval: float = 1.0,
+        state_ttl: int = 3600,
+        max_keys: int = 10000,
+        clock: Optional[Clock] = None,
+    ) -> None:
+        if not isinstance(storage, FixedWindowStorage):
+            msg = f"Adaptive rate limiting is not implemented for storage of type {storage.__class__.__name__}"
+            raise TypeError(msg)
+        if min_amount < 1 or max_keys < 1:
+            raise ValueError("AdaptiveRateLimiter requires a positive min_amount and max_keys.")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("AdaptiveRateLimiter requires a decrease_factor between 0 and 1.")
+
+        self.limiter: RateLimiter = limiter
+        self.storage: FixedWindowStorage = storage
+        self._min_amount = min_amount
+        self._increase_step = increase_step
+        self._decrease_factor = decrease_factor
+        self._latency_threshold = latency_threshold
+        self._max_error_rate = max_error_rate
+        self._interval = interval
+        self._state_ttl = state_ttl
+        self._max_keys = max_keys
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        # Maps each limit's key to its adjusted amount, and when that was read from the storage.
+        self._amounts: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._observations: "OrderedDict[str, _Observations]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key_for(item: RateLimitItem, *identifiers: Any) -> str:
+        return item.key_for(*identifiers) + "/adaptive"
+
+    def _clamp_amount(self, item: RateLimitItem, deficit: int) -> int:
+        # The storage keeps how far the amount was reduced from the item's own amount, so that a
+        # missing or expired counter stands for the item's own amount.
+        return min(max(item.amount - deficit, self._min_amount), item.amount)
+
+    def _read_amount(self, item: RateLimitItem, key: str) -> int:
+        return self._clamp_amount(item, self.storage.get(key))
+
+    def get_amount(self, item: RateLimitItem, *identifiers: Any) -> int:
+        """
+        Returns the adjusted amount of the limit, which may have been read from the storage up to
+        ``interval`` seconds ago.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: The number of hits currently allowed within the limit's period.
+        """
+
+        key = self._key_for(item, *identifiers)
+        now = self._clock.now()
+        with self._lock:
+            cached = self._amounts.get(key)
+            if cached is not None and now - cached[1] < self._interval:
+                return cached[0]
+
+        amount = self._read_amount(item, key)
+        with self._lock:
+            self._remember_amount(key, amount, now)
+        return amount
+
+    def _remember_amount(self, key: str, amount: int, now: float) -> None:
+        # Must be called while holding the lock.
+        self._amounts[key] = (amount, now)
+        self._amounts.move_to_end(key)
+        while len(self._amounts) > self._max_keys:
+            self._amounts.popitem(last=False)
+
+    def _adjusted(self, item: RateLimitItem, identifiers: Tuple[Any, ...]) -> RateLimitItem:
+        amount = self.get_amount(item, *identifiers)
+        if amount == item.amount:
+            return item
+        return _AdjustedItem(item, amount)
+
+    def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit, with its adjusted amount, and returns ``True`` if
+        successful.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+        return self.limiter.hit(self._adjusted(item, identifiers), *identifiers, cost=cost)
+
+    def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit, with its adjusted amount, and returns ``True`` if a hit of the
+        given cost would currently be allowed.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+        return self.limiter.test(self._adjusted(item, identifiers), *identifiers, cost=cost)
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Returns the number of requests remaining within this limit, with its adjusted amount.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+        return self.limiter.get_window_stats(self._adjusted(item, identifiers), *identifiers)
+
+    def record(
+        self,
+        item: RateLimitItem,
+        *identifiers: Any,
+        latency: Optional[float] = None,
+        error: bool = False,
+    ) -> None:
+        """
+        Records the outcome of a request admitted by the limit. Once ``interval`` seconds have
+        passed since the limit was last adjusted by this process, it is adjusted again based on
+        the outcomes recorded in the meantime.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param latency: How long the request took, in seconds.
+        :param error: Whether the request failed.
+        """
+
+        key = self._key_for(item, *identifiers)
+        now = self._clock.now()
+        with self._lock:
+            observations = self._observations.get(key)
+            if observations is None:
+                observations = self._observations[key] = _Observations(now)
+                while len(self._observations) > self._max_keys:
+                    self._observations.popitem(last=False)
+            self._observations.move_to_end(key)
+
+            observations.count += 1
+            observations.errors += error
+            if latency is not None:
+                observations.latency_count += 1
+                observations.latency_total += latency
+            if now - observations.started < self._interval:
+                return
+            self._observations[key] = _Observations(now)
+
+        self._adjust(item, key, self._is_healthy(observations), now)
+
+    @contextmanager
+    def measure(self, item: RateLimitItem, *identifiers: Any) -> Iterator[None]:
+        """
+        Records the outcome of the request made within a ``with`` block, timing the block as its
+        latency. The request is recorded as failed if the block raises an exception.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: A context manager which measures the request.
+        """
+
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.record(item, *identifiers, latency=time.perf_counter() - started, error=True)
+            raise
+        self.record(item, *identifiers, latency=time.perf_counter() - started)
+
+    def _is_healthy(self, observations: _Observations) -> bool:
+        if observations.errors > observations.count * self._max_error_rate:
+            return False
+        if self._latency_threshold is not None and observations.latency_count:
+            mean_latency = observations.latency_total / observations.latency_count
+            return mean_latency <= self._latency_threshold
+        return True
+
+    def _adjust(self, item: RateLimitItem, key: str, healthy: bool, now: float) -> None:
+        current = self._read_amount(item, key)
+        if healthy:
+            amount = min(current + self._increase_step, item.amount)
+        else:
+            amount = max(math.floor(current * self._decrease_factor), self._min_amount)
+        if amount == current:
+            return
+
+        # A single increment by the difference combines with concurrent adjustments, and never
+        # leaves the stored amount missing while it is being changed.
+        deficit = self.storage.incr(
+            key, self._state_ttl, elastic_expiry=True, amount=current - amount
+        )
+        if deficit < 0:
+            # Concurrent increases took the amount past the item's own amount. The part of this
+            # increase which did so is taken back off, so that the stored value stops at zero on
+            # every storage, as it does on those which can't go below zero, such as memcached.
+            # Otherwise, later decreases would start from too high an amount.
+            deficit = self.storage.incr(
+                key, self._state_ttl, elastic_expiry=True, amount=min(-deficit, amount - current)
+            )
+        with self._lock:
+            self._remember_amount(key, self._clamp_amount(item, deficit), now)
+
+    def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero, and discards its adjusted amount.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        key = self._key_for(item, *identifiers)
+        with self._lock:
+            self._amounts.pop(key, None)
+            self._observations.pop(key, None)
+        self.storage.clear(key)
+        self.limiter.clear(item, *identifiers)
+
+
+__all__ = [
+    "AdaptiveRateLimiter",
+]
@@ -0,0 +1,101 @@
+from typing import Any, List, Sequence, Tuple, Union
+
+from freiner.limits import RateLimitItem
+
+from . import WindowStats
+from .fixed_window import FixedWindowRateLimiter
+from .moving_window import MovingWindowRateLimiter
+
+
+#: A rate limit, along with the identifiers of the limit it applies to.
+Limit = Tuple[RateLimitItem, Sequence[Any]]
+
+
+class CompositeRateLimiter:
+    """
+    Reference: :ref:`composite-limits`
+
+    Enforces several rate limits together, each with its own identifiers, such as a per-user, a
+    per-organisation and a global limit. A hit is only counted against any of the limits if none
+    of them have been exceeded, so a rejected request never uses up the quota of the others.
+
+    The limits are checked and hit with the wrapped fixed window or moving window strategy's
+    storage. If it implements :class:`freiner.storage.FixedWindowBatchStorage` or
+    :class:`freiner.storage.MovingWindowBatchStorage` respectively, this is done in a single
+    operation, which is atomic for every storage except where noted otherwise.
+
+    :param limiter: The fixed window or moving window rate limiter to hit the limits with.
+    :raises TypeError: If the rate limiter isn't a fixed window or moving window rate limiter.
+    """
+
+    def __init__(self, limiter: Union[FixedWindowRateLimiter, MovingWindowRateLimiter]) -> None:
+        if not isinstance(limiter, (FixedWindowRateLimiter, MovingWindowRateLimiter)):
+            msg = f"Composite rate limiting is not implemented for rate limiters of type {limiter.__class__.__name__}"
+            raise TypeError(msg)
+
+        self.limiter: Union[FixedWindowRateLimiter, MovingWindowRateLimiter] = limiter
+
+    @staticmethod
+    def _keys(limits: Sequence[Limit]) -> Tuple[List[RateLimitItem], List[str]]:
+        return (
+            [item for item, _ in limits],
+            [item.key_for(*identifiers) for item, identifiers in limits],
+        )
+
+    def hit(self, limits: Sequence[Limit], cost: int = 1) -> Tuple[bool, List[WindowStats]]:
+        """
+        Creates a hit on every one of the given rate limits, but only if none of them have been
+        exceeded.
+
+        :param limits: A sequence of :class:`freiner.limits.RateLimitItem` instances, each
+                       paired with the identifiers of the limit it applies to.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if any of the rate limits
+                 had been exceeded, along with the statistics of each limit afterwards.
+        """
+
+        items, keys = self._keys(limits)
+        return self.limiter._hit_keys(items, keys, cost)
+
+    def test(self, limits: Sequence[Limit], cost: int = 1) -> bool:
+        """
+        Checks the given rate limits and returns ``True`` if a hit of the given cost would
+        currently be allowed by all of them.
+
+        :param limits: A sequence of :class:`freiner.limits.RateLimitItem` instances, each
+                       paired with the identifiers of the limit it applies to.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if none of the rate limits would be exceeded, or ``False`` if any would.
+        """
+
+        stats = self.get_window_stats(limits)
+        return all(window_stats.remaining_count >= cost for window_stats in stats)
+
+    def get_window_stats(self, limits: Sequence[Limit]) -> List[WindowStats]:
+        """
+        Returns the number of requests remaining within each of the given limits.
+
+        :param limits: A sequence of :class:`freiner.limits.RateLimitItem` instances, each
+                       paired with the identifiers of the limit it applies to.
+        :return: A list of tuples (reset time (float), remaining (int)), one per limit.
+        """
+
+        items, keys = self._keys(limits)
+        return self.limiter._get_window_stats_keys(items, keys)
+
+    def clear(self, limits: Sequence[Limit]) -> None:
+        """
+        Resets the request counters for the given limits to zero.
+
+        :param limits: A sequence of :class:`freiner.limits.RateLimitItem` instances, each
+                       paired with the identifiers of the limit it applies to.
+        """
+
+        for item, identifiers in limits:
+            self.limiter.clear(item, *identifiers)
+
+
+__all__ = [
+    "CompositeRateLimiter",
+    "Limit",
+]
@@ -0,0 +1,128 @@
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterator, NamedTuple, Optional
+
+from freiner.errors import ConcurrencyLimitExceeded
+from freiner.limits import RateLimitItem
+from freiner.storage import ConcurrencyStorage
+
+
+class Lease(NamedTuple):
+    key: str
+    id: str
+
+
+class ConcurrencyLimiter:
+    """
+    Reference: :ref:`concurrency`
+
+    Limits the number of requests in flight at once, rather than the number of requests made
+    within a period. Each request acquires a lease before it starts, and releases it once it
+    has finished.
+
+    The rate limit item's amount is the number of leases that may be held at once, and its
+    period is how long a lease lasts if it isn't released, so that the leases of crashed
+    workers are eventually reclaimed. For example, with ``parse("10/minute")`` up to 10
+    requests may be in flight, and a lease expires a minute after it was acquired. The period
+    should be longer than the slowest request, as a request whose lease has expired no longer
+    counts towards the limit.
+
+    :param storage: The storage to keep leases in.
+    :raises TypeError: If the storage doesn't support concurrency limiting.
+    """
+
+    def __init__(self, storage: ConcurrencyStorage) -> None:
+        if not isinstance(storage, ConcurrencyStorage):
+            msg = f"Concurrency limiting is not implemented for storage of type {storage.__class__.__name__}"
+            raise TypeError(msg)
+
+        self.storage: ConcurrencyStorage = storage
+
+    @staticmethod
+    def _key_for(item: RateLimitItem, *identifiers: Any) -> str:
+        # Kept apart from the keys of the other strategies, which store different types of data.
+        return item.key_for(*identifiers) + "/leases"
+
+    def acquire(self, item: RateLimitItem, *identifiers: Any) -> Optional[Lease]:
+        """
+        Acquires a lease on the limit, if fewer than the limit's amount are currently held.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: The lease, which must be passed to :meth:`release` once the request has
+                 finished, or ``None`` if the limit had been reached.
+        """
+
+        lease = Lease(self._key_for(item, *identifiers), uuid.uuid4().hex)
+        if self.storage.acquire_lease(lease.key, item.amount, lease.id, item.get_expiry()):
+            return lease
+        return None
+
+    def release(self, lease: Lease) -> None:
+        """
+        Releases a lease acquired with :meth:`acquire`. Releasing a lease which has already been
+        released or has expired has no effect.
+
+        :param lease: The lease to release.
+        """
+
+        self.storage.release_lease(lease.key, lease.id)
+
+    @contextmanager
+    def hold(self, item: RateLimitItem, *identifiers: Any) -> Iterator[Lease]:
+        """
+        Acquires a lease on the limit for the duration of a ``with`` block, and releases it when
+        the block exits.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :raises ConcurrencyLimitExceeded: If the limit had been reached.
+        :return: A context manager which holds the lease.
+        """
+
+        lease = self.acquire(item, *identifiers)
+        if lease is None:
+            raise ConcurrencyLimitExceeded(f"Concurrency limit reached for {item}")
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    def test(self, item: RateLimitItem, *identifiers: Any) -> bool:
+        """
+        Checks the limit and returns ``True`` if a lease could currently be acquired.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: ``True`` if fewer than the limit's amount of leases are held, or ``False``
+                 otherwise.
+        """
+
+        return self.get_in_flight(item, *identifiers) < item.amount
+
+    def get_in_flight(self, item: RateLimitItem, *identifiers: Any) -> int:
+        """
+        Returns the number of leases currently held on the limit.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: The number of requests in flight.
+        """
+
+        return self.storage.get_lease_count(self._key_for(item, *identifiers))
+
+    def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Releases every lease held on the limit.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        self.storage.clear(self._key_for(item, *identifiers))
+
+
+__all__ = [
+    "ConcurrencyLimiter",
+    "Lease",
+]
@@ -1,9 +1,16 @@
-from typing import Any
+from typing import Any, Iterable, List, Sequence, Tuple
 
 from freiner.limits import RateLimitItem
-from freiner.storage import FixedWindowStorage
+from freiner.storage import (
+    FixedWindow,
+    FixedWindowBatchStorage,
+    FixedWindowBulkStorage,
+    FixedWindowStatsStorage,
+    FixedWindowStorage,
+)
+from freiner.util import chunked
 
-from . import WindowStats
+from . import WindowStats, _amount_argument
 
 
 class FixedWindowRateLimiter:
@@ -11,6 +18,11 @@ class FixedWindowRateLimiter:
     Reference: :ref:`fixed-window`
     """
 
+    _elastic_expiry = False
+
+    #: The maximum number of keys which :meth:`hit_batch` hits with a single storage operation.
+    BATCH_CHUNK_SIZE = 1000
+
     def __init__(self, storage: FixedWindowStorage) -> None:
         if not isinstance(storage, FixedWindowStorage):
             msg = f"Fixed Window rate limiting is not implemented for storage of type {storage.__class__.__name__}"
@@ -18,27 +30,67 @@ class FixedWindowRateLimiter:
 
         self.storage: FixedWindowStorage = storage
 
-    def hit(self, item: RateLimitItem, *identifiers: Any) -> bool:
+    def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
         """
         Creates a hit on the rate limit and returns ``True`` if successful.
 
         :param item: A :class:`freiner.limits.RateLimitItem` instance.
         :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
         :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
         """
 
-        return self.storage.incr(item.key_for(*identifiers), item.get_expiry()) <= item.amount
+        counter = self.storage.incr(
+            item.key_for(*identifiers),
+            item.get_expiry(),
+            elastic_expiry=self._elastic_expiry,
+            **_amount_argument(cost),
+        )
+        return counter <= item.amount
+
+    def hit_with_stats(
+        self, item: RateLimitItem, *identifiers: Any, cost: int = 1
+    ) -> Tuple[bool, WindowStats]:
+        """
+        Creates a hit on the rate limit, and returns whether it was successful along with the
+        number of requests remaining within the limit afterwards.
+
+        If the storage implements :class:`freiner.storage.FixedWindowStatsStorage`, this is done
+        in a single operation.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been
+                 exceeded, along with a tuple (reset time (float), remaining (int)).
+        """
 
-    def test(self, item: RateLimitItem, *identifiers: Any) -> bool:
+        key = item.key_for(*identifiers)
+        expiry = item.get_expiry()
+        if isinstance(self.storage, FixedWindowStatsStorage):
+            window = self.storage.incr_with_expiry(
+                key, expiry, elastic_expiry=self._elastic_expiry, **_amount_argument(cost)
+            )
+        else:
+            counter = self.storage.incr(
+                key, expiry, elastic_expiry=self._elastic_expiry, **_amount_argument(cost)
+            )
+            window = FixedWindow(counter, self.storage.get_expiry(key))
+
+        return window.counter <= item.amount, self._window_stats(item, window)
+
+    def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
         """
-        Checks the rate limit and returns ``True`` if it is not currently exceeded.
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
 
         :param item: A :class:`freiner.limits.RateLimitItem` instance.
         :param identifiers: A variable list of stringable objects to uniquely identify the limit.
-        :return: ``True`` if the rate limit has not yet been exceeded, or ``False`` if it has.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
         """
 
-        return self.storage.get(item.key_for(*identifiers)) < item.amount
+        return self.storage.get(item.key_for(*identifiers)) + cost <= item.amount
 
     def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
         """
@@ -49,10 +101,131 @@ class FixedWindowRateLimiter:
         :return: tuple (reset time (float), remaining (int))
         """
 
-        remaining = max(0, item.amount - self.storage.get(item.key_for(*identifiers)))
-        reset = self.storage.get_expiry(item.key_for(*identifiers))
+        key = item.key_for(*identifiers)
+        remaining = max(0, item.amount - self.storage.get(key))
+        reset = self.storage.get_expiry(key)
         return WindowStats(reset, remaining)
 
+    def hit_many(
+        self, items: Sequence[RateLimitItem], *identifiers: Any, cost: int = 1
+    ) -> Tuple[bool, List[WindowStats]]:
+        """
+        Creates a hit on every one of the given rate limits, but only if none of them have been
+        exceeded. Unlike :meth:`hit`, a rejected hit is not counted against any of the limits.
+
+        If the storage implements :class:`freiner.storage.FixedWindowBatchStorage`, this is done
+        atomically in a single operation. Otherwise, the limits are checked and then hit one at
+        a time.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if any of the rate limits
+                 had been exceeded, along with the statistics of each limit afterwards.
+        """
+
+        return self._hit_keys(items, [item.key_for(*identifiers) for item in items], cost)
+
+    def _hit_keys(
+        self, items: Sequence[RateLimitItem], keys: Sequence[str], cost: int
+    ) -> Tuple[bool, List[WindowStats]]:
+        entries = [(key, item.amount, item.get_expiry()) for item, key in zip(items, keys)]
+        if isinstance(self.storage, FixedWindowBatchStorage):
+            allowed, windows = self.storage.incr_many(
+                entries, self._elastic_expiry, **_amount_argument(cost)
+            )
+        else:
+            allowed = all(self.storage.get(key) + cost <= limit for key, limit, _ in entries)
+            if allowed:
+                for key, _, expiry in entries:
+                    self.storage.incr(
+                        key, expiry, elastic_expiry=self._elastic_expiry, **_amount_argument(cost)
+                    )
+            windows = self._get_windows([key for key, _, _ in entries])
+
+        return allowed, [self._window_stats(item, window) for item, window in zip(items, windows)]
+
+    def test_many(self, items: Sequence[RateLimitItem], *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the given rate limits and returns ``True`` if a hit of the given cost would
+        currently be allowed by all of them.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if none of the rate limits would be exceeded, or ``False`` if any would.
+        """
+
+        stats = self.get_window_stats_many(items, *identifiers)
+        return all(window_stats.remaining_count >= cost for window_stats in stats)
+
+    def get_window_stats_many(
+        self, items: Sequence[RateLimitItem], *identifiers: Any
+    ) -> List[WindowStats]:
+        """
+        Returns the number of requests remaining within each of the given limits. If the storage
+        implements :class:`freiner.storage.FixedWindowBatchStorage`, this is done in a single
+        operation.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :return: A list of tuples (reset time (float), remaining (int)), one per limit.
+        """
+
+        return self._get_window_stats_keys(items, [item.key_for(*identifiers) for item in items])
+
+    def _get_window_stats_keys(
+        self, items: Sequence[RateLimitItem], keys: Sequence[str]
+    ) -> List[WindowStats]:
+        windows = self._get_windows(keys)
+        return [self._window_stats(item, window) for item, window in zip(items, windows)]
+
+    def hit_batch(
+        self, item: RateLimitItem, identifiers: Iterable[Any], *prefix: Any, cost: int = 1
+    ) -> List[bool]:
+        """
+        Creates a hit on a separate rate limit for each of the given identifiers, and returns
+        whether each hit was successful.
+
+        If the storage implements :class:`freiner.storage.FixedWindowBulkStorage`, the
+        identifiers are hit in chunks of :attr:`BATCH_CHUNK_SIZE`, with a single operation per
+        chunk. Otherwise, they are hit one at a time.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: An iterable of stringable objects, each identifying its own limit.
+        :param prefix: A variable list of stringable objects to precede each identifier with.
+        :param cost: The weight of each request, which is counted as this many hits.
+        :return: Whether the hit on each identifier's limit was successful, in the same order.
+        """
+
+        expiry = item.get_expiry()
+        key_for = item.key_builder(*prefix)
+        allowed: List[bool] = []
+        for chunk in chunked(identifiers, self.BATCH_CHUNK_SIZE):
+            keys = [key_for(identifier) for identifier in chunk]
+            if isinstance(self.storage, FixedWindowBulkStorage):
+                counters = self.storage.incr_bulk(
+                    keys, expiry, elastic_expiry=self._elastic_expiry, **_amount_argument(cost)
+                )
+            else:
+                counters = [
+                    self.storage.incr(
+                        key, expiry, elastic_expiry=self._elastic_expiry, **_amount_argument(cost)
+                    )
+                    for key in keys
+                ]
+            allowed.extend(counter <= item.amount for counter in counters)
+        return allowed
+
+    def _get_windows(self, keys: Sequence[str]) -> List[FixedWindow]:
+        if isinstance(self.storage, FixedWindowBatchStorage):
+            return self.storage.get_many(keys)
+        return [FixedWindow(self.storage.get(key), self.storage.get_expiry(key)) for key in keys]
+
+    @staticmethod
+    def _window_stats(item: RateLimitItem, window: FixedWindow) -> WindowStats:
+        return WindowStats(window.expiry_time, max(0, item.amount - window.counter))
+
     def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
         """
         Resets the request counter for a given limit to zero.
@@ -0,0 +1,235 @@
+import math
+from typing import Any, Iterable, List, Sequence, Tuple
+
+from freiner.limits import RateLimitItem
+from freiner.storage import GCRABatchStorage, GCRABulkStorage, GCRAState, GCRAStorage
+from freiner.util import chunked
+
+from . import WindowStats, _amount_argument
+
+
+class GCRARateLimiter:
+    """
+    Reference: :ref:`gcra`
+    """
+
+    #: The maximum number of keys which :meth:`hit_batch` hits with a single storage operation.
+    BATCH_CHUNK_SIZE = 1000
+
+    def __init__(self, storage: GCRAStorage) -> None:
+        if not isinstance(storage, GCRAStorage):
+            msg = f"GCRA rate limiting is not implemented for storage of type {storage.__class__.__name__}"
+            raise TypeError(msg)
+
+        self.storage: GCRAStorage = storage
+
+    def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit and returns ``True`` if successful.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+        allowed, _ = self.storage.acquire_tat(
+            item.key_for(*identifiers), item.amount, item.get_expiry(), **_amount_argument(cost)
+        )
+        return allowed
+
+    def hit_with_stats(
+        self, item: RateLimitItem, *identifiers: Any, cost: int = 1
+    ) -> Tuple[bool, WindowStats]:
+        """
+        Creates a hit on the rate limit, and returns whether it was successful along with the
+        number of requests remaining within the limit afterwards.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been
+                 exceeded, along with a tuple (reset time (float), remaining (int)).
+        """
+
+        allowed, state = self.storage.acquire_tat(
+            item.key_for(*identifiers), item.amount, item.get_expiry(), **_amount_argument(cost)
+        )
+        return allowed, self._window_stats(item, state)
+
+    def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+        allowed, _ = self.storage.acquire_tat(
+            item.key_for(*identifiers),
+            item.amount,
+            item.get_expiry(),
+            no_add=True,
+            **_amount_argument(cost),
+        )
+        return allowed
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Returns the number of requests remaining within this limit. The reset time is the time
+        at which the limit will have fully recovered, if no further hits are made.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+        return self._window_stats(item, self.storage.get_tat(item.key_for(*identifiers)))
+
+    @staticmethod
+    def _window_stats(item: RateLimitItem, state: GCRAState) -> WindowStats:
+        now, tat = state
+        if item.amount < 1:
+            return WindowStats(now, 0)
+
+        expiry = item.get_expiry()
+        emission_interval = expiry / item.amount
+        # The small allowance absorbs floating point error, so that exact multiples of the
+        # emission interval aren't rounded down.
+        remaining = int((expiry - (tat - now)) / emission_interval + 1e-6)
+        return WindowStats(tat, min(max(remaining, 0), item.amount))
+
+    def get_retry_time(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> float:
+        """
+        Returns the time at which a hit of the given cost will next be allowed, if no further
+        hits are made. This is when the theoretical arrival time, once the hit's emission
+        intervals are added to it, is no more than the limit's period ahead.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: The time at which the hit will be allowed. This is the current time if it would
+                 be allowed straight away, and infinity if the cost exceeds the limit.
+        """
+
+        if item.amount < 1 or cost > item.amount:
+            return math.inf
+
+        now, tat = self.storage.get_tat(item.key_for(*identifiers))
+        expiry = item.get_expiry()
+        return max(tat - expiry + cost * expiry / item.amount, now)
+
+    def hit_many(
+        self, items: Sequence[RateLimitItem], *identifiers: Any, cost: int = 1
+    ) -> Tuple[bool, List[WindowStats]]:
+        """
+        Creates a hit on every one of the given rate limits, but only if none of them have been
+        exceeded.
+
+        If the storage implements :class:`freiner.storage.GCRABatchStorage`, this is done
+        atomically in a single operation. Otherwise, the limits are checked and then hit one at
+        a time, and the request is reported as unsuccessful as soon as any of the hits is
+        rejected.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if any of the rate limits
+                 had been exceeded, along with the statistics of each limit afterwards.
+        """
+
+        if isinstance(self.storage, GCRABatchStorage):
+            entries = [
+                (item.key_for(*identifiers), item.amount, item.get_expiry()) for item in items
+            ]
+            allowed, states = self.storage.acquire_tats(entries, **_amount_argument(cost))
+            return allowed, [self._window_stats(item, state) for item, state in zip(items, states)]
+
+        allowed = self.test_many(items, *identifiers, cost=cost)
+        if allowed:
+            allowed = all(self.hit(item, *identifiers, cost=cost) for item in items)
+        return allowed, self.get_window_stats_many(items, *identifiers)
+
+    def test_many(self, items: Sequence[RateLimitItem], *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the given rate limits and returns ``True`` if a hit of the given cost would
+        currently be allowed by all of them.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if none of the rate limits would be exceeded, or ``False`` if any would.
+        """
+
+        return all(self.test(item, *identifiers, cost=cost) for item in items)
+
+    def get_window_stats_many(
+        self, items: Sequence[RateLimitItem], *identifiers: Any
+    ) -> List[WindowStats]:
+        """
+        Returns the number of requests remaining within each of the given limits. If the storage
+        implements :class:`freiner.storage.GCRABatchStorage`, this is done in a single operation.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :return: A list of tuples (reset time (float), remaining (int)), one per limit.
+        """
+
+        if isinstance(self.storage, GCRABatchStorage):
+            states = self.storage.get_tats([item.key_for(*identifiers) for item in items])
+            return [self._window_stats(item, state) for item, state in zip(items, states)]
+
+        return [self.get_window_stats(item, *identifiers) for item in items]
+
+    def hit_batch(
+        self, item: RateLimitItem, identifiers: Iterable[Any], *prefix: Any, cost: int = 1
+    ) -> List[bool]:
+        """
+        Creates a hit on a separate rate limit for each of the given identifiers, and returns
+        whether each hit was successful.
+
+        If the storage implements :class:`freiner.storage.GCRABulkStorage`, the
+        identifiers are hit in chunks of :attr:`BATCH_CHUNK_SIZE`, with a single operation per
+        chunk. Otherwise, they are hit one at a time, with a storage operation each.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: An iterable of stringable objects, each identifying its own limit.
+        :param prefix: A variable list of stringable objects to precede each identifier with.
+        :param cost: The weight of each request, which is counted as this many hits.
+        :return: Whether the hit on each identifier's limit was successful, in the same order.
+        """
+
+        expiry = item.get_expiry()
+        key_for = item.key_builder(*prefix)
+        allowed: List[bool] = []
+        for chunk in chunked(identifiers, self.BATCH_CHUNK_SIZE):
+            if isinstance(self.storage, GCRABulkStorage):
+                keys = [key_for(identifier) for identifier in chunk]
+                allowed.extend(
+                    self.storage.acquire_tat_bulk(
+                        keys, item.amount, expiry, **_amount_argument(cost)
+                    )
+                )
+            else:
+                allowed.extend(
+                    self.hit(item, *prefix, identifier, cost=cost) for identifier in chunk
+                )
+        return allowed
+
+    def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        self.storage.clear(item.key_for(*identifiers))
+
+
+__all__ = [
+    "GCRARateLimiter",
+]
@@ -0,0 +1,198 @@
+import math
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.limits import RateLimitItem
+from freiner.storage import FixedWindow, FixedWindowStatsStorage, FixedWindowStorage
+
+from . import WindowStats
+
+
+class _Lease:
+    """
+    The hits of a limit's current window which this process has reserved in the storage, but
+    not yet spent.
+    """
+
+    __slots__ = ("expires_at", "available", "size", "started", "headroom")
+
+    def __init__(
+        self, expires_at: float, available: int, size: int, started: float, headroom: int
+    ) -> None:
+        self.expires_at = expires_at
+        # The reserved hits which haven't been spent yet.
+        self.available = available
+        # The number of hits requested by the reservation, and when it was made.
+        self.size = size
+        self.started = started
+        # The number of hits which were still unreserved in the storage after the reservation.
+        self.headroom = headroom
+
+
+class LeasingRateLimiter:
+    """
+    Reference: :ref:`leasing`
+
+    A fixed window rate limiter which reserves hits from the storage in blocks, called leases,
+    and spends them locally. Each process then only reaches the storage once per lease rather
+    than once per hit, which relieves the storage of very hot keys.
+
+    The size of each lease adapts to the rate at which the previous lease was spent, so that
+    it lasts for about ``lease_duration`` seconds. It is also capped at ``headroom_share`` of
+    the hits which remained unreserved in the storage, so that processes don't reserve hits
+    that others will need as the limit is approached.
+
+    Hits are reserved before they are spent, so the limit is never exceeded. Instead, hits
+    reserved by one process can't be spent by another, so a hit may be rejected while up to one
+    lease per process remains unspent. Unspent hits are given up when the window ends and the
+    storage's counter resets.
+
+    :param storage: The storage to reserve hits from.
+    :param max_lease_size: The most hits to reserve at once.
+    :param lease_duration: How long each lease should last at the observed rate, in seconds.
+    :param headroom_share: The largest share of the unreserved hits to reserve at once.
+    :param max_keys: The maximum number of limits to keep leases for. Once reached, the least
+                     recently reserved leases are discarded first.
+    :param clock: The clock to compare window expiry times against. This should be the same
+                  clock as the storage uses. Defaults to the system clock.
+    :raises TypeError: If the storage doesn't support the fixed window strategy.
+    :raises ValueError: If ``max_lease_size`` or ``max_keys`` is not positive.
+    """
+
+    def __init__(
+        self,
+        storage: FixedWindowStorage,
+        max_lease_size: int = 100,
+        lease_duration: float = 0.1,
+        headroom_share: float = 0.1,
+        max_keys: int = 10000,
+        clock: Optional[Clock] = None,
+    ) -> None:
+        if not isinstance(storage, FixedWindowStorage):
+            msg = f"Leasing rate limiting is not implemented for storage of type {storage.__class__.__name__}"
+            raise TypeError(msg)
+        if max_lease_size < 1 or max_keys < 1:
+            raise ValueError("LeasingRateLimiter requires a positive max_lease_size and max_keys.")
+
+        self.storage: FixedWindowStorage = storage
+        self._max_lease_size = max_lease_size
+        self._lease_duration = lease_duration
+        self._headroom_share = headroom_share
+        self._max_keys = max_keys
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        self._leases: "OrderedDict[str, _Lease]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lease_size(
+        self, item: RateLimitItem, lease: Optional[_Lease], cost: int, now: float
+    ) -> int:
+        if lease is None:
+            return cost
+
+        rate = lease.size / max(now - lease.started, 1e-6)
+        size = math.ceil(rate * self._lease_duration)
+        headroom = lease.headroom if lease.expires_at > now else item.amount
+        size = min(size, int(headroom * self._headroom_share), self._max_lease_size)
+        return max(size, cost)
+
+    def _reserve(self, key: str, expiry: int, size: int) -> FixedWindow:
+        if isinstance(self.storage, FixedWindowStatsStorage):
+            return self.storage.incr_with_expiry(key, expiry, amount=size)
+
+        counter = self.storage.incr(key, expiry, amount=size)
+        return FixedWindow(counter, self.storage.get_expiry(key))
+
+    def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit and returns ``True`` if successful. The hit is spent from
+        this process's lease, and a new lease is only reserved from the storage once that lease
+        has been spent.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+        key = item.key_for(*identifiers)
+        with self._lock:
+            now = self._clock.now()
+            lease = self._leases.get(key)
+            if lease is not None and lease.expires_at > now:
+                if lease.available >= cost:
+                    lease.available -= cost
+                    return True
+                # Other processes can only reserve more, so the lease can't be topped up.
+                if lease.available + lease.headroom < cost:
+                    return False
+            size = self._lease_size(item, lease, cost, now)
+
+        window = self._reserve(key, item.get_expiry(), size)
+        headroom = item.amount - window.counter
+        granted = min(size, max(0, size + headroom))
+
+        with self._lock:
+            now = self._clock.now()
+            lease = self._leases.get(key)
+            if lease is not None and lease.expires_at > now:
+                granted += lease.available
+
+            allowed = granted >= cost
+            if allowed:
+                granted -= cost
+            self._leases[key] = _Lease(window.expiry_time, granted, size, now, headroom)
+            self._leases.move_to_end(key)
+            while len(self._leases) > self._max_keys:
+                self._leases.popitem(last=False)
+            return allowed
+
+    def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed for this process.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+        return self.get_window_stats(item, *identifiers).remaining_count >= cost
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Returns the number of requests remaining within this limit for this process, which
+        includes the unspent hits of its lease but not those of other processes.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+        key = item.key_for(*identifiers)
+        remaining = max(0, item.amount - self.storage.get(key))
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease.expires_at > self._clock.now():
+                remaining += lease.available
+        return WindowStats(self.storage.get_expiry(key), remaining)
+
+    def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero, and discards this process's lease.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        key = item.key_for(*identifiers)
+        with self._lock:
+            self._leases.pop(key, None)
+        self.storage.clear(key)
+
+
+__all__ = [
+    "LeasingRateLimiter",
+]
@@ -1,9 +1,17 @@
-from typing import Any
+import math
+from typing import Any, Iterable, List, Sequence, Tuple
 
 from freiner.limits import RateLimitItem
-from freiner.storage import MovingWindowStorage
+from freiner.storage import (
+    MovingWindow,
+    MovingWindowBatchStorage,
+    MovingWindowBulkStorage,
+    MovingWindowRetryStorage,
+    MovingWindowStorage,
+)
+from freiner.util import chunked
 
-from . import WindowStats
+from . import WindowStats, _amount_argument
 
 
 class MovingWindowRateLimiter:
@@ -11,6 +19,9 @@ class MovingWindowRateLimiter:
     Reference: :ref:`moving-window`
     """
 
+    #: The maximum number of keys which :meth:`hit_batch` hits with a single storage operation.
+    BATCH_CHUNK_SIZE = 1000
+
     def __init__(self, storage: MovingWindowStorage) -> None:
         if not isinstance(storage, MovingWindowStorage):
             msg = f"Moving Window rate limiting is not implemented for storage of type {storage.__class__.__name__}"
@@ -18,33 +29,65 @@ class MovingWindowRateLimiter:
 
         self.storage: MovingWindowStorage = storage
 
-    def hit(self, item: RateLimitItem, *identifiers: Any) -> bool:
+    def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
         """
         Creates a hit on the rate limit and returns ``True`` if successful.
 
         :param item: A :class:`freiner.limits.RateLimitItem` instance.
         :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
         :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
         """
 
         return self.storage.acquire_entry(
-            item.key_for(*identifiers), item.amount, item.get_expiry()
+            item.key_for(*identifiers), item.amount, item.get_expiry(), **_amount_argument(cost)
         )
 
-    def test(self, item: RateLimitItem, *identifiers: Any) -> bool:
+    def hit_with_stats(
+        self, item: RateLimitItem, *identifiers: Any, cost: int = 1
+    ) -> Tuple[bool, WindowStats]:
+        """
+        Creates a hit on the rate limit, and returns whether it was successful along with the
+        number of requests remaining within the limit afterwards.
+
+        If the storage implements :class:`freiner.storage.MovingWindowBatchStorage`, this is done
+        in a single operation.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been
+                 exceeded, along with a tuple (reset time (float), remaining (int)).
+        """
+
+        key = item.key_for(*identifiers)
+        expiry = item.get_expiry()
+        if isinstance(self.storage, MovingWindowBatchStorage):
+            allowed, (window,) = self.storage.acquire_entries(
+                [(key, item.amount, expiry)], **_amount_argument(cost)
+            )
+        else:
+            allowed = self.storage.acquire_entry(key, item.amount, expiry, **_amount_argument(cost))
+            window = self.storage.get_moving_window(key, item.amount, expiry)
+
+        return allowed, self._window_stats(item, window)
+
+    def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
         """
-        Checks the rate limit and returns ``True`` if it is not currently exceeded.
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
 
         :param item: A :class:`freiner.limits.RateLimitItem` instance.
         :param identifiers: A variable list of stringable objects to uniquely identify the limit.
-        :return: ``True`` if the rate limit has not yet been exceeded, or ``False`` if it has.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
         """
 
         _, acquired_count = self.storage.get_moving_window(
             item.key_for(*identifiers), item.amount, item.get_expiry()
         )
 
-        return acquired_count < item.amount
+        return acquired_count + cost <= item.amount
 
     def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
         """
@@ -55,9 +98,162 @@ class MovingWindowRateLimiter:
         :return: tuple (reset time (float), remaining (int))
         """
 
-        window_start, window_items = self.storage.get_moving_window(
+        window = self.storage.get_moving_window(
             item.key_for(*identifiers), item.amount, item.get_expiry()
         )
+        return self._window_stats(item, window)
+
+    def get_retry_time(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> float:
+        """
+        Returns the time at which a hit of the given cost will next be allowed, if no further
+        hits are made. If the storage implements
+        :class:`freiner.storage.MovingWindowRetryStorage`, this is when enough of the window's
+        entries will have expired. Otherwise, it is the limit's reset time, when all of them
+        will have.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: The time at which the hit will be allowed. This is no later than the current
+                 time if it would be allowed straight away, and infinity if the cost exceeds the
+                 limit.
+        """
+
+        key = item.key_for(*identifiers)
+        expiry = item.get_expiry()
+        if isinstance(self.storage, MovingWindowRetryStorage):
+            return self.storage.get_moving_window_retry_time(
+                key, item.amount, expiry, **_amount_argument(cost)
+            )
+
+        if cost > item.amount:
+            return math.inf
+        window = self.storage.get_moving_window(key, item.amount, expiry)
+        if window.acquired_count + cost <= item.amount:
+            return window.start_time
+        return window.start_time + expiry
+
+    def hit_many(
+        self, items: Sequence[RateLimitItem], *identifiers: Any, cost: int = 1
+    ) -> Tuple[bool, List[WindowStats]]:
+        """
+        Creates a hit on every one of the given rate limits, but only if none of them have been
+        exceeded.
+
+        If the storage implements :class:`freiner.storage.MovingWindowBatchStorage`, this is
+        done atomically in a single operation. Otherwise, the limits are checked and then hit
+        one at a time.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if any of the rate limits
+                 had been exceeded, along with the statistics of each limit afterwards.
+        """
+
+        return self._hit_keys(items, [item.key_for(*identifiers) for item in items], cost)
+
+    def _hit_keys(
+        self, items: Sequence[RateLimitItem], keys: Sequence[str], cost: int
+    ) -> Tuple[bool, List[WindowStats]]:
+        entries = [(key, item.amount, item.get_expiry()) for item, key in zip(items, keys)]
+        if isinstance(self.storage, MovingWindowBatchStorage):
+            allowed, windows = self.storage.acquire_entries(entries, **_amount_argument(cost))
+        else:
+            allowed = all(
+                self.storage.acquire_entry(
+                    key, limit, expiry, no_add=True, **_amount_argument(cost)
+                )
+                for key, limit, expiry in entries
+            )
+            if allowed:
+                for key, limit, expiry in entries:
+                    self.storage.acquire_entry(key, limit, expiry, **_amount_argument(cost))
+            windows = self._get_windows(entries)
+
+        return allowed, [self._window_stats(item, window) for item, window in zip(items, windows)]
+
+    def test_many(self, items: Sequence[RateLimitItem], *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the given rate limits and returns ``True`` if a hit of the given cost would
+        currently be allowed by all of them.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if none of the rate limits would be exceeded, or ``False`` if any would.
+        """
+
+        stats = self.get_window_stats_many(items, *identifiers)
+        return all(window_stats.remaining_count >= cost for window_stats in stats)
+
+    def get_window_stats_many(
+        self, items: Sequence[RateLimitItem], *identifiers: Any
+    ) -> List[WindowStats]:
+        """
+        Returns the number of requests remaining within each of the given limits. If the storage
+        implements :class:`freiner.storage.MovingWindowBatchStorage`, this is done in a single
+        operation.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :return: A list of tuples (reset time (float), remaining (int)), one per limit.
+        """
+
+        return self._get_window_stats_keys(items, [item.key_for(*identifiers) for item in items])
+
+    def _get_window_stats_keys(
+        self, items: Sequence[RateLimitItem], keys: Sequence[str]
+    ) -> List[WindowStats]:
+        entries = [(key, item.amount, item.get_expiry()) for item, key in zip(items, keys)]
+        windows = self._get_windows(entries)
+        return [self._window_stats(item, window) for item, window in zip(items, windows)]
+
+    def hit_batch(
+        self, item: RateLimitItem, identifiers: Iterable[Any], *prefix: Any, cost: int = 1
+    ) -> List[bool]:
+        """
+        Creates a hit on a separate rate limit for each of the given identifiers, and returns
+        whether each hit was successful.
+
+        If the storage implements :class:`freiner.storage.MovingWindowBulkStorage`, the
+        identifiers are hit in chunks of :attr:`BATCH_CHUNK_SIZE`, with a single operation per
+        chunk. Otherwise, they are hit one at a time, with a storage operation each.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: An iterable of stringable objects, each identifying its own limit.
+        :param prefix: A variable list of stringable objects to precede each identifier with.
+        :param cost: The weight of each request, which is counted as this many hits.
+        :return: Whether the hit on each identifier's limit was successful, in the same order.
+        """
+
+        expiry = item.get_expiry()
+        key_for = item.key_builder(*prefix)
+        allowed: List[bool] = []
+        for chunk in chunked(identifiers, self.BATCH_CHUNK_SIZE):
+            if isinstance(self.storage, MovingWindowBulkStorage):
+                keys = [key_for(identifier) for identifier in chunk]
+                allowed.extend(
+                    self.storage.acquire_entry_bulk(
+                        keys, item.amount, expiry, **_amount_argument(cost)
+                    )
+                )
+            else:
+                allowed.extend(
+                    self.hit(item, *prefix, identifier, cost=cost) for identifier in chunk
+                )
+        return allowed
+
+    def _get_windows(self, entries: Sequence[Tuple[str, int, int]]) -> List[MovingWindow]:
+        if isinstance(self.storage, MovingWindowBatchStorage):
+            return self.storage.get_moving_windows(entries)
+        return [
+            self.storage.get_moving_window(key, limit, expiry) for key, limit, expiry in entries
+        ]
+
+    @staticmethod
+    def _window_stats(item: RateLimitItem, window: MovingWindow) -> WindowStats:
+        window_start, window_items = window
         reset = window_start + item.get_expiry()
         return WindowStats(reset, item.amount - window_items)
 
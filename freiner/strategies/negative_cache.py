@@ -0,0 +1,162 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.limits import RateLimitItem
+
+from . import RateLimiter, WindowStats
+
+
+class NegativeCacheRateLimiter:
+    """
+    Wraps another rate limiter, and remembers in process memory which limits it has denied.
+    Until a denied limit resets, further hits and tests of it are answered locally, without
+    reaching the storage. This protects the storage from clients that keep retrying once they
+    are over their limit.
+
+    A limit is remembered along with the number of hits it had remaining when it was denied.
+    Only requests costing more than that are denied locally; cheaper requests are still passed
+    on to the wrapped rate limiter.
+
+    The deny lasts until the wrapped rate limiter would next allow a request costing more than
+    the remaining hits. Rate limiters which provide ``get_retry_time``, such as the moving
+    window, GCRA and sliding window counter strategies, are asked for that time. Otherwise, the
+    deny lasts until the reset time reported by ``get_window_stats``, which is exact for the
+    fixed window strategies. The moving window strategy can only tell when enough entries will
+    have expired with storages which implement
+    :class:`freiner.storage.MovingWindowRetryStorage`. With other storages, it reports when its
+    newest entry expires, which may be well after enough capacity has recovered. In that case,
+    ``max_ttl`` should be set to keep denies short.
+
+    Each process keeps its own cache, so hits and clears made by other processes aren't seen
+    until the cached deny expires.
+
+    :param limiter: The rate limiter to wrap.
+    :param max_keys: The maximum number of denied limits to remember. Once reached, the
+                     least recently denied limits are forgotten first.
+    :param max_ttl: The longest time to remember a denied limit for, in seconds. Defaults to no
+                    maximum, so that a limit is remembered until it resets.
+    :param clock: The clock to compare reset times against. This should be the same clock as
+                  the wrapped rate limiter's storage uses. Defaults to the system clock.
+    :raises ValueError: If ``max_keys`` is not positive.
+    """
+
+    def __init__(
+        self,
+        limiter: RateLimiter,
+        max_keys: int = 10000,
+        max_ttl: Optional[float] = None,
+        clock: Optional[Clock] = None,
+    ) -> None:
+        if max_keys < 1:
+            raise ValueError("NegativeCacheRateLimiter requires a positive max_keys.")
+
+        self.limiter: RateLimiter = limiter
+        self._max_keys = max_keys
+        self._max_ttl = max_ttl
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        # Maps each denied key to the time its deny ends and the hits it had remaining.
+        self._denied: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _is_denied(self, key: str, cost: int) -> bool:
+        with self._lock:
+            entry = self._denied.get(key)
+            if entry is None:
+                return False
+
+            until, remaining = entry
+            if until <= self._clock.now():
+                del self._denied[key]
+                return False
+            return cost > remaining
+
+    def _remember(self, item: RateLimitItem, identifiers: Tuple[Any, ...]) -> None:
+        window_stats = self.limiter.get_window_stats(item, *identifiers)
+        until = window_stats.reset_time
+        get_retry_time = getattr(self.limiter, "get_retry_time", None)
+        if get_retry_time is not None and window_stats.remaining_count < item.amount:
+            # Only requests costing more than the remaining hits are denied, and the cheapest of
+            # them is allowed first.
+            until = get_retry_time(item, *identifiers, cost=window_stats.remaining_count + 1)
+
+        now = self._clock.now()
+        if self._max_ttl is not None:
+            until = min(until, now + self._max_ttl)
+        if until <= now:
+            return
+
+        key = item.key_for(*identifiers)
+        with self._lock:
+            self._denied[key] = (until, window_stats.remaining_count)
+            self._denied.move_to_end(key)
+            while len(self._denied) > self._max_keys:
+                self._denied.popitem(last=False)
+
+    def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit and returns ``True`` if successful. If the limit is known
+        to be exceeded, no hit is made.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+        if self._is_denied(item.key_for(*identifiers), cost):
+            return False
+
+        allowed = self.limiter.hit(item, *identifiers, cost=cost)
+        if not allowed:
+            self._remember(item, identifiers)
+        return allowed
+
+    def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+        if self._is_denied(item.key_for(*identifiers), cost):
+            return False
+
+        allowed = self.limiter.test(item, *identifiers, cost=cost)
+        if not allowed:
+            self._remember(item, identifiers)
+        return allowed
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Returns the number of requests remaining within this limit, from the wrapped rate
+        limiter.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+        return self.limiter.get_window_stats(item, *identifiers)
+
+    def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero, and forgets that it was denied.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        with self._lock:
+            self._denied.pop(item.key_for(*identifiers), None)
+        self.limiter.clear(item, *identifiers)
+
+
+__all__ = [
+    "NegativeCacheRateLimiter",
+]
@@ -0,0 +1,366 @@
+import math
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, Union
+
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.limits import RateLimitItem
+from freiner.storage import (
+    FixedWindowBatchStorage,
+    FixedWindowStorage,
+    SlidingWindow,
+    SlidingWindowCounterBatchStorage,
+    SlidingWindowCounterBulkStorage,
+    SlidingWindowCounterStorage,
+)
+from freiner.util import chunked
+
+from . import WindowStats, _amount_argument
+
+
+class SlidingWindowCounterRateLimiter:
+    """
+    Reference: :ref:`sliding-window-counter`
+
+    Storages which implement :class:`freiner.storage.SlidingWindowCounterStorage` count each
+    hit with a single atomic operation. Any other
+    :class:`freiner.storage.FixedWindowStorage` is used with one counter per window. Hits are
+    then counted before the limit is checked, and rejected hits are taken off the counter again
+    straight away, so that they don't delay recovery. Until then, concurrent hits may see them.
+
+    :param storage: The storage to keep counters in.
+    :param clock: The clock to determine the current window with, for storages which don't
+                  implement :class:`freiner.storage.SlidingWindowCounterStorage`. This should
+                  be the same clock as the storage uses. Defaults to the system clock.
+    """
+
+    #: The maximum number of keys which :meth:`hit_batch` hits with a single storage operation.
+    BATCH_CHUNK_SIZE = 1000
+
+    def __init__(
+        self,
+        storage: Union[SlidingWindowCounterStorage, FixedWindowStorage],
+        clock: Optional[Clock] = None,
+    ) -> None:
+        if not isinstance(storage, (SlidingWindowCounterStorage, FixedWindowStorage)):
+            msg = f"Sliding Window Counter rate limiting is not implemented for storage of type {storage.__class__.__name__}"
+            raise TypeError(msg)
+
+        self.storage: Union[SlidingWindowCounterStorage, FixedWindowStorage] = storage
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+
+    def _window_keys(self, key: str, expiry: int, timestamp: float) -> Tuple[str, str]:
+        index = int(timestamp // expiry)
+        return f"{key}/{index - 1}", f"{key}/{index}"
+
+    def _get_window(self, key: str, expiry: int) -> SlidingWindow:
+        if isinstance(self.storage, SlidingWindowCounterStorage):
+            return self.storage.get_sliding_window(key, expiry)
+
+        timestamp = self._clock.now()
+        previous_key, current_key = self._window_keys(key, expiry, timestamp)
+        previous_count = self.storage.get(previous_key)
+        return SlidingWindow(timestamp, previous_count, self.storage.get(current_key))
+
+    @staticmethod
+    def _weighted_count(window: SlidingWindow, expiry: int) -> float:
+        now, previous_count, current_count = window
+        return previous_count * (1 - (now % expiry) / expiry) + current_count
+
+    def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit and returns ``True`` if successful.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+        allowed, _ = self._hit(item, identifiers, cost)
+        return allowed
+
+    def hit_with_stats(
+        self, item: RateLimitItem, *identifiers: Any, cost: int = 1
+    ) -> Tuple[bool, WindowStats]:
+        """
+        Creates a hit on the rate limit, and returns whether it was successful along with the
+        number of requests remaining within the limit afterwards. The counts of both windows
+        are retrieved along with the hit, so no further operations are needed.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been
+                 exceeded, along with a tuple (reset time (float), remaining (int)).
+        """
+
+        allowed, window = self._hit(item, identifiers, cost)
+        return allowed, self._window_stats(item, window)
+
+    def _hit(
+        self, item: RateLimitItem, identifiers: Sequence[Any], cost: int
+    ) -> Tuple[bool, SlidingWindow]:
+        key = item.key_for(*identifiers)
+        expiry = item.get_expiry()
+        if isinstance(self.storage, SlidingWindowCounterStorage):
+            return self.storage.acquire_sliding_window_entry(
+                key, item.amount, expiry, **_amount_argument(cost)
+            )
+
+        timestamp = self._clock.now()
+        previous_key, current_key = self._window_keys(key, expiry, timestamp)
+        # Each window's counter must outlive the following window, where it is still weighted.
+        current_count = self.storage.incr(current_key, 2 * expiry, **_amount_argument(cost))
+        window = SlidingWindow(timestamp, self.storage.get(previous_key), current_count)
+        if self._weighted_count(window, expiry) <= item.amount:
+            return True, window
+
+        # Rejected hits would otherwise be weighted into the next window too.
+        self.storage.incr(current_key, 2 * expiry, amount=-cost)
+        return False, window._replace(current_count=current_count - cost)
+
+    def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+        expiry = item.get_expiry()
+        window = self._get_window(item.key_for(*identifiers), expiry)
+        return self._weighted_count(window, expiry) + cost <= item.amount
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Returns the number of requests remaining within this limit. The reset time is the time
+        at which both counted windows will have passed, if no further hits are made.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+        window = self._get_window(item.key_for(*identifiers), item.get_expiry())
+        return self._window_stats(item, window)
+
+    def _window_stats(self, item: RateLimitItem, window: SlidingWindow) -> WindowStats:
+        expiry = item.get_expiry()
+        remaining = max(0, int(item.amount - self._weighted_count(window, expiry)))
+
+        window_start = window.now - window.now % expiry
+        if window.current_count:
+            reset = window_start + 2 * expiry
+        elif window.previous_count:
+            reset = window_start + expiry
+        else:
+            reset = window.now
+        return WindowStats(reset, remaining)
+
+    def get_retry_time(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> float:
+        """
+        Returns the time at which a hit of the given cost will next be allowed, if no further
+        hits are made. As the previous window's hits are weighted down while the current window
+        passes, this is usually well before the reset time.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: The time at which the hit will be allowed. This is the current time if it would
+                 be allowed straight away, and infinity if the cost exceeds the limit.
+        """
+
+        if cost > item.amount:
+            return math.inf
+
+        expiry = item.get_expiry()
+        now, previous_count, current_count = self._get_window(item.key_for(*identifiers), expiry)
+        window_start = now - now % expiry
+        available = item.amount - cost
+        if current_count > available:
+            # The current window's hits are only weighted down once it has become the previous
+            # window.
+            return window_start + expiry * (2 - available / current_count)
+        if previous_count > available - current_count:
+            weight = (available - current_count) / previous_count
+            return max(window_start + expiry * (1 - weight), now)
+        return now
+
+    def hit_many(
+        self, items: Sequence[RateLimitItem], *identifiers: Any, cost: int = 1
+    ) -> Tuple[bool, List[WindowStats]]:
+        """
+        Creates a hit on every one of the given rate limits, but only if none of them have been
+        exceeded.
+
+        If the storage implements :class:`freiner.storage.SlidingWindowCounterBatchStorage`,
+        this is done atomically in a single operation. Storages which implement
+        :class:`freiner.storage.FixedWindowBatchStorage` instead have the previous windows
+        retrieved in one operation and the current windows counted in another, which only
+        counts the hits if all of them are allowed. Otherwise, the limits are checked and then
+        hit one at a time, and the request is reported as unsuccessful as soon as any of the
+        hits is rejected.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if any of the rate limits
+                 had been exceeded, along with the statistics of each limit afterwards.
+        """
+
+        keys = [item.key_for(*identifiers) for item in items]
+        if isinstance(self.storage, SlidingWindowCounterBatchStorage):
+            allowed, windows = self.storage.acquire_sliding_window_entries(
+                [(key, item.amount, item.get_expiry()) for item, key in zip(items, keys)],
+                **_amount_argument(cost),
+            )
+        elif isinstance(self.storage, FixedWindowBatchStorage) and not isinstance(
+            self.storage, SlidingWindowCounterStorage
+        ):
+            allowed, windows = self._hit_fixed_windows(self.storage, items, keys, cost)
+        else:
+            allowed = self.test_many(items, *identifiers, cost=cost)
+            if allowed:
+                allowed = all(self.hit(item, *identifiers, cost=cost) for item in items)
+            windows = self._get_windows(items, keys)
+
+        return allowed, [self._window_stats(item, window) for item, window in zip(items, windows)]
+
+    def _hit_fixed_windows(
+        self,
+        storage: FixedWindowBatchStorage,
+        items: Sequence[RateLimitItem],
+        keys: Sequence[str],
+        cost: int,
+    ) -> Tuple[bool, List[SlidingWindow]]:
+        timestamp = self._clock.now()
+        window_keys = [
+            self._window_keys(key, item.get_expiry(), timestamp) for item, key in zip(items, keys)
+        ]
+        previous = storage.get_many([previous_key for previous_key, _ in window_keys])
+
+        # The previous windows are no longer counted in, so the current windows are limited to
+        # whatever their weighted counts leave over.
+        entries = []
+        for item, (_, current_key), window in zip(items, window_keys, previous):
+            expiry = item.get_expiry()
+            weighted = self._weighted_count(SlidingWindow(timestamp, window.counter, 0), expiry)
+            entries.append((current_key, math.floor(item.amount - weighted), 2 * expiry))
+        allowed, current = storage.incr_many(entries, **_amount_argument(cost))
+
+        return allowed, [
+            SlidingWindow(timestamp, previous_window.counter, current_window.counter)
+            for previous_window, current_window in zip(previous, current)
+        ]
+
+    def _get_windows(
+        self, items: Sequence[RateLimitItem], keys: Sequence[str]
+    ) -> List[SlidingWindow]:
+        if isinstance(self.storage, SlidingWindowCounterBatchStorage):
+            return self.storage.get_sliding_windows(
+                [(key, item.get_expiry()) for item, key in zip(items, keys)]
+            )
+
+        if isinstance(self.storage, FixedWindowBatchStorage) and not isinstance(
+            self.storage, SlidingWindowCounterStorage
+        ):
+            timestamp = self._clock.now()
+            window_keys = [
+                window_key
+                for item, key in zip(items, keys)
+                for window_key in self._window_keys(key, item.get_expiry(), timestamp)
+            ]
+            counters = self.storage.get_many(window_keys)
+            return [
+                SlidingWindow(timestamp, previous.counter, current.counter)
+                for previous, current in zip(counters[::2], counters[1::2])
+            ]
+
+        return [self._get_window(key, item.get_expiry()) for item, key in zip(items, keys)]
+
+    def test_many(self, items: Sequence[RateLimitItem], *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the given rate limits and returns ``True`` if a hit of the given cost would
+        currently be allowed by all of them.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if none of the rate limits would be exceeded, or ``False`` if any would.
+        """
+
+        return all(self.test(item, *identifiers, cost=cost) for item in items)
+
+    def get_window_stats_many(
+        self, items: Sequence[RateLimitItem], *identifiers: Any
+    ) -> List[WindowStats]:
+        """
+        Returns the number of requests remaining within each of the given limits. If the storage
+        implements :class:`freiner.storage.SlidingWindowCounterBatchStorage` or
+        :class:`freiner.storage.FixedWindowBatchStorage`, this is done in a single operation.
+
+        :param items: A sequence of :class:`freiner.limits.RateLimitItem` instances.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limits.
+        :return: A list of tuples (reset time (float), remaining (int)), one per limit.
+        """
+
+        windows = self._get_windows(items, [item.key_for(*identifiers) for item in items])
+        return [self._window_stats(item, window) for item, window in zip(items, windows)]
+
+    def hit_batch(
+        self, item: RateLimitItem, identifiers: Iterable[Any], *prefix: Any, cost: int = 1
+    ) -> List[bool]:
+        """
+        Creates a hit on a separate rate limit for each of the given identifiers, and returns
+        whether each hit was successful.
+
+        If the storage implements :class:`freiner.storage.SlidingWindowCounterBulkStorage`, the
+        identifiers are hit in chunks of :attr:`BATCH_CHUNK_SIZE`, with a single operation per
+        chunk. Otherwise, they are hit one at a time, with a storage operation each.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: An iterable of stringable objects, each identifying its own limit.
+        :param prefix: A variable list of stringable objects to precede each identifier with.
+        :param cost: The weight of each request, which is counted as this many hits.
+        :return: Whether the hit on each identifier's limit was successful, in the same order.
+        """
+
+        expiry = item.get_expiry()
+        key_for = item.key_builder(*prefix)
+        allowed: List[bool] = []
+        for chunk in chunked(identifiers, self.BATCH_CHUNK_SIZE):
+            if isinstance(self.storage, SlidingWindowCounterBulkStorage):
+                keys = [key_for(identifier) for identifier in chunk]
+                allowed.extend(
+                    self.storage.acquire_sliding_window_entry_bulk(
+                        keys, item.amount, expiry, **_amount_argument(cost)
+                    )
+                )
+            else:
+                allowed.extend(
+                    self.hit(item, *prefix, identifier, cost=cost) for identifier in chunk
+                )
+        return allowed
+
+    def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        key = item.key_for(*identifiers)
+        if isinstance(self.storage, SlidingWindowCounterStorage):
+            self.storage.clear(key)
+            return
+
+        for window_key in self._window_keys(key, item.get_expiry(), self._clock.now()):
+            self.storage.clear(window_key)
+
+
+__all__ = [
+    "SlidingWindowCounterRateLimiter",
+]
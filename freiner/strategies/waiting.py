@@ -0,0 +1,168 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from freiner.clock import SYSTEM_CLOCK, Clock
+from freiner.limits import RateLimitItem
+
+from . import RateLimiter, WindowStats
+
+
+def _wait_time(retry_time: float, now: float, min_wait: float) -> float:
+    # Hits retried at exactly their retry time may still be rejected due to rounding, so each
+    # wait is at least min_wait long rather than retrying straight away.
+    return max(retry_time - now, min_wait)
+
+
+class WaitingRateLimiter:
+    """
+    Wraps another rate limiter, and adds :meth:`acquire`, which waits until a hit is allowed
+    instead of failing straight away. This suits clients throttling their own outbound requests.
+
+    When a hit is rejected, the caller sleeps until it would be allowed before trying again.
+    Rate limiters which provide ``get_retry_time``, such as the moving window, GCRA and sliding
+    window counter strategies, are asked for the exact time at which enough capacity will have
+    recovered. Otherwise, the caller sleeps until the limit's reset time, at which it will have
+    recovered fully.
+
+    Callers waiting on the same limit in this process are served in the order they arrived, and
+    only the first of them reaches the storage at a time, so each admitted request usually
+    costs a single storage operation. Callers in other processes are not queued with them.
+
+    :param limiter: The rate limiter to wrap.
+    :param clock: The clock to compare reset times against. This should be the same clock as
+                  the wrapped rate limiter's storage uses. Defaults to the system clock.
+    """
+
+    #: The shortest time to sleep before trying again, in seconds.
+    MIN_WAIT = 0.001
+
+    def __init__(self, limiter: RateLimiter, clock: Optional[Clock] = None) -> None:
+        self.limiter: RateLimiter = limiter
+        self._clock: Clock = clock if clock is not None else SYSTEM_CLOCK
+        # Each key's waiters, in the order they arrived. Only the first of them is ever set.
+        self._waiters: Dict[str, Deque[threading.Event]] = {}
+        self._lock = threading.Lock()
+
+    def _try_hit(
+        self, item: RateLimitItem, identifiers: Tuple[Any, ...], cost: int
+    ) -> Optional[float]:
+        # Returns None if the hit was allowed, or otherwise the time at which it would be.
+        get_retry_time = getattr(self.limiter, "get_retry_time", None)
+        if get_retry_time is not None:
+            if self.limiter.hit(item, *identifiers, cost=cost):
+                return None
+            return get_retry_time(item, *identifiers, cost=cost)
+
+        hit_with_stats = getattr(self.limiter, "hit_with_stats", None)
+        if hit_with_stats is not None:
+            allowed, window_stats = hit_with_stats(item, *identifiers, cost=cost)
+        else:
+            allowed = self.limiter.hit(item, *identifiers, cost=cost)
+            window_stats = None
+        if allowed:
+            return None
+        if window_stats is None:
+            window_stats = self.limiter.get_window_stats(item, *identifiers)
+        return window_stats.reset_time
+
+    def acquire(
+        self, item: RateLimitItem, *identifiers: Any, cost: int = 1, timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Creates a hit on the rate limit, waiting until it is allowed if necessary.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :param timeout: The longest time to wait, in seconds. Defaults to waiting indefinitely.
+        :return: ``True`` once the hit was allowed, or ``False`` if it can't be allowed within
+                 the timeout. In that case, no time is spent waiting for a hit that would
+                 still be rejected.
+        """
+
+        if item.amount < 1 or cost > item.amount:
+            return False
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        key = item.key_for(*identifiers)
+        event = threading.Event()
+        with self._lock:
+            waiters = self._waiters.setdefault(key, deque())
+            waiters.append(event)
+            if len(waiters) == 1:
+                event.set()
+
+        try:
+            if not event.wait(None if deadline is None else max(deadline - time.monotonic(), 0)):
+                return False
+
+            while True:
+                retry_time = self._try_hit(item, identifiers, cost)
+                if retry_time is None:
+                    return True
+
+                wait = _wait_time(retry_time, self._clock.now(), self.MIN_WAIT)
+                if deadline is not None and time.monotonic() + wait > deadline:
+                    return False
+                time.sleep(wait)
+        finally:
+            with self._lock:
+                waiters.remove(event)
+                if waiters:
+                    waiters[0].set()
+                else:
+                    del self._waiters[key]
+
+    def hit(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Creates a hit on the rate limit and returns ``True`` if successful, without waiting.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the request was successful, or ``False`` if the rate limit had been exceeded.
+        """
+
+        return self.limiter.hit(item, *identifiers, cost=cost)
+
+    def test(self, item: RateLimitItem, *identifiers: Any, cost: int = 1) -> bool:
+        """
+        Checks the rate limit and returns ``True`` if a hit of the given cost would currently be
+        allowed.
+
+        :param item: A :class:`freiner.limits.RateLimitItem` instance.
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :param cost: The weight of the request, which is counted as this many hits.
+        :return: ``True`` if the rate limit would not be exceeded, or ``False`` if it would.
+        """
+
+        return self.limiter.test(item, *identifiers, cost=cost)
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: Any) -> WindowStats:
+        """
+        Returns the number of requests remaining within this limit, from the wrapped rate
+        limiter.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        :return: tuple (reset time (float), remaining (int))
+        """
+
+        return self.limiter.get_window_stats(item, *identifiers)
+
+    def clear(self, item: RateLimitItem, *identifiers: Any) -> None:
+        """
+        Resets the request counter for a given limit to zero.
+
+        :param item: a :class:`freiner.limits.RateLimitItem` instance
+        :param identifiers: A variable list of stringable objects to uniquely identify the limit.
+        """
+
+        self.limiter.clear(item, *identifiers)
+
+
+__all__ = [
+    "WaitingRateLimiter",
+]
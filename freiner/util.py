@@ -1,9 +1,13 @@
+import functools
+import itertools
 import re
-from typing import Sequence, Type, cast
+from typing import Iterable, Iterator, List, Sequence, Tuple, Type, TypeVar, cast
 
 from .limits import GRANULARITIES, RateLimitItem
 
 
+T = TypeVar("T")
+
 SEPARATORS = re.compile(r"[,;|]")
 SINGLE_EXPR = re.compile(
     r"""
@@ -21,11 +25,21 @@ EXPR = re.compile(
 )
 
 
+#: The number of distinct rate limit strings, and of distinct rate limits, to keep parsed.
+PARSE_CACHE_SIZE = 1024
+
+
 def parse_many(limit_string: str) -> Sequence[RateLimitItem]:
     """
     Parses rate limits in string notation containing multiple rate limits
     (e.g. '1/second; 5/minute').
 
+    The most recently parsed strings are cached, and equal rate limits are returned as the same
+    :class:`freiner.limits.RateLimitItem` instance, so parsing the same string repeatedly is
+    cheap.
+
+    # noqa: DAR402
+
     :param limit_string: The rate limit string. using :ref:`ratelimit-string`.
     :raises TypeError: If something other than a string was supplied.
     :raises ValueError: If the string notation is invalid.
@@ -35,6 +49,11 @@ def parse_many(limit_string: str) -> Sequence[RateLimitItem]:
     if not isinstance(limit_string, str):
         raise TypeError("Invalid rate limit string supplied.")
 
+    return _parse_many(limit_string)
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_many(limit_string: str) -> Tuple[RateLimitItem, ...]:
     if not EXPR.match(limit_string):
         raise ValueError(f"Failed to parse rate limit string: {limit_string}")
 
@@ -45,11 +64,16 @@ def parse_many(limit_string: str) -> Sequence[RateLimitItem]:
         limit_match = cast(re.Match, SINGLE_EXPR.match(limit))
         amount, multiples, granularity_string = limit_match.groups()
         granularity = granularity_from_string(granularity_string)
-        limits.append(granularity(amount, multiples))
+        limits.append(_intern(granularity, int(amount), int(multiples or 1)))
 
     return tuple(limits)
 
 
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _intern(granularity: Type[RateLimitItem], amount: int, multiples: int) -> RateLimitItem:
+    return granularity(amount, multiples)
+
+
 def parse(limit_string: str) -> RateLimitItem:
     """
     Parses a single rate limit in string notation (e.g. '1/second' or '1 per second').
@@ -72,8 +96,31 @@ def granularity_from_string(granularity_string: str) -> Type[RateLimitItem]:
     :return: A subclass of :class:`freiner.limits.RateLimitItem`.
     """
 
+    granularity = GRANULARITIES.get(granularity_string.lower())
+    if granularity is not None:
+        return granularity
+
+    # Granularities may also match other strings, by overriding check_granularity_string().
     for granularity in GRANULARITIES.values():
         if granularity.check_granularity_string(granularity_string):
             return granularity
 
     raise ValueError(f"No granularity matched for: {granularity_string}")
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """
+    Splits an iterable into lists of at most ``size`` items, without consuming more of it than
+    is needed for the next list.
+
+    :param iterable: The items to split.
+    :param size: The maximum number of items per list.
+    :return: An iterator over the lists of items.
+    """
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
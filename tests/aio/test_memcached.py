@@ -0,0 +1,76 @@
+import asyncio
+
+import pymemcache
+import pytest
+
+from freiner.aio.storage.memcached import AsyncMemcachedStorage
+from freiner.aio.strategies.fixed_window import AsyncFixedWindowRateLimiter
+from freiner.aio.strategies.fixed_window_elastic import AsyncFixedWindowElasticExpiryRateLimiter
+from freiner.errors import FreinerConfigurationError
+from freiner.keys import HashedKeyEncoder
+from freiner.limits import RateLimitItemPerMinute, RateLimitItemPerSecond
+
+
+def setup_function():
+    pymemcache.Client(("localhost", 22122)).flush_all()
+
+
+def test_from_uri_requires_one_host():
+    with pytest.raises(FreinerConfigurationError):
+        AsyncMemcachedStorage.from_uri("memcached://localhost:22122,localhost:22123")
+
+
+def test_fixed_window():
+    async def run():
+        storage = AsyncMemcachedStorage.from_uri("memcached://localhost:22122")
+        limiter = AsyncFixedWindowRateLimiter(storage)
+        limit = RateLimitItemPerMinute(10)
+
+        results = await asyncio.gather(*(limiter.hit(limit, "k") for _ in range(15)))
+        assert results.count(True) == 10
+        assert await limiter.test(limit, "k") is False
+        window_stats = await limiter.get_window_stats(limit, "k")
+        assert window_stats.remaining_count == 0
+        assert await storage.check() is True
+
+        await limiter.clear(limit, "k")
+        assert await limiter.hit(limit, "k", cost=10) is True
+
+    asyncio.run(run())
+
+
+def test_fixed_window_with_elastic_expiry():
+    async def run():
+        limiter = AsyncFixedWindowElasticExpiryRateLimiter(
+            AsyncMemcachedStorage.from_uri("memcached://localhost:22122")
+        )
+        limit = RateLimitItemPerSecond(10, 2)
+
+        assert all([await limiter.hit(limit) for _ in range(10)])
+        await asyncio.sleep(1)
+        assert await limiter.hit(limit) is False
+        await asyncio.sleep(1)
+        assert await limiter.hit(limit) is False
+
+    asyncio.run(run())
+
+
+def test_key_encoder():
+    async def run():
+        client = AsyncMemcachedStorage.from_uri("memcached://localhost:22122")._client
+        with pytest.raises(FreinerConfigurationError):
+            AsyncMemcachedStorage(client, key_encoder=HashedKeyEncoder())
+
+        storage = AsyncMemcachedStorage(client, key_encoder=HashedKeyEncoder(text=True))
+        limiter = AsyncFixedWindowRateLimiter(storage)
+        limit = RateLimitItemPerMinute(10)
+        identifier = "a" * 300
+
+        assert await limiter.hit(limit, identifier, cost=10) is True
+        assert await limiter.hit(limit, identifier) is False
+        assert (await limiter.get_window_stats(limit, identifier)).remaining_count == 0
+
+        await limiter.clear(limit, identifier)
+        assert await limiter.hit(limit, identifier) is True
+
+    asyncio.run(run())
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from freiner.aio.storage.memory import AsyncMemoryStorage
+
+from ..util import ManualClock
+
+
+@pytest.fixture
+def clock() -> ManualClock:
+    return ManualClock(1000.0)
+
+
+@pytest.fixture
+def storage(clock: ManualClock) -> AsyncMemoryStorage:
+    return AsyncMemoryStorage(clock=clock)
+
+
+def test_incr(storage: AsyncMemoryStorage, clock: ManualClock):
+    async def run():
+        assert await storage.incr("k", 10) == 1
+        assert await storage.incr("k", 10, amount=4) == 5
+        assert await storage.get("k") == 5
+        assert await storage.get_expiry("k") == 1010.0
+
+        clock.time = 1010.0
+        assert await storage.get("k") == 0
+        assert await storage.get_expiry("k") == -1
+        assert await storage.incr("k", 10) == 1
+        assert await storage.get_expiry("k") == 1020.0
+
+    asyncio.run(run())
+
+
+def test_incr_elastic_expiry(storage: AsyncMemoryStorage, clock: ManualClock):
+    async def run():
+        assert await storage.incr("k", 10, elastic_expiry=True) == 1
+        clock.time = 1009.0
+        assert await storage.incr("k", 10, elastic_expiry=True) == 2
+        assert await storage.get_expiry("k") == 1019.0
+
+        # The key's original deadline has passed, but it is kept until its extended deadline.
+        clock.time = 1015.0
+        assert await storage.incr("other", 10) == 1
+        assert await storage.get("k") == 2
+        clock.time = 1019.0
+        assert await storage.get("k") == 0
+
+    asyncio.run(run())
+
+
+def test_acquire_entry(storage: AsyncMemoryStorage, clock: ManualClock):
+    async def run():
+        assert await storage.acquire_entry("k", 5, 10, amount=3) is True
+        assert await storage.acquire_entry("k", 5, 10, no_add=True, amount=3) is False
+        assert await storage.acquire_entry("k", 5, 10, amount=2) is True
+        assert await storage.acquire_entry("k", 5, 10) is False
+        assert await storage.get_moving_window("k", 5, 10) == (1000.0, 5)
+        assert await storage.acquire_entry("k", 5, 10, amount=6) is False
+
+        clock.time = 1010.0
+        assert await storage.get_moving_window("k", 5, 10) == (1010.0, 0)
+        assert await storage.acquire_entry("k", 5, 10, amount=5) is True
+
+    asyncio.run(run())
+
+
+def test_clear(storage: AsyncMemoryStorage):
+    async def run():
+        await storage.incr("k", 10)
+        await storage.acquire_entry("k", 5, 10)
+        await storage.clear("k")
+        assert await storage.get("k") == 0
+        assert (await storage.get_moving_window("k", 5, 10)).acquired_count == 0
+        assert await storage.incr("k", 10) == 1
+
+    asyncio.run(run())
+
+
+def test_expired_keys_removed_on_write(storage: AsyncMemoryStorage, clock: ManualClock):
+    async def run():
+        for index in range(100):
+            await storage.incr(f"counter{index}", 10)
+            await storage.acquire_entry(f"window{index}", 5, 20)
+
+        clock.time = 1010.0
+        await storage.incr("new", 10)
+        assert len(storage._counters) == 1
+        assert len(storage._events) == 100
+
+        clock.time = 1030.0
+        await storage.acquire_entry("new", 5, 10)
+        assert len(storage._counters) == 0
+        assert len(storage._events) == 1
+        assert len(storage._expiry_heap) == 1
+
+    asyncio.run(run())
+
+
+def test_reset(storage: AsyncMemoryStorage):
+    async def run():
+        await storage.incr("k", 10)
+        await storage.acquire_entry("k", 5, 10)
+        assert await storage.check() is True
+        await storage.reset()
+        assert await storage.get("k") == 0
+        assert not storage._expiry_heap
+
+    asyncio.run(run())
@@ -0,0 +1,154 @@
+import asyncio
+import math
+import time
+
+import redis
+import redis.asyncio
+
+from freiner.aio.storage.redis import AsyncRedisStorage
+from freiner.aio.storage.redis_sentinel import AsyncRedisSentinelStorage
+from freiner.aio.strategies.fixed_window import AsyncFixedWindowRateLimiter
+from freiner.aio.strategies.fixed_window_elastic import AsyncFixedWindowElasticExpiryRateLimiter
+from freiner.aio.strategies.moving_window import AsyncMovingWindowRateLimiter
+from freiner.keys import HashedKeyEncoder
+from freiner.limits import RateLimitItemPerMinute, RateLimitItemPerSecond
+from freiner.storage.redis import RedisStorage
+from freiner.strategies.moving_window import MovingWindowRateLimiter
+
+
+def setup_function():
+    redis.from_url("redis://localhost:7379").flushall()
+
+
+def test_fixed_window():
+    async def run():
+        storage = AsyncRedisStorage.from_uri("redis://localhost:7379")
+        limiter = AsyncFixedWindowRateLimiter(storage)
+        limit = RateLimitItemPerMinute(10)
+
+        results = await asyncio.gather(*(limiter.hit(limit, "k") for _ in range(15)))
+        assert results.count(True) == 10
+        assert await limiter.test(limit, "k") is False
+        assert (await limiter.get_window_stats(limit, "k")).remaining_count == 0
+        assert await storage.check() is True
+
+        await limiter.clear(limit, "k")
+        assert await limiter.hit(limit, "k", cost=10) is True
+
+        await storage.reset()
+        assert await storage.get(limit.key_for("k")) == 0
+
+    asyncio.run(run())
+
+
+def test_fixed_window_with_elastic_expiry():
+    async def run():
+        limiter = AsyncFixedWindowElasticExpiryRateLimiter(
+            AsyncRedisStorage.from_uri("redis://localhost:7379")
+        )
+        limit = RateLimitItemPerSecond(10, 2)
+
+        assert all(await asyncio.gather(*(limiter.hit(limit) for _ in range(10))))
+        await asyncio.sleep(1)
+        assert await limiter.hit(limit) is False
+        await asyncio.sleep(1)
+        assert await limiter.hit(limit) is False
+
+    asyncio.run(run())
+
+
+def test_moving_window():
+    async def run():
+        storage = AsyncRedisStorage.from_uri("redis://localhost:7379")
+        limiter = AsyncMovingWindowRateLimiter(storage)
+        limit = RateLimitItemPerSecond(10, 2)
+
+        window_stats = await limiter.get_window_stats(limit)
+        assert window_stats.remaining_count == 10
+
+        results = await asyncio.gather(*(limiter.hit(limit) for _ in range(15)))
+        assert results.count(True) == 10
+        assert (await limiter.get_window_stats(limit)).remaining_count == 0
+        assert await limiter.test(limit) is False
+
+        await asyncio.sleep(2.1)
+        assert await limiter.hit(limit) is True
+
+    asyncio.run(run())
+
+
+def test_moving_window_retry_time():
+    async def run():
+        limiter = AsyncMovingWindowRateLimiter(AsyncRedisStorage.from_uri("redis://localhost:7379"))
+        limit = RateLimitItemPerMinute(2)
+
+        before = time.time()
+        assert await limiter.hit(limit) is True
+        after = time.time()
+        await asyncio.sleep(0.1)
+        assert await limiter.hit(limit) is True
+        assert before + 60 <= await limiter.get_retry_time(limit) <= after + 60
+        assert await limiter.get_retry_time(limit, cost=3) == math.inf
+
+    asyncio.run(run())
+
+
+def test_shared_with_sync_storage():
+    sync_limiter = MovingWindowRateLimiter(RedisStorage.from_uri("redis://localhost:7379"))
+    limit = RateLimitItemPerMinute(5)
+    for _ in range(3):
+        assert sync_limiter.hit(limit, "shared") is True
+
+    async def run():
+        limiter = AsyncMovingWindowRateLimiter(AsyncRedisStorage.from_uri("redis://localhost:7379"))
+        assert (await limiter.get_window_stats(limit, "shared")).remaining_count == 2
+        assert await limiter.hit(limit, "shared", cost=2) is True
+        assert await limiter.hit(limit, "shared") is False
+
+    asyncio.run(run())
+    assert sync_limiter.test(limit, "shared") is False
+
+
+def test_sentinel():
+    async def run():
+        storage = AsyncRedisSentinelStorage.from_uri(
+            "redis+sentinel://localhost:26379/localhost-redis-sentinel"
+        )
+        await storage.reset()
+        limiter = AsyncFixedWindowRateLimiter(storage)
+        limit = RateLimitItemPerSecond(10, 2)
+
+        start = time.time()
+        assert all(await asyncio.gather(*(limiter.hit(limit) for _ in range(10))))
+        assert await limiter.hit(limit) is False
+        assert await storage.check() is True
+        assert (await limiter.get_window_stats(limit)).reset_time <= start + 3
+
+    asyncio.run(run())
+
+
+def test_key_encoder_shared_with_sync_storage():
+    encoder = HashedKeyEncoder()
+    sync_limiter = MovingWindowRateLimiter(
+        RedisStorage(redis.from_url("redis://localhost:7379"), key_encoder=encoder)
+    )
+    limit = RateLimitItemPerMinute(5)
+    for _ in range(3):
+        assert sync_limiter.hit(limit, "shared") is True
+
+    async def run():
+        storage = AsyncRedisStorage(
+            redis.asyncio.from_url("redis://localhost:7379"), key_encoder=encoder
+        )
+        limiter = AsyncMovingWindowRateLimiter(storage)
+        assert (await limiter.get_window_stats(limit, "shared")).remaining_count == 2
+        assert await limiter.hit(limit, "shared", cost=2) is True
+        assert await limiter.hit(limit, "shared") is False
+
+        fixed_window = AsyncFixedWindowRateLimiter(storage)
+        assert await fixed_window.hit(limit, "shared") is True
+        assert (await fixed_window.get_window_stats(limit, "shared")).remaining_count == 4
+
+    asyncio.run(run())
+    assert sync_limiter.test(limit, "shared") is False
+    assert redis.from_url("redis://localhost:7379").exists(limit.key_for("shared")) == 0
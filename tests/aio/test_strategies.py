@@ -0,0 +1,153 @@
+import asyncio
+import math
+from unittest import mock
+
+import pytest
+
+from freiner.aio.storage import (
+    AsyncFixedWindowStorage,
+    AsyncMovingWindowRetryStorage,
+    AsyncMovingWindowStorage,
+)
+from freiner.aio.storage.memory import AsyncMemoryStorage
+from freiner.aio.strategies.fixed_window import AsyncFixedWindowRateLimiter
+from freiner.aio.strategies.fixed_window_elastic import AsyncFixedWindowElasticExpiryRateLimiter
+from freiner.aio.strategies.moving_window import AsyncMovingWindowRateLimiter
+from freiner.aio.strategies.waiting import AsyncWaitingRateLimiter
+from freiner.limits import RateLimitItemPerMinute
+from freiner.storage import MovingWindow
+from freiner.storage.memory import MemoryStorage
+
+from ..util import ManualClock
+
+
+class AsyncWrappedStorage:
+    def __init__(self) -> None:
+        self.storage = MemoryStorage()
+
+    async def incr(
+        self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1
+    ) -> int:
+        return self.storage.incr(key, expiry, elastic_expiry, amount)
+
+    async def get(self, key: str) -> int:
+        return self.storage.get(key)
+
+    async def get_expiry(self, key: str) -> float:
+        return self.storage.get_expiry(key)
+
+    async def clear(self, key: str) -> None:
+        self.storage.clear(key)
+
+    async def acquire_entry(
+        self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+    ) -> bool:
+        return self.storage.acquire_entry(key, limit, expiry, no_add, amount)
+
+    async def get_moving_window(self, key: str, limit: int, expiry: int) -> MovingWindow:
+        return self.storage.get_moving_window(key, limit, expiry)
+
+
+@pytest.fixture(params=(AsyncWrappedStorage, AsyncMemoryStorage))
+def storage(request):
+    return request.param()
+
+
+def test_storage_protocols(storage):
+    assert isinstance(storage, AsyncFixedWindowStorage)
+    assert isinstance(storage, AsyncMovingWindowStorage)
+    assert isinstance(storage, AsyncMovingWindowRetryStorage) is isinstance(
+        storage, AsyncMemoryStorage
+    )
+
+
+@pytest.mark.parametrize(
+    "limiter_cls",
+    (
+        AsyncFixedWindowRateLimiter,
+        AsyncFixedWindowElasticExpiryRateLimiter,
+        AsyncMovingWindowRateLimiter,
+    ),
+)
+def test_sync_storage_rejected(limiter_cls):
+    with pytest.raises(TypeError):
+        limiter_cls(MemoryStorage())
+
+
+@pytest.mark.parametrize(
+    "limiter_cls",
+    (
+        AsyncFixedWindowRateLimiter,
+        AsyncFixedWindowElasticExpiryRateLimiter,
+        AsyncMovingWindowRateLimiter,
+    ),
+)
+def test_limiter(storage, limiter_cls):
+    limiter = limiter_cls(storage)
+    limit = RateLimitItemPerMinute(10)
+
+    async def run():
+        assert all(await asyncio.gather(*(limiter.hit(limit, "k") for _ in range(5))))
+        assert await limiter.hit(limit, "k", cost=5) is True
+        assert await limiter.test(limit, "k") is False
+        assert await limiter.hit(limit, "k") is False
+        assert await limiter.test(limit, "other") is True
+        assert (await limiter.get_window_stats(limit, "k")).remaining_count == 0
+
+        await limiter.clear(limit, "k")
+        assert await limiter.test(limit, "k", cost=10) is True
+        assert (await limiter.get_window_stats(limit, "k")).remaining_count == 10
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("limiter_cls", (AsyncFixedWindowRateLimiter, AsyncMovingWindowRateLimiter))
+def test_waiting(limiter_cls):
+    clock = ManualClock(1000.0)
+    limiter = AsyncWaitingRateLimiter(limiter_cls(AsyncMemoryStorage(clock=clock)), clock=clock)
+    limit = RateLimitItemPerMinute(1)
+    admitted = []
+
+    async def sleep(delay: float) -> None:
+        clock.time += delay
+
+    async def acquire(name: str) -> None:
+        assert await limiter.acquire(limit, "user") is True
+        admitted.append((name, clock.time))
+
+    async def run():
+        with mock.patch("freiner.aio.strategies.waiting.asyncio.sleep", side_effect=sleep):
+            await asyncio.gather(*(acquire(name) for name in ("first", "second", "third")))
+            # Hits which couldn't be allowed in time are given up on without waiting.
+            assert await limiter.acquire(limit, "user", timeout=10) is False
+            assert await limiter.acquire(limit, "user", cost=2) is False
+
+    asyncio.run(run())
+    assert admitted == [("first", 1000.0), ("second", 1060.0), ("third", 1120.0)]
+    assert limiter._waiters == {}
+
+
+def test_moving_window_retry_time():
+    clock = ManualClock(1000.0)
+    limiter = AsyncMovingWindowRateLimiter(AsyncMemoryStorage(clock=clock))
+    waiting_limiter = AsyncWaitingRateLimiter(limiter, clock=clock)
+    limit = RateLimitItemPerMinute(2)
+
+    async def sleep(delay: float) -> None:
+        clock.time += delay
+
+    async def run():
+        assert await limiter.get_retry_time(limit) == 1000.0
+        assert await waiting_limiter.acquire(limit) is True
+        clock.time = 1050.0
+        assert await waiting_limiter.acquire(limit) is True
+        assert await limiter.get_retry_time(limit) == 1060.0
+        assert await limiter.get_retry_time(limit, cost=2) == 1110.0
+        assert await limiter.get_retry_time(limit, cost=3) == math.inf
+
+        # The wait ends once the oldest entry expires, rather than at the reset time.
+        with mock.patch("freiner.aio.strategies.waiting.asyncio.sleep", side_effect=sleep):
+            assert await waiting_limiter.acquire(limit) is True
+        assert clock.time == 1060.0
+
+    asyncio.run(run())
@@ -5,7 +5,7 @@ from uuid import uuid4
 
 import pytest
 
-from freiner.limits import RateLimitItemPerSecond
+from freiner.limits import RateLimitItemPerMinute, RateLimitItemPerSecond
 from freiner.storage.memory import MemoryStorage
 from freiner.strategies.fixed_window import FixedWindowRateLimiter
 from freiner.strategies.moving_window import MovingWindowRateLimiter
@@ -70,3 +70,28 @@ def test_memory_storage_moving_window(storage: MemoryStorage):
 
     assert time.time() - start < 1
     assert len(hits) == 100
+
+
+def test_memory_storage_fixed_window_many_keys(storage: MemoryStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    per_minute = RateLimitItemPerMinute(50)
+
+    keys = [uuid4().hex for _ in range(10)]
+    hits: List[str] = []
+    hits_lock = threading.Lock()
+
+    def hit(key: str) -> None:
+        for _ in range(100):
+            if limiter.hit(per_minute, key):
+                with hits_lock:
+                    hits.append(key)
+
+    threads = [threading.Thread(target=hit, args=(key,)) for key in keys for _ in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert all(hits.count(key) == 50 for key in keys)
@@ -215,3 +215,15 @@ def test_clear(default_client: pymemcache.Client):
 
     limiter.clear(per_min)
     assert limiter.hit(per_min) is True
+
+
+@pytest.mark.usefixtures("flush_default_host")
+def test_incr_negative_amount(default_client: pymemcache.Client):
+    storage = MemcachedStorage(default_client)
+
+    assert storage.incr("k", 10, amount=-1) == 0
+    assert storage.incr("k", 10, amount=5) == 5
+    assert storage.incr("k", 10, amount=-2) == 3
+    assert storage.incr("k", 10, elastic_expiry=True, amount=-2) == 1
+    assert storage.incr("k", 10, elastic_expiry=True, amount=-2) == 0
+    assert storage.get("k") == 0
@@ -1,13 +1,15 @@
 import time
+from pathlib import Path
 
 import pytest
 
 from freiner import RateLimitItemPerMinute, RateLimitItemPerSecond
 from freiner.storage.memory import MemoryStorage
 from freiner.strategies.fixed_window import FixedWindowRateLimiter
+from freiner.strategies.gcra import GCRARateLimiter
 from freiner.strategies.moving_window import MovingWindowRateLimiter
 
-from ..util import freeze_time
+from ..util import ManualClock, freeze_time
 
 
 @pytest.fixture
@@ -54,6 +56,105 @@ def test_moving_window_clear(storage: MemoryStorage):
         assert limiter.hit(per_min) is True
 
 
+def test_incr_many(storage: MemoryStorage):
+    with freeze_time():
+        start = time.time()
+
+        allowed, windows = storage.incr_many([("a", 2, 10), ("b", 1, 20)])
+        assert allowed is True
+        assert windows == [(1, start + 10), (1, start + 20)]
+
+        allowed, windows = storage.incr_many([("a", 2, 10), ("b", 1, 20)])
+        assert allowed is False
+        assert windows == [(1, start + 10), (1, start + 20)]
+        assert storage.get_many(["a", "b", "c"]) == [(1, start + 10), (1, start + 20), (0, -1)]
+
+
+def test_acquire_entries(storage: MemoryStorage):
+    with freeze_time():
+        start = time.time()
+
+        allowed, windows = storage.acquire_entries([("a", 2, 10), ("b", 1, 20)])
+        assert allowed is True
+        assert windows == [(start, 1), (start, 1)]
+
+        allowed, windows = storage.acquire_entries([("a", 2, 10), ("b", 1, 20)])
+        assert allowed is False
+        assert storage.get_moving_windows([("a", 2, 10), ("b", 1, 20)]) == windows
+        assert windows == [(start, 1), (start, 1)]
+
+
+def test_batch_duplicate_keys(storage: MemoryStorage):
+    with freeze_time():
+        start = time.time()
+
+        allowed, windows = storage.incr_many([("a", 1, 10), ("a", 1, 10)])
+        assert allowed is False
+        assert windows == [(0, -1), (0, -1)]
+        allowed, windows = storage.incr_many([("a", 2, 10), ("a", 2, 10)])
+        assert allowed is True
+        assert windows == [(2, start + 10), (2, start + 10)]
+
+        allowed, moving_windows = storage.acquire_entries([("b", 3, 10), ("b", 3, 10)], amount=2)
+        assert allowed is False
+        assert moving_windows == [(start, 0), (start, 0)]
+        allowed, moving_windows = storage.acquire_entries([("b", 2, 10), ("b", 2, 10)])
+        assert allowed is True
+        assert moving_windows == [(start, 2), (start, 2)]
+
+
+def test_acquire_tats(storage: MemoryStorage):
+    with freeze_time():
+        start = time.time()
+
+        allowed, states = storage.acquire_tats([("a", 2, 10), ("b", 1, 20)])
+        assert allowed is True
+        assert states == [(start, start + 5), (start, start + 20)]
+        assert storage.get_tats(["a", "b", "c"]) == [*states, (start, start)]
+
+        allowed, states = storage.acquire_tats([("a", 2, 10), ("b", 1, 20)])
+        assert allowed is False
+        assert states == [(start, start + 5), (start, start + 20)]
+
+        assert storage.acquire_tats([("c", 2, 10), ("c", 2, 10)], amount=2)[0] is False
+        assert storage.acquire_tats([("c", 0, 10)])[0] is False
+        assert storage.acquire_tats([("c", 2, 10), ("c", 2, 10)]) == (
+            True,
+            [(start, start + 10), (start, start + 10)],
+        )
+
+
+def test_incr_with_expiry(storage: MemoryStorage):
+    with freeze_time() as frozen_datetime:
+        start = time.time()
+
+        assert storage.incr_with_expiry("a", 10, amount=2) == (2, start + 10)
+        frozen_datetime.tick(5)
+        assert storage.incr_with_expiry("a", 10) == (3, start + 10)
+        assert storage.incr_with_expiry("a", 10, elastic_expiry=True) == (4, start + 15)
+
+
+def test_get_expiry_of_expired_key(storage: MemoryStorage):
+    with freeze_time() as frozen_datetime:
+        start = time.time()
+
+        storage.incr("a", 10)
+        assert storage.get_expiry("a") == start + 10
+        frozen_datetime.tick(10)
+        assert storage.get_expiry("a") == -1
+        assert storage.get_expiry("b") == -1
+
+
+def test_acquire_tat(storage: MemoryStorage):
+    with freeze_time():
+        start = time.time()
+
+        assert storage.acquire_tat("a", 2, 10) == (True, (start, start + 5))
+        assert storage.acquire_tat("a", 2, 10) == (True, (start, start + 10))
+        assert storage.acquire_tat("a", 2, 10) == (False, (start, start + 10))
+        assert storage.acquire_tat("b", 2, 10, no_add=True) == (True, (start, start))
+
+
 def test_reset(storage: MemoryStorage):
     limiter = FixedWindowRateLimiter(storage)
     with freeze_time():
@@ -83,7 +184,7 @@ def test_expiry_fixed_window(storage: MemoryStorage):
         # touch another key and yield
         assert limiter.hit(per_sec) is True
         time.sleep(0.02)
-        assert per_min.key_for() not in storage.storage
+        assert per_min.key_for() not in storage._shard_for(per_min.key_for()).counters
 
 
 def test_expiry_moving_window(storage: MemoryStorage):
@@ -100,4 +201,338 @@ def test_expiry_moving_window(storage: MemoryStorage):
             # touch another key and yield
             assert limiter.hit(per_sec) is True
             time.sleep(0.02)
-            assert storage.events[per_min.key_for()] == []
+            assert per_min.key_for() not in storage._shard_for(per_min.key_for()).events
+
+
+def test_expiry_gcra(storage: MemoryStorage):
+    limiter = GCRARateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_min = RateLimitItemPerMinute(10)
+        per_sec = RateLimitItemPerSecond(1)
+
+        for _ in range(0, 2):
+            for _ in range(0, 10):
+                assert limiter.hit(per_min) is True
+
+            frozen_datetime.tick(60)
+            # touch another key and yield
+            assert limiter.hit(per_sec) is True
+            time.sleep(0.02)
+            assert per_min.key_for() not in storage._shard_for(per_min.key_for()).tats
+
+
+def test_moving_window_retains_only_limit_entries(storage: MemoryStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_min = RateLimitItemPerMinute(3)
+
+        for _ in range(0, 3):
+            for _ in range(0, 3):
+                assert limiter.hit(per_min) is True
+            assert limiter.hit(per_min) is False
+            assert len(storage._shard_for(per_min.key_for()).events[per_min.key_for()]) == 3
+            frozen_datetime.tick(61)
+
+        start = time.time()
+        assert limiter.hit(per_min) is True
+        frozen_datetime.tick(30)
+        assert limiter.hit(per_min) is True
+        window_stats = limiter.get_window_stats(per_min)
+        assert window_stats.reset_time == start + 90
+        assert window_stats.remaining_count == 1
+
+        frozen_datetime.tick(31)
+        window_stats = limiter.get_window_stats(per_min)
+        assert window_stats.reset_time == start + 90
+        assert window_stats.remaining_count == 2
+
+
+def test_single_reaper_thread(storage: MemoryStorage):
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    moving_limiter = MovingWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_sec = RateLimitItemPerSecond(1)
+
+        for i in range(0, 100):
+            assert fixed_limiter.hit(per_sec, "fixed", i) is True
+        reaper = storage._reaper
+        assert reaper is not None
+        assert reaper.is_alive() is True
+
+        for i in range(0, 100):
+            assert moving_limiter.hit(per_sec, "moving", i) is True
+        assert storage._reaper is reaper
+        assert sum(len(shard.expiry_heap) for shard in storage._shards) == 200
+
+        frozen_datetime.tick(1)
+        # touch another key and yield
+        assert fixed_limiter.hit(per_sec, "other") is True
+        time.sleep(0.02)
+        assert sum(len(shard.expiry_heap) for shard in storage._shards) == 1
+        assert sum(len(shard.counters) for shard in storage._shards) == 1
+        assert sum(len(shard.events) for shard in storage._shards) == 0
+
+        frozen_datetime.tick(1)
+        storage._reaper_wakeup.set()
+        reaper.join(1)
+        assert reaper.is_alive() is False
+        assert storage._reaper is None
+        assert sum(len(shard.counters) for shard in storage._shards) == 0
+
+
+def test_invalid_shard_count():
+    with pytest.raises(ValueError, match="MemoryStorage requires at least one shard."):
+        MemoryStorage(shards=0)
+
+
+def test_invalid_max_keys():
+    with pytest.raises(ValueError, match="MemoryStorage requires a maximum of at least one key."):
+        MemoryStorage(max_keys=0)
+
+
+def test_keys_are_spread_across_shards():
+    storage = MemoryStorage(shards=4)
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time():
+        per_min = RateLimitItemPerMinute(1)
+
+        for i in range(0, 100):
+            assert limiter.hit(per_min, i) is True
+            assert limiter.hit(per_min, i) is False
+
+        assert all(shard.counters for shard in storage._shards)
+        assert sum(len(shard.counters) for shard in storage._shards) == 100
+
+
+def test_max_keys_evicts_least_recently_written():
+    storage = MemoryStorage(shards=1, max_keys=10)
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    moving_limiter = MovingWindowRateLimiter(storage)
+    with freeze_time():
+        per_min = RateLimitItemPerMinute(1)
+
+        for i in range(0, 10):
+            assert fixed_limiter.hit(per_min, "fixed", i) is True
+        assert storage.evictions == 0
+
+        # Writing to the oldest key makes it the most recently written.
+        assert fixed_limiter.hit(per_min, "fixed", 0) is False
+
+        for i in range(0, 5):
+            assert moving_limiter.hit(per_min, "moving", i) is True
+        assert storage.evictions == 5
+
+        shard = storage._shards[0]
+        assert len(shard.counters) == 5
+        assert len(shard.events) == 5
+        assert per_min.key_for("fixed", 0) in shard.counters
+        for i in range(1, 6):
+            assert per_min.key_for("fixed", i) not in shard.counters
+            assert fixed_limiter.test(per_min, "fixed", i) is True
+
+
+def test_max_keys_bounds_expiry_heap():
+    storage = MemoryStorage(shards=1, max_keys=10)
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time():
+        per_min = RateLimitItemPerMinute(1)
+
+        for i in range(0, 1000):
+            assert limiter.hit(per_min, i) is True
+
+        shard = storage._shards[0]
+        assert storage.evictions == 990
+        assert len(shard.counters) == 10
+        assert len(shard.scheduled) == 10
+        assert len(shard.expiry_heap) <= 2 * 10 + 64
+
+
+def test_empty_keys_are_removed(storage: MemoryStorage):
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    moving_limiter = MovingWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_min = RateLimitItemPerMinute(1)
+
+        for i in range(0, 10):
+            assert moving_limiter.test(per_min, i) is True
+            assert fixed_limiter.test(per_min, i) is True
+            assert storage.acquire_entry(per_min.key_for(i), 1, 60, no_add=True) is True
+        assert sum(len(shard.events) for shard in storage._shards) == 0
+
+        assert fixed_limiter.hit(per_min, "a") is True
+        assert moving_limiter.hit(per_min, "b") is True
+        frozen_datetime.tick(60)
+        assert fixed_limiter.test(per_min, "a") is True
+        assert sum(len(shard.counters) for shard in storage._shards) == 0
+
+        storage._reaper_wakeup.set()
+        time.sleep(0.02)
+        assert sum(len(shard.events) for shard in storage._shards) == 0
+        assert sum(len(shard.scheduled) for shard in storage._shards) == 0
+
+
+def test_snapshot_and_restore(storage: MemoryStorage, tmp_path: Path):
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    moving_limiter = MovingWindowRateLimiter(storage)
+    path = str(tmp_path / "snapshot")
+    with freeze_time() as frozen_datetime:
+        per_min = RateLimitItemPerMinute(3)
+        per_sec = RateLimitItemPerSecond(1)
+        start = time.time()
+
+        for _ in range(0, 2):
+            assert fixed_limiter.hit(per_min, "fixed") is True
+            assert moving_limiter.hit(per_min, "moving") is True
+            frozen_datetime.tick(10)
+        assert fixed_limiter.hit(per_sec, "expiring") is True
+        storage.snapshot(path)
+
+        frozen_datetime.tick(1)
+        restored = MemoryStorage()
+        assert restored.restore(path) == 2
+
+        fixed_limiter = FixedWindowRateLimiter(restored)
+        moving_limiter = MovingWindowRateLimiter(restored)
+        window_stats = fixed_limiter.get_window_stats(per_min, "fixed")
+        assert window_stats.reset_time == start + 60
+        assert window_stats.remaining_count == 1
+        window_stats = moving_limiter.get_window_stats(per_min, "moving")
+        assert window_stats.reset_time == start + 70
+        assert window_stats.remaining_count == 1
+        assert fixed_limiter.get_window_stats(per_sec, "expiring").remaining_count == 1
+
+        # Moving window entries that expired after the snapshot was taken are dropped.
+        frozen_datetime.tick(45)
+        assert restored.restore(path) == 1
+        assert moving_limiter.get_window_stats(per_min, "moving").remaining_count == 2
+
+
+def test_snapshot_and_restore_gcra(storage: MemoryStorage, tmp_path: Path):
+    path = str(tmp_path / "snapshot")
+    with freeze_time() as frozen_datetime:
+        per_min = RateLimitItemPerMinute(3)
+        per_sec = RateLimitItemPerSecond(1)
+
+        for _ in range(0, 2):
+            assert GCRARateLimiter(storage).hit(per_min) is True
+        assert GCRARateLimiter(storage).hit(per_sec) is True
+        storage.snapshot(path)
+
+        frozen_datetime.tick(1)
+        restored = MemoryStorage()
+        assert restored.restore(path) == 1
+
+        limiter = GCRARateLimiter(restored)
+        assert limiter.get_window_stats(per_min).remaining_count == 1
+        assert limiter.get_window_stats(per_sec).remaining_count == 1
+        assert limiter.hit(per_min) is True
+        assert limiter.hit(per_min) is False
+
+
+def test_restore_rebases_clock(tmp_path: Path):
+    path = str(tmp_path / "snapshot")
+    storage = MemoryStorage(clock=ManualClock(1000.0))
+    per_min = RateLimitItemPerMinute(2)
+
+    assert FixedWindowRateLimiter(storage).hit(per_min, "fixed") is True
+    assert MovingWindowRateLimiter(storage).hit(per_min, "moving") is True
+    assert GCRARateLimiter(storage).hit(per_min, "gcra") is True
+    storage.snapshot(path)
+
+    # Another process's clock has a different origin, such as a monotonic clock's.
+    restored = MemoryStorage(clock=ManualClock(5000.0))
+    assert restored.restore(path) == 3
+    window_stats = FixedWindowRateLimiter(restored).get_window_stats(per_min, "fixed")
+    assert window_stats.reset_time == pytest.approx(5060.0, abs=1)
+    window_stats = MovingWindowRateLimiter(restored).get_window_stats(per_min, "moving")
+    assert window_stats.reset_time == pytest.approx(5060.0, abs=1)
+    assert window_stats.remaining_count == 1
+    window_stats = GCRARateLimiter(restored).get_window_stats(per_min, "gcra")
+    assert window_stats.reset_time == pytest.approx(5030.0, abs=1)
+
+
+def test_restore_invalid_snapshot(storage: MemoryStorage, tmp_path: Path):
+    path = tmp_path / "snapshot"
+
+    path.write_bytes(b"FREINER")
+    with pytest.raises(ValueError, match="Not a MemoryStorage snapshot"):
+        storage.restore(str(path))
+
+    path.write_bytes(b"NOTFREINER")
+    with pytest.raises(ValueError, match="Not a MemoryStorage snapshot"):
+        storage.restore(str(path))
+
+    limiter = FixedWindowRateLimiter(storage)
+    assert limiter.hit(RateLimitItemPerMinute(1), "key") is True
+    storage.snapshot(str(path))
+    path.write_bytes(path.read_bytes()[:-4])
+    with pytest.raises(ValueError, match="Corrupt MemoryStorage snapshot"):
+        storage.restore(str(path))
+
+
+def test_periodic_snapshots(storage: MemoryStorage, tmp_path: Path):
+    limiter = FixedWindowRateLimiter(storage)
+    path = tmp_path / "snapshot"
+    per_min = RateLimitItemPerMinute(2)
+
+    assert limiter.hit(per_min) is True
+    storage.start_snapshots(str(path), 0.01)
+    try:
+        deadline = time.time() + 5
+        while not path.exists() and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        storage.stop_snapshots()
+    storage.stop_snapshots()
+
+    restored = MemoryStorage()
+    assert restored.restore(str(path)) == 1
+    assert FixedWindowRateLimiter(restored).hit(per_min) is True
+    assert FixedWindowRateLimiter(restored).hit(per_min) is False
+
+
+def test_custom_clock():
+    clock = ManualClock(1000.0)
+    storage = MemoryStorage(clock=clock)
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    moving_limiter = MovingWindowRateLimiter(storage)
+    per_min = RateLimitItemPerMinute(1)
+
+    assert fixed_limiter.hit(per_min, "fixed") is True
+    assert moving_limiter.hit(per_min, "moving") is True
+    assert fixed_limiter.hit(per_min, "fixed") is False
+    assert moving_limiter.hit(per_min, "moving") is False
+    assert fixed_limiter.get_window_stats(per_min, "fixed").reset_time == 1060.0
+    assert moving_limiter.get_window_stats(per_min, "moving").reset_time == 1060.0
+
+    clock.time += 60
+    assert fixed_limiter.hit(per_min, "fixed") is True
+    assert moving_limiter.hit(per_min, "moving") is True
+
+
+def test_leases():
+    clock = ManualClock(1000.0)
+    storage = MemoryStorage(clock=clock)
+
+    assert storage.acquire_lease("k", 2, "a", 10) is True
+    assert storage.acquire_lease("k", 2, "b", 20) is True
+    assert storage.acquire_lease("k", 2, "c", 10) is False
+    assert storage.get_lease_count("k") == 2
+
+    storage.release_lease("k", "a")
+    storage.release_lease("k", "a")
+    assert storage.get_lease_count("k") == 1
+    assert storage.acquire_lease("k", 2, "c", 10) is True
+
+    clock.time += 10
+    assert storage.get_lease_count("k") == 1
+    clock.time += 10
+    assert storage.get_lease_count("k") == 0
+    assert sum(len(shard.leases) for shard in storage._shards) == 0
+
+    assert storage.acquire_lease("k", 2, "d", 10) is True
+    storage._expire_events()
+    clock.time += 10
+    storage._expire_events()
+    assert sum(len(shard.leases) for shard in storage._shards) == 0
+    assert sum(len(shard.scheduled) for shard in storage._shards) == 0
@@ -0,0 +1,129 @@
+import multiprocessing
+import re
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from freiner import RateLimitItemPerMinute
+from freiner.errors import FreinerConfigurationError
+from freiner.storage.shared_memory import SharedMemoryStorage
+from freiner.strategies.fixed_window import FixedWindowRateLimiter
+from freiner.strategies.moving_window import MovingWindowRateLimiter
+
+from ..util import freeze_time
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> str:
+    return str(tmp_path / "freiner.shm")
+
+
+@pytest.fixture
+def storage(path: str) -> Iterator[SharedMemoryStorage]:
+    shared_storage = SharedMemoryStorage(path, slots=64, window_capacity=16, stripes=4)
+    assert shared_storage.check() is True
+    yield shared_storage
+    shared_storage.close()
+    assert shared_storage.check() is False
+
+
+def test_invalid_geometry(path: str):
+    errmsg = re.escape("Invalid shared memory geometry: 2 slots, 4 stripes, window capacity 16")
+    with pytest.raises(FreinerConfigurationError, match=errmsg):
+        SharedMemoryStorage(path, slots=2, window_capacity=16, stripes=4)
+
+
+def test_mismatched_geometry(path: str, storage: SharedMemoryStorage):
+    errmsg = re.escape(f"Shared memory file {path} was created with a different geometry")
+    with pytest.raises(FreinerConfigurationError, match=errmsg):
+        SharedMemoryStorage(path, slots=64, window_capacity=32, stripes=4)
+
+
+def test_not_a_shared_memory_file(path: str):
+    with open(path, "wb") as f:
+        f.write(b"not a freiner file" * 10)
+
+    errmsg = re.escape(f"Not a Freiner shared memory file: {path}")
+    with pytest.raises(FreinerConfigurationError, match=errmsg):
+        SharedMemoryStorage(path)
+
+
+def test_shared_between_instances(path: str, storage: SharedMemoryStorage):
+    other = SharedMemoryStorage(path, slots=64, window_capacity=16, stripes=4)
+    try:
+        limiter = FixedWindowRateLimiter(storage)
+        other_limiter = FixedWindowRateLimiter(other)
+        per_min = RateLimitItemPerMinute(2)
+
+        assert limiter.hit(per_min) is True
+        assert other_limiter.hit(per_min) is True
+        assert limiter.hit(per_min) is False
+        assert other_limiter.get_window_stats(per_min).remaining_count == 0
+
+        other.reset()
+        assert limiter.hit(per_min) is True
+    finally:
+        other.close()
+
+
+def test_window_capacity(storage: SharedMemoryStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    errmsg = re.escape("Limit of 17 exceeds the shared memory window capacity of 16")
+    with pytest.raises(ValueError, match=errmsg):
+        limiter.hit(RateLimitItemPerMinute(17))
+
+
+def test_expired_slots_are_reused(storage: SharedMemoryStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_min = RateLimitItemPerMinute(1)
+
+        for i in range(0, 64):
+            assert limiter.hit(per_min, i) is True
+
+        frozen_datetime.tick(60)
+        for i in range(64, 128):
+            assert limiter.hit(per_min, i) is True
+            assert limiter.hit(per_min, i) is False
+
+
+def test_full_table_evicts_earliest_deadline(storage: SharedMemoryStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_min = RateLimitItemPerMinute(1)
+
+        for i in range(0, 200):
+            assert limiter.hit(per_min, i) is True
+            frozen_datetime.tick(0.1)
+
+        # The most recent keys survive, since they have the latest deadlines.
+        for i in range(190, 200):
+            assert limiter.hit(per_min, i) is False
+
+
+def _hit_many(path: str, hits: "multiprocessing.Queue[int]") -> None:
+    storage = SharedMemoryStorage(path, slots=64, window_capacity=16, stripes=4)
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    moving_limiter = MovingWindowRateLimiter(storage)
+    per_min = RateLimitItemPerMinute(16)
+
+    fixed_hits = sum(fixed_limiter.hit(per_min, "fixed") for _ in range(0, 50))
+    moving_hits = sum(moving_limiter.hit(per_min, "moving") for _ in range(0, 50))
+    hits.put(fixed_hits * 1000 + moving_hits)
+    storage.close()
+
+
+def test_shared_between_processes(path: str, storage: SharedMemoryStorage):
+    context = multiprocessing.get_context("fork")
+    hits: "multiprocessing.Queue[int]" = context.Queue()
+    processes = [context.Process(target=_hit_many, args=(path, hits)) for _ in range(0, 8)]
+
+    for process in processes:
+        process.start()
+    results = [hits.get(timeout=10) for _ in processes]
+    for process in processes:
+        process.join()
+
+    assert sum(result // 1000 for result in results) == 16
+    assert sum(result % 1000 for result in results) == 16
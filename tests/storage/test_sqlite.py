@@ -0,0 +1,136 @@
+import multiprocessing
+import re
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from freiner import RateLimitItemPerDay, RateLimitItemPerMinute
+from freiner.errors import FreinerConfigurationError
+from freiner.storage.sqlite import SQLiteStorage
+from freiner.strategies.fixed_window import FixedWindowRateLimiter
+from freiner.strategies.moving_window import MovingWindowRateLimiter
+
+from ..util import freeze_time
+
+
+@pytest.fixture
+def path(tmp_path: Path) -> str:
+    return str(tmp_path / "freiner.sqlite")
+
+
+@pytest.fixture
+def storage(path: str) -> Iterator[SQLiteStorage]:
+    sqlite_storage = SQLiteStorage(path)
+    assert sqlite_storage.check() is True
+    yield sqlite_storage
+    sqlite_storage.close()
+
+
+def test_invalid_synchronous_mode(path: str):
+    errmsg = re.escape("Unknown SQLite synchronous mode: SOMETIMES")
+    with pytest.raises(FreinerConfigurationError, match=errmsg):
+        SQLiteStorage(path, synchronous="sometimes")
+
+
+def test_wal_mode(storage: SQLiteStorage):
+    connection = storage._connect()
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_survives_restart(path: str, storage: SQLiteStorage):
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    moving_limiter = MovingWindowRateLimiter(storage)
+    per_day = RateLimitItemPerDay(2)
+
+    assert fixed_limiter.hit(per_day) is True
+    assert moving_limiter.hit(per_day, "moving") is True
+    storage.close()
+    assert storage.check() is True
+    storage.close()
+
+    restarted = SQLiteStorage(path)
+    try:
+        fixed_limiter = FixedWindowRateLimiter(restarted)
+        moving_limiter = MovingWindowRateLimiter(restarted)
+
+        assert fixed_limiter.get_window_stats(per_day).remaining_count == 1
+        assert fixed_limiter.hit(per_day) is True
+        assert fixed_limiter.hit(per_day) is False
+        assert moving_limiter.hit(per_day, "moving") is True
+        assert moving_limiter.hit(per_day, "moving") is False
+    finally:
+        restarted.close()
+
+
+def test_incr_bulk(storage: SQLiteStorage):
+    with freeze_time():
+        assert storage.incr_bulk(["a", "b", "a"], 10, amount=2) == [2, 2, 4]
+        assert storage.incr_bulk(["b"], 10) == [3]
+        assert storage.get("a") == 4
+
+
+def test_reset(storage: SQLiteStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    per_min = RateLimitItemPerMinute(1)
+
+    assert limiter.hit(per_min) is True
+    assert limiter.hit(per_min) is False
+
+    storage.reset()
+    assert limiter.hit(per_min) is True
+
+
+def test_expired_rows_are_cleaned_up(path: str):
+    storage = SQLiteStorage(path, cleanup_interval=60, cleanup_batch_size=5)
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    moving_limiter = MovingWindowRateLimiter(storage)
+    connection = storage._connect()
+    try:
+        with freeze_time() as frozen_datetime:
+            per_min = RateLimitItemPerMinute(1)
+
+            for i in range(0, 10):
+                assert fixed_limiter.hit(per_min, i) is True
+                assert moving_limiter.hit(per_min, i) is True
+
+            frozen_datetime.tick(60)
+            assert fixed_limiter.hit(per_min, "other") is True
+            counters = connection.execute("SELECT COUNT(*) FROM freiner_counters").fetchone()
+            events = connection.execute("SELECT COUNT(*) FROM freiner_events").fetchone()
+            assert counters[0] == 6
+            assert events[0] == 5
+
+            # Cleanups are rate limited.
+            assert fixed_limiter.hit(per_min, "another") is True
+            counters = connection.execute("SELECT COUNT(*) FROM freiner_counters").fetchone()
+            assert counters[0] == 7
+    finally:
+        storage.close()
+
+
+def _hit_many(path: str, hits: "multiprocessing.Queue[int]") -> None:
+    storage = SQLiteStorage(path)
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    moving_limiter = MovingWindowRateLimiter(storage)
+    per_min = RateLimitItemPerMinute(20)
+
+    fixed_hits = sum(fixed_limiter.hit(per_min, "fixed") for _ in range(0, 30))
+    moving_hits = sum(moving_limiter.hit(per_min, "moving") for _ in range(0, 30))
+    hits.put(fixed_hits * 1000 + moving_hits)
+    storage.close()
+
+
+def test_shared_between_processes(path: str, storage: SQLiteStorage):
+    context = multiprocessing.get_context("fork")
+    hits: "multiprocessing.Queue[int]" = context.Queue()
+    processes = [context.Process(target=_hit_many, args=(path, hits)) for _ in range(0, 4)]
+
+    for process in processes:
+        process.start()
+    results = [hits.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+
+    assert sum(result // 1000 for result in results) == 20
+    assert sum(result % 1000 for result in results) == 20
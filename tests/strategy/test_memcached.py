@@ -5,12 +5,21 @@ import traceback
 import pymemcache
 import pytest
 
-from freiner.limits import RateLimitItemPerSecond
+from freiner.errors import FreinerConfigurationError
+from freiner.keys import HashedKeyEncoder
+from freiner.limits import RateLimitItemPerMinute, RateLimitItemPerSecond
 from freiner.storage.memcached import MemcachedStorage
+from freiner.strategies.composite import CompositeRateLimiter
+from freiner.strategies.concurrency import ConcurrencyLimiter
+from freiner.strategies.fixed_window import FixedWindowRateLimiter
 from freiner.strategies.fixed_window_elastic import FixedWindowElasticExpiryRateLimiter
+from freiner.strategies.gcra import GCRARateLimiter
 from freiner.strategies.moving_window import MovingWindowRateLimiter
+from freiner.strategies.sliding_window_counter import SlidingWindowCounterRateLimiter
 from freiner.types import Host
 
+from ..util import ManualClock
+
 
 @pytest.fixture
 def default_host() -> Host:
@@ -37,6 +46,18 @@ def flush_pooled_host(client: pymemcache.PooledClient):
     client.flush_all()
 
 
+@pytest.mark.usefixtures("flush_default_host")
+def test_fixed_window_cost(client: pymemcache.Client):
+    limiter = FixedWindowRateLimiter(MemcachedStorage(client))
+    limit = RateLimitItemPerMinute(10)
+
+    assert limiter.hit(limit, cost=4) is True
+    assert limiter.test(limit, cost=7) is False
+    assert limiter.hit(limit, cost=6) is True
+    assert limiter.get_window_stats(limit).remaining_count == 0
+    assert limiter.hit(limit) is False
+
+
 @pytest.mark.usefixtures("flush_default_host")
 def test_fixed_window_with_elastic_expiry(client: pymemcache.Client):
     storage = MemcachedStorage(client)
@@ -89,9 +110,147 @@ def test_fixed_window_with_elastic_expiry_concurrency(pooled_client: pymemcache.
     assert storage.get(limit.key_for()) == 10
 
 
+@pytest.mark.usefixtures("flush_default_host")
+def test_hit_with_stats(client: pymemcache.Client):
+    clock = ManualClock(time.time())
+    limiter = FixedWindowRateLimiter(MemcachedStorage(client, clock=clock))
+    limit = RateLimitItemPerMinute(5)
+
+    assert limiter.hit_with_stats(limit, cost=4) == (True, (clock.time + 60, 1))
+    clock.time += 10
+    assert limiter.hit_with_stats(limit, cost=2) == (False, (clock.time + 50, 0))
+
+
+@pytest.mark.usefixtures("flush_default_host")
+def test_fixed_window_hit_batch(client: pymemcache.Client):
+    storage = MemcachedStorage(client)
+    limiter = FixedWindowRateLimiter(storage)
+    limit = RateLimitItemPerMinute(2)
+
+    assert limiter.hit_batch(limit, ["a", "b", "a"], "device") == [True, True, True]
+    assert limiter.hit_batch(limit, ["a", "b", "c"], "device") == [False, True, True]
+    assert storage.get(limit.key_for("device", "b")) == 2
+    assert storage.get_expiry(limit.key_for("device", "c")) > time.time()
+
+
+@pytest.mark.usefixtures("flush_default_host")
+def test_composite(client: pymemcache.Client):
+    storage = MemcachedStorage(client)
+    limiter = CompositeRateLimiter(FixedWindowRateLimiter(storage))
+    per_user = RateLimitItemPerMinute(2)
+    per_org = RateLimitItemPerMinute(3)
+    first = [(per_user, ("user", 1)), (per_org, ("org", 1))]
+
+    assert limiter.hit(first)[0] is True
+    assert limiter.hit(first)[0] is True
+    assert limiter.hit(first)[0] is False
+    assert limiter.hit([(per_user, ("user", 2)), (per_org, ("org", 1))])[0] is True
+
+    # A rejected hit doesn't use up the organisation's quota.
+    storage.incr(per_user.key_for("user", 3), 60, amount=2)
+    allowed, stats = limiter.hit([(per_org, ("org", 2)), (per_user, ("user", 3))])
+    assert allowed is False
+    assert [window_stats.remaining_count for window_stats in stats] == [3, 0]
+
+
 @pytest.mark.usefixtures("flush_default_host")
 def test_moving_window(client: pymemcache.Client):
     storage = MemcachedStorage(client)
     with pytest.raises(TypeError):
         # Ignore the type error here because that's exactly what we're testing for.
         MovingWindowRateLimiter(storage)  # type: ignore
+
+
+@pytest.mark.usefixtures("flush_default_host")
+def test_gcra(client: pymemcache.Client):
+    storage = MemcachedStorage(client)
+    limiter = GCRARateLimiter(storage)
+    limit = RateLimitItemPerSecond(10, 2)
+
+    assert all([limiter.hit(limit) for _ in range(0, 10)]) is True
+    assert limiter.hit(limit) is False
+    assert limiter.test(limit) is False
+    assert limiter.get_window_stats(limit).remaining_count == 0
+
+    time.sleep(0.4)
+    assert limiter.get_window_stats(limit).remaining_count == 2
+    assert limiter.hit(limit) is True
+    assert limiter.hit(limit) is True
+    assert limiter.hit(limit) is False
+
+
+@pytest.mark.usefixtures("flush_default_host")
+def test_gcra_hit_many(client: pymemcache.Client):
+    limiter = GCRARateLimiter(MemcachedStorage(client))
+    per_second = RateLimitItemPerSecond(2)
+    per_minute = RateLimitItemPerMinute(1)
+
+    allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+    assert allowed is True
+    assert [window_stats.remaining_count for window_stats in stats] == [1, 0]
+    allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+    assert allowed is False
+    assert [window_stats.remaining_count for window_stats in stats] == [1, 0]
+
+
+@pytest.mark.usefixtures("flush_default_host")
+def test_sliding_window_counter(client: pymemcache.Client):
+    window_start = (int(time.time()) // 60 + 1) * 60
+    clock = ManualClock(window_start)
+    limiter = SlidingWindowCounterRateLimiter(MemcachedStorage(client, clock=clock), clock=clock)
+    limit = RateLimitItemPerMinute(10)
+
+    assert all([limiter.hit(limit) for _ in range(0, 10)]) is True
+    assert limiter.test(limit) is False
+    assert limiter.hit(limit) is False
+
+    clock.time += 75
+    assert limiter.get_window_stats(limit).remaining_count == 1
+    assert limiter.hit(limit) is True
+    assert limiter.hit(limit) is False
+
+
+@pytest.mark.usefixtures("flush_default_host")
+def test_concurrency(client: pymemcache.Client):
+    clock = ManualClock(time.time())
+    limiter = ConcurrencyLimiter(MemcachedStorage(client, clock=clock))
+    limit = RateLimitItemPerMinute(2)
+
+    first = limiter.acquire(limit)
+    assert first is not None
+    with limiter.hold(limit):
+        assert limiter.acquire(limit) is None
+        assert limiter.get_in_flight(limit) == 2
+    limiter.release(first)
+    assert limiter.get_in_flight(limit) == 0
+
+    assert limiter.acquire(limit) is not None
+    assert limiter.acquire(limit) is not None
+    assert limiter.test(limit) is False
+    clock.time += 60
+    assert limiter.get_in_flight(limit) == 0
+    assert limiter.acquire(limit) is not None
+
+
+@pytest.mark.usefixtures("flush_default_host")
+def test_key_encoder(client: pymemcache.Client):
+    with pytest.raises(FreinerConfigurationError):
+        MemcachedStorage(client, key_encoder=HashedKeyEncoder())
+
+    storage = MemcachedStorage(client, key_encoder=HashedKeyEncoder(text=True))
+    limiter = CompositeRateLimiter(FixedWindowRateLimiter(storage))
+    per_user = RateLimitItemPerMinute(2)
+    per_org = RateLimitItemPerMinute(3)
+    identifier = "a" * 300
+    first = [(per_user, (identifier,)), (per_org, ("org", 1))]
+
+    assert limiter.hit(first)[0] is True
+    assert limiter.hit(first)[0] is True
+    allowed, stats = limiter.hit(first)
+    assert allowed is False
+    assert [window_stats.remaining_count for window_stats in stats] == [0, 1]
+
+    gcra = GCRARateLimiter(storage)
+    assert gcra.hit(per_user, identifier) is True
+    assert gcra.hit(per_user, identifier) is True
+    assert gcra.hit(per_user, identifier) is False
@@ -1,14 +1,27 @@
+import datetime
+import math
+import threading
 import time
+from unittest import mock
 
 import pytest
 
+from freiner.errors import ConcurrencyLimitExceeded
 from freiner.limits import RateLimitItemPerMinute, RateLimitItemPerSecond
 from freiner.storage.memory import MemoryStorage
+from freiner.strategies.adaptive import AdaptiveRateLimiter
+from freiner.strategies.composite import CompositeRateLimiter
+from freiner.strategies.concurrency import ConcurrencyLimiter
 from freiner.strategies.fixed_window import FixedWindowRateLimiter
 from freiner.strategies.fixed_window_elastic import FixedWindowElasticExpiryRateLimiter
+from freiner.strategies.gcra import GCRARateLimiter
+from freiner.strategies.leasing import LeasingRateLimiter
 from freiner.strategies.moving_window import MovingWindowRateLimiter
+from freiner.strategies.negative_cache import NegativeCacheRateLimiter
+from freiner.strategies.sliding_window_counter import SlidingWindowCounterRateLimiter
+from freiner.strategies.waiting import WaitingRateLimiter
 
-from ..util import freeze_time
+from ..util import ManualClock, freeze_time
 
 
 @pytest.fixture
@@ -76,6 +89,68 @@ def test_fixed_window_with_elastic_expiry(storage: MemoryStorage):
         assert window_stats.remaining_count == 9
 
 
+def test_fixed_window_cost(storage: MemoryStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time():
+        limit = RateLimitItemPerMinute(10)
+
+        assert limiter.hit(limit, cost=4) is True
+        assert limiter.test(limit, cost=6) is True
+        assert limiter.test(limit, cost=7) is False
+        assert limiter.hit(limit, cost=6) is True
+        assert limiter.get_window_stats(limit).remaining_count == 0
+        assert limiter.hit(limit) is False
+
+
+@pytest.mark.parametrize(
+    "limiter_class",
+    (
+        FixedWindowRateLimiter,
+        FixedWindowElasticExpiryRateLimiter,
+        GCRARateLimiter,
+        MovingWindowRateLimiter,
+        SlidingWindowCounterRateLimiter,
+    ),
+)
+def test_hit_with_stats(storage: MemoryStorage, limiter_class):
+    limiter = limiter_class(storage)
+    with freeze_time() as frozen_datetime:
+        frozen_datetime.move_to(datetime.datetime(2022, 1, 1, 0, 0, 15))
+        limit = RateLimitItemPerMinute(5)
+
+        for remaining in (3, 1):
+            allowed, window_stats = limiter.hit_with_stats(limit, "user", cost=2)
+            assert allowed is True
+            assert window_stats == limiter.get_window_stats(limit, "user")
+            assert window_stats.remaining_count == remaining
+
+        allowed, window_stats = limiter.hit_with_stats(limit, "user", cost=2)
+        assert allowed is False
+        assert window_stats.remaining_count <= 1
+        assert window_stats == limiter.get_window_stats(limit, "user")
+
+
+@pytest.mark.parametrize(
+    "limiter_class",
+    (
+        FixedWindowRateLimiter,
+        FixedWindowElasticExpiryRateLimiter,
+        GCRARateLimiter,
+        MovingWindowRateLimiter,
+        SlidingWindowCounterRateLimiter,
+    ),
+)
+def test_hit_batch(storage: MemoryStorage, limiter_class):
+    limiter = limiter_class(storage)
+    with freeze_time():
+        limit = RateLimitItemPerMinute(2)
+
+        assert limiter.hit_batch(limit, ["a", "b", "a"], "device") == [True, True, True]
+        assert limiter.hit_batch(limit, iter(["a", "b", "c"]), "device") == [False, True, True]
+        assert limiter.get_window_stats(limit, "device", "c").remaining_count == 1
+        assert limiter.hit_batch(limit, []) == []
+
+
 def test_moving_window_simple(storage: MemoryStorage):
     limiter = MovingWindowRateLimiter(storage)
     with freeze_time():
@@ -110,3 +185,777 @@ def test_moving_window(storage: MemoryStorage):
 
         frozen_datetime.tick(30)
         assert limiter.get_window_stats(limit).remaining_count == 10
+
+
+def test_moving_window_cost(storage: MemoryStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerMinute(10)
+
+        assert limiter.hit(limit, cost=11) is False
+        assert limiter.hit(limit, cost=10) is True
+        assert limiter.test(limit) is False
+
+        frozen_datetime.tick(60)
+        assert limiter.hit(limit, cost=3) is True
+        frozen_datetime.tick(30)
+        assert limiter.test(limit, cost=8) is False
+        assert limiter.hit(limit, cost=8) is False
+        assert limiter.hit(limit, cost=7) is True
+        assert limiter.get_window_stats(limit).remaining_count == 0
+
+        frozen_datetime.tick(30)
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.remaining_count == 3
+        assert window_stats.reset_time == time.time() + 30
+
+
+def test_moving_window_retry_time(storage: MemoryStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerMinute(10)
+        start = time.time()
+
+        assert limiter.get_retry_time(limit) == start
+        assert limiter.hit(limit, cost=6) is True
+        frozen_datetime.tick(30)
+        assert limiter.hit(limit, cost=4) is True
+        # Each cost is allowed once enough of the oldest entries have expired.
+        assert limiter.get_retry_time(limit) == start + 60
+        assert limiter.get_retry_time(limit, cost=6) == start + 60
+        assert limiter.get_retry_time(limit, cost=7) == start + 90
+        assert limiter.get_retry_time(limit, cost=11) == math.inf
+
+
+def test_gcra_retry_time():
+    clock = ManualClock(1000.0)
+    limiter = GCRARateLimiter(MemoryStorage(clock=clock))
+    limit = RateLimitItemPerMinute(10)
+
+    assert limiter.get_retry_time(limit) == 1000.0
+    assert limiter.hit(limit, cost=10) is True
+    # Each hit is allowed once its emission intervals fit within the limit's period again.
+    assert limiter.get_retry_time(limit) == pytest.approx(1006.0)
+    assert limiter.get_retry_time(limit, cost=4) == pytest.approx(1024.0)
+    assert limiter.get_retry_time(limit, cost=11) == math.inf
+
+
+def test_sliding_window_counter_retry_time():
+    clock = ManualClock(1200.0)
+    limiter = SlidingWindowCounterRateLimiter(MemoryStorage(clock=clock), clock=clock)
+    limit = RateLimitItemPerMinute(10)
+
+    assert limiter.get_retry_time(limit) == 1200.0
+    assert limiter.hit(limit, cost=8) is True
+    clock.time = 1230.0
+    assert limiter.hit(limit, cost=2) is True
+    # The current window's hits are weighted down once the next window starts, well before
+    # the reset time.
+    assert limiter.get_window_stats(limit).reset_time == 1320.0
+    assert limiter.get_retry_time(limit) == pytest.approx(1266.0)
+    assert limiter.get_retry_time(limit, cost=11) == math.inf
+
+    clock.time = 1260.0
+    assert limiter.get_retry_time(limit) == pytest.approx(1266.0)
+    assert limiter.get_retry_time(limit, cost=5) == pytest.approx(1290.0)
+    clock.time = 1289.0
+    assert limiter.test(limit, cost=5) is False
+    clock.time = 1290.0
+    assert limiter.test(limit, cost=5) is True
+    assert limiter.get_retry_time(limit, cost=5) == 1290.0
+
+
+def test_fixed_window_hit_many(storage: MemoryStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_second = RateLimitItemPerSecond(2)
+        per_minute = RateLimitItemPerMinute(3)
+        start = time.time()
+
+        assert limiter.test_many([per_second, per_minute], "user") is True
+        allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+        assert allowed is True
+        assert stats == [(start + 1, 1), (start + 60, 2)]
+
+        assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+        assert limiter.test_many([per_second, per_minute], "user") is False
+        # A rejected hit must not count against any of the limits.
+        allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+        assert allowed is False
+        assert stats == [(start + 1, 0), (start + 60, 1)]
+
+        frozen_datetime.tick(1)
+        assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+        assert limiter.get_window_stats_many([per_second, per_minute], "user") == [
+            (start + 2, 1),
+            (start + 60, 0),
+        ]
+        assert limiter.hit_many([per_second, per_minute], "user")[0] is False
+        assert limiter.get_window_stats(per_second, "user").remaining_count == 1
+
+
+def test_fixed_window_hit_many_cost(storage: MemoryStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_second = RateLimitItemPerSecond(5)
+        per_minute = RateLimitItemPerMinute(8)
+
+        assert limiter.hit_many([per_second, per_minute], "user", cost=5)[0] is True
+        assert limiter.test_many([per_second, per_minute], "user") is False
+
+        frozen_datetime.tick(1)
+        assert limiter.test_many([per_second, per_minute], "user", cost=3) is True
+        assert limiter.hit_many([per_second, per_minute], "user", cost=4)[0] is False
+        allowed, stats = limiter.hit_many([per_second, per_minute], "user", cost=3)
+        assert allowed is True
+        assert [window_stats.remaining_count for window_stats in stats] == [2, 0]
+
+
+def test_moving_window_hit_many(storage: MemoryStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_second = RateLimitItemPerSecond(2)
+        per_minute = RateLimitItemPerMinute(3)
+
+        assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+        assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+        assert limiter.test_many([per_second, per_minute], "user") is False
+        allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+        assert allowed is False
+        assert [window_stats.remaining_count for window_stats in stats] == [0, 1]
+
+        frozen_datetime.tick(1)
+        allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+        assert allowed is True
+        assert stats[0] == (time.time() + 1, 1)
+        assert stats[1].remaining_count == 0
+
+        frozen_datetime.tick(1)
+        assert limiter.hit_many([per_second, per_minute], "user")[0] is False
+        stats = limiter.get_window_stats_many([per_second, per_minute], "user")
+        assert stats[0].remaining_count == 2
+
+
+def test_gcra_hit_many(storage: MemoryStorage):
+    limiter = GCRARateLimiter(storage)
+    with freeze_time():
+        per_second = RateLimitItemPerSecond(2)
+        per_minute = RateLimitItemPerMinute(1)
+
+        allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+        assert allowed is True
+        assert [window_stats.remaining_count for window_stats in stats] == [1, 0]
+        assert limiter.test_many([per_second, per_minute], "user") is False
+        assert limiter.hit_many([per_second, per_minute], "user")[0] is False
+        assert limiter.get_window_stats(per_second, "user").remaining_count == 1
+
+
+def test_gcra_hit_many_without_batch_storage(storage: MemoryStorage):
+    limiter = GCRARateLimiter(storage)
+    per_second = RateLimitItemPerSecond(2)
+    per_minute = RateLimitItemPerMinute(1)
+    with mock.patch("freiner.strategies.gcra.GCRABatchStorage", ()), mock.patch.object(
+        limiter, "hit", side_effect=[True, False]
+    ) as hit:
+        allowed, _ = limiter.hit_many([per_second, per_minute], "user")
+        assert allowed is False
+        assert hit.call_count == 2
+
+
+def test_gcra_simple(storage: MemoryStorage):
+    limiter = GCRARateLimiter(storage)
+    with freeze_time():
+        limit = RateLimitItemPerSecond(2, 1)
+
+        assert limiter.test(limit) is True
+        assert limiter.hit(limit) is True
+        assert limiter.test(limit) is True
+        assert limiter.hit(limit) is True
+        assert limiter.test(limit) is False
+        assert limiter.hit(limit) is False
+
+
+def test_gcra_zero_limit(storage: MemoryStorage):
+    limiter = GCRARateLimiter(storage)
+    with freeze_time():
+        limit = RateLimitItemPerMinute(0)
+
+        assert limiter.hit(limit, "user") is False
+        assert limiter.test(limit, "user") is False
+        assert limiter.hit_with_stats(limit, "user") == (False, (time.time(), 0))
+        assert limiter.get_window_stats(limit, "user") == (time.time(), 0)
+        assert WaitingRateLimiter(limiter).acquire(limit, "user", cost=0) is False
+
+
+def test_gcra(storage: MemoryStorage):
+    limiter = GCRARateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerSecond(10, 2)
+        start = time.time()
+
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.reset_time == pytest.approx(start)
+        assert window_stats.remaining_count == 10
+
+        # A full burst is allowed straight away.
+        for i in range(0, 10):
+            assert limiter.hit(limit) is True
+            assert limiter.get_window_stats(limit).remaining_count == 10 - (i + 1)
+        assert limiter.hit(limit) is False
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.reset_time == pytest.approx(start + 2)
+        assert window_stats.remaining_count == 0
+
+        # Capacity is then regained smoothly, one hit every 0.2 seconds.
+        frozen_datetime.tick(0.1)
+        assert limiter.hit(limit) is False
+        frozen_datetime.tick(0.1)
+        assert limiter.hit(limit) is True
+        assert limiter.hit(limit) is False
+
+        frozen_datetime.tick(1)
+        assert limiter.get_window_stats(limit).remaining_count == 5
+        assert all([limiter.hit(limit) for _ in range(0, 5)]) is True
+        assert limiter.hit(limit) is False
+
+        frozen_datetime.tick(10)
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.reset_time == pytest.approx(time.time())
+        assert window_stats.remaining_count == 10
+
+
+def test_gcra_cost(storage: MemoryStorage):
+    limiter = GCRARateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerMinute(10)
+
+        assert limiter.hit(limit, cost=11) is False
+        assert limiter.hit(limit, cost=10) is True
+        assert limiter.test(limit) is False
+
+        frozen_datetime.tick(30)
+        assert limiter.get_window_stats(limit).remaining_count == 5
+        assert limiter.test(limit, cost=6) is False
+        assert limiter.hit(limit, cost=6) is False
+        assert limiter.hit(limit, cost=5) is True
+        assert limiter.get_window_stats(limit).remaining_count == 0
+
+
+def test_cost_only_passed_when_needed(storage: MemoryStorage):
+    limit = RateLimitItemPerMinute(10)
+    with mock.patch.object(storage, "acquire_tat", wraps=storage.acquire_tat) as acquire_tat:
+        limiter = GCRARateLimiter(storage)
+        assert limiter.hit(limit) is True
+        assert limiter.test(limit) is True
+        assert limiter.hit(limit, cost=2) is True
+
+    # Storages written before hits had a cost don't accept an amount.
+    assert [call.kwargs.get("amount") for call in acquire_tat.call_args_list] == [None, None, 2]
+
+
+def test_gcra_clear(storage: MemoryStorage):
+    limiter = GCRARateLimiter(storage)
+    with freeze_time():
+        limit = RateLimitItemPerMinute(1)
+
+        assert limiter.hit(limit) is True
+        assert limiter.hit(limit) is False
+        limiter.clear(limit)
+        assert limiter.hit(limit) is True
+
+
+def test_sliding_window_counter(storage: MemoryStorage):
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerMinute(10)
+        window_start = (int(time.time()) // 60 + 1) * 60
+        frozen_datetime.move_to(
+            datetime.datetime.fromtimestamp(window_start, datetime.timezone.utc)
+        )
+
+        assert limiter.get_window_stats(limit) == (window_start, 10)
+        for i in range(0, 10):
+            assert limiter.test(limit) is True
+            assert limiter.hit(limit) is True
+            assert limiter.get_window_stats(limit).remaining_count == 10 - (i + 1)
+        assert limiter.test(limit) is False
+        assert limiter.hit(limit) is False
+        assert limiter.get_window_stats(limit).reset_time == window_start + 120
+
+        # A quarter of the way into the next window, the previous window's 10 hits (but not the
+        # rejected one) are weighted by three quarters.
+        frozen_datetime.tick(75)
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.remaining_count == 2
+        assert window_stats.reset_time == window_start + 120
+        assert limiter.hit(limit) is True
+        assert limiter.hit(limit) is True
+        assert limiter.hit(limit) is False
+
+        frozen_datetime.tick(120)
+        assert limiter.get_window_stats(limit).remaining_count == 10
+
+
+def test_sliding_window_counter_rejected_burst():
+    clock = ManualClock(6000.0)
+    limiter = SlidingWindowCounterRateLimiter(MemoryStorage(clock=clock), clock=clock)
+    limit = RateLimitItemPerMinute(10)
+
+    assert sum(limiter.hit(limit) for _ in range(0, 200)) == 10
+    allowed, window_stats = limiter.hit_with_stats(limit)
+    assert allowed is False
+    assert window_stats.remaining_count == 0
+
+    # Rejected hits aren't counted, so only the 10 allowed hits are weighted into the next
+    # window, just as with hit_many.
+    clock.time = 6065.0
+    assert limiter.hit(limit) is False
+    assert limiter.get_retry_time(limit) == pytest.approx(6066.0)
+    clock.time = 6066.0
+    assert limiter.hit(limit) is True
+
+
+def test_sliding_window_counter_hit_many(storage: MemoryStorage):
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        per_minute = RateLimitItemPerMinute(4)
+        per_hour = RateLimitItemPerMinute(5, 60)
+        window_start = (int(time.time()) // 3600 + 1) * 3600
+        frozen_datetime.move_to(
+            datetime.datetime.fromtimestamp(window_start, datetime.timezone.utc)
+        )
+
+        allowed, stats = limiter.hit_many([per_minute, per_hour], "user", cost=4)
+        assert allowed is True
+        assert [window_stats.remaining_count for window_stats in stats] == [0, 1]
+        assert limiter.test_many([per_minute, per_hour], "user") is False
+        # Rejected hits aren't counted in any of the windows.
+        assert limiter.hit_many([per_minute, per_hour], "user")[0] is False
+        assert limiter.get_window_stats_many([per_minute, per_hour], "user") == stats
+
+        # Half way into the next minute, half of the previous minute's hits are still counted.
+        frozen_datetime.tick(90)
+        allowed, stats = limiter.hit_many([per_minute, per_hour], "user")
+        assert allowed is True
+        assert [window_stats.remaining_count for window_stats in stats] == [1, 0]
+        assert limiter.hit_many([per_minute, per_hour], "user")[0] is False
+
+
+def test_sliding_window_counter_cost(storage: MemoryStorage):
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        frozen_datetime.move_to(datetime.datetime(2022, 1, 1, 0, 0, 15))
+        limit = RateLimitItemPerMinute(10)
+
+        assert limiter.hit(limit, cost=8) is True
+        assert limiter.test(limit, cost=2) is True
+        assert limiter.test(limit, cost=3) is False
+        assert limiter.hit(limit, cost=2) is True
+        assert limiter.get_window_stats(limit).remaining_count == 0
+
+        # Half way into the next window, the previous window's hits are weighted by a half.
+        frozen_datetime.tick(75)
+        assert limiter.hit(limit, cost=5) is True
+        assert limiter.hit(limit) is False
+
+
+def test_sliding_window_counter_clear(storage: MemoryStorage):
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    with freeze_time():
+        limit = RateLimitItemPerMinute(1)
+
+        assert limiter.hit(limit) is True
+        assert limiter.hit(limit) is False
+        limiter.clear(limit)
+        assert limiter.hit(limit) is True
+
+
+def test_negative_cache(storage: MemoryStorage):
+    limiter = NegativeCacheRateLimiter(FixedWindowRateLimiter(storage))
+    with freeze_time() as frozen_datetime, mock.patch.object(
+        storage, "incr", wraps=storage.incr
+    ) as incr:
+        limit = RateLimitItemPerMinute(2)
+
+        assert limiter.hit(limit, "user") is True
+        assert limiter.hit(limit, "user") is True
+        assert limiter.hit(limit, "user") is False
+        assert incr.call_count == 3
+
+        assert limiter.hit(limit, "user") is False
+        assert limiter.test(limit, "user") is False
+        assert incr.call_count == 3
+        assert limiter.hit(limit, "other") is True
+
+        frozen_datetime.tick(60)
+        assert limiter.hit(limit, "user") is True
+        assert incr.call_count == 5
+
+
+def test_negative_cache_remaining(storage: MemoryStorage):
+    limiter = NegativeCacheRateLimiter(MovingWindowRateLimiter(storage), max_ttl=10)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerMinute(3)
+
+        assert limiter.hit(limit, cost=2) is True
+        assert limiter.hit(limit, cost=2) is False
+        # Cheaper requests which may still be allowed are passed on to the storage.
+        assert limiter.hit(limit) is True
+        assert limiter.hit(limit) is False
+
+        storage.clear(limit.key_for())
+        assert limiter.hit(limit) is False
+        frozen_datetime.tick(10)
+        assert limiter.hit(limit) is True
+
+
+def test_negative_cache_moving_window():
+    clock = ManualClock(1000)
+    limiter = NegativeCacheRateLimiter(
+        MovingWindowRateLimiter(MemoryStorage(clock=clock)), clock=clock
+    )
+    limit = RateLimitItemPerMinute(2)
+
+    assert limiter.hit(limit) is True
+    clock.time = 1050
+    assert limiter.hit(limit) is True
+    assert limiter.hit(limit) is False
+
+    # The deny ends when the oldest entry expires, rather than the newest.
+    clock.time = 1059
+    assert limiter.test(limit) is False
+    clock.time = 1060
+    assert limiter.test(limit) is True
+
+
+def test_negative_cache_bounds(storage: MemoryStorage):
+    limiter = NegativeCacheRateLimiter(FixedWindowRateLimiter(storage), max_keys=2)
+    with freeze_time():
+        limit = RateLimitItemPerMinute(1)
+
+        for user in ("a", "b", "c"):
+            limiter.hit(limit, user)
+            assert limiter.hit(limit, user) is False
+        assert list(limiter._denied) == [limit.key_for("b"), limit.key_for("c")]
+
+        limiter.clear(limit, "b")
+        assert list(limiter._denied) == [limit.key_for("c")]
+        assert limiter.hit(limit, "b") is True
+
+        with pytest.raises(ValueError):
+            NegativeCacheRateLimiter(FixedWindowRateLimiter(storage), max_keys=0)
+
+
+def test_leasing(storage: MemoryStorage):
+    limiter = LeasingRateLimiter(storage, max_lease_size=10)
+    with freeze_time() as frozen_datetime, mock.patch.object(
+        storage, "incr_with_expiry", wraps=storage.incr_with_expiry
+    ) as incr_with_expiry:
+        limit = RateLimitItemPerMinute(1000)
+
+        assert all(limiter.hit(limit, "user") for _ in range(0, 100)) is True
+        # After the first hit, each lease is for the maximum of 10 hits.
+        assert incr_with_expiry.call_count == 11
+        assert storage.get(limit.key_for("user")) == 101
+        assert limiter.get_window_stats(limit, "user").remaining_count == 900
+
+        frozen_datetime.tick(60)
+        assert limiter.hit(limit, "user") is True
+        assert storage.get(limit.key_for("user")) <= 10
+
+
+def test_leasing_shared_limit(storage: MemoryStorage):
+    limiters = [LeasingRateLimiter(storage, headroom_share=0.5) for _ in range(0, 3)]
+    with freeze_time(), mock.patch.object(
+        storage, "incr_with_expiry", wraps=storage.incr_with_expiry
+    ) as incr_with_expiry:
+        limit = RateLimitItemPerMinute(50)
+
+        allowed = sum(limiters[i % 3].hit(limit) for i in range(0, 300))
+        # Hits reserved by one limiter can't be spent by another, but the limit is never exceeded.
+        assert 50 - 3 * 25 <= allowed <= 50
+        assert [limiter.test(limit) for limiter in limiters] == [False] * 3
+
+        # Once the window is exhausted, every limiter denies hits without reaching the storage.
+        call_count = incr_with_expiry.call_count
+        assert not any(limiter.hit(limit) for limiter in limiters)
+        assert incr_with_expiry.call_count == call_count
+
+        limiters[0].clear(limit)
+        assert limiters[0].hit(limit, cost=2) is True
+
+
+def test_leasing_cost(storage: MemoryStorage):
+    limiter = LeasingRateLimiter(storage)
+    with freeze_time():
+        limit = RateLimitItemPerMinute(10)
+
+        assert limiter.hit(limit, cost=4) is True
+        assert limiter.hit(limit, cost=6) is True
+        assert limiter.test(limit) is False
+        assert limiter.hit(limit) is False
+        assert limiter.get_window_stats(limit).remaining_count == 0
+
+
+def test_concurrency(storage: MemoryStorage):
+    limiter = ConcurrencyLimiter(storage)
+    limit = RateLimitItemPerMinute(2)
+
+    first = limiter.acquire(limit, "tenant")
+    second = limiter.acquire(limit, "tenant")
+    assert first is not None
+    assert second is not None
+    assert limiter.acquire(limit, "tenant") is None
+    assert limiter.test(limit, "tenant") is False
+    assert limiter.get_in_flight(limit, "tenant") == 2
+    assert limiter.test(limit, "other") is True
+
+    limiter.release(first)
+    assert limiter.get_in_flight(limit, "tenant") == 1
+    limiter.release(first)
+    assert limiter.get_in_flight(limit, "tenant") == 1
+
+    with limiter.hold(limit, "tenant") as lease:
+        assert lease.key == limit.key_for("tenant") + "/leases"
+        assert limiter.test(limit, "tenant") is False
+        with pytest.raises(ConcurrencyLimitExceeded):
+            with limiter.hold(limit, "tenant"):
+                pass
+    assert limiter.get_in_flight(limit, "tenant") == 1
+
+    limiter.clear(limit, "tenant")
+    assert limiter.get_in_flight(limit, "tenant") == 0
+
+
+def test_concurrency_lease_expiry(storage: MemoryStorage):
+    limiter = ConcurrencyLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerSecond(1, 5)
+
+        assert limiter.acquire(limit) is not None
+        assert limiter.acquire(limit) is None
+
+        frozen_datetime.tick(5)
+        assert limiter.get_in_flight(limit) == 0
+        assert limiter.acquire(limit) is not None
+
+
+def test_concurrency_separate_from_other_strategies(storage: MemoryStorage):
+    limiter = ConcurrencyLimiter(storage)
+    fixed_limiter = FixedWindowRateLimiter(storage)
+    limit = RateLimitItemPerMinute(1)
+
+    assert fixed_limiter.hit(limit) is True
+    assert limiter.acquire(limit) is not None
+    assert fixed_limiter.hit(limit) is False
+
+
+def test_adaptive(storage: MemoryStorage):
+    clock = ManualClock(1000.0)
+    limiter = AdaptiveRateLimiter(
+        FixedWindowRateLimiter(storage),
+        storage,
+        min_amount=2,
+        increase_step=3,
+        latency_threshold=0.5,
+        interval=1.0,
+        clock=clock,
+    )
+    limit = RateLimitItemPerMinute(10)
+
+    assert limiter.get_amount(limit, "backend") == 10
+    assert all(limiter.hit(limit, "backend") for _ in range(0, 4))
+
+    # Slow requests halve the amount once the interval has passed.
+    limiter.record(limit, "backend", latency=1.0)
+    clock.time += 1
+    limiter.record(limit, "backend", latency=1.0)
+    assert limiter.get_amount(limit, "backend") == 5
+    assert limiter.hit(limit, "backend") is True
+    assert limiter.hit(limit, "backend") is False
+    assert limiter.get_window_stats(limit, "backend").remaining_count == 0
+
+    # Errors keep decreasing it, down to the minimum.
+    for _ in range(0, 3):
+        clock.time += 1
+        limiter.record(limit, "backend", error=True)
+    assert limiter.get_amount(limit, "backend") == 2
+
+    # Healthy intervals increase it again, up to the item's own amount.
+    for _ in range(0, 5):
+        clock.time += 1
+        limiter.record(limit, "backend", latency=0.1)
+    assert limiter.get_amount(limit, "backend") == 10
+    assert limiter.get_amount(limit, "other") == 10
+
+    limiter.clear(limit, "backend")
+    assert limiter.test(limit, "backend", cost=10) is True
+
+
+def test_adaptive_shared_between_processes(storage: MemoryStorage):
+    clock = ManualClock(1000.0)
+    limiters = [
+        AdaptiveRateLimiter(MovingWindowRateLimiter(storage), storage, interval=1.0, clock=clock)
+        for _ in range(0, 2)
+    ]
+    limit = RateLimitItemPerMinute(10)
+
+    limiters[0].record(limit, error=True)
+    clock.time += 1
+    limiters[0].record(limit, error=True)
+    assert limiters[0].get_amount(limit) == 5
+    assert limiters[1].get_amount(limit) == 5
+    assert all(limiters[1].hit(limit) for _ in range(0, 5))
+    assert limiters[0].hit(limit) is False
+
+
+def test_adaptive_concurrent_adjustments(storage: MemoryStorage):
+    clock = ManualClock(1000.0)
+    limiters = [
+        AdaptiveRateLimiter(FixedWindowRateLimiter(storage), storage, interval=1.0, clock=clock)
+        for _ in range(0, 2)
+    ]
+    limit = RateLimitItemPerMinute(10)
+
+    limiters[0].record(limit, error=True)
+    limiters[1].record(limit)
+    clock.time += 1
+    limiters[0].record(limit, error=True)
+    assert limiters[1].get_amount(limit) == 5
+
+    # Both processes read the decreased amount before either of them increases it.
+    clock.time += 1
+    with mock.patch.object(storage, "clear", side_effect=AssertionError), mock.patch.object(
+        storage, "get", return_value=5
+    ):
+        limiters[0].record(limit)
+        limiters[1].record(limit)
+    assert AdaptiveRateLimiter(FixedWindowRateLimiter(storage), storage).get_amount(limit) == 7
+
+
+def test_adaptive_concurrent_increases_capped(storage: MemoryStorage):
+    clock = ManualClock(1000.0)
+    limiters = [
+        AdaptiveRateLimiter(
+            FixedWindowRateLimiter(storage), storage, increase_step=5, interval=1.0, clock=clock
+        )
+        for _ in range(0, 2)
+    ]
+    limit = RateLimitItemPerMinute(10)
+
+    limiters[0].record(limit, error=True)
+    limiters[1].record(limit)
+    clock.time += 1
+    limiters[0].record(limit, error=True)
+    assert limiters[1].get_amount(limit) == 5
+
+    # Both processes raise the decreased amount back to the item's own amount at once.
+    clock.time += 1
+    with mock.patch.object(storage, "get", return_value=5):
+        limiters[0].record(limit)
+        limiters[1].record(limit)
+    assert storage.get(limiters[0]._key_for(limit)) == 0
+
+    # A later decrease halves the item's own amount, rather than what the increases overshot.
+    clock.time += 1
+    limiters[0].record(limit, error=True)
+    assert AdaptiveRateLimiter(FixedWindowRateLimiter(storage), storage).get_amount(limit) == 5
+
+
+def test_adaptive_measure(storage: MemoryStorage):
+    clock = ManualClock(1000.0)
+    limiter = AdaptiveRateLimiter(FixedWindowRateLimiter(storage), storage, clock=clock)
+    limit = RateLimitItemPerMinute(10)
+
+    with limiter.measure(limit):
+        pass
+    clock.time += 1
+    with pytest.raises(RuntimeError):
+        with limiter.measure(limit):
+            raise RuntimeError()
+    assert limiter.get_amount(limit) == 5
+
+
+@pytest.mark.parametrize(
+    "limiter_cls, wait",
+    (
+        (FixedWindowRateLimiter, 60),
+        (MovingWindowRateLimiter, 60),
+        # The GCRA strategy recovers one hit per emission interval.
+        (GCRARateLimiter, 30),
+    ),
+)
+def test_waiting(storage: MemoryStorage, limiter_cls, wait):
+    limiter = WaitingRateLimiter(limiter_cls(storage))
+    with freeze_time() as frozen_datetime, mock.patch(
+        "freiner.strategies.waiting.time.sleep", side_effect=frozen_datetime.tick
+    ) as sleep:
+        limit = RateLimitItemPerMinute(2)
+
+        assert limiter.acquire(limit, "user") is True
+        assert limiter.acquire(limit, "user") is True
+        assert sleep.call_count == 0
+
+        assert limiter.acquire(limit, "user") is True
+        sleep.assert_called_once()
+        assert sleep.call_args[0][0] == pytest.approx(wait)
+
+        # Hits which couldn't be allowed in time are given up on without waiting.
+        assert limiter.acquire(limit, "user", cost=2, timeout=10) is False
+        assert limiter.acquire(limit, "user", cost=3) is False
+        assert sleep.call_count == 1
+        assert limiter.acquire(limit, "other", timeout=0) is True
+
+
+def test_waiting_fairness(storage: MemoryStorage):
+    limiter = WaitingRateLimiter(FixedWindowRateLimiter(storage))
+    limit = RateLimitItemPerSecond(1)
+    admitted = []
+
+    def acquire(name: str) -> None:
+        assert limiter.acquire(limit, timeout=5) is True
+        admitted.append(name)
+
+    assert limiter.acquire(limit) is True
+    threads = []
+    for name in ("first", "second"):
+        thread = threading.Thread(target=acquire, args=(name,))
+        thread.start()
+        threads.append(thread)
+        while len(limiter._waiters.get(limit.key_for(), ())) < len(threads):
+            time.sleep(0.01)
+
+    for thread in threads:
+        thread.join()
+    assert admitted == ["first", "second"]
+    assert limiter._waiters == {}
+
+
+@pytest.mark.parametrize("limiter_cls", (FixedWindowRateLimiter, MovingWindowRateLimiter))
+def test_composite(storage: MemoryStorage, limiter_cls):
+    limiter = CompositeRateLimiter(limiter_cls(storage))
+    per_user = RateLimitItemPerMinute(2)
+    per_org = RateLimitItemPerMinute(3)
+    first = [(per_user, ("user", 1)), (per_org, ("org", 1))]
+    second = [(per_user, ("user", 2)), (per_org, ("org", 1))]
+
+    assert limiter.hit(first)[0] is True
+    assert limiter.hit(first)[0] is True
+    # A rejected hit doesn't use up the organisation's quota.
+    allowed, stats = limiter.hit(first)
+    assert allowed is False
+    assert [window_stats.remaining_count for window_stats in stats] == [0, 1]
+
+    assert limiter.test(second) is True
+    assert limiter.hit(second)[0] is True
+    assert limiter.test(second) is False
+    stats = limiter.get_window_stats(second)
+    assert [window_stats.remaining_count for window_stats in stats] == [1, 0]
+
+    limiter.clear(second)
+    assert limiter.hit(second, cost=2)[0] is True
+
+
+def test_composite_rejects_strategy(storage: MemoryStorage):
+    with pytest.raises(TypeError):
+        CompositeRateLimiter(GCRARateLimiter(storage))  # type: ignore[arg-type]
@@ -1,12 +1,22 @@
+import math
 import time
 
 import pytest
 import redis
 
-from freiner.limits import RateLimitItemPerSecond
+from freiner.keys import HashedKeyEncoder
+from freiner.limits import RateLimitItemPerMinute, RateLimitItemPerSecond
 from freiner.storage.redis import RedisStorage
+from freiner.strategies.composite import CompositeRateLimiter
+from freiner.strategies.concurrency import ConcurrencyLimiter
+from freiner.strategies.fixed_window import FixedWindowRateLimiter
 from freiner.strategies.fixed_window_elastic import FixedWindowElasticExpiryRateLimiter
+from freiner.strategies.gcra import GCRARateLimiter
+from freiner.strategies.leasing import LeasingRateLimiter
 from freiner.strategies.moving_window import MovingWindowRateLimiter
+from freiner.strategies.sliding_window_counter import SlidingWindowCounterRateLimiter
+
+from ..util import ManualClock
 
 
 @pytest.fixture
@@ -53,3 +63,299 @@ def test_moving_window(storage: RedisStorage):
     assert limiter.hit(limit) is True
     assert limiter.hit(limit) is True
     assert limiter.get_window_stats(limit).remaining_count == 0
+
+
+def test_fixed_window_cost(storage: RedisStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    limit = RateLimitItemPerMinute(10)
+
+    assert limiter.hit(limit, cost=4) is True
+    assert limiter.test(limit, cost=7) is False
+    assert limiter.hit(limit, cost=6) is True
+    assert limiter.get_window_stats(limit).remaining_count == 0
+    assert limiter.hit(limit) is False
+
+
+def test_moving_window_cost(storage: RedisStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    limit = RateLimitItemPerSecond(10)
+
+    assert limiter.hit(limit, cost=11) is False
+    assert limiter.hit(limit, cost=4) is True
+    assert limiter.test(limit, cost=7) is False
+    assert limiter.hit(limit, cost=7) is False
+    assert limiter.hit(limit, cost=6) is True
+    assert limiter.get_window_stats(limit).remaining_count == 0
+
+    time.sleep(1)
+    assert limiter.hit(limit, cost=10) is True
+
+
+def test_fixed_window_hit_many(storage: RedisStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    per_second = RateLimitItemPerSecond(2)
+    per_minute = RateLimitItemPerMinute(3)
+
+    assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+    assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+    allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+    assert allowed is False
+    assert [window_stats.remaining_count for window_stats in stats] == [0, 1]
+
+    time.sleep(1)
+    assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+    assert limiter.test_many([per_second, per_minute], "user") is False
+
+
+def test_moving_window_hit_many(storage: RedisStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    per_second = RateLimitItemPerSecond(2)
+    per_minute = RateLimitItemPerMinute(3)
+
+    assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+    assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+    allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+    assert allowed is False
+    assert [window_stats.remaining_count for window_stats in stats] == [0, 1]
+
+    time.sleep(1)
+    assert limiter.hit_many([per_second, per_minute], "user")[0] is True
+    assert limiter.get_window_stats_many([per_second, per_minute], "user")[1].remaining_count == 0
+
+
+def test_gcra_hit_many(storage: RedisStorage):
+    limiter = GCRARateLimiter(storage)
+    per_second = RateLimitItemPerSecond(2)
+    per_minute = RateLimitItemPerMinute(1)
+
+    allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+    assert allowed is True
+    assert [window_stats.remaining_count for window_stats in stats] == [1, 0]
+    allowed, stats = limiter.hit_many([per_second, per_minute], "user")
+    assert allowed is False
+    assert [window_stats.remaining_count for window_stats in stats] == [1, 0]
+    assert limiter.get_window_stats_many([per_second, per_minute], "user") == stats
+
+
+def test_sliding_window_counter_hit_many(storage: RedisStorage):
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    per_minute = RateLimitItemPerMinute(4)
+    per_hour = RateLimitItemPerMinute(3, 60)
+
+    assert limiter.hit_many([per_minute, per_hour], "user", cost=2)[0] is True
+    assert limiter.hit_many([per_minute, per_hour], "user", cost=2)[0] is False
+    stats = limiter.get_window_stats_many([per_minute, per_hour], "user")
+    assert [window_stats.remaining_count for window_stats in stats] == [2, 1]
+    assert limiter.hit_many([per_minute, per_hour], "user")[0] is True
+
+
+def test_moving_window_retry_time(storage: RedisStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    limit = RateLimitItemPerMinute(2)
+
+    before = time.time()
+    assert limiter.hit(limit) is True
+    after = time.time()
+    time.sleep(0.1)
+    assert limiter.hit(limit) is True
+    assert before + 60 <= limiter.get_retry_time(limit) <= after + 60
+    assert limiter.get_retry_time(limit, cost=3) == math.inf
+
+
+def test_batch_duplicate_keys(storage: RedisStorage):
+    assert storage.incr_many([("a", 1, 10), ("a", 1, 10)])[0] is False
+    allowed, windows = storage.incr_many([("a", 2, 10), ("a", 2, 10)])
+    assert allowed is True
+    assert [window.counter for window in windows] == [2, 2]
+
+    assert storage.acquire_entries([("b", 3, 10), ("b", 3, 10)], amount=2)[0] is False
+    allowed, moving_windows = storage.acquire_entries([("b", 2, 10), ("b", 2, 10)])
+    assert allowed is True
+    assert [window.acquired_count for window in moving_windows] == [2, 2]
+
+
+@pytest.mark.parametrize("limiter_cls", (FixedWindowRateLimiter, MovingWindowRateLimiter))
+def test_composite(storage: RedisStorage, limiter_cls):
+    limiter = CompositeRateLimiter(limiter_cls(storage))
+    per_user = RateLimitItemPerMinute(2)
+    per_org = RateLimitItemPerMinute(3)
+    first = [(per_user, ("user", 1)), (per_org, ("org", 1))]
+
+    assert limiter.hit(first)[0] is True
+    assert limiter.hit(first)[0] is True
+    allowed, stats = limiter.hit(first)
+    assert allowed is False
+    assert [window_stats.remaining_count for window_stats in stats] == [0, 1]
+    assert limiter.hit([(per_user, ("user", 2)), (per_org, ("org", 1))])[0] is True
+
+
+@pytest.mark.parametrize(
+    "limiter_class",
+    (
+        FixedWindowRateLimiter,
+        FixedWindowElasticExpiryRateLimiter,
+        GCRARateLimiter,
+        MovingWindowRateLimiter,
+        SlidingWindowCounterRateLimiter,
+    ),
+)
+def test_hit_with_stats(client: redis.Redis, limiter_class):
+    clock = ManualClock(time.time())
+    limiter = limiter_class(RedisStorage(client, clock=clock))
+    limit = RateLimitItemPerMinute(5)
+
+    for remaining in (3, 1):
+        allowed, window_stats = limiter.hit_with_stats(limit, "user", cost=2)
+        assert allowed is True
+        assert window_stats.remaining_count == remaining
+
+    allowed, window_stats = limiter.hit_with_stats(limit, "user", cost=2)
+    assert allowed is False
+    assert window_stats.remaining_count == limiter.get_window_stats(limit, "user").remaining_count
+
+
+@pytest.mark.parametrize(
+    "limiter_class", (FixedWindowRateLimiter, FixedWindowElasticExpiryRateLimiter)
+)
+def test_fixed_window_hit_batch(storage: RedisStorage, limiter_class):
+    limiter = limiter_class(storage)
+    limiter.BATCH_CHUNK_SIZE = 2
+    limit = RateLimitItemPerMinute(2)
+
+    assert limiter.hit_batch(limit, ["a", "b", "a", "c", "a"]) == [True, True, True, True, False]
+    assert [limiter.get_window_stats(limit, key).remaining_count for key in "abc"] == [0, 1, 1]
+    assert 0 < storage.get_expiry(limit.key_for("b")) - time.time() <= 60
+
+
+@pytest.mark.parametrize(
+    "limiter_class",
+    (MovingWindowRateLimiter, GCRARateLimiter, SlidingWindowCounterRateLimiter),
+)
+def test_hit_batch(storage: RedisStorage, limiter_class):
+    limiter = limiter_class(storage)
+    limiter.BATCH_CHUNK_SIZE = 2
+    limit = RateLimitItemPerMinute(2)
+
+    assert limiter.hit_batch(limit, ["a", "b", "a", "c", "a"]) == [True, True, True, True, False]
+    assert [limiter.get_window_stats(limit, key).remaining_count for key in "abc"] == [0, 1, 1]
+    assert limiter.hit_batch(limit, ["b", "c"], cost=2) == [False, False]
+
+
+def test_leasing(storage: RedisStorage):
+    limiters = [LeasingRateLimiter(storage, headroom_share=0.5) for _ in range(0, 2)]
+    limit = RateLimitItemPerMinute(20)
+
+    allowed = sum(limiters[i % 2].hit(limit) for i in range(0, 100))
+    assert 0 < allowed <= 20
+    assert storage.get(limit.key_for()) >= 20
+    assert not any(limiter.hit(limit) for limiter in limiters)
+
+
+def test_gcra(storage: RedisStorage):
+    limiter = GCRARateLimiter(storage)
+    limit = RateLimitItemPerSecond(10, 2)
+
+    assert all([limiter.hit(limit) for _ in range(0, 10)]) is True
+    assert limiter.hit(limit) is False
+    assert limiter.test(limit) is False
+    assert limiter.get_window_stats(limit).remaining_count == 0
+
+    time.sleep(0.4)
+    assert limiter.get_window_stats(limit).remaining_count == 2
+    assert limiter.hit(limit) is True
+    assert limiter.hit(limit) is True
+    assert limiter.hit(limit) is False
+
+    time.sleep(2)
+    assert limiter.get_window_stats(limit).remaining_count == 10
+
+
+def test_sliding_window_counter(client: redis.Redis):
+    window_start = (int(time.time()) // 60 + 1) * 60
+    clock = ManualClock(window_start)
+    limiter = SlidingWindowCounterRateLimiter(RedisStorage(client, clock=clock))
+    limit = RateLimitItemPerMinute(10)
+
+    assert all([limiter.hit(limit) for _ in range(0, 10)]) is True
+    assert limiter.test(limit) is False
+    assert limiter.hit(limit) is False
+    window_stats = limiter.get_window_stats(limit)
+    assert window_stats.reset_time == window_start + 120
+    assert window_stats.remaining_count == 0
+
+    # Rejected hits aren't counted, so a quarter of the way into the next window the previous
+    # window's 10 hits are weighted by three quarters.
+    clock.time += 75
+    assert limiter.get_window_stats(limit).remaining_count == 2
+    assert limiter.hit(limit) is True
+    assert limiter.hit(limit) is True
+    assert limiter.hit(limit) is False
+
+    limiter.clear(limit)
+    assert limiter.get_window_stats(limit).remaining_count == 10
+
+
+def test_concurrency(storage: RedisStorage):
+    limiter = ConcurrencyLimiter(storage)
+    limit = RateLimitItemPerSecond(2, 1)
+
+    first = limiter.acquire(limit)
+    assert first is not None
+    with limiter.hold(limit):
+        assert limiter.acquire(limit) is None
+        assert limiter.get_in_flight(limit) == 2
+    limiter.release(first)
+    assert limiter.get_in_flight(limit) == 0
+
+    assert limiter.acquire(limit) is not None
+    assert limiter.acquire(limit) is not None
+    assert limiter.test(limit) is False
+    time.sleep(1.1)
+    assert limiter.get_in_flight(limit) == 0
+    assert limiter.acquire(limit) is not None
+
+
+@pytest.mark.parametrize(
+    "limiter_class",
+    (
+        FixedWindowRateLimiter,
+        FixedWindowElasticExpiryRateLimiter,
+        MovingWindowRateLimiter,
+        SlidingWindowCounterRateLimiter,
+        GCRARateLimiter,
+    ),
+)
+def test_key_encoder(client: redis.Redis, limiter_class):
+    encoder = HashedKeyEncoder()
+    limiter = limiter_class(RedisStorage(client, key_encoder=encoder))
+    limit = RateLimitItemPerMinute(2)
+    identifier = "a" * 200
+
+    assert limiter.hit(limit, identifier) is True
+    assert limiter.hit(limit, identifier) is True
+    assert limiter.hit(limit, identifier) is False
+    assert limiter.get_window_stats(limit, identifier).remaining_count == 0
+    assert limiter.hit(limit, "b" * 200) is True
+    assert all(len(key) == len(b"LIMITER/") + 16 for key in client.keys("*"))
+
+    limiter.clear(limit, identifier)
+    assert limiter.hit(limit, identifier) is True
+
+
+@pytest.mark.parametrize("limiter_cls", (FixedWindowRateLimiter, MovingWindowRateLimiter))
+def test_key_encoder_hit_many(client: redis.Redis, limiter_cls):
+    storage = RedisStorage(client, key_encoder=HashedKeyEncoder())
+    limiter = CompositeRateLimiter(limiter_cls(storage))
+    per_user = RateLimitItemPerMinute(2)
+    per_org = RateLimitItemPerMinute(3)
+    first = [(per_user, ("{org-1}", "user-1")), (per_org, ("{org-1}",))]
+
+    assert limiter.hit(first)[0] is True
+    assert limiter.hit(first)[0] is True
+    allowed, stats = limiter.hit(first)
+    assert allowed is False
+    assert [window_stats.remaining_count for window_stats in stats] == [0, 1]
+    assert all(key.startswith(b"LIMITER/{org-1}/") for key in client.keys("*"))
+
+    storage.reset()
+    assert client.keys("*") == []
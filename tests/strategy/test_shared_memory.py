@@ -0,0 +1,165 @@
+import math
+import time
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from freiner.limits import RateLimitItemPerMinute, RateLimitItemPerSecond
+from freiner.storage.shared_memory import SharedMemoryStorage
+from freiner.strategies.fixed_window import FixedWindowRateLimiter
+from freiner.strategies.fixed_window_elastic import FixedWindowElasticExpiryRateLimiter
+from freiner.strategies.moving_window import MovingWindowRateLimiter
+
+from ..util import freeze_time
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> Iterator[SharedMemoryStorage]:
+    shared_storage = SharedMemoryStorage(str(tmp_path / "freiner.shm"), slots=256, stripes=4)
+    yield shared_storage
+    shared_storage.close()
+
+
+def test_fixed_window(storage: SharedMemoryStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerSecond(10, 2)
+        start = time.time()
+
+        assert all([limiter.hit(limit) for _ in range(0, 10)]) is True
+        assert limiter.hit(limit) is False
+
+        frozen_datetime.tick(1)
+        assert limiter.hit(limit) is False
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.reset_time == start + 2
+        assert window_stats.remaining_count == 0
+
+        frozen_datetime.tick(1)
+        assert limiter.get_window_stats(limit).remaining_count == 10
+        assert limiter.hit(limit) is True
+
+
+def test_fixed_window_cost(storage: SharedMemoryStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time():
+        limit = RateLimitItemPerMinute(10)
+
+        assert limiter.hit(limit, cost=4) is True
+        assert limiter.test(limit, cost=6) is True
+        assert limiter.test(limit, cost=7) is False
+        assert limiter.hit(limit, cost=6) is True
+        assert limiter.get_window_stats(limit).remaining_count == 0
+        assert limiter.hit(limit) is False
+
+
+def test_fixed_window_clear(storage: SharedMemoryStorage):
+    limiter = FixedWindowRateLimiter(storage)
+    with freeze_time():
+        per_min = RateLimitItemPerMinute(1)
+
+        assert limiter.hit(per_min) is True
+        assert limiter.hit(per_min) is False
+
+        limiter.clear(per_min)
+        assert limiter.hit(per_min) is True
+
+
+def test_fixed_window_with_elastic_expiry(storage: SharedMemoryStorage):
+    limiter = FixedWindowElasticExpiryRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerSecond(10, 2)
+        start = time.time()
+
+        assert all([limiter.hit(limit) for _ in range(0, 10)]) is True
+        assert limiter.hit(limit) is False
+
+        frozen_datetime.tick(1)
+        assert limiter.hit(limit) is False
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.reset_time == start + 3
+        assert window_stats.remaining_count == 0
+
+        frozen_datetime.tick(3)
+        start = time.time()
+        assert limiter.hit(limit) is True
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.reset_time == start + 2
+        assert window_stats.remaining_count == 9
+
+
+def test_moving_window(storage: SharedMemoryStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerMinute(10)
+
+        for i in range(0, 5):
+            assert limiter.hit(limit) is True
+            assert limiter.hit(limit) is True
+            assert limiter.get_window_stats(limit).remaining_count == 10 - ((i + 1) * 2)
+            frozen_datetime.tick(10)
+
+        assert limiter.get_window_stats(limit).remaining_count == 0
+        assert limiter.hit(limit) is False
+
+        frozen_datetime.tick(20)
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.reset_time == time.time() + 30
+        assert window_stats.remaining_count == 4
+
+        frozen_datetime.tick(30)
+        assert limiter.get_window_stats(limit).remaining_count == 10
+
+
+def test_moving_window_retry_time(storage: SharedMemoryStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerMinute(10)
+        start = time.time()
+
+        assert limiter.get_retry_time(limit) == start
+        assert limiter.hit(limit, cost=6) is True
+        frozen_datetime.tick(30)
+        assert limiter.hit(limit, cost=4) is True
+        # Each cost is allowed once enough of the oldest entries have expired.
+        assert limiter.get_retry_time(limit) == start + 60
+        assert limiter.get_retry_time(limit, cost=6) == start + 60
+        assert limiter.get_retry_time(limit, cost=7) == start + 90
+        assert limiter.get_retry_time(limit, cost=11) == math.inf
+
+
+def test_moving_window_cost(storage: SharedMemoryStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    with freeze_time() as frozen_datetime:
+        limit = RateLimitItemPerMinute(10)
+
+        assert limiter.hit(limit, cost=11) is False
+        assert limiter.hit(limit, cost=10) is True
+        assert limiter.test(limit) is False
+
+        frozen_datetime.tick(60)
+        assert limiter.hit(limit, cost=3) is True
+        frozen_datetime.tick(30)
+        assert limiter.test(limit, cost=8) is False
+        assert limiter.hit(limit, cost=8) is False
+        assert limiter.hit(limit, cost=7) is True
+        assert limiter.get_window_stats(limit).remaining_count == 0
+
+        frozen_datetime.tick(30)
+        window_stats = limiter.get_window_stats(limit)
+        assert window_stats.remaining_count == 3
+        assert window_stats.reset_time == time.time() + 30
+
+
+def test_moving_window_clear(storage: SharedMemoryStorage):
+    limiter = MovingWindowRateLimiter(storage)
+    with freeze_time():
+        per_min = RateLimitItemPerMinute(1)
+
+        assert limiter.test(per_min) is True
+        assert limiter.hit(per_min) is True
+        assert limiter.hit(per_min) is False
+
+        limiter.clear(per_min)
+        assert limiter.hit(per_min) is True
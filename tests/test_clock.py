@@ -0,0 +1,79 @@
+import os
+import time
+
+import pytest
+
+from freiner.clock import Clock, CoarseClock, MonotonicClock, SystemClock
+
+from .util import ManualClock, freeze_time
+
+
+def test_clocks_implement_protocol():
+    assert isinstance(SystemClock(), Clock)
+    assert isinstance(MonotonicClock(), Clock)
+    clock = CoarseClock()
+    try:
+        assert isinstance(clock, Clock)
+    finally:
+        clock.stop()
+
+
+def test_system_clock():
+    with freeze_time() as frozen_datetime:
+        clock = SystemClock()
+        start = time.time()
+        assert clock.now() == start
+        frozen_datetime.tick(5)
+        assert clock.now() == start + 5
+
+
+def test_monotonic_clock_ignores_wall_clock_changes(monkeypatch: pytest.MonkeyPatch):
+    clock = MonotonicClock()
+    assert abs(clock.now() - time.time()) < 1
+
+    before = clock.now()
+    monkeypatch.setattr(time, "time", lambda: 0.0)
+    assert clock.now() >= before
+
+
+def test_coarse_clock():
+    source = ManualClock(100.0)
+    clock = CoarseClock(resolution=0.01, source=source)
+    try:
+        assert clock.now() == 100.0
+
+        source.time = 200.0
+        deadline = time.time() + 5
+        while clock.now() != 200.0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert clock.now() == 200.0
+    finally:
+        clock.stop()
+
+    source.time = 300.0
+    time.sleep(0.05)
+    assert clock.now() == 200.0
+
+
+def test_coarse_clock_invalid_resolution():
+    with pytest.raises(ValueError, match="positive resolution"):
+        CoarseClock(resolution=0)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+def test_coarse_clock_keeps_ticking_after_fork():
+    source = ManualClock(100.0)
+    clock = CoarseClock(resolution=0.01, source=source)
+    try:
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            source.time = 200.0
+            deadline = time.time() + 5
+            while clock.now() != 200.0 and time.time() < deadline:
+                time.sleep(0.01)
+            os._exit(0 if clock.now() == 200.0 else 1)
+
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+    finally:
+        clock.stop()
@@ -0,0 +1,54 @@
+import pytest
+
+from freiner.keys import HashedKeyEncoder, hash_tag
+from freiner.limits import RateLimitItemPerMinute
+
+
+def test_hash_tag():
+    assert hash_tag(b"LIMITER/{org-1}/user/10/1/minute") == b"org-1"
+    assert hash_tag(b"LIMITER/{org-1}/{user}") == b"org-1"
+    assert hash_tag(b"LIMITER/{}/{org-1}") is None
+    assert hash_tag(b"LIMITER/{org-1") is None
+    assert hash_tag(b"LIMITER/org-1") is None
+
+
+def test_hashed_key_encoder():
+    encoder = HashedKeyEncoder()
+    limit = RateLimitItemPerMinute(100)
+    key = encoder(limit.key_for("a" * 200, "/api/v1/resources"))
+
+    assert key.startswith(b"LIMITER/")
+    assert len(key) == len(b"LIMITER/") + 16
+    assert encoder(limit.key_for("a" * 200, "/api/v1/resources")) == key
+    assert encoder(limit.key_for("b" * 200, "/api/v1/resources")) != key
+    assert encoder(RateLimitItemPerMinute(10).key_for("a" * 200, "/api/v1/resources")) != key
+
+
+def test_hashed_key_encoder_options():
+    key = RateLimitItemPerMinute(100).key_for("user")
+
+    encoded = HashedKeyEncoder(namespace="LIMITER:app", digest_size=8)(key)
+    assert encoded.startswith(b"LIMITER:app/")
+    assert len(encoded) == len(b"LIMITER:app/") + 8
+
+    text_encoder = HashedKeyEncoder(digest_size=12, text=True)
+    assert text_encoder.text is True
+    encoded = text_encoder(key)
+    assert len(encoded) == len(b"LIMITER/") + 16
+    assert encoded.decode("ascii").replace("-", "").replace("_", "").replace("/", "").isalnum()
+
+    for digest_size in (0, 65):
+        with pytest.raises(ValueError):
+            HashedKeyEncoder(digest_size=digest_size)
+
+
+def test_hashed_key_encoder_keeps_hash_tag():
+    encoder = HashedKeyEncoder()
+    limit = RateLimitItemPerMinute(100)
+
+    user_key = encoder(limit.key_for("{org-1}", "user-1"))
+    org_key = encoder(limit.key_for("{org-1}"))
+    assert user_key.startswith(b"LIMITER/{org-1}/")
+    assert org_key.startswith(b"LIMITER/{org-1}/")
+    assert user_key != org_key
+    assert hash_tag(user_key) == hash_tag(org_key) == b"org-1"
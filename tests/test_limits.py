@@ -1,3 +1,8 @@
+import enum
+import pickle
+
+import pytest
+
 from freiner import limits
 
 
@@ -28,3 +33,67 @@ def test_key_with_mixed_string_types_default_namespace():
 def test_key_with_object_default_namespace():
     item = FakeLimit(1, 1)
     assert item.key_for({"a": 1, "b": 2}) == "LIMITER/{'a': 1, 'b': 2}/1/1/fake"
+
+
+def test_equality_and_hash():
+    item = FakeLimit(10, 2)
+    assert item == FakeLimit(10, 2)
+    assert hash(item) == hash(FakeLimit(10, 2))
+    assert item != FakeLimit(10, 1)
+    assert item != FakeLimit(10, 2, namespace="OTHER")
+    assert {item: 1}[FakeLimit(10, 2)] == 1
+
+
+def test_ordering():
+    item = FakeLimit(10, 2)
+    assert not item < FakeLimit(10, 2)
+    assert item <= FakeLimit(10, 2)
+    assert item < FakeLimit(10, 3)
+    assert item > FakeLimit(10, 1)
+    assert item < FakeLimit(20, 2)
+    assert item < FakeLimit(10, 2, namespace="OTHER")
+    # A longer window sorts later, whatever its amount.
+    assert FakeLimit(100, 1) < item
+    # Items with windows of the same length are still ordered consistently with equality.
+    per_minute = limits.RateLimitItemPerMinute(10)
+    per_60_seconds = limits.RateLimitItemPerSecond(10, 60)
+    assert per_minute != per_60_seconds
+    assert per_60_seconds < per_minute
+    assert not per_minute < per_60_seconds
+    assert sorted([per_minute, per_60_seconds]) == [per_60_seconds, per_minute]
+
+
+def test_immutable():
+    item = FakeLimit(10)
+    with pytest.raises(AttributeError):
+        item.amount = 20
+    with pytest.raises(AttributeError):
+        del item.namespace
+    assert item.amount == 10
+
+
+def test_key_builder():
+    item = FakeLimit(1, 1)
+    key_for = item.key_builder("a", 1)
+    assert key_for("b") == item.key_for("a", 1, "b") == "LIMITER/a/1/b/1/1/fake"
+    assert key_for(b"b", 2) == item.key_for("a", 1, b"b", 2) == "LIMITER/a/1/b/2/1/1/fake"
+    assert key_for() == item.key_for("a", 1) == "LIMITER/a/1/1/1/fake"
+    assert item.key_builder()("a") == item.key_for("a")
+
+
+def test_slots():
+    item = limits.RateLimitItemPerMinute(10, 2, namespace="OTHER")
+    assert not hasattr(item, "__dict__")
+    assert pickle.loads(pickle.dumps(item)) == item
+
+
+def test_key_with_str_subclass_default_namespace():
+    class Kind(str, enum.Enum):
+        USER = "user"
+
+        def __str__(self) -> str:
+            return "kind-user"
+
+    item = FakeLimit(1, 1)
+    assert item.key_for(Kind.USER, "a") == "LIMITER/kind-user/a/1/1/fake"
+    assert item.key_builder("a")(Kind.USER) == "LIMITER/a/kind-user/1/1/fake"
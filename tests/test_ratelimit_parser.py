@@ -3,7 +3,7 @@ import re
 import pytest
 
 from freiner import limits
-from freiner.util import granularity_from_string, parse, parse_many
+from freiner.util import _parse_many, granularity_from_string, parse, parse_many
 
 
 def _test_single_rate(rl_string: str, limit: limits.RateLimitItem) -> None:
@@ -180,3 +180,18 @@ def test_unknown_granularity():
 
     with pytest.raises(ValueError, match=errmsg):
         granularity_from_string("millenium")
+
+
+def test_parse_interned():
+    first = parse_many("10/minute; 5 per 2 seconds")
+    assert parse_many("10/minute; 5 per 2 seconds") is first
+    assert parse("10 per minute") is first[0]
+    assert parse("5/2 second") is first[1]
+    assert parse("10/hour") is not first[0]
+
+
+def test_parse_cache_bounded():
+    _parse_many.cache_clear()
+    for amount in range(0, 2000):
+        parse(f"{amount}/second")
+    assert _parse_many.cache_info().currsize <= 1024
@@ -1,8 +1,10 @@
 import re
 import time
+from typing import List
 
 import pytest
 
+from freiner.limits import RateLimitItemPerMinute
 from freiner.storage import MovingWindow
 from freiner.strategies.fixed_window import FixedWindowRateLimiter
 from freiner.strategies.moving_window import MovingWindowRateLimiter
@@ -23,8 +25,12 @@ def test_pluggable_storage_fixed_window():
             pass
 
     storage = MyStorage()
-    strategy = FixedWindowRateLimiter(storage)
-    assert strategy.storage is storage
+    # Ignore the type error here, as the protocol now has an amount argument that this
+    # storage predates.
+    strategy = FixedWindowRateLimiter(storage)  # type: ignore[arg-type]
+    assert strategy.storage is storage  # type: ignore[comparison-overlap]
+    # Storages written before hits had a cost still work for hits of the default cost.
+    assert strategy.hit(RateLimitItemPerMinute(1)) is True
 
     errmsg = re.escape(
         "Moving Window rate limiting is not implemented for storage of type MyStorage"
@@ -46,8 +52,11 @@ def test_pluggable_storage_moving_window():
             pass
 
     storage = MyStorage()
-    strategy = MovingWindowRateLimiter(storage)
-    assert strategy.storage is storage
+    # Ignore the type error here, as the protocol now has an amount argument that this
+    # storage predates.
+    strategy = MovingWindowRateLimiter(storage)  # type: ignore[arg-type]
+    assert strategy.storage is storage  # type: ignore[comparison-overlap]
+    assert strategy.hit(RateLimitItemPerMinute(1)) is True
 
     errmsg = re.escape(
         "Fixed Window rate limiting is not implemented for storage of type MyStorage"
@@ -55,3 +64,39 @@ def test_pluggable_storage_moving_window():
     with pytest.raises(TypeError, match=errmsg):
         # Ignore the type error here because that's exactly what we're testing for.
         FixedWindowRateLimiter(storage)  # type: ignore
+
+
+def test_pluggable_storage_with_cost():
+    class MyStorage:
+        def __init__(self) -> None:
+            self.amounts: List[int] = []
+
+        def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+            self.amounts.append(amount)
+            return amount
+
+        def get(self, key: str) -> int:
+            return 0
+
+        def get_expiry(self, key: str) -> float:
+            return time.time()
+
+        def clear(self, key: str):
+            pass
+
+        def acquire_entry(
+            self, key: str, limit: int, expiry: int, no_add: bool = False, amount: int = 1
+        ) -> bool:
+            self.amounts.append(amount)
+            return amount <= limit
+
+        def get_moving_window(self, key: str, limit: int, expiry: int) -> MovingWindow:
+            return MovingWindow(time.time(), 0)
+
+    storage = MyStorage()
+    limit = RateLimitItemPerMinute(5)
+    assert FixedWindowRateLimiter(storage).hit(limit, cost=3) is True
+    assert FixedWindowRateLimiter(storage).hit(limit, cost=6) is False
+    assert MovingWindowRateLimiter(storage).hit(limit, cost=4) is True
+    assert MovingWindowRateLimiter(storage).hit(limit) is True
+    assert storage.amounts == [3, 6, 4, 1]
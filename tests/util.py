@@ -12,6 +12,14 @@ ROOTDIR = Path(__file__).parent.parent
 DOCKERDIR = ROOTDIR / ".docker"
 
 
+class ManualClock:
+    def __init__(self, now: float) -> None:
+        self.time = now
+
+    def now(self) -> float:
+        return self.time
+
+
 def fixed_start(func: Callable[..., Any]):
     @functools.wraps(func)
     def _inner(*args: Any, **kwargs: Any):